@@ -3,13 +3,6 @@ import streamlit as st
 import sys
 import os
 from pathlib import Path
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
 
 # إعداد المسارات
 sys.path.append(str(Path(__file__).parent.parent))
@@ -18,20 +11,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # استيراد مدير التكوين
 from config_manager import ConfigManager
 
-# استيراد الوحدات
-from modules.document_analysis.document_app import DocumentAnalysisApp
-from modules.pricing.pricing_app import PricingApp
-from modules.resources.resources_app import ResourcesApp
-from modules.risk_analysis.risk_analyzer import RiskAnalysisApp
-from modules.project_management.project_management_app import ProjectsApp
-from modules.maps.maps_app import MapsApp
-from modules.notifications.notifications_app import NotificationsApp
-from modules.document_comparison.document_comparison_app import DocumentComparisonApp
-from modules.translation.translation_app import TranslationApp
-from modules.ai_assistant.ai_app import AIAssistantApp
-from modules.data_analysis.data_analysis_app import DataAnalysisApp
-from pricing_system.modules.pricing_strategies.pricing_strategies import PricingStrategies #added import
-from pricing_system.integrated_app import IntegratedApp #added import
+# سجل الصفحات (تستورد وحدة كل صفحة عند أول اختيار لها)
+from page_registry import PAGES, get_page_app, run_page
 from styling.enhanced_ui import UIEnhancer
 
 # تهيئة مدير التكوين
@@ -50,14 +31,10 @@ config_manager.set_page_config_if_needed(
     }
 )
 
-# تطبيق التنسيق العام
+# تطبيق التنسيق العام والأنماط الموحدة للنظام (حزمة CSS واحدة مخزنة)
 ui_enhancer = UIEnhancer(page_title="نظام تحليل المناقصات", page_icon="📊")
 ui_enhancer.apply_global_styles()
 
-# تطبيق الأنماط الموحدة المخصصة للنظام
-with open("pricing_system/static/css/unified_style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
 # إنشاء قائمة العناصر
 menu_items = [
     {"name": "لوحة المعلومات", "icon": "house"},
@@ -113,16 +90,9 @@ if selected == "لوحة المعلومات":
                 st.button("عرض", key=f"view_{notification['title']}")
             st.divider()
 
-elif selected == "تحليل المستندات":
-    document_app = DocumentAnalysisApp()
-    document_app.run()
-
 elif selected == "نظام التسعير":
-    import streamlit as st
-    from pricing_system.integrated_app import IntegratedApp
-
     # تهيئة النظام المتكامل
-    integrated_pricing = IntegratedApp()
+    integrated_pricing = get_page_app("نظام التسعير")
 
     # إعداد التكوين مرة واحدة في بداية التطبيق
     config_manager.set_page_config_if_needed(
@@ -132,24 +102,8 @@ elif selected == "نظام التسعير":
         initial_sidebar_state="expanded"
     )
 
-    # عرض الشعار وعنوان النظام
+    # عرض الشعار وعنوان النظام (الأنماط في pricing_pages.css)
     st.markdown("""
-        <style>
-            .title-container {
-                display: flex;
-                align-items: center;
-                padding: 1rem;
-                background-color: #f0f2f6;
-                border-radius: 0.5rem;
-                margin-bottom: 2rem;
-            }
-            .main-title {
-                color: #1f77b4;
-                font-size: 1.8rem;
-                margin: 0;
-                padding: 0;
-            }
-        </style>
         <div class="title-container">
             <h1 class="main-title">نظام التسعير المتكامل</h1>
         </div>
@@ -159,46 +113,8 @@ elif selected == "نظام التسعير":
     integrated_pricing.run()
 
 
-elif selected == "الموارد والتكاليف":
-    resources_app = ResourcesApp()
-    resources_app.run()
-
-elif selected == "تحليل المخاطر":
-    risk_app = RiskAnalysisApp()
-    risk_app.run()
-
-elif selected == "إدارة المشاريع":
-    projects_app = ProjectsApp()
-    projects_app.run()
-
-elif selected == "الخرائط والمواقع":
-    maps_app = MapsApp()
-    maps_app.run()
-
-elif selected == "الإشعارات":
-    notifications_app = NotificationsApp()
-    notifications_app.run()
-
-elif selected == "مقارنة المستندات":
-    document_comparison_app = DocumentComparisonApp()
-    document_comparison_app.run()
-
-elif selected == "الترجمة":
-    translation_app = TranslationApp()
-    translation_app.run()
-
-elif selected == "المساعد الذكي":
-    ai_app = AIAssistantApp()
-    ai_app.run()
-
-elif selected == "تحليل البيانات":
-    data_analysis_app = DataAnalysisApp()
-    data_analysis_app.run()
-
-elif selected == "الجدول الزمني":
-    from modules.scheduling.schedule_app import ScheduleApp
-    schedule_app = ScheduleApp()
-    schedule_app.run()
+elif selected in PAGES:
+    run_page(selected)
 
 elif selected == "الإعدادات":
     ui_enhancer.create_header("الإعدادات", "إعدادات النظام والحساب")
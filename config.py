@@ -67,11 +67,20 @@ class AppConfig:
                 "email_server": "smtp.example.com",
                 "email_port": 587,
                 "email_username": "",
-                "email_password": ""
+                "email_password": "",
+                "email_sender": "",
+                "email_use_tls": True,
+                "email_recipients": [],
+                "webhook_urls": [],
+                "delivery_rate_per_second": 5,
+                "delivery_max_attempts": 5
             },
             "reports": {
                 "default_format": "pdf",
-                "default_path": os.path.join(self.data_dir, "reports")
+                "default_path": os.path.join(self.data_dir, "reports"),
+                "retention_days": 30,
+                "keep_per_job": 10,
+                "scheduler_workers": 2
             },
             "backup": {
                 "auto_backup": True,
@@ -209,14 +218,23 @@ class AppConfig:
             "email_server": "smtp.example.com",
             "email_port": 587,
             "email_username": "",
-            "email_password": ""
+            "email_password": "",
+            "email_sender": "",
+            "email_use_tls": True,
+            "email_recipients": [],
+            "webhook_urls": [],
+            "delivery_rate_per_second": 5,
+            "delivery_max_attempts": 5
         })
     
     def get_reports_config(self):
         """الحصول على إعدادات التقارير"""
         return self.settings.get("reports", {
             "default_format": "pdf",
-            "default_path": os.path.join(self.data_dir, "reports")
+            "default_path": os.path.join(self.data_dir, "reports"),
+            "retention_days": 30,
+            "keep_per_job": 10,
+            "scheduler_workers": 2
         })
     
     def get_backup_config(self):
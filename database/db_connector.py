@@ -86,10 +86,20 @@ class DatabaseConnector:
             created_by INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            project_type TEXT,
+            location TEXT,
+            local_content REAL,
             FOREIGN KEY (created_by) REFERENCES users (id)
         )
         ''')
         
+        # إضافة أعمدة التصنيف إلى قواعد البيانات المنشأة بإصدارات سابقة
+        self._add_missing_columns('projects', {
+            'project_type': 'TEXT',
+            'location': 'TEXT',
+            'local_content': 'REAL'
+        })
+        
         # جدول المستندات
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS documents (
@@ -207,6 +217,16 @@ class DatabaseConnector:
         # حفظ التغييرات
         self.connection.commit()
     
+    def _add_missing_columns(self, table, columns):
+        """إضافة الأعمدة غير الموجودة إلى جدول قائم"""
+        self.cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in self.cursor.fetchall()}
+        
+        for column, column_type in columns.items():
+            if column not in existing:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                logger.info(f"تمت إضافة العمود {column} إلى الجدول {table}")
+    
     def _add_default_data(self):
         """إضافة بيانات افتراضية"""
         # التحقق من وجود مستخدمين
@@ -16,6 +16,169 @@ import json
 import base64
 from pathlib import Path
 
+from modules.pricing.services.scenario_engine import ScenarioEngine
+from modules.pricing.services.competitor_index import CompetitorIndex, OUR_COMPANY
+
+# بنود التكلفة الأساسية الافتراضية لتهيئة محرك السيناريوهات
+DEFAULT_COST_ITEMS = [
+    {
+        'id': 1,
+        'category': 'تكاليف مباشرة',
+        'subcategory': 'مواد',
+        'description': 'خرسانة',
+        'amount': 120000
+    },
+    {
+        'id': 2,
+        'category': 'تكاليف مباشرة',
+        'subcategory': 'مواد',
+        'description': 'حديد تسليح',
+        'amount': 135000
+    },
+    {
+        'id': 3,
+        'category': 'تكاليف مباشرة',
+        'subcategory': 'مواد',
+        'description': 'طابوق',
+        'amount': 54000
+    },
+    {
+        'id': 4,
+        'category': 'تكاليف مباشرة',
+        'subcategory': 'عمالة',
+        'description': 'عمالة تنفيذ',
+        'amount': 120000
+    },
+    {
+        'id': 5,
+        'category': 'تكاليف مباشرة',
+        'subcategory': 'معدات',
+        'description': 'معدات إنشائية',
+        'amount': 85000
+    },
+    {
+        'id': 6,
+        'category': 'تكاليف غير مباشرة',
+        'subcategory': 'إدارة',
+        'description': 'إدارة المشروع',
+        'amount': 45000
+    },
+    {
+        'id': 7,
+        'category': 'تكاليف غير مباشرة',
+        'subcategory': 'إدارة',
+        'description': 'إشراف هندسي',
+        'amount': 35000
+    },
+    {
+        'id': 8,
+        'category': 'تكاليف غير مباشرة',
+        'subcategory': 'عامة',
+        'description': 'تأمينات وضمانات',
+        'amount': 25000
+    },
+    {
+        'id': 9,
+        'category': 'تكاليف غير مباشرة',
+        'subcategory': 'عامة',
+        'description': 'مصاريف إدارية',
+        'amount': 30000
+    },
+    {
+        'id': 10,
+        'category': 'أرباح',
+        'subcategory': 'أرباح',
+        'description': 'هامش الربح',
+        'amount': 55000
+    }
+]
+
+# السيناريوهات الافتراضية (هامش ربح دون تعديلات على النموذج الأساسي)
+DEFAULT_SCENARIOS = [
+    {
+        'name': 'السيناريو الأساسي',
+        'description': 'التسعير الأساسي مع هامش ربح 8%',
+        'profit_margin': 8.2,
+        'is_active': True
+    },
+    {
+        'name': 'سيناريو تنافسي',
+        'description': 'تخفيض هامش الربح للمنافسة',
+        'profit_margin': 5.0
+    },
+    {
+        'name': 'سيناريو مرتفع',
+        'description': 'زيادة هامش الربح للمشاريع ذات المخاطر العالية',
+        'profit_margin': 12.0
+    }
+]
+
+# بيانات المقارنة التنافسية الافتراضية لتهيئة فهرس أسعار المنافسين
+DEFAULT_COMPETITORS = [
+    {
+        'competitor': 'شركة الإنشاءات المتحدة',
+        'project_type': 'مباني سكنية',
+        'region': 'الرياض',
+        'price_per_sqm': 1800,
+        'delivery_time': 12,
+        'quality_rating': 4.2,
+        'market_share': 15.5
+    },
+    {
+        'competitor': 'مجموعة البناء الحديث',
+        'project_type': 'مباني سكنية',
+        'region': 'الرياض',
+        'price_per_sqm': 2100,
+        'delivery_time': 10,
+        'quality_rating': 4.5,
+        'market_share': 18.2
+    },
+    {
+        'competitor': 'شركة الإعمار الدولية',
+        'project_type': 'مباني سكنية',
+        'region': 'جدة',
+        'price_per_sqm': 2300,
+        'delivery_time': 14,
+        'quality_rating': 4.7,
+        'market_share': 22.0
+    },
+    {
+        'competitor': 'مؤسسة البناء المتكامل',
+        'project_type': 'مباني سكنية',
+        'region': 'المنطقة الشرقية',
+        'price_per_sqm': 1750,
+        'delivery_time': 15,
+        'quality_rating': 3.8,
+        'market_share': 12.5
+    },
+    {
+        'competitor': 'شركتنا',
+        'project_type': 'مباني سكنية',
+        'region': 'الرياض',
+        'price_per_sqm': 1950,
+        'delivery_time': 11,
+        'quality_rating': 4.4,
+        'market_share': 14.8
+    }
+]
+
+
+@st.cache_resource
+def get_scenario_engine():
+    """الحصول على محرك سيناريوهات التسعير المشترك بين الجلسات"""
+    engine = ScenarioEngine()
+    engine.seed(DEFAULT_COST_ITEMS, DEFAULT_SCENARIOS)
+    return engine
+
+
+@st.cache_resource
+def get_competitor_index():
+    """الحصول على فهرس أسعار المنافسين المشترك بين الجلسات"""
+    index = CompetitorIndex()
+    index.seed(DEFAULT_COMPETITORS)
+    return index
+
+
 class PricingApp:
     """وحدة التسعير"""
     
@@ -127,170 +290,19 @@ class PricingApp:
                 }
             ]
         
-        if 'cost_analysis' not in st.session_state:
-            st.session_state.cost_analysis = [
-                {
-                    'id': 1,
-                    'category': 'تكاليف مباشرة',
-                    'subcategory': 'مواد',
-                    'description': 'خرسانة',
-                    'amount': 120000,
-                    'percentage': 17.9
-                },
-                {
-                    'id': 2,
-                    'category': 'تكاليف مباشرة',
-                    'subcategory': 'مواد',
-                    'description': 'حديد تسليح',
-                    'amount': 135000,
-                    'percentage': 20.1
-                },
-                {
-                    'id': 3,
-                    'category': 'تكاليف مباشرة',
-                    'subcategory': 'مواد',
-                    'description': 'طابوق',
-                    'amount': 54000,
-                    'percentage': 8.1
-                },
-                {
-                    'id': 4,
-                    'category': 'تكاليف مباشرة',
-                    'subcategory': 'عمالة',
-                    'description': 'عمالة تنفيذ',
-                    'amount': 120000,
-                    'percentage': 17.9
-                },
-                {
-                    'id': 5,
-                    'category': 'تكاليف مباشرة',
-                    'subcategory': 'معدات',
-                    'description': 'معدات إنشائية',
-                    'amount': 85000,
-                    'percentage': 12.7
-                },
-                {
-                    'id': 6,
-                    'category': 'تكاليف غير مباشرة',
-                    'subcategory': 'إدارة',
-                    'description': 'إدارة المشروع',
-                    'amount': 45000,
-                    'percentage': 6.7
-                },
-                {
-                    'id': 7,
-                    'category': 'تكاليف غير مباشرة',
-                    'subcategory': 'إدارة',
-                    'description': 'إشراف هندسي',
-                    'amount': 35000,
-                    'percentage': 5.2
-                },
-                {
-                    'id': 8,
-                    'category': 'تكاليف غير مباشرة',
-                    'subcategory': 'عامة',
-                    'description': 'تأمينات وضمانات',
-                    'amount': 25000,
-                    'percentage': 3.7
-                },
-                {
-                    'id': 9,
-                    'category': 'تكاليف غير مباشرة',
-                    'subcategory': 'عامة',
-                    'description': 'مصاريف إدارية',
-                    'amount': 30000,
-                    'percentage': 4.5
-                },
-                {
-                    'id': 10,
-                    'category': 'أرباح',
-                    'subcategory': 'أرباح',
-                    'description': 'هامش الربح',
-                    'amount': 55000,
-                    'percentage': 8.2
-                }
-            ]
+        self.scenario_engine = get_scenario_engine()
+        self.competitor_index = get_competitor_index()
         
-        if 'price_scenarios' not in st.session_state:
-            st.session_state.price_scenarios = [
-                {
-                    'id': 1,
-                    'name': 'السيناريو الأساسي',
-                    'description': 'التسعير الأساسي مع هامش ربح 8%',
-                    'total_cost': 615000,
-                    'profit_margin': 8.2,
-                    'total_price': 670000,
-                    'is_active': True
-                },
-                {
-                    'id': 2,
-                    'name': 'سيناريو تنافسي',
-                    'description': 'تخفيض هامش الربح للمنافسة',
-                    'total_cost': 615000,
-                    'profit_margin': 5.0,
-                    'total_price': 650000,
-                    'is_active': False
-                },
-                {
-                    'id': 3,
-                    'name': 'سيناريو مرتفع',
-                    'description': 'زيادة هامش الربح للمشاريع ذات المخاطر العالية',
-                    'total_cost': 615000,
-                    'profit_margin': 12.0,
-                    'total_price': 700000,
-                    'is_active': False
-                }
-            ]
-            
-        # إضافة بيانات المقارنة التنافسية
-        if 'competitive_analysis' not in st.session_state:
-            st.session_state.competitive_analysis = [
-                {
-                    'id': 1,
-                    'competitor': 'شركة الإنشاءات المتحدة',
-                    'project_type': 'مباني سكنية',
-                    'price_per_sqm': 1800,
-                    'delivery_time': 12,
-                    'quality_rating': 4.2,
-                    'market_share': 15.5
-                },
-                {
-                    'id': 2,
-                    'competitor': 'مجموعة البناء الحديث',
-                    'project_type': 'مباني سكنية',
-                    'price_per_sqm': 2100,
-                    'delivery_time': 10,
-                    'quality_rating': 4.5,
-                    'market_share': 18.2
-                },
-                {
-                    'id': 3,
-                    'competitor': 'شركة الإعمار الدولية',
-                    'project_type': 'مباني سكنية',
-                    'price_per_sqm': 2300,
-                    'delivery_time': 14,
-                    'quality_rating': 4.7,
-                    'market_share': 22.0
-                },
-                {
-                    'id': 4,
-                    'competitor': 'مؤسسة البناء المتكامل',
-                    'project_type': 'مباني سكنية',
-                    'price_per_sqm': 1750,
-                    'delivery_time': 15,
-                    'quality_rating': 3.8,
-                    'market_share': 12.5
-                },
-                {
-                    'id': 5,
-                    'competitor': 'شركتنا',
-                    'project_type': 'مباني سكنية',
-                    'price_per_sqm': 1950,
-                    'delivery_time': 11,
-                    'quality_rating': 4.4,
-                    'market_share': 14.8
-                }
-            ]
+        if 'cost_analysis' not in st.session_state:
+            st.session_state.cost_analysis = self._load_cost_analysis()
+    
+    def _load_cost_analysis(self):
+        """تحميل بنود التكلفة من النموذج الأساسي مع نسبها المئوية"""
+        items = self.scenario_engine.base_items()
+        total = self.scenario_engine.base_total(include_profit=True)
+        for item in items:
+            item['percentage'] = (item['amount'] / total) * 100 if total > 0 else 0
+        return items
     
     def run(self):
         """تشغيل وحدة التسعير"""
@@ -617,8 +629,8 @@ class PricingApp:
         with col2:
             new_amount = st.number_input("المبلغ", min_value=0.0, step=1000.0, key="new_cost_amount")
             
-            # حساب إجمالي التكاليف الحالية
-            total_cost = sum(item['amount'] for item in st.session_state.cost_analysis)
+            # حساب إجمالي التكاليف الحالية (مخزن لكل إصدار من النموذج الأساسي)
+            total_cost = self.scenario_engine.base_total(include_profit=True)
             
             # حساب النسبة المئوية التقريبية
             if total_cost > 0:
@@ -630,25 +642,11 @@ class PricingApp:
         
         if st.button("إضافة بند التكلفة", key="add_cost_item"):
             if new_description and new_amount > 0:
-                # إضافة بند جديد
-                new_id = max([item['id'] for item in st.session_state.cost_analysis]) + 1
-                
-                # حساب النسبة المئوية الفعلية بعد إضافة البند الجديد
-                new_total = total_cost + new_amount
-                
-                # إعادة حساب النسب المئوية لجميع البنود
-                for item in st.session_state.cost_analysis:
-                    item['percentage'] = (item['amount'] / new_total) * 100
+                # إضافة البند إلى النموذج الأساسي (يلغي إجماليات السيناريوهات المخزنة)
+                self.scenario_engine.add_base_item(new_category, new_subcategory, new_description, new_amount)
                 
-                # إضافة البند الجديد
-                st.session_state.cost_analysis.append({
-                    'id': new_id,
-                    'category': new_category,
-                    'subcategory': new_subcategory,
-                    'description': new_description,
-                    'amount': new_amount,
-                    'percentage': (new_amount / new_total) * 100
-                })
+                # إعادة تحميل البنود مع النسب المئوية بعد إضافة البند الجديد
+                st.session_state.cost_analysis = self._load_cost_analysis()
                 
                 st.success(f"تمت إضافة بند التكلفة بنجاح: {new_description}")
                 
@@ -744,37 +742,39 @@ class PricingApp:
         
         st.markdown("### سيناريوهات التسعير")
         
-        # عرض جدول سيناريوهات التسعير
-        scenarios_df = pd.DataFrame(st.session_state.price_scenarios)
+        # السيناريوهات المحفوظة بإجمالياتها المخزنة
+        scenarios = self.scenario_engine.scenarios()
         
-        st.dataframe(
-            scenarios_df[['name', 'description', 'total_cost', 'profit_margin', 'total_price', 'is_active']],
-            column_config={
-                'name': 'اسم السيناريو',
-                'description': 'الوصف',
-                'total_cost': st.column_config.NumberColumn('إجمالي التكلفة', format='%d ريال'),
-                'profit_margin': st.column_config.NumberColumn('هامش الربح', format='%.1f%%'),
-                'total_price': st.column_config.NumberColumn('السعر الإجمالي', format='%d ريال'),
-                'is_active': st.column_config.CheckboxColumn('نشط')
-            },
-            hide_index=True,
-            use_container_width=True
-        )
+        if scenarios:
+            scenarios_df = pd.DataFrame(scenarios)
+            scenarios_df['deltas'] = scenarios_df['deltas'].apply(len)
+            
+            st.dataframe(
+                scenarios_df[['name', 'description', 'total_cost', 'profit_margin', 'total_price', 'deltas', 'is_active']],
+                column_config={
+                    'name': 'اسم السيناريو',
+                    'description': 'الوصف',
+                    'total_cost': st.column_config.NumberColumn('إجمالي التكلفة', format='%d ريال'),
+                    'profit_margin': st.column_config.NumberColumn('هامش الربح', format='%.1f%%'),
+                    'total_price': st.column_config.NumberColumn('السعر الإجمالي', format='%d ريال'),
+                    'deltas': st.column_config.NumberColumn('عدد التعديلات'),
+                    'is_active': st.column_config.CheckboxColumn('نشط')
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("لا توجد سيناريوهات محفوظة")
         
         # إنشاء سيناريو جديد
         st.markdown("### إنشاء سيناريو جديد")
         
         col1, col2 = st.columns(2)
         
-        # حساب إجمالي التكاليف
-        total_cost = sum(item['amount'] for item in st.session_state.cost_analysis 
-                         if item['category'] != 'أرباح')
-        
         with col1:
             new_name = st.text_input("اسم السيناريو", key="new_scenario_name")
             new_description = st.text_input("وصف السيناريو", key="new_scenario_description")
-        
-        with col2:
+            
             new_profit_margin = st.slider(
                 "هامش الربح (%)",
                 min_value=0.0,
@@ -783,28 +783,42 @@ class PricingApp:
                 step=0.5,
                 key="new_scenario_profit_margin"
             )
+        
+        with col2:
+            st.markdown("**تعديلات على التكلفة الأساسية (%)**")
             
-            # حساب السعر الإجمالي بناءً على هامش الربح
-            profit_amount = total_cost * (new_profit_margin / 100)
-            new_total_price = total_cost + profit_amount
-            
-            st.metric("إجمالي التكلفة", f"{total_cost:,.0f} ريال")
-            st.metric("السعر الإجمالي المقترح", f"{new_total_price:,.0f} ريال")
+            # تعديل نسبي لكل فئة فرعية من التكاليف في النموذج الأساسي
+            subcategories = list(dict.fromkeys(
+                item['subcategory'] for item in st.session_state.cost_analysis
+                if item['category'] != 'أرباح'
+            ))
+            new_deltas = []
+            for subcategory in subcategories:
+                percent = st.number_input(
+                    subcategory,
+                    min_value=-50.0,
+                    max_value=100.0,
+                    value=0.0,
+                    step=1.0,
+                    key=f"new_scenario_delta_{subcategory}"
+                )
+                if percent:
+                    new_deltas.append({'scope': 'subcategory', 'target': subcategory, 'percent': percent})
+        
+        # معاينة السيناريو الجديد على النموذج الأساسي الحالي
+        preview = self.scenario_engine.evaluate([{'profit_margin': new_profit_margin, 'deltas': new_deltas}])
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.metric("إجمالي التكلفة", f"{preview['total_cost'][0]:,.0f} ريال")
+        
+        with col2:
+            st.metric("السعر الإجمالي المقترح", f"{preview['total_price'][0]:,.0f} ريال")
         
         if st.button("إضافة السيناريو", key="add_scenario"):
             if new_name and new_description:
-                # إضافة سيناريو جديد
-                new_id = max([item['id'] for item in st.session_state.price_scenarios]) + 1
-                
-                st.session_state.price_scenarios.append({
-                    'id': new_id,
-                    'name': new_name,
-                    'description': new_description,
-                    'total_cost': total_cost,
-                    'profit_margin': new_profit_margin,
-                    'total_price': new_total_price,
-                    'is_active': False
-                })
+                self.scenario_engine.add_scenario(new_name, new_description, new_profit_margin, new_deltas)
                 
                 st.success(f"تمت إضافة السيناريو بنجاح: {new_name}")
                 
@@ -813,13 +827,16 @@ class PricingApp:
             else:
                 st.error("يرجى إدخال جميع البيانات المطلوبة بشكل صحيح")
         
+        if not scenarios:
+            return
+        
         # مقارنة السيناريوهات
         st.markdown("### مقارنة السيناريوهات")
         
         # إنشاء رسم بياني للمقارنة
         fig = go.Figure()
         
-        for scenario in st.session_state.price_scenarios:
+        for scenario in scenarios:
             fig.add_trace(go.Bar(
                 name=scenario['name'],
                 x=['التكلفة', 'الربح', 'السعر الإجمالي'],
@@ -845,17 +862,32 @@ class PricingApp:
         
         st.plotly_chart(fig, use_container_width=True)
         
+        # مقارنة تفصيلية حسب فئات التكلفة لجميع السيناريوهات في عملية واحدة
+        comparison_df = self.scenario_engine.compare()
+        
+        st.dataframe(
+            comparison_df.style.format({
+                column: '{:,.0f}' for column in comparison_df.columns
+                if column not in ('السيناريو', 'هامش الربح (%)')
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+        
         # تحليل حساسية هامش الربح
         st.markdown("### تحليل حساسية هامش الربح")
         
-        # إنشاء بيانات لتحليل الحساسية
+        # تقييم هوامش الربح على تعديلات السيناريو النشط في عملية واحدة
+        active_scenario = next((s for s in scenarios if s['is_active']), scenarios[0])
         profit_margins = list(range(5, 26, 1))  # من 5% إلى 25%
-        total_prices = [total_cost * (1 + margin/100) for margin in profit_margins]
+        sensitivity = self.scenario_engine.evaluate([
+            {'profit_margin': margin, 'deltas': active_scenario['deltas']} for margin in profit_margins
+        ])
         
         # إنشاء DataFrame للرسم البياني
         sensitivity_df = pd.DataFrame({
             'هامش الربح (%)': profit_margins,
-            'السعر الإجمالي': total_prices
+            'السعر الإجمالي': sensitivity['total_price']
         })
         
         # إنشاء رسم بياني خطي
@@ -863,7 +895,7 @@ class PricingApp:
             sensitivity_df,
             x='هامش الربح (%)',
             y='السعر الإجمالي',
-            title='تحليل حساسية هامش الربح',
+            title=f"تحليل حساسية هامش الربح ({active_scenario['name']})",
             markers=True
         )
         
@@ -882,8 +914,8 @@ class PricingApp:
         # تفعيل/تعطيل السيناريوهات
         st.markdown("### تفعيل/تعطيل السيناريوهات")
         
-        for i, scenario in enumerate(st.session_state.price_scenarios):
-            col1, col2 = st.columns([4, 1])
+        for scenario in scenarios:
+            col1, col2, col3 = st.columns([4, 1, 1])
             
             with col1:
                 st.write(f"**{scenario['name']}**: {scenario['description']}")
@@ -895,19 +927,17 @@ class PricingApp:
                     key=f"activate_scenario_{scenario['id']}"
                 )
                 
-                # تحديث حالة التفعيل
+                # تحديث حالة التفعيل (تفعيل سيناريو يعطل جميع السيناريوهات الأخرى)
                 if is_active != scenario['is_active']:
-                    # إذا تم تفعيل سيناريو، قم بتعطيل جميع السيناريوهات الأخرى
-                    if is_active:
-                        for j, other_scenario in enumerate(st.session_state.price_scenarios):
-                            if j != i:
-                                other_scenario['is_active'] = False
-                    
-                    # تحديث حالة السيناريو الحالي
-                    scenario['is_active'] = is_active
+                    self.scenario_engine.set_active(scenario['id'], is_active)
                     
                     # تحديث الصفحة
                     st.rerun()
+            
+            with col3:
+                if st.button("حذف", key=f"delete_scenario_{scenario['id']}"):
+                    self.scenario_engine.delete_scenario(scenario['id'])
+                    st.rerun()
     
     def _render_competitive_analysis_tab(self):
         """عرض تبويب المقارنة التنافسية"""
@@ -915,13 +945,15 @@ class PricingApp:
         st.markdown("### المقارنة التنافسية")
         
         # عرض جدول المقارنة التنافسية
-        competitive_df = pd.DataFrame(st.session_state.competitive_analysis)
+        competitors = self.competitor_index.competitors()
+        competitive_df = pd.DataFrame(competitors)
         
         st.dataframe(
-            competitive_df[['competitor', 'project_type', 'price_per_sqm', 'delivery_time', 'quality_rating', 'market_share']],
+            competitive_df[['competitor', 'project_type', 'region', 'price_per_sqm', 'delivery_time', 'quality_rating', 'market_share']],
             column_config={
                 'competitor': 'المنافس',
                 'project_type': 'نوع المشروع',
+                'region': 'المنطقة',
                 'price_per_sqm': st.column_config.NumberColumn('السعر لكل متر مربع', format='%d ريال'),
                 'delivery_time': st.column_config.NumberColumn('مدة التسليم (شهر)', format='%d'),
                 'quality_rating': st.column_config.NumberColumn('تقييم الجودة', format='%.1f/5.0'),
@@ -931,6 +963,9 @@ class PricingApp:
             use_container_width=True
         )
         
+        # موقع سعرنا من أسعار المنافسين
+        self._render_market_position(competitors)
+        
         # إضافة منافس جديد
         st.markdown("### إضافة منافس جديد")
         
@@ -943,6 +978,11 @@ class PricingApp:
                 ["مباني سكنية", "مباني تجارية", "مباني صناعية", "بنية تحتية"],
                 key="new_competitor_project_type"
             )
+            new_region = st.selectbox(
+                "المنطقة",
+                ["الرياض", "جدة", "مكة المكرمة", "المدينة المنورة", "المنطقة الشرقية", "أبها", "تبوك"],
+                key="new_competitor_region"
+            )
             new_price_per_sqm = st.number_input(
                 "السعر لكل متر مربع (ريال)",
                 min_value=0,
@@ -976,18 +1016,16 @@ class PricingApp:
         
         if st.button("إضافة منافس", key="add_competitor"):
             if new_competitor and new_price_per_sqm > 0:
-                # إضافة منافس جديد
-                new_id = max([item['id'] for item in st.session_state.competitive_analysis]) + 1
-                
-                st.session_state.competitive_analysis.append({
-                    'id': new_id,
-                    'competitor': new_competitor,
-                    'project_type': new_project_type,
-                    'price_per_sqm': new_price_per_sqm,
-                    'delivery_time': new_delivery_time,
-                    'quality_rating': new_quality_rating,
-                    'market_share': new_market_share
-                })
+                # إضافة المنافس إلى الفهرس (يدرج سعره في المصفوفات المرتبة مباشرة)
+                self.competitor_index.add(
+                    new_competitor,
+                    new_project_type,
+                    new_price_per_sqm,
+                    region=new_region,
+                    delivery_time=new_delivery_time,
+                    quality_rating=new_quality_rating,
+                    market_share=new_market_share
+                )
                 
                 st.success(f"تمت إضافة المنافس بنجاح: {new_competitor}")
                 
@@ -999,11 +1037,8 @@ class PricingApp:
         # تحليل مقارنة الأسعار
         st.markdown("### مقارنة الأسعار")
         
-        # إنشاء DataFrame للرسم البياني
-        price_comparison_df = pd.DataFrame(st.session_state.competitive_analysis)
-        
         # ترتيب البيانات تصاعديًا حسب السعر
-        price_comparison_df = price_comparison_df.sort_values('price_per_sqm')
+        price_comparison_df = competitive_df.sort_values('price_per_sqm')
         
         # إنشاء رسم بياني شريطي
         fig = px.bar(
@@ -1098,6 +1133,88 @@ class PricingApp:
         
         st.plotly_chart(fig, use_container_width=True)
     
+    def _render_market_position(self, competitors):
+        """عرض موقع سعرنا لكل متر مربع من أسعار المنافسين أثناء تعديل نسبة الإضافة"""
+        
+        st.markdown("### موقع سعرنا في السوق")
+        
+        project_types = sorted({item['project_type'] for item in competitors})
+        regions = sorted({item['region'] for item in competitors})
+        our_company = next((item for item in competitors if item['competitor'] == OUR_COMPANY), None)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            project_type = st.selectbox("نوع المشروع", project_types, key="position_project_type")
+            region = st.selectbox("المنطقة", ["كل المناطق"] + regions, key="position_region")
+            region = None if region == "كل المناطق" else region
+        
+        with col2:
+            cost_per_sqm = st.number_input(
+                "التكلفة لكل متر مربع (ريال)",
+                min_value=1.0,
+                value=float(our_company['price_per_sqm'] / 1.1) if our_company else 1750.0,
+                step=25.0,
+                key="position_cost_per_sqm"
+            )
+            markup = st.slider(
+                "نسبة الإضافة (%)",
+                min_value=-10.0,
+                max_value=40.0,
+                value=10.0,
+                step=0.5,
+                key="position_markup"
+            )
+        
+        price_per_sqm = cost_per_sqm * (1 + markup / 100)
+        position = self.competitor_index.position(price_per_sqm, project_type, region)
+        
+        if not position['count']:
+            st.info("لا توجد أسعار منافسين لنوع المشروع والمنطقة المحددين")
+            return
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("سعرنا لكل متر مربع", f"{price_per_sqm:,.0f} ريال")
+        
+        with col2:
+            st.metric("الترتيب المئوي", f"{position['percentile']:.0f}%")
+        
+        with col3:
+            st.metric("الترتيب بين المنافسين", f"{position['rank']} من {position['count'] + 1}")
+        
+        with col4:
+            st.metric("وسيط السوق", f"{position['median']:,.0f} ريال", f"{price_per_sqm - position['median']:,.0f}", delta_color="inverse")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if position['below']:
+                st.write(f"**أقرب منافس أرخص:** {position['below']['competitor']} ({position['below']['price_per_sqm']:,.0f} ريال)")
+            else:
+                st.write("**سعرنا أقل من جميع المنافسين**")
+        
+        with col2:
+            if position['above']:
+                st.write(f"**أقرب منافس أغلى:** {position['above']['competitor']} ({position['above']['price_per_sqm']:,.0f} ريال)")
+            else:
+                st.write("**سعرنا أعلى من جميع المنافسين**")
+        
+        # الترتيب المئوي لكل نسب الإضافة في عملية بحث ثنائي واحدة
+        markups = np.arange(-10.0, 40.5, 0.5)
+        percentiles = self.competitor_index.percentile_ranks(cost_per_sqm * (1 + markups / 100), project_type, region)
+        
+        fig = px.line(
+            pd.DataFrame({'نسبة الإضافة (%)': markups, 'الترتيب المئوي (%)': percentiles}),
+            x='نسبة الإضافة (%)',
+            y='الترتيب المئوي (%)',
+            title='الترتيب المئوي لسعرنا حسب نسبة الإضافة'
+        )
+        fig.add_vline(x=markup, line_dash="dash", line_color="red")
+        
+        st.plotly_chart(fig, use_container_width=True)
+    
     def _render_reports_tab(self):
         """عرض تبويب التقارير"""
         
@@ -1451,7 +1568,13 @@ class PricingApp:
         st.markdown("## تقرير سيناريوهات التسعير")
         
         # عرض جدول سيناريوهات التسعير
-        scenarios_df = pd.DataFrame(st.session_state.price_scenarios)
+        scenarios = self.scenario_engine.scenarios()
+        
+        if not scenarios:
+            st.info("لا توجد سيناريوهات محفوظة")
+            return
+        
+        scenarios_df = pd.DataFrame(scenarios)
         
         st.dataframe(
             scenarios_df[['name', 'description', 'total_cost', 'profit_margin', 'total_price', 'is_active']],
@@ -1473,7 +1596,7 @@ class PricingApp:
         # إنشاء رسم بياني للمقارنة
         fig = go.Figure()
         
-        for scenario in st.session_state.price_scenarios:
+        for scenario in scenarios:
             fig.add_trace(go.Bar(
                 name=scenario['name'],
                 x=['التكلفة', 'الربح', 'السعر الإجمالي'],
@@ -1504,9 +1627,9 @@ class PricingApp:
         
         # إنشاء DataFrame للمقارنة
         profit_comparison_df = pd.DataFrame({
-            'السيناريو': [scenario['name'] for scenario in st.session_state.price_scenarios],
-            'هامش الربح (%)': [scenario['profit_margin'] for scenario in st.session_state.price_scenarios],
-            'مبلغ الربح (ريال)': [scenario['total_price'] - scenario['total_cost'] for scenario in st.session_state.price_scenarios]
+            'السيناريو': [scenario['name'] for scenario in scenarios],
+            'هامش الربح (%)': [scenario['profit_margin'] for scenario in scenarios],
+            'مبلغ الربح (ريال)': [scenario['total_price'] - scenario['total_cost'] for scenario in scenarios]
         })
         
         # ترتيب البيانات تنازليًا حسب هامش الربح
@@ -1528,7 +1651,7 @@ class PricingApp:
         st.markdown("### تحليل حساسية هامش الربح")
         
         # الحصول على التكلفة الإجمالية من السيناريو النشط أو الأول
-        active_scenario = next((s for s in st.session_state.price_scenarios if s['is_active']), st.session_state.price_scenarios[0])
+        active_scenario = next((s for s in scenarios if s['is_active']), scenarios[0])
         total_cost = active_scenario['total_cost']
         
         # إنشاء بيانات لتحليل الحساسية
@@ -1568,7 +1691,8 @@ class PricingApp:
         st.markdown("## تقرير المقارنة التنافسية")
         
         # عرض جدول المقارنة التنافسية
-        competitive_df = pd.DataFrame(st.session_state.competitive_analysis)
+        competitors = self.competitor_index.competitors()
+        competitive_df = pd.DataFrame(competitors)
         
         st.dataframe(
             competitive_df[['competitor', 'project_type', 'price_per_sqm', 'delivery_time', 'quality_rating', 'market_share']],
@@ -1687,7 +1811,7 @@ class PricingApp:
         st.markdown("### تحليل الموقع التنافسي")
         
         # إيجاد بيانات شركتنا
-        our_company = next((item for item in st.session_state.competitive_analysis if item['competitor'] == 'شركتنا'), None)
+        our_company = next((item for item in competitors if item['competitor'] == 'شركتنا'), None)
         
         if our_company:
             # حساب متوسطات السوق
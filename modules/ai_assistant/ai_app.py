@@ -9,7 +9,6 @@ import numpy as np
 import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
-import seaborn as sns
 from datetime import datetime
 import time
 import os
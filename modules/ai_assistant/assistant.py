@@ -24,10 +24,14 @@ from io import BytesIO
 from tempfile import NamedTemporaryFile
 from PIL import Image
 
+from modules.ai_assistant.services.cost_model import load_cost_prediction_model
+from modules.ai_assistant.services.local_content_optimizer import LocalContentOptimizer, catalog_alternatives
+from pricing_system.modules.catalogs.materials_catalog import MaterialsCatalog
+from pricing_system.modules.catalogs.subcontractors_catalog import SubcontractorsCatalog
+
 # استيراد النماذج المطلوبة
 try:
     from models.inference import (
-        load_cost_prediction_model, 
         load_document_classifier_model, 
         load_risk_assessment_model,
         load_local_content_model,
@@ -35,9 +39,6 @@ try:
     )
 except ImportError:
     # إنشاء دوال وهمية في حال عدم توفر النماذج
-    def load_cost_prediction_model():
-        return None
-
     def load_document_classifier_model():
         return None
 
@@ -59,6 +60,35 @@ except ImportError:
     logging.warning("لم يتم العثور على مكتبة pdf2image. لن يمكن تحويل ملفات PDF إلى صور.")
 
 
+# البدائل المقترحة لمكونات المحتوى المحلي (معامل التكلفة نسبة إلى قيمة المكون الحالية)
+DEFAULT_LC_ALTERNATIVES = {
+    "الأثاث والتجهيزات": [
+        {"البديل": "شركة الأثاث الوطني", "الوصف": "شركة متخصصة في تصنيع الأثاث المكتبي محلياً",
+         "المحتوى المحلي": 80, "معامل التكلفة": 1.05, "تقييم الجودة": 4.2},
+        {"البديل": "مصنع التجهيزات المكتبية", "الوصف": "مصنع متخصص في إنتاج الأثاث المكتبي بخامات محلية",
+         "المحتوى المحلي": 90, "معامل التكلفة": 1.10, "تقييم الجودة": 4.5},
+        {"البديل": "توزيع المكونات على موردين محليين", "الوصف": "تقسيم توريد الأثاث على عدة موردين محليين",
+         "المحتوى المحلي": 75, "معامل التكلفة": 1.00, "تقييم الجودة": 4.0},
+    ],
+    "أنظمة الأمن والمراقبة": [
+        {"البديل": "شركة التقنية الأمنية السعودية", "الوصف": "شركة متخصصة في تركيب وتجميع أنظمة الأمن محلياً",
+         "المحتوى المحلي": 70, "معامل التكلفة": 1.08, "تقييم الجودة": 4.0},
+        {"البديل": "مؤسسة تقنيات الحماية", "الوصف": "توريد وتركيب أنظمة أمنية معتمدة من هيئة المحتوى المحلي",
+         "المحتوى المحلي": 65, "معامل التكلفة": 0.95, "تقييم الجودة": 3.8},
+        {"البديل": "تجميع الأنظمة محلياً", "الوصف": "استيراد المكونات وتجميعها وبرمجتها محلياً",
+         "المحتوى المحلي": 60, "معامل التكلفة": 0.90, "تقييم الجودة": 3.7},
+    ],
+    "الواجهات والنوافذ": [
+        {"البديل": "مصنع الزجاج السعودي", "الوصف": "مصنع متخصص في إنتاج الزجاج والواجهات الزجاجية محلياً",
+         "المحتوى المحلي": 85, "معامل التكلفة": 1.15, "تقييم الجودة": 4.3},
+        {"البديل": "شركة الألمنيوم الوطنية", "الوصف": "شركة متخصصة في إنتاج الواجهات والنوافذ من الألمنيوم محلياً",
+         "المحتوى المحلي": 90, "معامل التكلفة": 1.20, "تقييم الجودة": 4.5},
+        {"البديل": "تعديل التصميم لاستخدام مواد محلية", "الوصف": "تعديل تصميم الواجهات لاستخدام نسبة أكبر من المواد المتوفرة محلياً",
+         "المحتوى المحلي": 75, "معامل التكلفة": 1.00, "تقييم الجودة": 4.0},
+    ],
+}
+
+
 class ClaudeAIService:
     """
     فئة خدمة Claude AI للتحليل الذكي
@@ -670,9 +700,6 @@ class AIAssistantApp:
 
         if predict_button:
             with st.spinner("جاري تحليل البيانات والتنبؤ بالتكاليف..."):
-                # محاكاة وقت المعالجة
-                time.sleep(2)
-
                 # تجهيز البيانات للنموذج
                 features = {
                     'project_type': project_type,
@@ -749,94 +776,89 @@ class AIAssistantApp:
                 # عرض نتائج التنبؤ
                 self._display_cost_prediction_results(cost_prediction_results)
 
+        # تسعير مجموعة مشاريع دفعة واحدة
+        self._render_cost_pipeline_section()
+
+    def _render_cost_pipeline_section(self):
+        """تقدير تكاليف قائمة مشاريع قادمة من ملف في عملية واحدة"""
+
+        st.markdown("#### تقدير تكاليف مجموعة مناقصات")
+
+        st.caption(
+            "ملف CSV أو Excel بعمود لكل خاصية: project_type, location, client_type, tender_type, "
+            "area, floors, duration_months، والمتطلبات الإضافية has_basement ... has_sustainability اختيارياً"
+        )
+
+        uploaded_file = st.file_uploader("ملف المشاريع", type=["csv", "xlsx"], key="cost_pipeline_file")
+        if uploaded_file is None:
+            return
+
+        try:
+            if uploaded_file.name.endswith(".csv"):
+                projects = pd.read_csv(uploaded_file)
+            else:
+                projects = pd.read_excel(uploaded_file)
+        except Exception as e:
+            st.error(f"تعذر قراءة الملف: {str(e)}")
+            return
+
+        missing = [column for column in ("project_type", "location", "area") if column not in projects.columns]
+        if missing:
+            st.error(f"أعمدة مطلوبة غير موجودة: {', '.join(missing)}")
+            return
+
+        predictions = self.cost_model.predict(projects, confidence=0.9)
+        results = pd.concat([projects, predictions], axis=1)
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("عدد المشاريع", f"{len(results):,}")
+
+        with col2:
+            st.metric("إجمالي التكلفة المتوقعة", f"{predictions['total_cost'].sum() / 1e6:,.1f} مليون ريال")
+
+        with col3:
+            st.metric("متوسط تكلفة المتر المربع", f"{predictions['cost_per_sqm'].mean():,.0f} ريال/م²")
+
+        st.dataframe(
+            results,
+            column_config={
+                'cost_per_sqm': st.column_config.NumberColumn('تكلفة المتر المربع', format='%d ريال'),
+                'total_cost': st.column_config.NumberColumn('التكلفة المتوقعة', format='%d ريال'),
+                'total_cost_low': st.column_config.NumberColumn('الحد الأدنى (90%)', format='%d ريال'),
+                'total_cost_high': st.column_config.NumberColumn('الحد الأعلى (90%)', format='%d ريال')
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+        st.download_button(
+            "تحميل النتائج (CSV)",
+            results.to_csv(index=False).encode("utf-8-sig"),
+            file_name="cost_predictions.csv",
+            mime="text/csv",
+            key="cost_pipeline_download"
+        )
+
     def _predict_cost(self, features):
-        """التنبؤ بتكاليف المشروع"""
-
-        # في البيئة الحقيقية، سيتم استدعاء نموذج التنبؤ بالتكاليف
-        # محاكاة نتائج التنبؤ للعرض
-
-        # حساب القيمة الأساسية للمتر المربع حسب نوع المشروع
-        base_cost_per_sqm = {
-            "مباني سكنية": 2500,
-            "مباني تجارية": 3000,
-            "مباني حكومية": 3500,
-            "مراكز صحية": 4000,
-            "مدارس": 3200,
-            "بنية تحتية": 2000,
-            "طرق": 1500,
-            "جسور": 5000,
-            "صرف صحي": 2200,
-            "مياه": 2000,
-            "كهرباء": 2500
-        }.get(features['project_type'], 2500)
-
-        # تطبيق معاملات التعديل حسب المتغيرات
-        location_factor = {
-            "الرياض": 1.1,
-            "جدة": 1.15,
-            "الدمام": 1.05,
-            "مكة": 1.2,
-            "المدينة": 1.1,
-            "تبوك": 0.95,
-            "حائل": 0.9,
-            "عسير": 0.95,
-            "جازان": 0.9,
-            "نجران": 0.85,
-            "الباحة": 0.9,
-            "الجوف": 0.85,
-            "القصيم": 0.9
-        }.get(features['location'], 1.0)
-
-        client_factor = {
-            "حكومي": 1.05,
-            "شبه حكومي": 1.0,
-            "شركة كبيرة": 0.95,
-            "شركة متوسطة": 0.9,
-            "شركة صغيرة": 0.85,
-            "أفراد": 0.8
-        }.get(features['client_type'], 1.0)
-
-        tender_factor = {
-            "عامة": 1.0,
-            "خاصة": 0.95,
-            "أمر مباشر": 0.9
-        }.get(features['tender_type'], 1.0)
-
-        # معاملات للميزات الإضافية
-        basement_factor = 1.1 if features['has_basement'] else 1.0
-        special_finishing_factor = 1.2 if features['has_special_finishing'] else 1.0
-        landscape_factor = 1.05 if features['has_landscape'] else 1.0
-        parking_factor = 1.1 if features['has_parking'] else 1.0
-        smart_systems_factor = 1.15 if features['has_smart_systems'] else 1.0
-        sustainability_factor = 1.1 if features['has_sustainability'] else 1.0
-
-        # معامل لعدد الطوابق
-        floors_factor = 1.0 + (features['floors'] - 1) * 0.05
-
-        # حساب التكلفة الإجمالية
-        total_sqm_cost = base_cost_per_sqm * location_factor * client_factor * tender_factor * \
-                         basement_factor * special_finishing_factor * landscape_factor * \
-                         parking_factor * smart_systems_factor * sustainability_factor * \
-                         floors_factor
-
-        total_cost = total_sqm_cost * features['area']
-
-        # حساب التكاليف المفصلة
-        material_cost = total_cost * 0.6
-        labor_cost = total_cost * 0.25
-        equipment_cost = total_cost * 0.15
-
-        # إضافة هامش خطأ عشوائي للمحاكاة
-        error_margin = 0.05  # 5%
-        total_cost = total_cost * (1 + np.random.uniform(-error_margin, error_margin))
+        """التنبؤ بتكاليف المشروع باستخدام نموذج التكاليف المدرب"""
+
+        prediction = self.cost_model.predict(pd.DataFrame([features]), confidence=0.9).iloc[0]
+        total_cost = float(prediction['total_cost'])
+
+        # التكلفة المرجعية من بيانات التدريب لنفس نوع المشروع (والموقع)
+        market_cost_per_sqm = self.cost_model.reference_cost_per_sqm(features['project_type'])
+        historical_cost_per_sqm = self.cost_model.reference_cost_per_sqm(features['project_type'], features['location'])
 
         # إعداد النتائج
         results = {
             "total_cost": total_cost,
-            "cost_per_sqm": total_cost / features['area'],
-            "material_cost": material_cost,
-            "labor_cost": labor_cost,
-            "equipment_cost": equipment_cost,
+            "cost_per_sqm": float(prediction['cost_per_sqm']),
+            "cost_range": (float(prediction['total_cost_low']), float(prediction['total_cost_high'])),
+            "material_cost": total_cost * 0.6,
+            "labor_cost": total_cost * 0.25,
+            "equipment_cost": total_cost * 0.15,
             "breakdown": {
                 "structural_works": total_cost * 0.35,
                 "architectural_works": total_cost * 0.25,
@@ -844,10 +866,10 @@ class AIAssistantApp:
                 "site_works": total_cost * 0.1,
                 "general_requirements": total_cost * 0.05
             },
-            "confidence_level": 0.85,  # مستوى الثقة في التنبؤ
+            "confidence_level": 0.9,  # مستوى الثقة لنطاق التكلفة
             "comparison": {
-                "market_average": total_cost * 1.1,
-                "historical_projects": total_cost * 0.95
+                "market_average": (market_cost_per_sqm or prediction['cost_per_sqm']) * features['area'],
+                "historical_projects": (historical_cost_per_sqm or prediction['cost_per_sqm']) * features['area']
             }
         }
 
@@ -875,9 +897,10 @@ class AIAssistantApp:
             )
 
         with col3:
+            low, high = results['cost_range']
             st.metric(
-                "مستوى الثقة في التنبؤ",
-                f"{results['confidence_level'] * 100:.0f}%"
+                f"نطاق التكلفة (ثقة {results['confidence_level'] * 100:.0f}%)",
+                f"{low / 1e6:,.1f} - {high / 1e6:,.1f} مليون ريال"
             )
 
         # عرض تفصيل التكاليف
@@ -2839,305 +2862,210 @@ class AIAssistantApp:
         st.markdown("#### تحسين المحتوى المحلي")
 
         st.markdown("""
-        تساعدك هذه الأداة في تحسين نسبة المحتوى المحلي في المشروع من خلال تقديم توصيات وبدائل للمكونات ذات المحتوى المحلي المنخفض.
+        تختار هذه الأداة مورداً لكل مكون من مكونات المشروع (المورد الحالي أو أحد البدائل المدخلة أو بنود كتالوج المواد ومقاولي الباطن) بحيث تتحقق نسبة المحتوى المحلي المستهدفة بأقل تكلفة إضافية.
         """)
 
-        # عرض المكونات ذات المحتوى المحلي المنخفض
-        st.markdown("##### المكونات ذات المحتوى المحلي المنخفض")
+        components = st.session_state.get("lc_components", [])
+        if not components:
+            st.info("أضف مكونات المشروع في تبويب حساب المحتوى المحلي أولاً.")
+            return
 
-        # محاكاة بيانات المكونات ذات المحتوى المحلي المنخفض
-        low_lc_components = [
-            {
-                "id": 1,
-                "name": "الأثاث والتجهيزات",
-                "category": "أثاث",
-                "value": 900000,
-                "local_content": 30,
-                "supplier": "شركة الأثاث المكتبي"
-            },
-            {
-                "id": 2,
-                "name": "أنظمة الأمن والمراقبة",
-                "category": "أنظمة",
-                "value": 600000,
-                "local_content": 40,
-                "supplier": "شركة الأنظمة الأمنية المتقدمة"
-            },
-            {
-                "id": 3,
-                "name": "الواجهات والنوافذ",
-                "category": "مواد",
-                "value": 800000,
-                "local_content": 45,
-                "supplier": "شركة الزجاج المتطورة"
-            }
-        ]
+        target_lc = st.slider("نسبة المحتوى المحلي المستهدفة (%)", 0, 100, 60, key="lc_optimization_target")
 
-        # عرض جدول المكونات
-        low_lc_df = pd.DataFrame(low_lc_components)
+        # البدائل المدخلة يدوياً لكل مكون
+        st.markdown("##### البدائل المقترحة")
 
-        st.dataframe(
-            low_lc_df[["name", "category", "value", "local_content", "supplier"]].rename(columns={
-                "name": "المكون",
-                "category": "الفئة",
-                "value": "القيمة",
-                "local_content": "المحتوى المحلي",
-                "supplier": "المورد"
-            }).style.format({
-                "القيمة": "{:,.0f} ريال",
-                "المحتوى المحلي": "{:.0f}%"
-            }),
-            use_container_width=True
-        )
+        if "lc_alternatives" not in st.session_state:
+            st.session_state.lc_alternatives = pd.DataFrame([
+                {"المكون": name, **alternative}
+                for name, alternatives in DEFAULT_LC_ALTERNATIVES.items()
+                for alternative in alternatives
+            ])
 
-        # اختيار مكون للتحسين
-        selected_component = st.selectbox(
-            "اختر المكون للتحسين",
-            options=[comp["name"] for comp in low_lc_components],
-            index=0
+        alternatives_df = st.data_editor(
+            st.session_state.lc_alternatives,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "المكون": st.column_config.SelectboxColumn(
+                    "المكون", options=[comp["name"] for comp in components], required=True
+                ),
+                "المحتوى المحلي": st.column_config.NumberColumn("المحتوى المحلي", min_value=0, max_value=100, format="%d%%"),
+                "معامل التكلفة": st.column_config.NumberColumn("معامل التكلفة", min_value=0.0, format="%.2f"),
+                "تقييم الجودة": st.column_config.NumberColumn("تقييم الجودة", min_value=0.0, max_value=5.0, format="%.1f")
+            },
+            key="lc_alternatives_editor"
         )
 
-        # الحصول على المكون المختار
-        selected_comp_data = next((comp for comp in low_lc_components if comp["name"] == selected_component), None)
-
-        # عرض بدائل المكون المختار
-        if selected_comp_data:
-            st.markdown(f"##### البدائل المقترحة لـ {selected_component}")
-
-            # محاكاة بيانات البدائل
-            alternatives = []
-
-            if selected_component == "الأثاث والتجهيزات":
-                alternatives = [
-                    {
-                        "id": 1,
-                        "name": "شركة الأثاث الوطني",
-                        "description": "شركة متخصصة في تصنيع الأثاث المكتبي محلياً",
-                        "local_content": 80,
-                        "cost_factor": 1.05,
-                        "quality_rating": 4.2
-                    },
-                    {
-                        "id": 2,
-                        "name": "مصنع التجهيزات المكتبية",
-                        "description": "مصنع متخصص في إنتاج الأثاث المكتبي بخامات محلية",
-                        "local_content": 90,
-                        "cost_factor": 1.10,
-                        "quality_rating": 4.5
-                    },
-                    {
-                        "id": 3,
-                        "name": "توزيع المكونات على موردين محليين",
-                        "description": "تقسيم توريد الأثاث على عدة موردين محليين",
-                        "local_content": 75,
-                        "cost_factor": 1.00,
-                        "quality_rating": 4.0
-                    }
-                ]
-            elif selected_component == "أنظمة الأمن والمراقبة":
-                alternatives = [
-                    {
-                        "id": 1,
-                        "name": "شركة التقنية الأمنية السعودية",
-                        "description": "شركة متخصصة في تركيب وتجميع أنظمة الأمن محلياً",
-                        "local_content": 70,
-                        "cost_factor": 1.08,
-                        "quality_rating": 4.0
-                    },
-                    {
-                        "id": 2,
-                        "name": "مؤسسة تقنيات الحماية",
-                        "description": "توريد وتركيب أنظمة أمنية معتمدة من هيئة المحتوى المحلي",
-                        "local_content": 65,
-                        "cost_factor": 0.95,
-                        "quality_rating": 3.8
-                    },
-                    {
-                        "id": 3,
-                        "name": "تجميع الأنظمة محلياً",
-                        "description": "استيراد المكونات وتجميعها وبرمجتها محلياً",
-                        "local_content": 60,
-                        "cost_factor": 0.90,
-                        "quality_rating": 3.7
-                    }
-                ]
-            elif selected_component == "الواجهات والنوافذ":
-                alternatives = [
-                    {
-                        "id": 1,
-                        "name": "مصنع الزجاج السعودي",
-                        "description": "مصنع متخصص في إنتاج الزجاج والواجهات الزجاجية محلياً",
-                        "local_content": 85,
-                        "cost_factor": 1.15,
-                        "quality_rating": 4.3
-                    },
-                    {
-                        "id": 2,
-                        "name": "شركة الألمنيوم الوطنية",
-                        "description": "شركة متخصصة في إنتاج الواجهات والنوافذ من الألمنيوم محلياً",
-                        "local_content": 90,
-                        "cost_factor": 1.20,
-                        "quality_rating": 4.5
-                    },
-                    {
-                        "id": 3,
-                        "name": "تعديل التصميم لاستخدام مواد محلية",
-                        "description": "تعديل تصميم الواجهات لاستخدام نسبة أكبر من المواد المتوفرة محلياً",
-                        "local_content": 75,
-                        "cost_factor": 1.00,
-                        "quality_rating": 4.0
-                    }
-                ]
-
-            # عرض البدائل
-            for alt in alternatives:
-                with st.container():
-                    col1, col2, col3 = st.columns([3, 1, 1])
-
-                    with col1:
-                        st.markdown(f"""
-                        <div style="border: 1px solid #ddd; border-radius: 5px; padding: 10px; margin-bottom: 10px;">
-                            <h6 style="margin-top: 0;">{alt['name']}</h6>
-                            <p style="margin-bottom: 5px;">{alt['description']}</p>
-                            <p style="margin-bottom: 0;"><strong>المحتوى المحلي:</strong> {alt['local_content']}% | <strong>معامل التكلفة:</strong> {alt['cost_factor']:.2f} | <strong>تقييم الجودة:</strong> {alt['quality_rating']}/5</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                    with col2:
-                        st.button(f"تفاصيل #{alt['id']}", key=f"alt_details_{alt['id']}")
-
-                    with col3:
-                        if st.button(f"اختيار #{alt['id']}", key=f"select_alt_{alt['id']}"):
-                            st.success(f"تم اختيار {alt['name']} كبديل لـ {selected_component}.")
+        component_ids = {comp["name"]: comp["id"] for comp in components}
+        component_values = {comp["id"]: comp["value"] for comp in components}
+        alternatives = [
+            {
+                "component_id": component_ids[row["المكون"]],
+                "supplier": row["البديل"],
+                "cost": component_values[component_ids[row["المكون"]]] * float(row["معامل التكلفة"]),
+                "local_content": float(row["المحتوى المحلي"]),
+                "source": "بديل مقترح"
+            }
+            for _, row in alternatives_df.dropna(subset=["المكون", "البديل", "المحتوى المحلي", "معامل التكلفة"]).iterrows()
+            if row["المكون"] in component_ids
+        ]
 
-            # حساب تأثير البدائل على المحتوى المحلي الإجمالي
-            st.markdown("##### تأثير البدائل على المحتوى المحلي الإجمالي")
+        # بدائل من كتالوج المواد وكتالوج مقاولي الباطن
+        MaterialsCatalog()
+        SubcontractorsCatalog()
+        catalogs = {
+            **{category: st.session_state.materials_catalog
+               for category in st.session_state.materials_catalog["category"].unique()},
+            **{category: st.session_state.subcontractors_catalog
+               for category in st.session_state.subcontractors_catalog["category"].unique()}
+        }
 
-            # محاكاة البيانات الإجمالية
-            total_value = 10000000
-            current_lc_value = 6000000
-            current_lc_percent = current_lc_value / total_value * 100
+        with st.expander("بدائل الكتالوجات"):
+            st.caption("اختر فئة الكتالوج المقابلة لكل مكون ليضاف موردوها كبدائل (المحتوى المحلي للمواد حسب المنشأ).")
+            for comp in components:
+                category = st.selectbox(
+                    comp["name"],
+                    ["بدون"] + list(catalogs),
+                    key=f"lc_catalog_{comp['id']}"
+                )
+                if category != "بدون":
+                    alternatives.extend(catalog_alternatives(comp, catalogs[category], category))
 
-            # حساب التأثير لكل بديل
-            impact_data = []
-            for alt in alternatives:
-                # القيمة الحالية للمحتوى المحلي في المكون
-                current_component_lc_value = selected_comp_data["value"] * selected_comp_data["local_content"] / 100
+        optimizer = LocalContentOptimizer(components, alternatives)
+        result = optimizer.optimize(target_lc)
 
-                # القيمة المتوقعة للمحتوى المحلي مع البديل
-                new_component_value = selected_comp_data["value"] * alt["cost_factor"]
-                new_component_lc_value = new_component_value * alt["local_content"] / 100
+        # نتائج التحسين
+        st.markdown("##### نتيجة التحسين")
 
-                # الفرق في قيمة المحتوى المحلي
-                lc_value_diff = new_component_lc_value - current_component_lc_value
+        col1, col2, col3 = st.columns(3)
 
-                # القيمة الإجمالية الجديدة للمشروع
-                new_total_value = total_value - selected_comp_data["value"] + new_component_value
+        with col1:
+            st.metric(
+                "المحتوى المحلي",
+                f"{result['local_content']:.1f}%",
+                f"{result['local_content'] - result['baseline_local_content']:+.1f}%"
+            )
 
-                # قيمة المحتوى المحلي الإجمالية الجديدة
-                new_total_lc_value = current_lc_value + lc_value_diff
+        with col2:
+            st.metric(
+                "التكلفة الإجمالية",
+                f"{result['total_cost']:,.0f} ريال",
+                f"{result['cost_increase']:+,.0f} ريال",
+                delta_color="inverse"
+            )
 
-                # نسبة المحتوى المحلي الإجمالية الجديدة
-                new_total_lc_percent = new_total_lc_value / new_total_value * 100
+        with col3:
+            changed_count = int(result["selection"]["changed"].sum())
+            st.metric("المكونات المستبدلة", f"{changed_count} من {len(components)}")
 
-                # إضافة البيانات
-                impact_data.append({
-                    "البديل": alt["name"],
-                    "نسبة المحتوى المحلي الحالية": current_lc_percent,
-                    "نسبة المحتوى المحلي المتوقعة": new_total_lc_percent,
-                    "التغير": new_total_lc_percent - current_lc_percent,
-                    "القيمة الإجمالية الجديدة": new_total_value,
-                    "تقييم الجودة": alt["quality_rating"]
-                })
+        if result["status"] == "infeasible":
+            st.warning(
+                f"لا يمكن تحقيق نسبة {target_lc}% بالبدائل المتاحة. "
+                f"أعلى نسبة ممكنة {result['max_local_content']:.1f}%، والمعروض هو الاختيار الذي يحققها."
+            )
+        elif result["status"] == "feasible":
+            st.caption(
+                f"حل تقريبي: لا تزيد التكلفة عن الحل الأمثل بأكثر من {result['gap']:,.0f} ريال "
+                f"({result['gap'] / result['total_cost'] * 100:.2f}%)."
+            )
 
-            # عرض جدول التأثير
-            impact_df = pd.DataFrame(impact_data)
+        selection = result["selection"]
+        changes = selection[selection["changed"]]
 
+        if changes.empty:
+            st.success("الموردون الحاليون يحققون النسبة المستهدفة بأقل تكلفة.")
+        else:
             st.dataframe(
-                impact_df.style.format({
-                    "نسبة المحتوى المحلي الحالية": "{:.1f}%",
-                    "نسبة المحتوى المحلي المتوقعة": "{:.1f}%",
-                    "التغير": "{:+.1f}%",
-                    "القيمة الإجمالية الجديدة": "{:,.0f} ريال",
-                    "تقييم الجودة": "{:.1f}/5"
+                changes[["component", "current_supplier", "supplier", "source", "current_local_content",
+                         "local_content", "current_cost", "cost"]].rename(columns={
+                    "component": "المكون",
+                    "current_supplier": "المورد الحالي",
+                    "supplier": "المورد المقترح",
+                    "source": "المصدر",
+                    "current_local_content": "المحتوى المحلي الحالي",
+                    "local_content": "المحتوى المحلي المقترح",
+                    "current_cost": "التكلفة الحالية",
+                    "cost": "التكلفة المقترحة"
+                }).style.format({
+                    "المحتوى المحلي الحالي": "{:.0f}%",
+                    "المحتوى المحلي المقترح": "{:.0f}%",
+                    "التكلفة الحالية": "{:,.0f} ريال",
+                    "التكلفة المقترحة": "{:,.0f} ريال"
                 }),
                 use_container_width=True
             )
 
-            # مخطط مقارنة للبدائل
-            fig = px.bar(
-                impact_df,
-                x="البديل",
-                y=["نسبة المحتوى المحلي الحالية", "نسبة المحتوى المحلي المتوقعة"],
-                barmode="group",
-                title="مقارنة تأثير البدائل على نسبة المحتوى المحلي الإجمالية",
-                labels={"value": "نسبة المحتوى المحلي (%)", "variable": ""}
+        # منحنى التكلفة الإضافية مقابل النسبة المستهدفة
+        low = result["baseline_local_content"]
+        high = result["max_local_content"]
+        if high > low:
+            targets = np.linspace(low, high, 15)
+            curve = pd.DataFrame({
+                "النسبة المستهدفة": targets,
+                "التكلفة الإضافية": [optimizer.optimize(target)["cost_increase"] for target in targets]
+            })
+            fig = px.line(
+                curve,
+                x="النسبة المستهدفة",
+                y="التكلفة الإضافية",
+                markers=True,
+                title="التكلفة الإضافية اللازمة لكل نسبة محتوى محلي",
+                labels={"النسبة المستهدفة": "نسبة المحتوى المحلي المستهدفة (%)", "التكلفة الإضافية": "التكلفة الإضافية (ريال)"}
             )
-
+            fig.add_vline(x=target_lc, line_dash="dash", line_color="red")
             st.plotly_chart(fig, use_container_width=True)
 
-            # استخدام Claude AI للتحليل المتقدم
-            if st.checkbox("استخدام Claude AI لتحليل البدائل", value=False, key="lc_optimization_use_claude"):
-                with st.spinner("جاري تحليل البدائل..."):
-                    # محاكاة وقت المعالجة
-                    time.sleep(2)
+        # استخدام Claude AI للتحليل المتقدم
+        if not changes.empty and st.checkbox("استخدام Claude AI لتحليل البدائل", value=False, key="lc_optimization_use_claude"):
+            with st.spinner("جاري تحليل البدائل..."):
+                try:
+                    changes_text = "\n".join(
+                        f"- {row['component']}: من {row['current_supplier']} ({row['current_local_content']:.0f}%، {row['current_cost']:,.0f} ريال) "
+                        f"إلى {row['supplier']} ({row['local_content']:.0f}%، {row['cost']:,.0f} ريال)"
+                        for _, row in changes.iterrows()
+                    )
 
-                    try:
-                        # إنشاء نص المدخلات للتحليل
-                        prompt = f"""تحليل بدائل المحتوى المحلي لمكون {selected_component}:
-
-                        المكون الحالي:
-                        - الاسم: {selected_component}
-                        - الفئة: {selected_comp_data['category']}
-                        - القيمة: {selected_comp_data['value']:,} ريال
-                        - نسبة المحتوى المحلي: {selected_comp_data['local_content']}%
-                        - المورد: {selected_comp_data['supplier']}
-
-                        البدائل المقترحة:
-                        1. {alternatives[0]['name']}:
-                           - المحتوى المحلي: {alternatives[0]['local_content']}%
-                           - معامل التكلفة: {alternatives[0]['cost_factor']:.2f}
-                           - تقييم الجودة: {alternatives[0]['quality_rating']}/5
-                           - الوصف: {alternatives[0]['description']}
-
-                        2. {alternatives[1]['name']}:
-                           - المحتوى المحلي: {alternatives[1]['local_content']}%
-                           - معامل التكلفة: {alternatives[1]['cost_factor']:.2f}
-                           - تقييم الجودة: {alternatives[1]['quality_rating']}/5
-                           - الوصف: {alternatives[1]['description']}
-
-                        3. {alternatives[2]['name']}:
-                           - المحتوى المحلي: {alternatives[2]['local_content']}%
-                           - معامل التكلفة: {alternatives[2]['cost_factor']:.2f}
-                           - تقييم الجودة: {alternatives[2]['quality_rating']}/5
-                           - الوصف: {alternatives[2]['description']}
+                    prompt = f"""تحليل خطة تحسين المحتوى المحلي:
 
-                        المطلوب:
-                        1. تحليل مقارن شامل للبدائل من حيث المحتوى المحلي والتكلفة والجودة
-                        2. تحديد البديل الأفضل مع شرح أسباب اختياره
-                        3. تقديم توصيات إضافية لتحسين المحتوى المحلي لهذا المكون
-                        4. تحديد أي مخاطر محتملة في الانتقال للبديل المقترح
+                    - نسبة المحتوى المحلي الحالية: {result['baseline_local_content']:.1f}%
+                    - النسبة المستهدفة: {target_lc}%
+                    - النسبة بعد الاستبدال: {result['local_content']:.1f}%
+                    - التكلفة الإضافية: {result['cost_increase']:,.0f} ريال
 
-                        يرجى تقديم تحليل مهني ومختصر يركز على الجوانب الأكثر أهمية.
-                        """
+                    الاستبدالات المقترحة (أقل تكلفة لتحقيق المستهدف):
+                    {changes_text}
 
-                        # استدعاء Claude للتحليل
-                        claude_analysis = self.claude_service.chat_completion(
-                            [{"role": "user", "content": prompt}]
-                        )
+                    المطلوب:
+                    1. تقييم الاستبدالات المقترحة من حيث الجودة والمخاطر وقابلية التنفيذ
+                    2. تحديد أي استبدال قد يؤثر على الجدول الزمني أو الجودة
+                    3. تقديم توصيات إضافية لتحسين المحتوى المحلي
 
-                        if "error" not in claude_analysis:
-                            # عرض تحليل Claude
-                            st.markdown("##### تحليل متقدم للبدائل")
-                            st.info(claude_analysis["content"])
-                        else:
-                            st.warning(f"تعذر إجراء التحليل المتقدم: {claude_analysis['error']}")
-                    except Exception as e:
-                        st.warning(f"تعذر إجراء التحليل المتقدم: {str(e)}")
+                    يرجى تقديم تحليل مهني ومختصر يركز على الجوانب الأكثر أهمية.
+                    """
 
-            # زر تطبيق البديل المختار
-            if st.button("تطبيق البديل المختار على المشروع"):
-                st.success("تم تطبيق البديل المختار على المشروع وتحديث نسبة المحتوى المحلي.")
+                    claude_analysis = self.claude_service.chat_completion(
+                        [{"role": "user", "content": prompt}]
+                    )
+
+                    if "error" not in claude_analysis:
+                        st.markdown("##### تحليل متقدم للبدائل")
+                        st.info(claude_analysis["content"])
+                    else:
+                        st.warning(f"تعذر إجراء التحليل المتقدم: {claude_analysis['error']}")
+                except Exception as e:
+                    st.warning(f"تعذر إجراء التحليل المتقدم: {str(e)}")
+
+        # تطبيق الاستبدالات على مكونات المشروع
+        if not changes.empty and st.button("تطبيق الاستبدالات على المشروع", key="lc_apply_optimization"):
+            by_id = selection.set_index("component_id")
+            for comp in st.session_state.lc_components:
+                if by_id.loc[comp["id"], "changed"]:
+                    comp["supplier"] = by_id.loc[comp["id"], "supplier"]
+                    comp["value"] = int(round(by_id.loc[comp["id"], "cost"]))
+                    comp["local_content"] = int(round(by_id.loc[comp["id"], "local_content"]))
+            st.success("تم تطبيق الاستبدالات على مكونات المشروع وتحديث نسبة المحتوى المحلي.")
+            st.rerun()
 
     def _render_faq_tab(self):
         """عرض تبويب الأسئلة الشائعة"""
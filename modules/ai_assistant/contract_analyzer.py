@@ -18,6 +18,9 @@ import base64
 import io
 import streamlit as st
 
+from utils.arabic_text import contains, normalize_text
+from modules.scheduling.services.earned_value import DEFAULT_PAYMENT_TERMS, EarnedValueModel
+
 # محاكاة استيراد مكتبات الذكاء الاصطناعي
 try:
     import openai
@@ -30,6 +33,22 @@ try:
 except ImportError:
     MODELS_AVAILABLE = False
 
+# مراحل تنفيذ بنود تقدير التكلفة كنسب من مدة المشروع (بداية، نهاية) لتوزيعها في التدفق النقدي
+CASH_FLOW_PHASES = {
+    "الأعمال الإنشائية": (0.0, 0.6),
+    "الأعمال المعمارية": (0.35, 0.95),
+    "الأعمال الكهربائية": (0.3, 1.0),
+    "الأعمال الميكانيكية": (0.3, 1.0),
+    "أعمال الموقع": (0.0, 1.0),
+}
+
+# أدوات النفي قبل شرط الدفع (لا توجد دفعة مقدمة) أو بعده (الدفعة المقدمة: لا يوجد) في النص الموحد
+_NEGATION_BEFORE_RE = re.compile(r"(?:^|[^\w])(?:لا|ولا|بدون|دون|ليس)(?:\s+(?:يوجد|توجد|تصرف|يصرف|هناك))?(?:\s+اي)?\s*$")
+_NEGATION_AFTER_RE = re.compile(r"\s*[:\-]?\s*(?:لا يوجد|لا توجد|لا تصرف|لا يصرف|لا|بدون)\s*(?:[،؛.]|$)")
+
+# النسبة المذكورة بعد كلمة الشرط في الجملة نفسها
+_PERCENTAGE_RE = re.compile(r"[^\d،؛.]{0,20}?(\d+(?:\.\d+)?)\s*%")
+
 class ContractAnalyzer:
     """فئة تحليل العقود والمناقصات باستخدام الذكاء الاصطناعي"""
     
@@ -1060,12 +1079,12 @@ class ContractAnalyzer:
     
     def _extract_parties(self, text):
         """استخراج الأطراف من النص"""
-        if "الطرف الأول: وزارة المالية" in text:
+        if contains(text, "الطرف الأول: وزارة المالية"):
             return {
                 "الطرف الأول": "وزارة المالية",
                 "الطرف الثاني": "شركة الإنشاءات المتطورة"
             }
-        elif "الجهة المالكة: وزارة المالية" in text:
+        elif contains(text, "الجهة المالكة: وزارة المالية"):
             return {
                 "الجهة المالكة": "وزارة المالية"
             }
@@ -1077,58 +1096,58 @@ class ContractAnalyzer:
     
     def _extract_contract_value(self, text):
         """استخراج قيمة العقد من النص"""
-        if "قيمة العقد الإجمالية هي 25,000,000 ريال" in text:
+        if contains(text, "قيمة العقد الإجمالية هي 25,000,000 ريال"):
             return "25,000,000 ريال"
         else:
             return "غير محدد"
     
     def _extract_duration(self, text):
         """استخراج مدة التنفيذ من النص"""
-        if "مدة تنفيذ المشروع 18 شهراً" in text:
+        if contains(text, "مدة تنفيذ المشروع 18 شهراً"):
             return "18 شهراً"
         else:
             return "غير محدد"
     
     def _extract_guarantees(self, text):
         """استخراج الضمانات من النص"""
-        if "ضماناً نهائياً بنسبة 5% من قيمة العقد" in text:
+        if contains(text, "ضماناً نهائياً بنسبة 5% من قيمة العقد"):
             return "ضمان نهائي بنسبة 5% من قيمة العقد"
-        elif "ضمان ابتدائي: 2% من قيمة العطاء" in text:
+        elif contains(text, "ضمان ابتدائي: 2% من قيمة العطاء"):
             return "ضمان ابتدائي بنسبة 2% من قيمة العطاء، وضمان نهائي بنسبة 5% من قيمة العقد"
         else:
             return "غير محدد"
     
     def _extract_penalties(self, text):
         """استخراج غرامات التأخير من النص"""
-        if "غرامة تأخير بنسبة 1% من قيمة العقد عن كل أسبوع تأخير بحد أقصى 10% من قيمة العقد" in text:
+        if contains(text, "غرامة تأخير بنسبة 1% من قيمة العقد عن كل أسبوع تأخير بحد أقصى 10% من قيمة العقد"):
             return "1% من قيمة العقد عن كل أسبوع تأخير بحد أقصى 10% من قيمة العقد"
         else:
             return "غير محدد"
     
     def _extract_payment_terms(self, text):
         """استخراج شروط الدفع من النص"""
-        if "دفعات شهرية حسب نسبة الإنجاز، مع احتجاز 10% من قيمة كل دفعة كضمان حسن التنفيذ" in text:
+        if contains(text, "دفعات شهرية حسب نسبة الإنجاز، مع احتجاز 10% من قيمة كل دفعة كضمان حسن التنفيذ"):
             return "دفعات شهرية حسب نسبة الإنجاز، مع احتجاز 10% من قيمة كل دفعة كضمان حسن التنفيذ"
         else:
             return "غير محدد"
     
     def _extract_warranty_period(self, text):
         """استخراج فترة الضمان من النص"""
-        if "فترة ضمان المشروع سنة واحدة من تاريخ الاستلام الابتدائي" in text:
+        if contains(text, "فترة ضمان المشروع سنة واحدة من تاريخ الاستلام الابتدائي"):
             return "سنة واحدة من تاريخ الاستلام الابتدائي"
         else:
             return "غير محدد"
     
     def _extract_termination_terms(self, text):
         """استخراج شروط فسخ العقد من النص"""
-        if "يحق للطرف الأول فسخ العقد في حالة إخلال الطرف الثاني بالتزاماته التعاقدية بعد إنذاره كتابياً" in text:
+        if contains(text, "يحق للطرف الأول فسخ العقد في حالة إخلال الطرف الثاني بالتزاماته التعاقدية بعد إنذاره كتابياً"):
             return "يحق للطرف الأول فسخ العقد في حالة إخلال الطرف الثاني بالتزاماته التعاقدية بعد إنذاره كتابياً"
         else:
             return "غير محدد"
     
     def _extract_dispute_resolution(self, text):
         """استخراج آلية تسوية النزاعات من النص"""
-        if "في حالة نشوء أي نزاع بين الطرفين، يتم حله ودياً، وفي حالة تعذر ذلك يتم اللجوء إلى التحكيم" in text:
+        if contains(text, "في حالة نشوء أي نزاع بين الطرفين، يتم حله ودياً، وفي حالة تعذر ذلك يتم اللجوء إلى التحكيم"):
             return "يتم حل النزاعات ودياً، وفي حالة تعذر ذلك يتم اللجوء إلى التحكيم وفقاً لأنظمة المملكة العربية السعودية"
         else:
             return "غير محدد"
@@ -1137,33 +1156,33 @@ class ContractAnalyzer:
         """استخراج معلومات المناقصة من النص"""
         tender_info = {}
         
-        if "رقم المناقصة: T-2024-001" in text:
+        if contains(text, "رقم المناقصة: T-2024-001"):
             tender_info["رقم المناقصة"] = "T-2024-001"
         
-        if "الجهة المالكة: وزارة المالية" in text:
+        if contains(text, "الجهة المالكة: وزارة المالية"):
             tender_info["الجهة المالكة"] = "وزارة المالية"
         
-        if "موقع المشروع: الرياض - حي العليا" in text:
+        if contains(text, "موقع المشروع: الرياض - حي العليا"):
             tender_info["موقع المشروع"] = "الرياض - حي العليا"
         
-        if "تاريخ الطرح: 01/03/2024م" in text:
+        if contains(text, "تاريخ الطرح: 01/03/2024م"):
             tender_info["تاريخ الطرح"] = "01/03/2024م"
         
-        if "تاريخ الإقفال: 15/04/2024م" in text:
+        if contains(text, "تاريخ الإقفال: 15/04/2024م"):
             tender_info["تاريخ الإقفال"] = "15/04/2024م"
         
         return tender_info
     
     def _extract_project_description(self, text):
         """استخراج وصف المشروع من النص"""
-        if "يتكون المشروع من إنشاء مبنى إداري مكون من 5 طوابق بمساحة إجمالية 5000 متر مربع" in text:
+        if contains(text, "يتكون المشروع من إنشاء مبنى إداري مكون من 5 طوابق بمساحة إجمالية 5000 متر مربع"):
             return "إنشاء مبنى إداري مكون من 5 طوابق بمساحة إجمالية 5000 متر مربع. يشمل المشروع الأعمال الإنشائية والمعمارية والكهربائية والميكانيكية وأعمال التشطيبات."
         else:
             return "غير محدد"
     
     def _extract_qualification_conditions(self, text):
         """استخراج شروط التأهيل من النص"""
-        if "أن يكون المقاول مصنفاً في مجال المباني من الدرجة الأولى" in text:
+        if contains(text, "أن يكون المقاول مصنفاً في مجال المباني من الدرجة الأولى"):
             return [
                 "أن يكون المقاول مصنفاً في مجال المباني من الدرجة الأولى",
                 "أن يكون لديه خبرة سابقة في تنفيذ مشاريع مماثلة لا تقل عن 3 مشاريع خلال الخمس سنوات الماضية",
@@ -1174,7 +1193,7 @@ class ContractAnalyzer:
     
     def _extract_required_guarantees(self, text):
         """استخراج الضمانات المطلوبة من النص"""
-        if "ضمان ابتدائي: 2% من قيمة العطاء" in text:
+        if contains(text, "ضمان ابتدائي: 2% من قيمة العطاء"):
             return [
                 "ضمان ابتدائي: 2% من قيمة العطاء ساري المفعول لمدة 90 يوماً من تاريخ تقديم العطاء",
                 "ضمان نهائي: 5% من قيمة العقد ساري المفعول حتى انتهاء فترة الضمان"
@@ -1184,7 +1203,7 @@ class ContractAnalyzer:
     
     def _extract_technical_specifications(self, text):
         """استخراج المواصفات الفنية من النص"""
-        if "الأعمال الإنشائية:" in text:
+        if contains(text, "الأعمال الإنشائية:"):
             return {
                 "الأعمال الإنشائية": [
                     "الخرسانة المسلحة: مقاومة لا تقل عن 300 كجم/سم²",
@@ -1211,7 +1230,7 @@ class ContractAnalyzer:
     
     def _extract_evaluation_criteria(self, text):
         """استخراج معايير التقييم من النص"""
-        if "السعر: 50%" in text:
+        if contains(text, "السعر: 50%"):
             return {
                 "السعر": "50%",
                 "الجودة الفنية": "30%",
@@ -1311,16 +1330,88 @@ class ContractAnalyzer:
             ]
         }
     
-    def _analyze_cash_flow(self, payment_terms, cost_estimation):
-        """تحليل التدفقات النقدية"""
-        return [
-            {"month": 1, "income": 0, "expense": 2500000, "net": -2500000, "cumulative": -2500000},
-            {"month": 2, "income": 1125000, "expense": 2000000, "net": -875000, "cumulative": -3375000},
-            {"month": 3, "income": 1125000, "expense": 1500000, "net": -375000, "cumulative": -3750000},
-            {"month": 4, "income": 1125000, "expense": 1500000, "net": -375000, "cumulative": -4125000},
-            {"month": 5, "income": 1125000, "expense": 1500000, "net": -375000, "cumulative": -4500000},
-            {"month": 6, "income": 1125000, "expense": 1500000, "net": -375000, "cumulative": -4875000}
+    def _analyze_cash_flow(self, payment_terms, cost_estimation, duration_months=18):
+        """
+        تحليل التدفقات النقدية
+
+        توزع بنود تقدير التكلفة على مراحل تنفيذها خلال مدة المشروع، ويحسب التدفق النقدي
+        الشهري وتكلفة تمويل العجز وفق شروط الدفع المستخرجة من النص.
+
+        المعلمات:
+            payment_terms (str): شروط الدفع
+            cost_estimation (dict): تقدير التكاليف (total_cost وcost_breakdown)
+            duration_months (int): مدة التنفيذ بالأشهر
+
+        العوائد:
+            list: لكل شهر month, value, income, expense, net, cumulative, financing_cost
+        """
+        breakdown = cost_estimation.get("cost_breakdown") or [
+            {"category": "الإجمالي", "amount": cost_estimation.get("total_cost", 0)}
         ]
+        start = pd.Timestamp(datetime.now().date()).replace(day=1)
+        days = (start + pd.DateOffset(months=duration_months) - start).days
+        phases = [CASH_FLOW_PHASES.get(item["category"], (0.0, 1.0)) for item in breakdown]
+        terms = self._extract_payment_parameters(payment_terms)
+        # بنود التقدير تكاليف؛ قيمة الأعمال في المستخلصات هي التكلفة مقسومة على نسبة التكلفة
+        items = pd.DataFrame({
+            "Start": [start + pd.Timedelta(days=int(days * begin)) for begin, _ in phases],
+            "Finish": [start + pd.Timedelta(days=int(days * end)) for _, end in phases],
+            "Cost": [item["amount"] for item in breakdown],
+            "Budget": [item["amount"] / terms["cost_ratio"] for item in breakdown],
+        })
+
+        flow = EarnedValueModel(items, cost_column="Cost", origin=start).cash_flow(terms)
+        columns = ["month", "value", "income", "expense", "net", "cumulative", "financing_cost"]
+        return flow["monthly"][columns].round(0).to_dict("records")
+
+    def _extract_payment_parameters(self, payment_terms):
+        """
+        استخراج معاملات الدفع الرقمية من نص شروط الدفع
+
+        المعلمات:
+            payment_terms (str): شروط الدفع
+
+        العوائد:
+            dict: شروط الدفع بمفاتيح DEFAULT_PAYMENT_TERMS (الافتراضية لما لم يذكر في النص)
+        """
+        text = normalize_text(payment_terms or "")
+        terms = dict(DEFAULT_PAYMENT_TERMS)
+
+        mentioned, retention = self._payment_percentage(text, r"احتجاز|محتجزات")
+        if retention is not None:
+            terms["retention"] = retention
+        mentioned, advance = self._payment_percentage(text, r"دفع[ةه] (?:ال)?مقدم[ةه]")
+        if advance is not None:
+            terms["advance_payment"] = advance
+            terms["advance_recovery"] = max(terms["advance_recovery"], advance)
+        elif not mentioned:
+            terms["advance_payment"] = 0.0
+        delay = re.search(r"خلال (\d+) يوم", text)
+        if delay:
+            terms["payment_delay_months"] = -(-int(delay.group(1)) // 30)
+        return terms
+
+    def _payment_percentage(self, text, keyword):
+        """
+        نسبة شرط دفع من النص الموحد
+
+        المعلمات:
+            text (str): نص شروط الدفع بعد التوحيد
+            keyword (str): تعبير منتظم لكلمة الشرط
+
+        العوائد:
+            tuple: (ذكر الشرط، النسبة كسراً عشرياً أو None إذا ذكر بلا نسبة)؛ النسبة 0 إذا سبقت
+                الكلمة أو تلتها أداة نفي
+        """
+        mentioned = False
+        for match in re.finditer(keyword, text):
+            mentioned = True
+            if _NEGATION_BEFORE_RE.search(text[:match.start()]) or _NEGATION_AFTER_RE.match(text, match.end()):
+                return True, 0.0
+            percentage = _PERCENTAGE_RE.match(text, match.end())
+            if percentage:
+                return True, float(percentage.group(1)) / 100
+        return mentioned, None
     
     def _analyze_financial_risks(self, text):
         """تحليل المخاطر المالية"""
@@ -13,6 +13,7 @@ from datetime import datetime
 import json
 import os
 import sys
+import logging
 from pathlib import Path
 
 # إضافة المسار للوصول إلى وحدة تحليل البيانات
@@ -33,12 +34,50 @@ except ImportError:
         def run(self):
             pass
 
+from modules.ai_assistant.services.tender_history import TenderHistoryStore, sample_tender_history
+from modules.ai_assistant.services.tender_cube import TenderCube
+from modules.ai_assistant.services.win_model import FEATURE_LABELS, ensure_win_model
+from modules.ai_assistant.services.bid_optimizer import BidOptimizer
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+# تنبيه النتائج المحسوبة من السجل النموذجي
+SAMPLE_DATA_NOTICE = "بيانات نموذجية للعرض فقط - سجل نتائج المناقصات الفعلية لتحل محلها"
+
 class DataAIIntegration:
     """فئة تكامل البيانات مع الذكاء الاصطناعي"""
     
-    def __init__(self):
-        """تهيئة فئة تكامل البيانات مع الذكاء الاصطناعي"""
+    def __init__(self, history_db_path=None, model_path=None):
+        """
+        تهيئة فئة تكامل البيانات مع الذكاء الاصطناعي
+        
+        المعلمات:
+            history_db_path (str): مسار قاعدة بيانات المناقصات التاريخية (اختياري)
+            model_path (str): مسار ملف نموذج احتمال الفوز (اختياري)
+        """
         self.data_analysis_app = DataAnalysisApp()
+        
+        self.history_store = TenderHistoryStore(history_db_path)
+        if self.history_store.count() == 0:
+            # تهيئة المخزن الفارغ بسجل نموذجي معلَّم إلى حين إدخال النتائج الفعلية
+            self.history_store.add_many(sample_tender_history(), is_sample=True)
+        self.tender_cube = TenderCube(self.history_store)
+        
+        self.model_path = model_path or os.path.join('data', 'models', 'win_model.npz')
+        self.win_model = ensure_win_model(self.history_store, self.model_path, self.sample_mode)
+    
+    @property
+    def sample_mode(self):
+        """التحليلات على السجل النموذجي لعدم وجود نتائج فعلية (تستبعد النماذج بمجرد إدخالها)"""
+        return not self.history_store.has_real_data()
+    
+    def _data_label(self):
+        """وسم مصدر البيانات المضاف إلى النتائج لعرضه في الواجهة"""
+        sample_mode = self.sample_mode
+        return {
+            'sample_data': sample_mode,
+            'data_notice': SAMPLE_DATA_NOTICE if sample_mode else None
+        }
     
     def analyze_tender_data(self, tender_data):
         """
@@ -76,38 +115,49 @@ class DataAIIntegration:
         المعلمات:
             project_type (str): نوع المشروع (اختياري)
             location (str): الموقع (اختياري)
-            time_period (str): الفترة الزمنية (اختياري)
+            time_period (int|tuple): سنة واحدة أو (سنة البداية، سنة النهاية) (اختياري)
             
         العوائد:
             dict: نتائج التحليل
         """
-        # الحصول على البيانات التاريخية (محاكاة)
-        historical_data = self._get_historical_data()
-        
-        # تطبيق التصفية إذا تم تحديدها
-        filtered_data = historical_data.copy()
-        
-        if project_type:
-            filtered_data = filtered_data[filtered_data['نوع المشروع'] == project_type]
-        
-        if location:
-            filtered_data = filtered_data[filtered_data['الموقع'] == location]
+        # تطبق الفلاتر على مكعب الملخصات بدلاً من نسخ جدول المناقصات وتصفيته
+        filters = {'project_type': project_type, 'location': location, 'include_samples': self.sample_mode}
         
         if time_period:
-            # تنفيذ تصفية الفترة الزمنية (محاكاة)
-            pass
+            if isinstance(time_period, (tuple, list)):
+                filters['start_year'], filters['end_year'] = time_period
+            else:
+                filters['start_year'] = filters['end_year'] = int(time_period)
         
         # تحليل البيانات
         results = {
-            'win_rate': self._calculate_win_rate(filtered_data),
-            'avg_profit_margin': self._calculate_avg_profit_margin(filtered_data),
-            'price_trends': self._analyze_price_trends(filtered_data),
-            'success_factors': self._identify_success_factors(filtered_data),
-            'visualizations': self._generate_visualizations(filtered_data)
+            'win_rate': self._calculate_win_rate(filters),
+            'avg_profit_margin': self._calculate_avg_profit_margin(filters),
+            'price_trends': self._analyze_price_trends(filters),
+            'success_factors': self._identify_success_factors(filters),
+            'visualizations': self._generate_visualizations(filters),
+            **self._data_label()
         }
         
         return results
     
+    def record_tender_outcomes(self, tenders):
+        """
+        تسجيل نتائج مناقصات جديدة أو محدثة
+        
+        تحدث ملخصات المكعب تلقائياً ضمن عملية الحفظ، ويعاد تدريب نموذج احتمال
+        الفوز على البيانات الجديدة.
+        
+        المعلمات:
+            tenders (list): قواميس بصيغة TenderHistoryStore.add_many
+            
+        العوائد:
+            int: عدد المناقصات المحفوظة
+        """
+        count = self.history_store.add_many(tenders)
+        self.win_model = ensure_win_model(self.history_store, self.model_path, self.sample_mode)
+        return count
+    
     def predict_tender_success(self, tender_data):
         """
         التنبؤ بفرص نجاح المناقصة
@@ -126,16 +176,33 @@ class DataAIIntegration:
         else:
             df = tender_data
         
-        # تنفيذ التنبؤ (محاكاة)
-        success_probability = np.random.uniform(0, 100)
-        
-        # تحديد العوامل المؤثرة (محاكاة)
+        tender = self._tender_features(df)
+        
+        if self.win_model is None:
+            # لا يوجد نموذج مدرب: استخدام معدل الفوز التاريخي
+            history = self.history_store.query(decided_only=True, include_samples=self.sample_mode)
+            success_probability = float(history['فائز'].mean() * 100) if len(history) else 50.0
+            return {
+                'success_probability': success_probability,
+                'confidence': 0.0,
+                'factors': [],
+                'recommendations': self._generate_success_recommendations([]),
+                **self._data_label()
+            }
+        
+        low, probability, high = self.win_model.probability_interval(tender)
+        success_probability = probability * 100
+        
+        # تحديد العوامل المؤثرة من مساهمات النموذج
+        contributions = self.win_model.contributions(tender)
+        largest = max(abs(value) for value in contributions.values()) or 1.0
         factors = [
-            {'name': 'السعر التنافسي', 'impact': np.random.uniform(0, 1), 'direction': 'إيجابي' if np.random.random() > 0.5 else 'سلبي'},
-            {'name': 'الخبرة السابقة', 'impact': np.random.uniform(0, 1), 'direction': 'إيجابي' if np.random.random() > 0.5 else 'سلبي'},
-            {'name': 'الجودة الفنية', 'impact': np.random.uniform(0, 1), 'direction': 'إيجابي' if np.random.random() > 0.5 else 'سلبي'},
-            {'name': 'المدة الزمنية', 'impact': np.random.uniform(0, 1), 'direction': 'إيجابي' if np.random.random() > 0.5 else 'سلبي'},
-            {'name': 'المنافسة', 'impact': np.random.uniform(0, 1), 'direction': 'إيجابي' if np.random.random() > 0.5 else 'سلبي'}
+            {
+                'name': FEATURE_LABELS[feature],
+                'impact': abs(value) / largest,
+                'direction': 'إيجابي' if value >= 0 else 'سلبي'
+            }
+            for feature, value in contributions.items()
         ]
         
         # ترتيب العوامل حسب التأثير
@@ -144,9 +211,12 @@ class DataAIIntegration:
         # إعداد النتائج
         results = {
             'success_probability': success_probability,
-            'confidence': np.random.uniform(70, 95),
+            # الثقة: 100 ناقص عرض فترة الثقة 95% لاحتمال الفوز
+            'confidence': 100 - (high - low) * 100,
+            'probability_range': (low * 100, high * 100),
             'factors': factors,
-            'recommendations': self._generate_success_recommendations(factors)
+            'recommendations': self._generate_success_recommendations(factors),
+            **self._data_label()
         }
         
         return results
@@ -177,35 +247,55 @@ class DataAIIntegration:
             # استخدام بيانات افتراضية للمنافسين
             competitors_df = self._get_competitors_data()
         
-        # تنفيذ تحسين التسعير (محاكاة)
-        base_price = float(df['الميزانية التقديرية'].iloc[0]) if 'الميزانية التقديرية' in df.columns else 10000000
-        
-        # حساب نطاق السعر المقترح
-        min_price = base_price * 0.85
-        optimal_price = base_price * 0.92
-        max_price = base_price * 0.98
-        
-        # تحليل حساسية السعر
-        price_sensitivity = []
-        for price_factor in np.linspace(0.8, 1.1, 7):
-            price = base_price * price_factor
-            win_probability = max(0, min(100, 100 - (price_factor - 0.9) * 200))
-            profit = price - (base_price * 0.75)
-            expected_value = win_probability / 100 * profit
-            
-            price_sensitivity.append({
-                'price_factor': price_factor,
-                'price': price,
-                'win_probability': win_probability,
-                'profit': profit,
-                'expected_value': expected_value
-            })
+        tender = self._tender_features(df)
+        base_price = tender['estimated_budget']
+        cost = float(df['التكلفة التقديرية'].iloc[0]) if 'التكلفة التقديرية' in df.columns else base_price * 0.75
+        
+        # شبكة الأسعار من 80% إلى 110% من الميزانية على الأقل
+        min_markup = min(-0.05, 0.8 * base_price / cost - 1)
+        max_markup = max(0.4, 1.1 * base_price / cost - 1)
+        
+        try:
+            # محاكاة عروض المنافسين وتعظيم الربح المتوقع
+            competitors_count = tender['competitors_count']
+            optimization = BidOptimizer(competitors_df, seed=0).optimize(
+                cost,
+                min_markup=min_markup,
+                max_markup=max_markup,
+                n_competitors=float(competitors_count) if competitors_count else None
+            )
+        except ValueError as e:
+            logger.warning(f"تعذرت محاكاة المنافسين، سيستخدم نموذج احتمال الفوز: {str(e)}")
+            optimization = self._optimize_with_win_model(tender, cost, min_markup, max_markup)
+        
+        optimal_price = optimization['optimal_price']
+        min_price, max_price = optimization['price_band']
+        
+        # تحليل حساسية السعر (نقاط مختارة من الشبكة للعرض)
+        prices = optimization['prices']
+        price_sensitivity = [
+            {
+                'price_factor': float(prices[i] / base_price),
+                'price': float(prices[i]),
+                'markup': float(optimization['markups'][i]),
+                'win_probability': float(optimization['win_probability'][i] * 100),
+                'profit': float(prices[i] - cost),
+                'expected_value': float(optimization['expected_profit'][i]),
+                'expected_value_low': float(optimization['expected_profit_low'][i]),
+                'expected_value_high': float(optimization['expected_profit_high'][i])
+            }
+            for i in np.linspace(0, len(prices) - 1, 21).astype(int)
+        ]
         
         # إعداد النتائج
         results = {
             'min_price': min_price,
             'optimal_price': optimal_price,
             'max_price': max_price,
+            'optimal_markup': optimization['optimal_markup'],
+            'markup_band': optimization['markup_band'],
+            'win_probability': optimization['optimal_win_probability'] * 100,
+            'expected_profit': optimization['optimal_expected_profit'],
             'price_sensitivity': price_sensitivity,
             'market_position': self._analyze_market_position(optimal_price, competitors_df),
             'recommendations': self._generate_pricing_recommendations(optimal_price, price_sensitivity)
@@ -295,38 +385,59 @@ class DataAIIntegration:
     
     def _get_historical_data(self):
         """الحصول على البيانات التاريخية"""
-        # محاكاة البيانات التاريخية
-        np.random.seed(42)
-        
-        n_tenders = 50
-        tender_ids = [f"T-{2021 + i//20}-{i%20 + 1:03d}" for i in range(n_tenders)]
-        tender_types = np.random.choice(["مبنى إداري", "مبنى سكني", "مدرسة", "مستشفى", "طرق", "جسور", "بنية تحتية"], n_tenders)
-        tender_locations = np.random.choice(["الرياض", "جدة", "الدمام", "مكة", "المدينة", "أبها", "تبوك"], n_tenders)
-        tender_areas = np.random.randint(1000, 10000, n_tenders)
-        tender_durations = np.random.randint(6, 36, n_tenders)
-        tender_budgets = np.random.randint(1000000, 50000000, n_tenders)
-        tender_costs = np.array([budget * np.random.uniform(0.8, 1.1) for budget in tender_budgets])
-        tender_profits = tender_budgets - tender_costs
-        tender_profit_margins = tender_profits / tender_budgets * 100
-        tender_statuses = np.random.choice(["فائز", "خاسر", "قيد التنفيذ", "منجز"], n_tenders)
-        tender_dates = [f"202{1 + i//20}-{np.random.randint(1, 13):02d}-{np.random.randint(1, 29):02d}" for i in range(n_tenders)]
-        
-        # إنشاء DataFrame للمناقصات السابقة
-        tenders_data = {
-            "رقم المناقصة": tender_ids,
-            "نوع المشروع": tender_types,
-            "الموقع": tender_locations,
-            "المساحة (م2)": tender_areas,
-            "المدة (شهر)": tender_durations,
-            "الميزانية (ريال)": tender_budgets,
-            "التكلفة (ريال)": tender_costs,
-            "الربح (ريال)": tender_profits,
-            "هامش الربح (%)": tender_profit_margins,
-            "الحالة": tender_statuses,
-            "تاريخ التقديم": tender_dates
+        return self.history_store.query(include_samples=self.sample_mode)
+    
+    def _optimize_with_win_model(self, tender, cost, min_markup, max_markup, grid_size=10000):
+        """تعظيم الربح المتوقع بمنحنى نموذج احتمال الفوز عند غياب بيانات المنافسين"""
+        markups = np.linspace(min_markup, max_markup, grid_size)
+        prices = cost * (1 + markups)
+        if self.win_model is not None:
+            win_probability = self.win_model.score_bids(tender, prices)
+        else:
+            win_probability = np.clip(1 - (prices / tender['estimated_budget'] - 0.9) * 2, 0, 1)
+        expected_profit = win_probability * (prices - cost)
+        
+        best = int(np.argmax(expected_profit))
+        # النطاق المقترح: الأسعار التي تحقق 90% على الأقل من أفضل ربح متوقع
+        near_optimal = np.flatnonzero(expected_profit >= 0.9 * expected_profit[best])
+        markup_band = (float(markups[near_optimal[0]]), float(markups[near_optimal[-1]]))
+        
+        return {
+            'markups': markups,
+            'prices': prices,
+            'win_probability': win_probability,
+            'expected_profit': expected_profit,
+            'expected_profit_low': expected_profit,
+            'expected_profit_high': expected_profit,
+            'optimal_markup': float(markups[best]),
+            'optimal_price': float(prices[best]),
+            'optimal_win_probability': float(win_probability[best]),
+            'optimal_expected_profit': float(expected_profit[best]),
+            'markup_band': markup_band,
+            'price_band': tuple(cost * (1 + value) for value in markup_band)
         }
+    
+    def _tender_features(self, df):
+        """استخراج خصائص المناقصة التي يستخدمها نموذج احتمال الفوز"""
+        row = df.iloc[0] if len(df) else pd.Series(dtype=object)
+        
+        def value(*columns, default=None):
+            for column in columns:
+                if column in row.index and pd.notna(row[column]):
+                    return row[column]
+            return default
+        
+        budget = float(value('الميزانية التقديرية', 'الميزانية (ريال)', default=10000000))
+        median_ratio = self.win_model.metadata.get('median_bid_ratio', 0.95) if self.win_model is not None else 0.95
         
-        return pd.DataFrame(tenders_data)
+        return {
+            'estimated_budget': budget,
+            'bid_price': float(value('قيمة العرض', 'قيمة العرض (ريال)', default=budget * median_ratio)),
+            'competitors_count': value('عدد المنافسين'),
+            'duration_months': value('المدة (شهر)', 'المدة'),
+            'project_type': value('نوع المشروع'),
+            'location': value('الموقع')
+        }
     
     def _get_competitors_data(self):
         """الحصول على بيانات المنافسين"""
@@ -338,11 +449,12 @@ class DataAIIntegration:
             "شركة البنية التحتية المتكاملة", "شركة المقاولات العامة", "شركة التشييد والبناء", "شركة الهندسة والإنشاءات",
             "شركة المشاريع الكبرى", "شركة التطوير العقاري"
         ]
-        competitor_specialties = np.random.choice(["مباني", "طرق", "جسور", "بنية تحتية", "متعددة"], n_competitors)
-        competitor_sizes = np.random.choice(["صغيرة", "متوسطة", "كبيرة"], n_competitors)
-        competitor_market_shares = np.random.uniform(1, 15, n_competitors)
-        competitor_win_rates = np.random.uniform(10, 60, n_competitors)
-        competitor_avg_margins = np.random.uniform(5, 20, n_competitors)
+        rng = np.random.default_rng(42)
+        competitor_specialties = rng.choice(["مباني", "طرق", "جسور", "بنية تحتية", "متعددة"], n_competitors)
+        competitor_sizes = rng.choice(["صغيرة", "متوسطة", "كبيرة"], n_competitors)
+        competitor_market_shares = rng.uniform(1, 15, n_competitors)
+        competitor_win_rates = rng.uniform(10, 60, n_competitors)
+        competitor_avg_margins = rng.uniform(5, 20, n_competitors)
         
         # إنشاء DataFrame للمنافسين
         competitors_data = {
@@ -431,78 +543,60 @@ class DataAIIntegration:
             ]
         }
     
-    def _calculate_win_rate(self, df):
-        """حساب معدل الفوز"""
-        # محاكاة حساب معدل الفوز
-        if 'الحالة' in df.columns:
-            total_tenders = len(df)
-            won_tenders = len(df[df['الحالة'] == 'فائز'])
-            win_rate = won_tenders / total_tenders * 100 if total_tenders > 0 else 0
-        else:
-            win_rate = 35  # قيمة افتراضية
+    def _calculate_win_rate(self, filters):
+        """حساب معدل الفوز من مكعب الملخصات"""
+        totals = self.tender_cube.totals(**filters)
         
         return {
-            "overall_win_rate": win_rate,
+            "overall_win_rate": totals["win_rate"] or 0,
             "win_rate_by_type": [
-                {"type": "مبنى إداري", "win_rate": 40},
-                {"type": "مبنى سكني", "win_rate": 35},
-                {"type": "مدرسة", "win_rate": 45},
-                {"type": "مستشفى", "win_rate": 30},
-                {"type": "طرق", "win_rate": 25},
-                {"type": "جسور", "win_rate": 20},
-                {"type": "بنية تحتية", "win_rate": 30}
+                {"type": row["project_type"], "win_rate": row["win_rate"] or 0, "tenders": row["decided"]}
+                for row in self.tender_cube.query(("project_type",), **filters)
             ],
             "win_rate_by_location": [
-                {"location": "الرياض", "win_rate": 40},
-                {"location": "جدة", "win_rate": 35},
-                {"location": "الدمام", "win_rate": 30},
-                {"location": "مكة", "win_rate": 25},
-                {"location": "المدينة", "win_rate": 30},
-                {"location": "أبها", "win_rate": 35},
-                {"location": "تبوك", "win_rate": 40}
+                {"location": row["location"], "win_rate": row["win_rate"] or 0, "tenders": row["decided"]}
+                for row in self.tender_cube.query(("location",), **filters)
+            ],
+            "win_rate_by_year": [
+                {"year": int(row["year"]) if row["year"].isdigit() else row["year"], "win_rate": row["win_rate"] or 0, "tenders": row["decided"]}
+                for row in self.tender_cube.query(("year",), **filters)
             ]
         }
     
-    def _calculate_avg_profit_margin(self, df):
-        """حساب متوسط هامش الربح"""
-        # محاكاة حساب متوسط هامش الربح
-        if 'هامش الربح (%)' in df.columns:
-            avg_profit_margin = df['هامش الربح (%)'].mean()
-        else:
-            avg_profit_margin = 15  # قيمة افتراضية
+    def _calculate_avg_profit_margin(self, filters):
+        """حساب متوسط هامش الربح من مكعب الملخصات"""
+        totals = self.tender_cube.totals(**filters)
         
         return {
-            "overall_avg_profit_margin": avg_profit_margin,
+            "overall_avg_profit_margin": totals["avg_margin"] or 0,
+            "won_avg_profit_margin": totals["avg_won_margin"] or 0,
             "profit_margin_by_type": [
-                {"type": "مبنى إداري", "profit_margin": 18},
-                {"type": "مبنى سكني", "profit_margin": 15},
-                {"type": "مدرسة", "profit_margin": 20},
-                {"type": "مستشفى", "profit_margin": 12},
-                {"type": "طرق", "profit_margin": 10},
-                {"type": "جسور", "profit_margin": 8},
-                {"type": "بنية تحتية", "profit_margin": 14}
+                {"type": row["project_type"], "profit_margin": row["avg_margin"] or 0}
+                for row in self.tender_cube.query(("project_type",), **filters)
             ],
             "profit_margin_by_location": [
-                {"location": "الرياض", "profit_margin": 16},
-                {"location": "جدة", "profit_margin": 14},
-                {"location": "الدمام", "profit_margin": 15},
-                {"location": "مكة", "profit_margin": 12},
-                {"location": "المدينة", "profit_margin": 13},
-                {"location": "أبها", "profit_margin": 18},
-                {"location": "تبوك", "profit_margin": 17}
+                {"location": row["location"], "profit_margin": row["avg_margin"] or 0}
+                for row in self.tender_cube.query(("location",), **filters)
             ]
         }
     
-    def _analyze_price_trends(self, df):
+    def _analyze_price_trends(self, filters):
         """تحليل اتجاهات الأسعار"""
-        # محاكاة تحليل اتجاهات الأسعار
+        price_trends_by_year = [
+            {"year": int(row["year"]), "avg_price_per_sqm": row["price_per_sqm"]}
+            for row in self.tender_cube.query(("year",), **filters)
+            if row["year"].isdigit() and row["price_per_sqm"]
+        ]
+        
+        # التوقع: متوسط التغير السنوي لآخر ثلاث سنوات
+        prices = [point["avg_price_per_sqm"] for point in price_trends_by_year]
+        changes = [(current / previous - 1) * 100 for previous, current in zip(prices, prices[1:])][-3:]
+        average_change = float(np.mean(changes)) if changes else 0.0
+        last_year = price_trends_by_year[-1]["year"] if price_trends_by_year else datetime.now().year
+        
         return {
-            "price_trends_by_year": [
-                {"year": 2021, "avg_price_per_sqm": 3500},
-                {"year": 2022, "avg_price_per_sqm": 3800},
-                {"year": 2023, "avg_price_per_sqm": 4200},
-                {"year": 2024, "avg_price_per_sqm": 4500}
-            ],
+            "price_trends_by_year": price_trends_by_year,
+            # لا يحفظ سجل المناقصات أسعار المواد، فتبقى هذه القيم مرجعية
             "price_trends_by_material": [
                 {"material": "خرسانة", "price_change": 15},
                 {"material": "حديد", "price_change": 20},
@@ -511,13 +605,12 @@ class DataAIIntegration:
                 {"material": "ألمنيوم", "price_change": 25}
             ],
             "price_forecast": [
-                {"year": 2025, "forecasted_price_change": 8},
-                {"year": 2026, "forecasted_price_change": 5},
-                {"year": 2027, "forecasted_price_change": 3}
+                {"year": last_year + offset, "forecasted_price_change": average_change}
+                for offset in (1, 2, 3)
             ]
         }
     
-    def _identify_success_factors(self, df):
+    def _identify_success_factors(self, filters):
         """تحديد عوامل النجاح"""
         # محاكاة تحديد عوامل النجاح
         return [
@@ -528,7 +621,7 @@ class DataAIIntegration:
             {"factor": "السمعة", "importance": 0.4, "description": "سمعة جيدة في السوق وعلاقات قوية مع العملاء"}
         ]
     
-    def _generate_visualizations(self, df):
+    def _generate_visualizations(self, filters):
         """توليد الرسوم البيانية"""
         # محاكاة توليد الرسوم البيانية
         return {
@@ -0,0 +1,156 @@
+"""
+محسن العروض - اختيار نسبة الإضافة التي تعظم الربح المتوقع بمحاكاة عروض المنافسين
+
+يحاكي المحسن عروض المنافسين من بياناتهم (متوسط هامش الربح ومعدل الفوز وحصة
+السوق) آلاف المرات، ثم يحسب لكل سعر في شبكة كثيفة احتمال أن يكون عرضنا هو
+الأقل والربح المتوقع مع حدود ثقته، ويحدد نطاق نسب الإضافة التي لا تقل عن
+الحل الأمثل بفرق ذي دلالة إحصائية.
+"""
+
+import logging
+from statistics import NormalDist
+
+import numpy as np
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+_MARGIN_COLUMN = "متوسط هامش الربح (%)"
+_MARGIN_SD_COLUMN = "انحراف هامش الربح (%)"
+_WIN_RATE_COLUMN = "معدل الفوز (%)"
+_SHARE_COLUMN = "حصة السوق (%)"
+
+
+class BidOptimizer:
+    """محسن العروض بمحاكاة مونت كارلو لعروض المنافسين"""
+
+    def __init__(self, competitors_df, n_simulations=50_000, margin_sd=4.0, cost_sigma=0.05,
+                 market_sigma=0.03, seed=None):
+        """
+        تهيئة المحسن
+
+        المعلمات:
+            competitors_df (DataFrame): بيانات المنافسين بأعمدة متوسط هامش الربح (%)
+                ومعدل الفوز (%) وحصة السوق (%)، وانحراف هامش الربح (%) اختيارياً
+            n_simulations (int): عدد المحاكاة
+            margin_sd (float): الانحراف المعياري لهامش المنافس بالنقاط المئوية عند غياب عموده
+            cost_sigma (float): تشتت تكلفة كل منافس حول تكلفتنا (لوغاريتمي)
+            market_sigma (float): صدمة تكلفة مشتركة بين المنافسين في المناقصة نفسها
+            seed (int): بذرة التوليد العشوائي لنتائج قابلة للتكرار
+        """
+        if competitors_df is None or len(competitors_df) == 0:
+            raise ValueError("لا توجد بيانات منافسين للمحاكاة")
+
+        count = len(competitors_df)
+        self.margins = _column(competitors_df, _MARGIN_COLUMN, 10.0, count) / 100
+        self.margin_sds = _column(competitors_df, _MARGIN_SD_COLUMN, margin_sd, count) / 100
+        win_rates = np.clip(_column(competitors_df, _WIN_RATE_COLUMN, 30.0, count) / 100, 0.01, 1.0)
+        shares = np.clip(_column(competitors_df, _SHARE_COLUMN, 100.0 / count, count), 0.01, None)
+
+        # الحصة السوقية ≈ معدل المشاركة × معدل الفوز، فالمشاركة النسبية = الحصة ÷ معدل الفوز
+        self.participation_weights = shares / win_rates
+
+        self.n_simulations = n_simulations
+        self.cost_sigma = cost_sigma
+        self.market_sigma = market_sigma
+        self.seed = seed
+
+    def _participation(self, n_competitors):
+        """احتمال مشاركة كل منافس بحيث يكون العدد المتوقع للمشاركين n_competitors"""
+        n_competitors = min(n_competitors, len(self.participation_weights))
+        weights = self.participation_weights
+        scale = n_competitors / weights.sum()
+        # رفع المعامل تدريجياً حتى يعوض ما يقطع عند الاحتمال 1
+        for _ in range(20):
+            probabilities = np.minimum(weights * scale, 1.0)
+            if probabilities.sum() >= n_competitors - 1e-9:
+                break
+            scale *= n_competitors / probabilities.sum()
+        return probabilities
+
+    def simulate_lowest_bids(self, cost, n_competitors=None):
+        """
+        محاكاة أقل عرض منافس في كل مناقصة افتراضية
+
+        المعلمات:
+            cost (float): تكلفتنا التقديرية (أساس تكلفة المنافسين)
+            n_competitors (float): العدد المتوقع للمنافسين المشاركين (الافتراضي جميعهم)
+
+        العوائد:
+            ndarray: أقل عرض منافس لكل محاكاة (inf إذا لم يشارك أحد)
+        """
+        rng = np.random.default_rng(self.seed)
+        n, count = self.n_simulations, len(self.margins)
+        participation = self._participation(n_competitors or count)
+
+        market = rng.normal(0.0, self.market_sigma, (n, 1))
+        own_cost = rng.normal(0.0, self.cost_sigma, (n, count))
+        margins = rng.normal(self.margins, self.margin_sds, (n, count))
+        bids = cost * np.exp(market + own_cost) * (1 + margins)
+
+        bids[rng.random((n, count)) >= participation] = np.inf
+        return bids.min(axis=1)
+
+    def optimize(self, cost, min_markup=-0.05, max_markup=0.40, grid_size=10_000, n_competitors=None,
+                 confidence=0.9):
+        """
+        إيجاد نسبة الإضافة التي تعظم الربح المتوقع
+
+        يفرز أقل عروض المنافسين مرة واحدة، ثم يحسب احتمال الفوز لكل أسعار
+        الشبكة بالبحث الثنائي بدلاً من مقارنة كل سعر بكل محاكاة.
+
+        المعلمات:
+            cost (float): تكلفتنا التقديرية
+            min_markup (float): أدنى نسبة إضافة على التكلفة
+            max_markup (float): أعلى نسبة إضافة على التكلفة
+            grid_size (int): عدد نقاط شبكة الأسعار
+            n_competitors (float): العدد المتوقع للمنافسين
+            confidence (float): مستوى الثقة
+
+        العوائد:
+            dict: الشبكة (markups, prices, win_probability, expected_profit مع حدوده)
+                والقيم المثلى ونطاقي الثقة لنسبة الإضافة والسعر
+        """
+        lowest = self.simulate_lowest_bids(cost, n_competitors)
+        markups = np.linspace(min_markup, max_markup, grid_size)
+        prices = cost * (1 + markups)
+        profits = prices - cost
+
+        # احتمال الفوز = نسبة المحاكاة التي يكون فيها أقل عرض منافس أعلى من سعرنا
+        win_probability = 1.0 - np.searchsorted(np.sort(lowest), prices, side="right") / len(lowest)
+        expected_profit = win_probability * profits
+
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        standard_error = np.sqrt(win_probability * (1 - win_probability) / len(lowest)) * np.abs(profits)
+
+        expected_profit_low = expected_profit - z * standard_error
+        expected_profit_high = expected_profit + z * standard_error
+
+        best = int(np.argmax(expected_profit))
+
+        # نطاق الثقة: نسب الإضافة التي يتجاوز حدها الأعلى الحد الأدنى للحل الأمثل
+        candidates = np.flatnonzero(expected_profit_high >= expected_profit_low[best])
+        markup_band = (float(markups[candidates[0]]), float(markups[candidates[-1]]))
+
+        return {
+            "markups": markups,
+            "prices": prices,
+            "win_probability": win_probability,
+            "expected_profit": expected_profit,
+            "expected_profit_low": expected_profit_low,
+            "expected_profit_high": expected_profit_high,
+            "optimal_markup": float(markups[best]),
+            "optimal_price": float(prices[best]),
+            "optimal_win_probability": float(win_probability[best]),
+            "optimal_expected_profit": float(expected_profit[best]),
+            "markup_band": markup_band,
+            "price_band": tuple(cost * (1 + value) for value in markup_band),
+            "n_simulations": int(len(lowest))
+        }
+
+
+def _column(df, column, default, count):
+    """قراءة عمود رقمي مع قيمة افتراضية للقيم أو العمود المفقود"""
+    if column not in df.columns:
+        return np.full(count, float(default))
+    values = np.asarray(df[column], dtype=float)
+    return np.where(np.isnan(values), float(default), values)
@@ -0,0 +1,292 @@
+"""
+نموذج التنبؤ بالتكاليف - انحدار لوغاريتمي خطي لتكلفة المتر المربع مع فترات تنبؤ
+
+يتعلم النموذج لوغاريتم تكلفة المتر المربع من نوع المشروع والموقع ونوع العميل
+ونوع المناقصة والمساحة وعدد الطوابق والمدة والمتطلبات الإضافية، فتصبح معاملات
+التعديل المضروبة معاملات خطية. تحفظ المعاملات ومصفوفة تباينها كملفات npy تحمل
+بالتعيين في الذاكرة (memory-mapped) مرة واحدة لكل إصدار من النموذج، ويتنبأ
+النموذج لجدول كامل من المشاريع مع فترات التنبؤ في عملية مصفوفية واحدة.
+"""
+
+import os
+import json
+import logging
+import datetime
+from functools import lru_cache
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+CATEGORICAL_FEATURES = ("project_type", "location", "client_type", "tender_type")
+FLAG_FEATURES = (
+    "has_basement", "has_special_finishing", "has_landscape",
+    "has_parking", "has_smart_systems", "has_sustainability",
+)
+NUMERIC_FEATURES = ("log_area", "extra_floors", "duration_months") + FLAG_FEATURES
+
+# معاملات مرجعية لتوليد سجل التكاليف النموذجي إلى حين توفر تكاليف فعلية
+REFERENCE_COST_PER_SQM = {
+    "مباني سكنية": 2500, "مباني تجارية": 3000, "مباني حكومية": 3500, "مراكز صحية": 4000,
+    "مدارس": 3200, "بنية تحتية": 2000, "طرق": 1500, "جسور": 5000, "صرف صحي": 2200,
+    "مياه": 2000, "كهرباء": 2500,
+}
+REFERENCE_LOCATION_FACTORS = {
+    "الرياض": 1.1, "جدة": 1.15, "الدمام": 1.05, "مكة": 1.2, "المدينة": 1.1, "تبوك": 0.95,
+    "حائل": 0.9, "عسير": 0.95, "جازان": 0.9, "نجران": 0.85, "الباحة": 0.9, "الجوف": 0.85,
+    "القصيم": 0.9,
+}
+REFERENCE_CLIENT_FACTORS = {
+    "حكومي": 1.05, "شبه حكومي": 1.0, "شركة كبيرة": 0.95, "شركة متوسطة": 0.9,
+    "شركة صغيرة": 0.85, "أفراد": 0.8,
+}
+REFERENCE_TENDER_FACTORS = {"عامة": 1.0, "خاصة": 0.95, "أمر مباشر": 0.9}
+REFERENCE_FLAG_FACTORS = {
+    "has_basement": 1.1, "has_special_finishing": 1.2, "has_landscape": 1.05,
+    "has_parking": 1.1, "has_smart_systems": 1.15, "has_sustainability": 1.1,
+}
+
+_ARRAYS = ("coef", "covariance", "means", "scales")
+
+
+class CostPredictionModel:
+    """نموذج انحدار لتكلفة المتر المربع مع فترات التنبؤ"""
+
+    def __init__(self, l2=1.0):
+        """
+        تهيئة النموذج
+
+        المعلمات:
+            l2 (float): معامل التنظيم للمعاملات (عدا الثابت)
+        """
+        self.l2 = l2
+        self.coef_ = None
+        self.covariance_ = None
+        self.means_ = None
+        self.scales_ = None
+        self.categories_ = {}
+        self.metadata = {}
+
+    @property
+    def is_fitted(self):
+        return self.coef_ is not None
+
+    def _numeric(self, projects):
+        """الخصائص الرقمية قبل التوحيد"""
+        n = len(projects)
+
+        def column(name, default):
+            if name not in projects:
+                return np.full(n, float(default))
+            return pd.to_numeric(pd.Series(projects[name], copy=False), errors="coerce").to_numpy(dtype=float)
+
+        columns = [
+            np.log(column("area", np.nan)),
+            column("floors", 1) - 1,
+            column("duration_months", np.nan),
+        ] + [np.nan_to_num(column(flag, 0)) for flag in FLAG_FEATURES]
+        return np.column_stack(columns)
+
+    def _design(self, projects):
+        """
+        مصفوفة التصميم: ثابت + خصائص رقمية موحدة + ترميز فئوي
+
+        القيم الرقمية المفقودة تعوض بمتوسط التدريب، والفئات غير المعروفة لا تضيف أثراً.
+        """
+        numeric = (self._numeric(projects) - self.means_) / self.scales_
+        numeric = np.where(np.isnan(numeric), 0.0, numeric)
+        n = numeric.shape[0]
+
+        blocks = [np.ones((n, 1)), numeric]
+        for feature in CATEGORICAL_FEATURES:
+            values = np.asarray(projects[feature], dtype=object) if feature in projects else np.full(n, "", dtype=object)
+            categories = np.asarray(self.categories_[feature], dtype=object)
+            blocks.append((values[:, None] == categories[None, :]).astype(float))
+        return np.hstack(blocks)
+
+    def fit(self, history):
+        """
+        تدريب النموذج على مشاريع سابقة
+
+        المعلمات:
+            history (DataFrame): أعمدة الخصائص (project_type, location, area, ...) و total_cost
+
+        العوائد:
+            CostPredictionModel: النموذج نفسه
+        """
+        history = history[(history["total_cost"] > 0) & (history["area"] > 0)].reset_index(drop=True)
+        if len(history) < 30:
+            raise ValueError("البيانات التاريخية غير كافية لتدريب نموذج التكاليف")
+
+        y = np.log(history["total_cost"].to_numpy(dtype=float) / history["area"].to_numpy(dtype=float))
+
+        numeric = self._numeric(history)
+        self.means_ = np.nan_to_num(np.nanmean(numeric, axis=0))
+        self.scales_ = np.nanstd(numeric, axis=0)
+        self.scales_[~(self.scales_ > 0)] = 1.0
+        self.categories_ = {
+            feature: sorted({str(value) for value in history[feature].dropna()}) if feature in history else []
+            for feature in CATEGORICAL_FEATURES
+        }
+
+        X = self._design(history)
+        penalty = np.full(X.shape[1], float(self.l2))
+        penalty[0] = 0.0
+        gram_inverse = np.linalg.inv(X.T @ X + np.diag(penalty))
+        coef = gram_inverse @ X.T @ y
+
+        residuals = y - X @ coef
+        dof = max(len(y) - X.shape[1], 1)
+        sigma2 = float(residuals @ residuals / dof)
+
+        self.coef_ = coef
+        self.covariance_ = sigma2 * gram_inverse
+
+        cost_per_sqm = np.exp(y)
+        keys = history["project_type"].astype(str) + "|" + history["location"].astype(str)
+        self.metadata.update({
+            "n_samples": int(len(y)),
+            "sigma": float(np.sqrt(sigma2)),
+            "r2": float(1 - residuals.var() / y.var()) if y.var() > 0 else 0.0,
+            "type_cost_per_sqm": pd.Series(cost_per_sqm).groupby(history["project_type"].astype(str)).mean().to_dict(),
+            "type_location_cost_per_sqm": pd.Series(cost_per_sqm).groupby(keys).mean().to_dict(),
+            "trained_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+        return self
+
+    def predict(self, projects, confidence=0.9):
+        """
+        التنبؤ بتكاليف مجموعة مشاريع مع فترات التنبؤ
+
+        المعلمات:
+            projects (DataFrame|dict): خصائص المشاريع (صف لكل مشروع)
+            confidence (float): مستوى الثقة لفترة التنبؤ
+
+        العوائد:
+            DataFrame: cost_per_sqm و total_cost (الوسيط المتوقع) و total_cost_low
+                و total_cost_high لكل مشروع بترتيب الإدخال
+        """
+        if not isinstance(projects, pd.DataFrame):
+            projects = pd.DataFrame(projects)
+
+        X = self._design(projects)
+        mean = X @ self.coef_
+        # تباين التنبؤ = تباين البواقي + تباين تقدير المعاملات لكل صف
+        variance = self.metadata["sigma"] ** 2 + np.einsum("ij,jk,ik->i", X, self.covariance_, X)
+        spread = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(variance)
+
+        area = pd.to_numeric(projects["area"], errors="coerce").to_numpy(dtype=float)
+        cost_per_sqm = np.exp(mean)
+        return pd.DataFrame({
+            "cost_per_sqm": cost_per_sqm,
+            "total_cost": cost_per_sqm * area,
+            "total_cost_low": np.exp(mean - spread) * area,
+            "total_cost_high": np.exp(mean + spread) * area,
+        }, index=projects.index)
+
+    def reference_cost_per_sqm(self, project_type, location=None):
+        """متوسط تكلفة المتر المربع في بيانات التدريب لنوع المشروع (والموقع إن وجد)"""
+        by_location = self.metadata.get("type_location_cost_per_sqm", {})
+        if location is not None and f"{project_type}|{location}" in by_location:
+            return by_location[f"{project_type}|{location}"]
+        return self.metadata.get("type_cost_per_sqm", {}).get(project_type)
+
+    def save(self, path):
+        """
+        حفظ النموذج في مجلد (ملف npy لكل مصفوفة وملف metadata.json)
+
+        يكتب كل ملف في ملف مؤقت ثم يستبدل، وتكتب البيانات الوصفية أخيراً لأن
+        وقت تعديلها هو مفتاح إعادة التحميل.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            temp_path = os.path.join(path, f"{name}.tmp.npy")
+            np.save(temp_path, np.ascontiguousarray(getattr(self, f"{name}_")))
+            os.replace(temp_path, os.path.join(path, f"{name}.npy"))
+
+        meta = dict(self.metadata, l2=self.l2, categories=self.categories_)
+        temp_path = os.path.join(path, "metadata.tmp.json")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(path, "metadata.json"))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """تحميل نموذج محفوظ مع تعيين مصفوفاته في الذاكرة"""
+        with open(os.path.join(path, "metadata.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        model = cls(l2=meta.pop("l2", 1.0))
+        model.categories_ = meta.pop("categories")
+        model.metadata = meta
+        for name in _ARRAYS:
+            setattr(model, f"{name}_", np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+        return model
+
+
+def sample_cost_history(n_projects=2000, seed=42):
+    """
+    توليد سجل تكاليف نموذجي من المعاملات المرجعية
+
+    المعلمات:
+        n_projects (int): عدد المشاريع
+        seed (int): بذرة التوليد العشوائي
+
+    العوائد:
+        DataFrame: خصائص المشاريع مع total_cost
+    """
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame({
+        "project_type": rng.choice(list(REFERENCE_COST_PER_SQM), n_projects),
+        "location": rng.choice(list(REFERENCE_LOCATION_FACTORS), n_projects),
+        "client_type": rng.choice(list(REFERENCE_CLIENT_FACTORS), n_projects),
+        "tender_type": rng.choice(list(REFERENCE_TENDER_FACTORS), n_projects),
+        "area": np.round(np.exp(rng.uniform(np.log(200), np.log(100_000), n_projects))),
+        "floors": rng.integers(1, 21, n_projects),
+        "duration_months": rng.integers(6, 49, n_projects),
+    })
+    for flag in FLAG_FEATURES:
+        df[flag] = rng.random(n_projects) < 0.3
+
+    cost_per_sqm = (
+        df["project_type"].map(REFERENCE_COST_PER_SQM).to_numpy(dtype=float)
+        * df["location"].map(REFERENCE_LOCATION_FACTORS).to_numpy(dtype=float)
+        * df["client_type"].map(REFERENCE_CLIENT_FACTORS).to_numpy(dtype=float)
+        * df["tender_type"].map(REFERENCE_TENDER_FACTORS).to_numpy(dtype=float)
+        * (1.0 + (df["floors"].to_numpy() - 1) * 0.05)
+        * np.exp(rng.normal(0.0, 0.08, n_projects))
+    )
+    for flag, factor in REFERENCE_FLAG_FACTORS.items():
+        cost_per_sqm *= np.where(df[flag], factor, 1.0)
+
+    df["total_cost"] = np.round(cost_per_sqm * df["area"], 2)
+    return df
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    return CostPredictionModel.load(path)
+
+
+def load_cost_prediction_model(path=None):
+    """
+    تحميل نموذج التكاليف مرة واحدة لكل إصدار، وتدريبه على السجل النموذجي إن لم يوجد
+
+    المعلمات:
+        path (str): مجلد النموذج (الافتراضي data/models/cost_model)
+
+    العوائد:
+        CostPredictionModel: النموذج المحمل
+    """
+    path = os.path.abspath(path or os.path.join('data', 'models', 'cost_model'))
+    metadata_path = os.path.join(path, "metadata.json")
+
+    if not os.path.exists(metadata_path):
+        model = CostPredictionModel().fit(sample_cost_history())
+        model.metadata["source"] = "sample"
+        model.save(path)
+        logger.info(f"تم تدريب نموذج التكاليف على {model.metadata['n_samples']} مشروع نموذجي")
+
+    return _load_cached(path, os.path.getmtime(metadata_path))
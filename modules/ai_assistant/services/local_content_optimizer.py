@@ -0,0 +1,344 @@
+"""
+محسن المحتوى المحلي - أقل تكلفة لاستبدال الموردين مع تحقيق نسبة المحتوى المحلي المستهدفة
+
+لكل مكون في المشروع مورده الحالي وبدائل (موردون محليون أو أجانب من كتالوج المواد
+أو كتالوج مقاولي الباطن أو بدائل يدخلها المستخدم) لكل منها تكلفة ونسبة محتوى
+محلي. يختار المحسن مورداً واحداً لكل مكون بحيث تكون نسبة المحتوى المحلي للمشروع
+لا تقل عن المستهدف بأقل تكلفة إجمالية.
+
+المسألة برمجة خطية صحيحة (MILP) بقيد اختيار واحد لكل مكون وقيد محتوى محلي واحد:
+    تصغير Σ c·x  بشرط  Σ c·(l - T)·x ≥ 0  و  Σ_j x_ij = 1  و  x ∈ {0, 1}
+تحل بـ scipy.optimize.milp (HiGHS) بمصفوفات متناثرة عند توفر scipy، وإلا بحل
+الاسترخاء الخطي بمضاعف لاغرانج واحد (بحث ثنائي على المضاعف) ثم تحسين الحل
+الصحيح الناتج، مع حد أدنى للتكلفة المثلى يبين مقدار الفجوة.
+"""
+
+import logging
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+# التحقق من توفر محلل البرمجة الخطية الصحيحة؛ يؤجل استيراد scipy إلى أول حل بـ milp
+# حتى لا يضاف زمن تحميله إلى زمن فتح صفحة المساعد الذكي
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+if not SCIPY_AVAILABLE:
+    logger.warning("مكتبة scipy غير متوفرة. سيستخدم محسن المحتوى المحلي طريقة مضاعف لاغرانج.")
+
+# نسبة المحتوى المحلي الافتراضية لبنود الكتالوج حسب المنشأ
+ORIGIN_LOCAL_CONTENT = {"محلي": 90.0, "مستورد": 10.0}
+
+# نسبة المحتوى المحلي الافتراضية لمقاولي الباطن (منشآت محلية)
+SUBCONTRACTOR_LOCAL_CONTENT = 70.0
+
+
+def catalog_alternatives(component, catalog, category=None):
+    """
+    بدائل مكون من كتالوج المواد أو كتالوج مقاولي الباطن
+
+    تكلفة البديل هي قيمة المكون مضروبة في نسبة سعر البند إلى وسيط أسعار بنود
+    الفئة الفرعية والوحدة نفسها (أو قيمة المكون نفسها إذا لم يكن في الكتالوج أسعار)، ونسبة محتواه المحلي
+    من عمود local_content إن وجد، وإلا من المنشأ، وإلا نسبة مقاولي الباطن. يستبعد
+    مقاولو الباطن الذين لا يقع حجم المكون في نطاق قيم مشاريعهم.
+
+    المعلمات:
+        component (dict): المكون (id, value)
+        catalog (DataFrame): بنود الكتالوج
+        category (str): فئة الكتالوج المقابلة للمكون (اختياري)
+
+    العوائد:
+        list: قواميس بدائل بمفاتيح component_id, supplier, cost, local_content, source
+    """
+    if catalog is None or len(catalog) == 0:
+        return []
+    items = catalog if category is None else catalog[catalog["category"] == category]
+    if "min_project_value" in items and "max_project_value" in items:
+        # مقاولو الباطن الذين يقبلون حجم المكون فقط
+        value = float(component["value"])
+        items = items[(items["min_project_value"] <= value) & (items["max_project_value"] >= value)]
+    if items.empty:
+        return []
+
+    if "price" in items:
+        # أسعار البنود تقارن داخل الفئة الفرعية والوحدة نفسها فقط
+        prices = pd.to_numeric(items["price"], errors="coerce")
+        groups = [items[column] for column in ("subcategory", "unit") if column in items]
+        medians = prices.groupby(groups).transform("median") if groups else prices.median()
+        factors = (prices / medians).fillna(1.0).to_numpy()
+    else:
+        factors = np.ones(len(items))
+
+    if "local_content" in items:
+        local_content = pd.to_numeric(items["local_content"], errors="coerce").fillna(0).to_numpy()
+    elif "origin" in items:
+        local_content = items["origin"].map(ORIGIN_LOCAL_CONTENT).fillna(0).to_numpy()
+    else:
+        local_content = np.full(len(items), SUBCONTRACTOR_LOCAL_CONTENT)
+
+    suppliers = items["supplier"] if "supplier" in items else items["name"]
+    names = items["name"] if "name" in items else suppliers
+    source = "كتالوج المواد" if "price" in items else "كتالوج مقاولي الباطن"
+
+    return [
+        {
+            "component_id": component["id"],
+            "supplier": f"{supplier} - {name}" if supplier != name else str(supplier),
+            "cost": float(component["value"]) * float(factor),
+            "local_content": float(lc),
+            "source": source,
+        }
+        for supplier, name, factor, lc in zip(suppliers, names, factors, local_content)
+    ]
+
+
+class LocalContentOptimizer:
+    """محسن اختيار الموردين لتحقيق المحتوى المحلي المستهدف بأقل تكلفة"""
+
+    def __init__(self, components, alternatives=()):
+        """
+        تهيئة المحسن
+
+        المعلمات:
+            components (list): المكونات (id, name, value, local_content, supplier)، ويعد
+                المورد الحالي لكل مكون أحد خياراته
+            alternatives (list|DataFrame): البدائل (component_id, supplier, cost,
+                local_content وsource اختيارياً)
+        """
+        components = pd.DataFrame(list(components) if not isinstance(components, pd.DataFrame) else components)
+        if components.empty:
+            raise ValueError("لا توجد مكونات للتحسين")
+        self.components = components.reset_index(drop=True)
+
+        current = pd.DataFrame({
+            "component_id": self.components["id"],
+            "supplier": self.components.get("supplier", pd.Series([""] * len(self.components))),
+            "cost": self.components["value"].astype(float),
+            "local_content": self.components["local_content"].astype(float),
+            "source": "المورد الحالي",
+        })
+        alternatives = pd.DataFrame(list(alternatives) if not isinstance(alternatives, pd.DataFrame) else alternatives)
+        if not alternatives.empty:
+            alternatives = alternatives[alternatives["component_id"].isin(self.components["id"])]
+            alternatives = alternatives.assign(source=alternatives.get("source", "بديل"))
+
+        options = pd.concat([current, alternatives], ignore_index=True)
+        options["row"] = options["component_id"].map({cid: i for i, cid in enumerate(self.components["id"])})
+        # ترتيب الخيارات حسب المكون مع بقاء المورد الحالي أولاً
+        self.options = options.sort_values("row", kind="stable").reset_index(drop=True)
+
+        # مصفوفات مبطنة: مكونات × أقصى عدد خيارات (تكلفة لا نهائية للخانات الفارغة)
+        rows = self.options["row"].to_numpy()
+        starts = np.r_[0, np.flatnonzero(np.diff(rows)) + 1]
+        counts = np.diff(np.r_[starts, len(rows)])
+        columns = np.arange(len(rows)) - np.repeat(starts, counts)
+
+        n, k = len(self.components), int(counts.max())
+        self._slots = np.full((n, k), -1)
+        self._slots[rows, columns] = np.arange(len(rows))
+        self._cost = np.full((n, k), np.inf)
+        self._cost[rows, columns] = self.options["cost"].to_numpy(dtype=float)
+        self._lc = np.zeros((n, k))
+        self._lc[rows, columns] = self.options["local_content"].to_numpy(dtype=float) / 100
+
+    def _surplus(self, target):
+        """فائض المحتوى المحلي لكل خيار بالريال: c·(l - T)"""
+        return np.where(self._slots >= 0, np.nan_to_num(self._cost, posinf=0.0) * (self._lc - target), -np.inf)
+
+    def optimize(self, target_lc, method="auto"):
+        """
+        اختيار الموردين بأقل تكلفة مع تحقيق المحتوى المحلي المستهدف
+
+        المعلمات:
+            target_lc (float): نسبة المحتوى المحلي المستهدفة (%)
+            method (str): "auto" أو "milp" (يتطلب scipy) أو "lagrangian"
+
+        العوائد:
+            dict: status (optimal|feasible|infeasible)، solver، selection (DataFrame)،
+                total_cost، baseline_cost، cost_increase، local_content، lower_bound، gap
+                و max_local_content
+        """
+        target = float(target_lc) / 100
+        if method == "auto":
+            method = "milp" if SCIPY_AVAILABLE else "lagrangian"
+        if method == "milp" and not SCIPY_AVAILABLE:
+            raise ValueError("طريقة milp تتطلب مكتبة scipy")
+
+        surplus = self._surplus(target)
+        rows = np.arange(len(self.components))
+
+        # أعلى محتوى محلي ممكن: أعلى فائض لكل مكون (والأقل تكلفة عند التساوي)
+        max_choice = np.array([np.lexsort((self._cost[i], -surplus[i]))[0] for i in rows])
+        max_local_content = self._local_content(max_choice)
+
+        if surplus[rows, max_choice].sum() < 0:
+            return self._result("infeasible", method, max_choice, None, max_local_content)
+
+        if method == "milp":
+            choice, bound = self._solve_milp(target)
+            status = "optimal"
+        else:
+            choice, bound = self._solve_lagrangian(surplus)
+            status = "optimal" if self._cost[rows, choice].sum() - bound <= 1e-6 * max(bound, 1.0) else "feasible"
+
+        return self._result(status, method, choice, bound, max_local_content)
+
+    def _solve_lagrangian(self, surplus):
+        """
+        حل الاسترخاء الخطي بمضاعف لاغرانج واحد لقيد المحتوى المحلي
+
+        لكل مضاعف λ يختار كل مكون الخيار الأقل في c - λ·a، والفائض الكلي يتزايد مع
+        λ، فيوجد بالبحث الثنائي أصغر λ يحقق القيد. قيمة دالة لاغرانج حد أدنى
+        للتكلفة المثلى، ثم تخفض التكلفة بإعادة المكونات لخيارات أرخص ما دام القيد محققاً.
+        """
+        rows = np.arange(len(self.components))
+        cost = self._cost
+        finite_surplus = np.where(np.isfinite(surplus), surplus, 0.0)
+
+        def choose(lam):
+            scores = cost - lam * finite_surplus
+            choice = np.argmin(scores, axis=1)
+            return choice, float(scores[rows, choice].sum())
+
+        low, high = 0.0, 1.0
+        choice, dual = choose(0.0)
+        bound = dual
+        if surplus[rows, choice].sum() >= 0:
+            return choice, bound
+
+        while surplus[rows, choose(high)[0]].sum() < 0 and high < 1e12:
+            low, high = high, high * 2
+        for _ in range(100):
+            middle = (low + high) / 2
+            if surplus[rows, choose(middle)[0]].sum() >= 0:
+                high = middle
+            else:
+                low = middle
+            if high - low <= 1e-12 * high:
+                break
+
+        choice, dual_high = choose(high)
+        cheaper, dual_low = choose(low)
+        bound = max(bound, dual_high, dual_low)
+        if surplus[rows, choice].sum() < 0:
+            # حالة حدية عند نقطة الانكسار: الخيار الأعلى فائضاً لكل مكون متاح دائماً
+            choice = np.argmax(surplus, axis=1)
+
+        # الحلان على طرفي نقطة الانكسار: الأغلى المحقق للقيد، والأرخص بعد إصلاحه
+        candidates = [self._improve(choice, surplus), self._improve(self._repair(cheaper, surplus), surplus)]
+        return min(candidates, key=lambda candidate: self._cost[rows, candidate].sum()), bound
+
+    def _repair(self, choice, surplus):
+        """تحقيق قيد المحتوى المحلي بالانتقال لخيارات ذات أقل تكلفة إضافية لكل ريال فائض"""
+        rows = np.arange(len(self.components))
+        choice = choice.copy()
+        deficit = -surplus[rows, choice].sum()
+        while deficit > 0:
+            gains = surplus - surplus[rows, choice][:, None]
+            extra = self._cost - self._cost[rows, choice][:, None]
+            valid = (gains > 0) & (self._slots >= 0)
+            if not valid.any():
+                break
+            # الانتقال الذي يسد العجز كاملاً بأقل تكلفة، وإلا الأعلى فائضاً لكل ريال
+            closing = valid & (gains >= deficit)
+            if closing.any():
+                i, j = np.unravel_index(np.argmin(np.where(closing, extra, np.inf)), extra.shape)
+            else:
+                ratio = np.where(valid, np.maximum(extra, 0) / np.where(valid, gains, 1), np.inf)
+                i, j = np.unravel_index(np.argmin(ratio), ratio.shape)
+            deficit -= gains[i, j]
+            choice[i] = j
+        return choice
+
+    def _improve(self, choice, surplus):
+        """خفض التكلفة بالانتقال لخيارات أرخص لا تكسر قيد المحتوى المحلي"""
+        rows = np.arange(len(self.components))
+        choice = choice.copy()
+        slack = surplus[rows, choice].sum()
+
+        chosen_cost = self._cost[rows, choice]
+        savings = chosen_cost[:, None] - self._cost
+        drops = surplus[rows, choice][:, None] - surplus
+        candidate = (savings > 0) & (self._slots >= 0)
+        for i in np.argsort(-np.where(candidate, savings, 0).max(axis=1)):
+            if not candidate[i].any():
+                continue
+            allowed = candidate[i] & (drops[i] <= slack)
+            if allowed.any():
+                j = int(np.argmax(np.where(allowed, savings[i], -np.inf)))
+                slack -= drops[i, j]
+                choice[i] = j
+        return choice
+
+    def _solve_milp(self, target):
+        """الحل الصحيح الأمثل بـ scipy.optimize.milp بمصفوفات قيود متناثرة"""
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+
+        slots = self.options["row"].to_numpy()
+        columns = np.arange(len(slots))
+        cost = self.options["cost"].to_numpy(dtype=float)
+        option_surplus = cost * (self.options["local_content"].to_numpy(dtype=float) / 100 - target)
+
+        one_per_component = csr_matrix((np.ones(len(slots)), (slots, columns)), shape=(len(self.components), len(slots)))
+        result = milp(
+            c=cost,
+            constraints=[
+                LinearConstraint(one_per_component, 1, 1),
+                LinearConstraint(csr_matrix(option_surplus[None, :]), 0, np.inf),
+            ],
+            integrality=np.ones(len(slots)),
+            bounds=Bounds(0, 1),
+        )
+        if not result.success:
+            raise RuntimeError(f"تعذر حل مسألة المحتوى المحلي: {result.message}")
+
+        selected = columns[result.x > 0.5]
+        choice = np.zeros(len(self.components), dtype=int)
+        positions = np.argwhere(self._slots >= 0)
+        slot_position = {int(self._slots[i, j]): j for i, j in positions}
+        for option in selected:
+            choice[slots[option]] = slot_position[int(option)]
+        return choice, float(result.fun)
+
+    def _local_content(self, choice):
+        """نسبة المحتوى المحلي للمشروع لاختيار معين (%)"""
+        rows = np.arange(len(self.components))
+        cost = self._cost[rows, choice]
+        total = cost.sum()
+        return float((cost * self._lc[rows, choice]).sum() / total * 100) if total > 0 else 0.0
+
+    def _result(self, status, solver, choice, bound, max_local_content):
+        """تجميع نتيجة التحسين"""
+        rows = np.arange(len(self.components))
+        chosen = self.options.iloc[self._slots[rows, choice]].reset_index(drop=True)
+
+        selection = pd.DataFrame({
+            "component_id": self.components["id"],
+            "component": self.components.get("name", self.components["id"]),
+            "current_supplier": self.components.get("supplier", ""),
+            "current_cost": self.components["value"].astype(float),
+            "current_local_content": self.components["local_content"].astype(float),
+            "supplier": chosen["supplier"],
+            "source": chosen["source"],
+            "cost": chosen["cost"].astype(float),
+            "local_content": chosen["local_content"].astype(float),
+        })
+        selection["changed"] = choice != 0
+
+        baseline = float(selection["current_cost"].sum())
+        total = float(selection["cost"].sum())
+        return {
+            "status": status,
+            "solver": solver,
+            "selection": selection,
+            "total_cost": total,
+            "baseline_cost": baseline,
+            "cost_increase": total - baseline,
+            "baseline_local_content": self._local_content(np.zeros(len(rows), dtype=int)),
+            "local_content": self._local_content(choice),
+            "lower_bound": bound,
+            "gap": None if bound is None else max(total - bound, 0.0),
+            "max_local_content": max_local_content,
+        }
@@ -0,0 +1,225 @@
+"""
+مكعب تحليلات المناقصات - ملخصات معدل الفوز وهامش الربح وسعر المتر حسب النوع والموقع والسنة
+
+يحتفظ المكعب بمجاميع لكل (نوع المشروع، الموقع، السنة) في جدول بجانب جدول
+المناقصات التاريخية، وتحدثها مشغلات عند كل إضافة أو تعديل أو حذف، فتدخل نتائج
+المناقصات الجديدة في التحليلات فوراً دون إعادة حساب. تجيب الاستعلامات المفلترة
+والمجمعة من المكعب الذي يكبر بعدد الفئات وليس بعدد المناقصات.
+
+تحفظ مجاميع المناقصات النموذجية في صفوف منفصلة (is_sample) وتستبعد من الاستعلامات
+إلا عند طلبها صراحة.
+"""
+
+import logging
+
+from modules.ai_assistant.services.tender_history import WON_STATUSES, LOST_STATUSES
+from utils.sql import sql_in
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+UNSPECIFIED = "غير محدد"
+
+DIMENSIONS = ("project_type", "location", "year")
+
+# مفتاح صفوف المكعب: الأبعاد ثم علامة المناقصات النموذجية
+_KEYS = DIMENSIONS + ("is_sample",)
+
+_MEASURES = (
+    "tender_count", "decided_count", "won_count", "margin_sum", "margin_count",
+    "won_margin_sum", "won_margin_count", "area_bid_sum", "area_sum", "bid_sum",
+)
+
+
+def _value(expression):
+    """تعبير SQL لقيمة بعد نصية مع قيمة افتراضية للفارغ"""
+    return f"COALESCE(NULLIF(TRIM({expression}), ''), '{UNSPECIFIED}')"
+
+
+def _measures(row, params=None):
+    """
+    تعابير مقاييس صف واحد من جدول المناقصات بترتيب _MEASURES
+
+    تربط قيم الحالات في params (المعاملات المسماة للاستعلام)، وتدرج كنصوص مهربة بدونها
+    في عبارات المشغلات.
+    """
+    has_margin = f"({row}.estimated_cost IS NOT NULL AND {row}.bid_price > 0)"
+    margin = f"(CASE WHEN {has_margin} THEN ({row}.bid_price - {row}.estimated_cost) * 100.0 / {row}.bid_price ELSE 0 END)"
+    won = sql_in(f"{row}.status", WON_STATUSES, params, "won")
+    has_area = f"({row}.area > 0 AND {row}.bid_price IS NOT NULL)"
+    return (
+        "1",
+        sql_in(f"{row}.status", WON_STATUSES + LOST_STATUSES, params, "decided"),
+        won,
+        margin,
+        has_margin,
+        f"(CASE WHEN {won} THEN {margin} ELSE 0 END)",
+        f"({won} AND {has_margin})",
+        f"(CASE WHEN {has_area} THEN {row}.bid_price ELSE 0 END)",
+        f"(CASE WHEN {has_area} THEN {row}.area ELSE 0 END)",
+        f"COALESCE({row}.bid_price, 0)",
+    )
+
+
+def _keys(row):
+    return (
+        _value(f"{row}.project_type"),
+        _value(f"{row}.location"),
+        f"COALESCE(substr({row}.submitted_at, 1, 4), '{UNSPECIFIED}')",
+        f"{row}.is_sample",
+    )
+
+
+def _statement(row, sign):
+    """عبارة تحديث المكعب لصف جديد (sign=+1) أو محذوف (sign=-1)"""
+    values = ", ".join(_keys(row) + tuple(f"{sign} * {measure}" for measure in _measures(row)))
+    updates = ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in _MEASURES)
+    return f'''
+    INSERT INTO tender_cube ({", ".join(_KEYS + _MEASURES)}) VALUES ({values})
+    ON CONFLICT ({", ".join(_KEYS)}) DO UPDATE SET {updates};
+    '''
+
+
+class TenderCube:
+    """ملخصات المناقصات التاريخية المحدثة تلقائياً"""
+
+    def __init__(self, store):
+        """
+        تهيئة المكعب على اتصال مخزن المناقصات
+
+        المعلمات:
+            store (TenderHistoryStore): مخزن المناقصات التاريخية
+        """
+        self.store = store
+        self.connection = store.connection
+        self._lock = store._lock
+        self._install()
+
+    def _install(self):
+        """إنشاء جدول المكعب ومشغلاته، وبنائه عند إنشائه لأول مرة أو تغير مفتاحه"""
+        with self._lock:
+            existing = [row[1] for row in self.connection.execute("PRAGMA table_info(tender_cube)")]
+            created = existing[:len(_KEYS)] != list(_KEYS)
+
+            cursor = self.connection.cursor()
+            if created:
+                # المكعب بيانات مشتقة: يعاد إنشاؤه بمفتاحه الحالي ويبنى من جدول المناقصات
+                cursor.execute("DROP TABLE IF EXISTS tender_cube")
+                for event in ("insert", "delete", "update"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS trg_tender_history_cube_{event}")
+
+            columns = ", ".join(
+                [f"{dimension} TEXT NOT NULL" for dimension in DIMENSIONS]
+                + ["is_sample INTEGER NOT NULL DEFAULT 0"]
+                + [f"{measure} REAL NOT NULL DEFAULT 0" for measure in _MEASURES]
+            )
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS tender_cube ({columns}, PRIMARY KEY ({', '.join(_KEYS)}))"
+            )
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_tender_history_cube_insert AFTER INSERT ON tender_history
+            BEGIN {_statement("NEW", 1)} END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_tender_history_cube_delete AFTER DELETE ON tender_history
+            BEGIN {_statement("OLD", -1)} END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_tender_history_cube_update AFTER UPDATE ON tender_history
+            BEGIN {_statement("OLD", -1)} {_statement("NEW", 1)} END
+            ''')
+            self.connection.commit()
+
+        if created:
+            self.refresh()
+
+    def refresh(self):
+        """إعادة بناء المكعب بالكامل من جدول المناقصات"""
+        params = {}
+        sums = ", ".join(f"SUM({measure})" for measure in _measures("t", params))
+        with self._lock:
+            try:
+                self.connection.execute("DELETE FROM tender_cube")
+                self.connection.execute(f'''
+                INSERT INTO tender_cube ({", ".join(_KEYS + _MEASURES)})
+                SELECT {", ".join(_keys("t"))}, {sums} FROM tender_history t GROUP BY 1, 2, 3, 4
+                ''', params)
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في إعادة بناء مكعب المناقصات: {str(e)}")
+                self.connection.rollback()
+                raise
+
+    def query(self, group_by=(), project_type=None, location=None, start_year=None, end_year=None,
+              include_samples=False):
+        """
+        مؤشرات المناقصات مجمعة ومفلترة
+
+        المعلمات:
+            group_by (tuple): أبعاد التجميع من project_type و location و year
+            project_type (str): تصفية حسب نوع المشروع (اختياري)
+            location (str): تصفية حسب الموقع (اختياري)
+            start_year (int): أول سنة (اختياري)
+            end_year (int): آخر سنة (اختياري)
+            include_samples (bool): تضمين المناقصات النموذجية
+
+        العوائد:
+            list: قواميس بأبعاد التجميع و tenders, decided, won, win_rate,
+                avg_margin, avg_won_margin, price_per_sqm, total_bid
+        """
+        unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"أبعاد تجميع غير معروفة: {unknown}")
+
+        clauses = ["tender_count > 0"] if include_samples else ["tender_count > 0", "is_sample = 0"]
+        params = []
+        if project_type:
+            clauses.append("project_type = ?")
+            params.append(project_type)
+        if location:
+            clauses.append("location = ?")
+            params.append(location)
+        if start_year is not None:
+            clauses.append("year >= ?")
+            params.append(str(start_year))
+        if end_year is not None:
+            clauses.append("year <= ?")
+            params.append(str(end_year))
+
+        select = list(group_by) + [f"SUM({measure})" for measure in _MEASURES]
+        group = f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ""
+
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(select)} FROM tender_cube WHERE {' AND '.join(clauses)} {group}", params
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            keys = dict(zip(group_by, row[:len(group_by)]))
+            totals = dict(zip(_MEASURES, (value or 0 for value in row[len(group_by):])))
+            if not totals["tender_count"]:
+                continue
+            results.append(dict(
+                keys,
+                tenders=int(totals["tender_count"]),
+                decided=int(totals["decided_count"]),
+                won=int(totals["won_count"]),
+                win_rate=_ratio(totals["won_count"] * 100, totals["decided_count"]),
+                avg_margin=_ratio(totals["margin_sum"], totals["margin_count"]),
+                avg_won_margin=_ratio(totals["won_margin_sum"], totals["won_margin_count"]),
+                price_per_sqm=_ratio(totals["area_bid_sum"], totals["area_sum"]),
+                total_bid=float(totals["bid_sum"])
+            ))
+        return results
+
+    def totals(self, **filters):
+        """المؤشرات الإجمالية بعد التصفية (قاموس بمقاييس query، أو قيم صفرية)"""
+        rows = self.query((), **filters)
+        if rows:
+            return rows[0]
+        return {"tenders": 0, "decided": 0, "won": 0, "win_rate": None, "avg_margin": None,
+                "avg_won_margin": None, "price_per_sqm": None, "total_bid": 0.0}
+
+
+def _ratio(numerator, denominator):
+    return float(numerator) / denominator if denominator else None
@@ -0,0 +1,273 @@
+"""
+مخزن المناقصات التاريخية - نتائج العروض السابقة المستخدمة في تدريب نماذج التنبؤ
+
+يحفظ المخزن لكل مناقصة سابقة الميزانية التقديرية وقيمة عرضنا وتكلفتنا وعدد
+المنافسين والسعر الفائز والنتيجة، ويعيدها بأعمدة DataFrame نفسها التي تستخدمها
+تحليلات DataAIIntegration.
+
+المناقصات النموذجية (لعرض النظام قبل إدخال نتائج فعلية) تعلَّم بعمود is_sample،
+وتستبعد من الاستعلامات والبصمة افتراضياً حتى لا تختلط بالبيانات الفعلية.
+"""
+
+import os
+import sqlite3
+import logging
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+# الحالات التي تعني الفوز بالمناقصة
+WON_STATUSES = ("فائز", "قيد التنفيذ", "منجز")
+LOST_STATUSES = ("خاسر",)
+
+PROJECT_TYPES = ["مبنى إداري", "مبنى سكني", "مدرسة", "مستشفى", "طرق", "جسور", "بنية تحتية"]
+LOCATIONS = ["الرياض", "جدة", "الدمام", "مكة", "المدينة", "أبها", "تبوك"]
+
+# أعمدة الجدول -> أعمدة DataFrame المعروضة
+_COLUMNS = {
+    "tender_number": "رقم المناقصة",
+    "project_type": "نوع المشروع",
+    "location": "الموقع",
+    "area": "المساحة (م2)",
+    "duration_months": "المدة (شهر)",
+    "estimated_budget": "الميزانية (ريال)",
+    "bid_price": "قيمة العرض (ريال)",
+    "estimated_cost": "التكلفة (ريال)",
+    "competitors_count": "عدد المنافسين",
+    "winning_price": "السعر الفائز (ريال)",
+    "status": "الحالة",
+    "submitted_at": "تاريخ التقديم",
+}
+
+
+class TenderHistoryStore:
+    """مخزن المناقصات التاريخية"""
+
+    def __init__(self, db_path=None):
+        """
+        تهيئة المخزن
+
+        المعلمات:
+            db_path (str): مسار ملف قاعدة البيانات، أو ":memory:" لمخزن مؤقت
+        """
+        self.db_path = db_path or os.path.join('data', 'tender_history.db')
+        self._lock = threading.RLock()
+
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جدول المناقصات التاريخية وفهارسه"""
+        with self._lock:
+            self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS tender_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tender_number TEXT UNIQUE NOT NULL,
+                project_type TEXT,
+                location TEXT,
+                area REAL,
+                duration_months INTEGER,
+                estimated_budget REAL NOT NULL,
+                bid_price REAL NOT NULL,
+                estimated_cost REAL,
+                competitors_count INTEGER,
+                winning_price REAL,
+                status TEXT NOT NULL,
+                submitted_at TEXT,
+                is_sample INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_tender_history_type_location
+            ON tender_history (project_type, location);
+
+            CREATE INDEX IF NOT EXISTS idx_tender_history_submitted
+            ON tender_history (submitted_at);
+            ''')
+            self._migrate()
+            self.connection.commit()
+
+    def _migrate(self):
+        """إضافة عمود is_sample للقواعد القديمة وتعليم السجل النموذجي المحفوظ فيها"""
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(tender_history)")}
+        if "is_sample" in columns:
+            return
+        self.connection.execute("ALTER TABLE tender_history ADD COLUMN is_sample INTEGER NOT NULL DEFAULT 0")
+        self.connection.executemany(
+            "UPDATE tender_history SET is_sample = 1 WHERE tender_number = ? AND bid_price = ?",
+            [(tender["tender_number"], tender["bid_price"]) for tender in sample_tender_history()]
+        )
+
+    def add_many(self, tenders, is_sample=False):
+        """
+        إضافة مناقصات أو تحديثها حسب رقم المناقصة
+
+        المعلمات:
+            tenders (list): قواميس بمفاتيح أعمدة الجدول (tender_number, estimated_budget, bid_price, status, ...)
+            is_sample (bool): المناقصات نموذجية للعرض وليست نتائج فعلية
+
+        العوائد:
+            int: عدد المناقصات المحفوظة
+        """
+        columns = list(_COLUMNS) + ["is_sample"]
+        rows = [
+            tuple(_to_db_value(tender.get(column)) for column in _COLUMNS) + (1 if is_sample else 0,)
+            for tender in tenders
+        ]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+
+        with self._lock:
+            self.connection.executemany(f'''
+            INSERT INTO tender_history ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})
+            ON CONFLICT (tender_number) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+            ''', rows)
+            self.connection.commit()
+        return len(rows)
+
+    def count(self, include_samples=True):
+        """عدد المناقصات المحفوظة (مع النموذجية أو بدونها)"""
+        where = "" if include_samples else "WHERE is_sample = 0"
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM tender_history {where}").fetchone()[0]
+
+    def has_real_data(self):
+        """هل يحتوي المخزن على نتائج مناقصات فعلية"""
+        with self._lock:
+            return self.connection.execute("SELECT 1 FROM tender_history WHERE is_sample = 0 LIMIT 1").fetchone() is not None
+
+    def fingerprint(self, include_samples=False):
+        """بصمة محتوى المخزن تتغير مع أي إضافة أو تحديث (لمعرفة حاجة النموذج لإعادة التدريب)"""
+        where = "" if include_samples else "WHERE is_sample = 0"
+        with self._lock:
+            count, max_id, updated = self.connection.execute(
+                f"SELECT COUNT(*), MAX(id), MAX(updated_at) FROM tender_history {where}"
+            ).fetchone()
+        return f"{'sample:' if include_samples else ''}{count}:{max_id}:{updated}"
+
+    def query(self, project_type=None, location=None, start=None, end=None, decided_only=False,
+              include_samples=False):
+        """
+        الاستعلام عن المناقصات التاريخية
+
+        المعلمات:
+            project_type (str): نوع المشروع (اختياري)
+            location (str): الموقع (اختياري)
+            start (date): بداية فترة التقديم (اختياري)
+            end (date): نهاية فترة التقديم (اختياري)
+            decided_only (bool): المناقصات المحسومة (فوز أو خسارة) فقط
+            include_samples (bool): تضمين المناقصات النموذجية
+
+        العوائد:
+            DataFrame: المناقصات بأعمدة عربية مع الربح وهامش الربح ونسبة العرض ونتيجة الفوز
+        """
+        clauses = [] if include_samples else ["is_sample = 0"]
+        params = []
+        if project_type:
+            clauses.append("project_type = ?")
+            params.append(project_type)
+        if location:
+            clauses.append("location = ?")
+            params.append(location)
+        if start is not None:
+            clauses.append("submitted_at >= ?")
+            params.append(_to_db_value(start))
+        if end is not None:
+            clauses.append("submitted_at <= ?")
+            params.append(_to_db_value(end))
+        if decided_only:
+            statuses = WON_STATUSES + LOST_STATUSES
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(_COLUMNS)} FROM tender_history {where} ORDER BY submitted_at, id",
+                self.connection,
+                params=params
+            )
+
+        df = df.rename(columns=_COLUMNS)
+        df["الربح (ريال)"] = df["قيمة العرض (ريال)"] - df["التكلفة (ريال)"]
+        df["هامش الربح (%)"] = df["الربح (ريال)"] / df["قيمة العرض (ريال)"] * 100
+        df["نسبة العرض"] = df["قيمة العرض (ريال)"] / df["الميزانية (ريال)"]
+        df["فائز"] = df["الحالة"].isin(WON_STATUSES)
+        return df
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
+
+
+def _to_db_value(value):
+    """تحويل القيم إلى أنواع تقبلها SQLite"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def sample_tender_history(n_tenders=400, seed=42):
+    """
+    توليد سجل مناقصات نموذجي لتهيئة مخزن فارغ
+
+    تتبع نتائج الفوز علاقة منطقية بنسبة العرض إلى الميزانية وعدد المنافسين
+    ونوع المشروع، بحيث يكون للنموذج المدرب عليها معنى إلى حين إدخال بيانات فعلية.
+
+    المعلمات:
+        n_tenders (int): عدد المناقصات
+        seed (int): بذرة التوليد العشوائي
+
+    العوائد:
+        list: قواميس المناقصات بصيغة add_many
+    """
+    rng = np.random.default_rng(seed)
+
+    types = rng.choice(PROJECT_TYPES, n_tenders)
+    locations = rng.choice(LOCATIONS, n_tenders)
+    budgets = rng.integers(1_000_000, 50_000_000, n_tenders).astype(float)
+    costs = budgets * rng.uniform(0.78, 0.95, n_tenders)
+    markups = rng.normal(0.12, 0.07, n_tenders)
+    bids = costs * (1 + markups)
+    competitors = rng.integers(2, 12, n_tenders)
+    durations = rng.integers(6, 36, n_tenders)
+    areas = rng.integers(1000, 10000, n_tenders)
+
+    type_effect = dict(zip(PROJECT_TYPES, [0.3, 0.2, 0.4, -0.2, -0.3, -0.5, 0.0]))
+    ratio = bids / budgets
+    logit = 0.4 - 14 * (ratio - 0.97) - 0.18 * (competitors - 5) + np.array([type_effect[t] for t in types])
+    won = rng.random(n_tenders) < 1 / (1 + np.exp(-logit))
+
+    # السعر الفائز: عرضنا عند الفوز، وأقل منه عند الخسارة
+    winning = np.where(won, bids, bids * rng.uniform(0.85, 0.99, n_tenders))
+
+    start = datetime.date(2021, 1, 1)
+    days = np.sort(rng.integers(0, 4 * 365, n_tenders))
+
+    tenders = []
+    for i in range(n_tenders):
+        status = rng.choice(WON_STATUSES) if won[i] else "خاسر"
+        tenders.append({
+            "tender_number": f"T-{(start + datetime.timedelta(days=int(days[i]))).year}-{i + 1:04d}",
+            "project_type": str(types[i]),
+            "location": str(locations[i]),
+            "area": float(areas[i]),
+            "duration_months": int(durations[i]),
+            "estimated_budget": round(float(budgets[i]), 2),
+            "bid_price": round(float(bids[i]), 2),
+            "estimated_cost": round(float(costs[i]), 2),
+            "competitors_count": int(competitors[i]),
+            "winning_price": round(float(winning[i]), 2),
+            "status": str(status),
+            "submitted_at": (start + datetime.timedelta(days=int(days[i]))).isoformat()
+        })
+    return tenders
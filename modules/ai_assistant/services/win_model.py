@@ -0,0 +1,298 @@
+"""
+نموذج احتمال الفوز - انحدار لوجستي مدرب على المناقصات التاريخية
+
+يتعلم النموذج احتمال الفوز من نسبة العرض إلى الميزانية التقديرية وحجم المشروع
+وعدد المنافسين والمدة ونوع المشروع وموقعه. يحفظ النموذج المدرب في ملف npz
+ويحمل مرة واحدة لكل إصدار من الملف، ويقيم آلاف الأسعار المرشحة لمناقصة
+واحدة في عملية مصفوفية واحدة.
+"""
+
+import os
+import json
+import logging
+import datetime
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger('tender_system.ai_assistant')
+
+NUMERIC_FEATURES = ("bid_ratio", "log_budget", "competitors_count", "duration_months")
+CATEGORICAL_FEATURES = ("project_type", "location")
+
+# أسماء العوامل المعروضة للمستخدم
+FEATURE_LABELS = {
+    "bid_ratio": "السعر التنافسي",
+    "log_budget": "حجم المشروع",
+    "competitors_count": "المنافسة",
+    "duration_months": "المدة الزمنية",
+    "project_type": "نوع المشروع",
+    "location": "الموقع",
+}
+
+# أعمدة مخزن المناقصات التاريخية -> أسماء الخصائص
+_HISTORY_COLUMNS = {
+    "الميزانية (ريال)": "estimated_budget",
+    "قيمة العرض (ريال)": "bid_price",
+    "عدد المنافسين": "competitors_count",
+    "المدة (شهر)": "duration_months",
+    "نوع المشروع": "project_type",
+    "الموقع": "location",
+}
+
+
+def _sigmoid(z):
+    """الدالة اللوجستية بصيغة مستقرة عددياً"""
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+class WinProbabilityModel:
+    """نموذج انحدار لوجستي لاحتمال الفوز بالمناقصة"""
+
+    def __init__(self, l2=1.0):
+        """
+        تهيئة النموذج
+
+        المعلمات:
+            l2 (float): معامل التنظيم (يمنع تضخم المعاملات مع البيانات القليلة)
+        """
+        self.l2 = l2
+        self.coef_ = None
+        self.covariance_ = None
+        self.means_ = None
+        self.scales_ = None
+        self.categories_ = {}
+        self.metadata = {}
+
+    @property
+    def is_fitted(self):
+        return self.coef_ is not None
+
+    def _numeric(self, records):
+        """استخراج الخصائص الرقمية قبل التوحيد"""
+        budget = np.asarray(records["estimated_budget"], dtype=float)
+        bid = np.asarray(records["bid_price"], dtype=float)
+        columns = [
+            bid / budget,
+            np.log(budget),
+            np.asarray(records.get("competitors_count", np.nan), dtype=float),
+            np.asarray(records.get("duration_months", np.nan), dtype=float),
+        ]
+        return np.column_stack(np.broadcast_arrays(*columns))
+
+    def _design(self, records):
+        """
+        بناء مصفوفة التصميم: ثابت + خصائص رقمية موحدة + ترميز فئوي
+
+        القيم المفقودة تعوض بمتوسط التدريب (أي قيمة موحدة صفر).
+        """
+        numeric = (self._numeric(records) - self.means_) / self.scales_
+        numeric = np.where(np.isnan(numeric), 0.0, numeric)
+        n = numeric.shape[0]
+
+        blocks = [np.ones((n, 1)), numeric]
+        for feature in CATEGORICAL_FEATURES:
+            values = np.broadcast_to(np.asarray(records.get(feature, ""), dtype=object), (n,))
+            categories = self.categories_[feature]
+            blocks.append((values[:, None] == np.asarray(categories, dtype=object)[None, :]).astype(float))
+        return np.hstack(blocks)
+
+    def fit(self, history, max_iter=50, tol=1e-8):
+        """
+        تدريب النموذج بطريقة نيوتن-رافسون على المناقصات المحسومة
+
+        المعلمات:
+            history (DataFrame): ناتج TenderHistoryStore.query(decided_only=True)
+
+        العوائد:
+            WinProbabilityModel: النموذج نفسه
+        """
+        records = {feature: history[column].to_numpy() for column, feature in _HISTORY_COLUMNS.items()}
+        y = history["فائز"].to_numpy(dtype=float)
+        if len(y) < 10 or y.min() == y.max():
+            raise ValueError("البيانات التاريخية غير كافية لتدريب النموذج (يلزم فوز وخسارة)")
+
+        numeric = self._numeric(records)
+        self.means_ = np.nanmean(numeric, axis=0)
+        self.scales_ = np.nanstd(numeric, axis=0)
+        self.scales_[~(self.scales_ > 0)] = 1.0
+        self.means_ = np.where(np.isnan(self.means_), 0.0, self.means_)
+        self.categories_ = {
+            feature: sorted({str(value) for value in records[feature] if value is not None})
+            for feature in CATEGORICAL_FEATURES
+        }
+
+        X = self._design(records)
+        penalty = np.full(X.shape[1], self.l2)
+        penalty[0] = 0.0  # لا تنظيم للثابت
+
+        w = np.zeros(X.shape[1])
+        for _ in range(max_iter):
+            p = _sigmoid(X @ w)
+            gradient = X.T @ (p - y) + penalty * w
+            hessian = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+            step = np.linalg.solve(hessian, gradient)
+            w -= step
+            if np.max(np.abs(step)) < tol:
+                break
+
+        p = np.clip(_sigmoid(X @ w), 1e-12, 1 - 1e-12)
+        hessian = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+
+        self.coef_ = w
+        self.covariance_ = np.linalg.inv(hessian)
+        self.metadata.update({
+            "n_samples": int(len(y)),
+            "win_rate": float(y.mean()),
+            "log_loss": float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+            "accuracy": float(np.mean((p >= 0.5) == (y == 1))),
+            "median_bid_ratio": float(np.nanmedian(numeric[:, 0])),
+            "trained_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+        return self
+
+    def predict_proba(self, tenders):
+        """
+        احتمال الفوز لمجموعة مناقصات
+
+        المعلمات:
+            tenders (dict|DataFrame): أعمدة estimated_budget و bid_price وبقية الخصائص
+
+        العوائد:
+            ndarray: احتمالات الفوز
+        """
+        return _sigmoid(self._design(tenders) @ self.coef_)
+
+    def score_bids(self, tender, bid_prices):
+        """
+        احتمال الفوز لعدد كبير من الأسعار المرشحة لمناقصة واحدة
+
+        يحسب الجزء الثابت من المعادلة مرة واحدة، ثم يضاف أثر السعر لكل المرشحين
+        في عملية مصفوفية واحدة.
+
+        المعلمات:
+            tender (dict): خصائص المناقصة (estimated_budget، project_type، ...)
+            bid_prices (array): الأسعار المرشحة بأي شكل
+
+        العوائد:
+            ndarray: احتمالات الفوز بشكل bid_prices نفسه
+        """
+        bid_prices = np.asarray(bid_prices, dtype=float)
+        base = self._design(dict(tender, bid_price=tender["estimated_budget"]))[0]
+        ratio_weight = self.coef_[1] / self.scales_[0]
+        # z(السعر) = z(نسبة 1) + الوزن × (النسبة - 1)
+        z = base @ self.coef_ + ratio_weight * (bid_prices / float(tender["estimated_budget"]) - 1.0)
+        return _sigmoid(z)
+
+    def probability_interval(self, tender, z_score=1.96):
+        """
+        فترة ثقة لاحتمال الفوز من تباين المعاملات
+
+        العوائد:
+            tuple: (الحد الأدنى، الاحتمال، الحد الأعلى)
+        """
+        x = self._design(tender)[0]
+        z = x @ self.coef_
+        spread = z_score * np.sqrt(max(x @ self.covariance_ @ x, 0.0))
+        return float(_sigmoid(z - spread)), float(_sigmoid(z)), float(_sigmoid(z + spread))
+
+    def contributions(self, tender):
+        """
+        مساهمة كل عامل في احتمال الفوز مقارنة بمناقصة متوسطة (بوحدة اللوجيت)
+
+        العوائد:
+            dict: اسم الخاصية -> المساهمة (موجبة تزيد فرص الفوز)
+        """
+        x = self._design(tender)[0]
+        weighted = x * self.coef_
+        result = {feature: float(weighted[1 + i]) for i, feature in enumerate(NUMERIC_FEATURES)}
+
+        offset = 1 + len(NUMERIC_FEATURES)
+        for feature in CATEGORICAL_FEATURES:
+            size = len(self.categories_[feature])
+            coefs = self.coef_[offset:offset + size]
+            # مقارنة الفئة بمتوسط معاملات الفئات
+            result[feature] = float(weighted[offset:offset + size].sum() - (coefs.mean() if size else 0.0))
+            offset += size
+        return result
+
+    def save(self, path):
+        """حفظ النموذج في ملف npz"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        meta = dict(self.metadata, l2=self.l2, categories=self.categories_)
+        temp_path = f"{path}.tmp.npz"
+        np.savez(
+            temp_path,
+            coef=self.coef_,
+            covariance=self.covariance_,
+            means=self.means_,
+            scales=self.scales_,
+            metadata=np.array(json.dumps(meta, ensure_ascii=False))
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """تحميل نموذج محفوظ"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["metadata"]))
+            model = cls(l2=meta.pop("l2", 1.0))
+            model.categories_ = meta.pop("categories")
+            model.metadata = meta
+            model.coef_ = data["coef"]
+            model.covariance_ = data["covariance"]
+            model.means_ = data["means"]
+            model.scales_ = data["scales"]
+        return model
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    return WinProbabilityModel.load(path)
+
+
+def load_win_model(path):
+    """
+    تحميل النموذج مع التخزين المؤقت
+
+    يعاد استخدام النموذج المحمل ما دام الملف لم يتغير، ويعاد تحميله تلقائياً
+    عند إعادة التدريب.
+    """
+    path = os.path.abspath(path)
+    return _load_cached(path, os.path.getmtime(path))
+
+
+def ensure_win_model(store, model_path, include_samples=False):
+    """
+    الحصول على نموذج محدث لبيانات المخزن
+
+    يحمل النموذج المحفوظ إذا كان مدرباً على محتوى المخزن الحالي، وإلا يعاد
+    تدريبه وحفظه.
+
+    المعلمات:
+        store (TenderHistoryStore): مخزن المناقصات التاريخية
+        model_path (str): مسار ملف النموذج
+        include_samples (bool): التدريب على المناقصات النموذجية (قبل إدخال نتائج فعلية)
+
+    العوائد:
+        WinProbabilityModel: النموذج، أو None إذا كانت البيانات غير كافية
+    """
+    fingerprint = store.fingerprint(include_samples)
+    if os.path.exists(model_path):
+        try:
+            model = load_win_model(model_path)
+            if model.metadata.get("fingerprint") == fingerprint:
+                return model
+        except Exception as e:
+            logger.warning(f"تعذر تحميل نموذج احتمال الفوز، ستتم إعادة التدريب: {str(e)}")
+
+    try:
+        model = WinProbabilityModel().fit(store.query(decided_only=True, include_samples=include_samples))
+    except ValueError as e:
+        logger.warning(str(e))
+        return None
+
+    model.metadata["fingerprint"] = fingerprint
+    model.save(model_path)
+    logger.info(f"تم تدريب نموذج احتمال الفوز على {model.metadata['n_samples']} مناقصة")
+    return load_win_model(model_path)
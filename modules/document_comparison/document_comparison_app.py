@@ -18,6 +18,9 @@ sys.path.append(str(Path(__file__).parent.parent))
 # استيراد محسن واجهة المستخدم
 from styling.enhanced_ui import UIEnhancer
 
+# استيراد أدوات توحيد النصوص العربية
+from utils.arabic_text import normalize_text, tokenize
+
 class DocumentComparisonApp:
     """تطبيق مقارنة المستندات"""
     
@@ -553,11 +556,19 @@ class DocumentComparisonApp:
         sections1 = self.split_into_sections(text1)
         sections2 = self.split_into_sections(text2)
         
+        # توحيد النصوص مرة واحدة حسب خيارات التجاهل
+        normalized_text1 = self.normalize_for_comparison(text1, ignore_options)
+        normalized_text2 = self.normalize_for_comparison(text2, ignore_options)
+        normalized_sections1 = {title: self.normalize_for_comparison(content, ignore_options) for title, content in sections1.items()}
+        normalized_sections2 = {title: self.normalize_for_comparison(content, ignore_options) for title, content in sections2.items()}
+        normalized_titles2 = {title: self.normalize_for_comparison(title, ignore_options) for title in sections2}
+        
         # حساب نسبة التشابه الإجمالية
-        similarity = difflib.SequenceMatcher(None, text1, text2).ratio()
+        similarity = difflib.SequenceMatcher(None, normalized_text1, normalized_text2).ratio()
         
         # عرض نسبة التشابه
         st.markdown(f"**نسبة التشابه الإجمالية:** {similarity:.2%}")
+        st.markdown(f"**نسبة تداخل الكلمات المفتاحية:** {self.keyword_overlap(text1, text2):.2%}")
         
         # عرض مقارنة الأقسام
         st.markdown("### مقارنة الأقسام")
@@ -569,12 +580,18 @@ class DocumentComparisonApp:
             best_match = None
             best_similarity = 0
             
+            normalized_title1 = self.normalize_for_comparison(section1_title, ignore_options)
+            title_matcher = difflib.SequenceMatcher(None, b=normalized_title1)
+            content_matcher = difflib.SequenceMatcher(None, b=normalized_sections1[section1_title])
+            
             for section2_title, section2_content in sections2.items():
                 # حساب نسبة التشابه بين عناوين الأقسام
-                title_similarity = difflib.SequenceMatcher(None, section1_title, section2_title).ratio()
+                title_matcher.set_seq1(normalized_titles2[section2_title])
+                title_similarity = title_matcher.ratio()
                 
                 # حساب نسبة التشابه بين محتوى الأقسام
-                content_similarity = difflib.SequenceMatcher(None, section1_content, section2_content).ratio()
+                content_matcher.set_seq1(normalized_sections2[section2_title])
+                content_similarity = content_matcher.ratio()
                 
                 # حساب متوسط نسبة التشابه
                 avg_similarity = (title_similarity + content_similarity) / 2
@@ -649,6 +666,46 @@ class DocumentComparisonApp:
         else:
             st.warning("القسم المحدد غير موجود في المستند الثاني")
     
+    def normalize_for_comparison(self, text, ignore_options=None):
+        """
+        توحيد النص قبل المقارنة وفق خيارات التجاهل
+        
+        المعلمات:
+            text (str): النص المراد توحيده
+            ignore_options (list): خيارات التجاهل المختارة من واجهة المقارنة
+            
+        العوائد:
+            str: النص الموحد
+        """
+        ignore_options = ignore_options or []
+        
+        return normalize_text(
+            text,
+            lowercase="حالة الأحرف" in ignore_options,
+            remove_punctuation="علامات الترقيم" in ignore_options,
+            remove_digits="الأرقام" in ignore_options,
+            collapse_whitespace="المسافات" in ignore_options
+        )
+    
+    def keyword_overlap(self, text1, text2):
+        """
+        حساب نسبة تداخل الكلمات المفتاحية بين نصين (معامل جاكارد)
+        
+        المعلمات:
+            text1 (str): النص الأول
+            text2 (str): النص الثاني
+            
+        العوائد:
+            float: نسبة التداخل بين 0 و 1
+        """
+        tokens1 = set(tokenize(text1))
+        tokens2 = set(tokenize(text2))
+        
+        if not tokens1 and not tokens2:
+            return 1.0
+        
+        return len(tokens1 & tokens2) / len(tokens1 | tokens2)
+    
     def split_into_sections(self, text):
         """تقسيم النص إلى أقسام باستخدام العناوين"""
         sections = {}
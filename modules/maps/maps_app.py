@@ -6,7 +6,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import folium
-from streamlit_folium import folium_static
+from streamlit_folium import folium_static, st_folium
 import json
 import os
 import sys
@@ -17,6 +17,76 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 # استيراد محسن واجهة المستخدم
 from styling.enhanced_ui import UIEnhancer
+from modules.maps.services.spatial_index import ProjectSpatialIndex
+from modules.maps.services.logistics import LogisticsEngine
+from modules.maps.services.regional_analytics import (
+    RegionalAnalytics, UNSPECIFIED, load_regions_geojson, regions_figure
+)
+from modules.ai_assistant.services.tender_history import TenderHistoryStore
+from config import AppConfig
+from database.db_connector import DatabaseConnector
+from pricing_system.modules.catalogs.materials_catalog import MaterialsCatalog
+
+# مركز الخريطة الافتراضي (وسط المملكة العربية السعودية تقريباً) ومستوى التكبير
+MAP_CENTER = [24.0, 45.0]
+MAP_ZOOM = 5
+
+# ألوان العلامات حسب حالة المشروع
+STATUS_COLORS = {"جاري التنفيذ": "blue", "قيد الدراسة": "orange", "مكتمل": "green"}
+
+# أقصى عدد مشاريع يبنى لها جدول المشاريع الظاهرة في الخريطة
+VISIBLE_TABLE_LIMIT = 500
+
+# مؤشرات تحليل المناطق: الاسم المعروض -> (عمود المؤشر، تنسيق القيم)
+REGION_METRICS = {
+    "عدد المشاريع": ("project_count", ",.0f"),
+    "عدد المناقصات": ("tender_count", ",.0f"),
+    "إجمالي الميزانية (ريال)": ("total_budget", ",.0f"),
+    "متوسط مدة المشروع (شهر)": ("avg_duration_months", ".1f"),
+    "نسبة الفوز (%)": ("win_rate", ".1f"),
+    "متوسط سعر المتر المربع (ريال)": ("avg_price_per_sqm", ",.0f"),
+}
+
+
+def _base_map():
+    """
+    الخريطة الأساسية (البلاطات والإعدادات) تبنى مرة واحدة لكل جلسة وتضاف العلامات إليها كطبقة منفصلة
+
+    تحفظ في حالة الجلسة وليس في cache_resource لأن كائن folium.Map قابل للتعديل أثناء الرسم
+    فلا يشارك بين الجلسات.
+    """
+    if "projects_base_map" not in st.session_state:
+        st.session_state.projects_base_map = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM, tiles="OpenStreetMap")
+    return st.session_state.projects_base_map
+
+
+@st.cache_resource(show_spinner=False)
+def _spatial_index(projects):
+    """الفهرس المكاني لمواقع المشاريع، يعاد بناؤه فقط عند تغير بيانات المشاريع"""
+    return ProjectSpatialIndex(projects)
+
+
+@st.cache_resource(show_spinner=False)
+def _logistics_engine(projects):
+    """محرك النقل بمصفوفة المسافات من مدن التوريد إلى مواقع المشاريع، يبنى مرة واحدة لكل بيانات مشاريع"""
+    return LogisticsEngine(projects)
+
+
+@st.cache_resource(show_spinner=False)
+def _regional_analytics():
+    """تحليل المناطق المشترك بين الجلسات، يعيد الاستعلام فقط عند تغير إصدار البيانات"""
+    config = AppConfig()
+    # التأكد من إنشاء جداول المشاريع والمناقصات قبل الاستعلام
+    DatabaseConnector(config).close()
+    history = TenderHistoryStore()
+    history.close()
+    return RegionalAnalytics(config.get_database_config()["path"], history.db_path)
+
+
+@st.cache_resource(show_spinner=False)
+def _regions_geojson():
+    """حدود المناطق من الملف المحلي"""
+    return load_regions_geojson()
 
 class MapsApp:
     """تطبيق الخرائط والمواقع"""
@@ -138,6 +208,8 @@ class MapsApp:
     
     def show_projects_map(self):
         """عرض خريطة المشاريع"""
+        index = _spatial_index(self.projects_data)
+        
         # إنشاء فلاتر للخريطة
         col1, col2, col3 = st.columns(3)
         
@@ -151,7 +223,7 @@ class MapsApp:
         with col2:
             location_filter = st.multiselect(
                 "الموقع",
-                options=["الكل"] + list(set([p["location"] for p in self.projects_data])),
+                options=["الكل"] + sorted(index.projects["location"].unique()),
                 default=["الكل"]
             )
         
@@ -162,64 +234,64 @@ class MapsApp:
                 step=0.5
             )
         
-        # تطبيق الفلاتر
-        filtered_projects = self.projects_data
-        
-        if "الكل" not in status_filter and status_filter:
-            filtered_projects = [p for p in filtered_projects if p["status"] in status_filter]
-        
-        if "الكل" not in location_filter and location_filter:
-            filtered_projects = [p for p in filtered_projects if p["location"] in location_filter]
-        
-        filtered_projects = [p for p in filtered_projects if budget_range[0] * 1000000 <= p["budget"] <= budget_range[1] * 1000000]
+        # تطبيق الفلاتر على الفهرس المكاني
+        mask = index.filter(
+            statuses=None if "الكل" in status_filter else status_filter,
+            locations=None if "الكل" in location_filter else location_filter,
+            budget_range=(budget_range[0] * 1000000, budget_range[1] * 1000000)
+        )
         
         # إنشاء الخريطة
         st.markdown("### خريطة المشاريع")
         
-        # تحديد مركز الخريطة (وسط المملكة العربية السعودية تقريباً)
-        center = [24.0, 45.0]
-        
-        # إنشاء خريطة folium
-        m = folium.Map(location=center, zoom_start=5, tiles="OpenStreetMap")
-        
-        # إضافة المشاريع إلى الخريطة
-        for project in filtered_projects:
-            # تحديد لون العلامة بناءً على حالة المشروع
-            if project["status"] == "جاري التنفيذ":
-                color = "blue"
-            elif project["status"] == "قيد الدراسة":
-                color = "orange"
-            elif project["status"] == "مكتمل":
-                color = "green"
-            else:
-                color = "gray"
-            
-            # إنشاء نص النافذة المنبثقة
-            popup_text = f"""
-            <div dir="rtl" style="text-align: right; width: 200px;">
-                <h4>{project['name']}</h4>
-                <p><strong>الحالة:</strong> {project['status']}</p>
-                <p><strong>الميزانية:</strong> {project['budget']:,} ريال</p>
-                <p><strong>نسبة الإنجاز:</strong> {project['completion']}%</p>
-                <p><strong>العميل:</strong> {project['client']}</p>
-                <p><strong>تاريخ البدء:</strong> {project['start_date']}</p>
-                <p><strong>تاريخ الانتهاء:</strong> {project['end_date']}</p>
-                <a href="#" onclick="alert('تم فتح تفاصيل المشروع');">عرض التفاصيل</a>
-            </div>
-            """
-            
-            # إضافة علامة للمشروع
-            folium.Marker(
-                location=project["coordinates"],
-                popup=folium.Popup(popup_text, max_width=300),
-                tooltip=project["name"],
-                icon=folium.Icon(color=color, icon="info-sign")
-            ).add_to(m)
+        # حدود الخريطة ومستوى التكبير من آخر تفاعل؛ لا يرسم إلا ما يظهر في الخريطة مجمعاً حسب التكبير
+        view = st.session_state.get("projects_map") or {}
+        bounds = view.get("bounds") or {}
+        zoom = view.get("zoom") or MAP_ZOOM
+        if bounds.get("_southWest") and bounds.get("_northEast"):
+            south, west = bounds["_southWest"]["lat"], bounds["_southWest"]["lng"]
+            north, east = bounds["_northEast"]["lat"], bounds["_northEast"]["lng"]
+            visible = index.query_bbox(south, max(west, -180), north, min(east, 180), mask)
+        else:
+            visible = np.flatnonzero(mask)
         
-        # عرض الخريطة
-        folium_static(m, width=1000, height=500)
+        markers = folium.FeatureGroup(name="المشاريع")
+        for cluster in index.clusters(visible, zoom).itertuples(index=False):
+            color = STATUS_COLORS.get(cluster.status, "gray")
+            if cluster.project >= 0:
+                project = self.projects_data[cluster.project]
+                folium.Marker(
+                    location=project["coordinates"],
+                    popup=folium.Popup(self._project_popup(project), max_width=300),
+                    tooltip=project["name"],
+                    icon=folium.Icon(color=color, icon="info-sign")
+                ).add_to(markers)
+            else:
+                folium.Marker(
+                    location=[cluster.lat, cluster.lon],
+                    tooltip=f"{cluster.count} مشروع - {cluster.budget / 1000000:,.1f} مليون ريال",
+                    icon=folium.DivIcon(
+                        html=f"""<div style="background:{color};color:white;border-radius:50%;width:36px;height:36px;
+                        line-height:36px;text-align:center;font-weight:bold;opacity:0.85;">{cluster.count}</div>""",
+                        icon_size=(36, 36), icon_anchor=(18, 18)
+                    )
+                ).add_to(markers)
+        
+        # عرض الخريطة: الخريطة الأساسية ثابتة وتحدث طبقة العلامات فقط
+        st_folium(
+            _base_map(),
+            feature_group_to_add=markers,
+            center=[view["center"]["lat"], view["center"]["lng"]] if view.get("center") else MAP_CENTER,
+            zoom=zoom,
+            key="projects_map",
+            returned_objects=["bounds", "zoom", "center"],
+            width=1000,
+            height=500
+        )
+        st.caption(f"يظهر في الخريطة {len(visible)} من {int(mask.sum())} مشروع مطابق للفلاتر")
         
         # عرض إحصائيات المشاريع
+        filtered = index.projects[mask]
         st.markdown("### إحصائيات المشاريع")
         
         col1, col2, col3, col4 = st.columns(4)
@@ -227,13 +299,13 @@ class MapsApp:
         with col1:
             self.ui.create_metric_card(
                 "إجمالي المشاريع",
-                str(len(filtered_projects)),
+                str(len(filtered)),
                 None,
                 self.ui.COLORS['primary']
             )
         
         with col2:
-            projects_in_progress = len([p for p in filtered_projects if p["status"] == "جاري التنفيذ"])
+            projects_in_progress = int((filtered["status"] == "جاري التنفيذ").sum())
             self.ui.create_metric_card(
                 "مشاريع جارية",
                 str(projects_in_progress),
@@ -242,7 +314,7 @@ class MapsApp:
             )
         
         with col3:
-            total_budget = sum([p["budget"] for p in filtered_projects])
+            total_budget = filtered["budget"].sum()
             self.ui.create_metric_card(
                 "إجمالي الميزانية",
                 f"{total_budget/1000000:.1f} مليون ريال",
@@ -251,13 +323,36 @@ class MapsApp:
             )
         
         with col4:
-            avg_completion = np.mean([p["completion"] for p in filtered_projects])
+            avg_completion = filtered["completion"].mean() if len(filtered) else 0
             self.ui.create_metric_card(
                 "متوسط نسبة الإنجاز",
                 f"{avg_completion:.1f}%",
                 None,
                 self.ui.COLORS['success']
             )
+        
+        if 0 < len(visible) <= VISIBLE_TABLE_LIMIT and len(visible) < len(filtered):
+            with st.expander("المشاريع الظاهرة في الخريطة"):
+                st.dataframe(
+                    index.projects.iloc[visible][["id", "name", "location", "status", "budget", "completion"]],
+                    use_container_width=True,
+                    hide_index=True
+                )
+    
+    def _project_popup(self, project):
+        """نص النافذة المنبثقة لمشروع"""
+        return f"""
+            <div dir="rtl" style="text-align: right; width: 200px;">
+                <h4>{project['name']}</h4>
+                <p><strong>الحالة:</strong> {project['status']}</p>
+                <p><strong>الميزانية:</strong> {project['budget']:,} ريال</p>
+                <p><strong>نسبة الإنجاز:</strong> {project['completion']}%</p>
+                <p><strong>العميل:</strong> {project['client']}</p>
+                <p><strong>تاريخ البدء:</strong> {project['start_date']}</p>
+                <p><strong>تاريخ الانتهاء:</strong> {project['end_date']}</p>
+                <a href="#" onclick="alert('تم فتح تفاصيل المشروع');">عرض التفاصيل</a>
+            </div>
+            """
     
     def show_location_details(self):
         """عرض تفاصيل المواقع"""
@@ -335,6 +430,28 @@ class MapsApp:
                     icon=folium.Icon(color="red", icon="info-sign")
                 ).add_to(m)
                 folium_static(m, width=300, height=300)
+            
+            self.show_delivered_costs(project)
+    
+    def show_delivered_costs(self, project):
+        """عرض تكلفة نقل مواد الكتالوج من مورديها إلى موقع المشروع"""
+        costs = _logistics_engine(self.projects_data).delivered_costs(
+            MaterialsCatalog().get_all_materials(), project["id"]
+        ).dropna(subset=["haul_cost"])
+        
+        with st.expander("تكلفة توريد المواد إلى الموقع"):
+            if costs.empty:
+                st.info("لا توجد مواد معروفة الوزن لتقدير تكلفة نقلها")
+                return
+            
+            costs = costs.sort_values("haul_share", ascending=False)
+            st.caption(f"متوسط نسبة النقل من سعر المواد: {costs['haul_share'].mean() * 100:.1f}%")
+            display_df = costs[["name", "unit", "supplier", "supply_city", "distance_km", "price", "haul_cost",
+                                "delivered_price", "haul_share"]].copy()
+            display_df["haul_share"] = display_df["haul_share"] * 100
+            display_df.columns = ["المادة", "الوحدة", "المورد", "مدينة التوريد", "المسافة (كم)", "السعر (ريال)",
+                                  "تكلفة النقل (ريال/وحدة)", "السعر الموصل (ريال)", "نسبة النقل (%)"]
+            st.dataframe(display_df.round(2), use_container_width=True, hide_index=True)
     
     def add_new_location(self):
         """إضافة موقع جديد"""
@@ -394,49 +511,56 @@ class MapsApp:
         """تحليل المناطق"""
         st.markdown("### تحليل المناطق")
         
-        # إنشاء بيانات المناطق (نموذجية)
-        regions_data = {
-            "المنطقة": ["الرياض", "مكة المكرمة", "المدينة المنورة", "القصيم", "المنطقة الشرقية", "عسير", "تبوك", "حائل", "الحدود الشمالية", "جازان", "نجران", "الباحة", "الجوف"],
-            "عدد المشاريع": [15, 12, 8, 5, 18, 7, 4, 3, 2, 6, 3, 2, 3],
-            "إجمالي الميزانية (مليون ريال)": [120, 95, 45, 30, 150, 40, 25, 18, 12, 35, 20, 15, 22],
-            "متوسط مدة المشروع (شهر)": [18, 16, 14, 12, 20, 15, 12, 10, 9, 14, 12, 10, 11]
-        }
+        regions_df = _regional_analytics().summary()
+        regions_df["win_rate"] = regions_df["win_rate"] * 100
+        mapped = regions_df[regions_df["region"] != UNSPECIFIED]
         
-        regions_df = pd.DataFrame(regions_data)
+        if not (mapped["project_count"].sum() or mapped["tender_count"].sum()):
+            st.info("لا توجد مشاريع أو مناقصات مسجلة بمواقع معروفة بعد")
         
-        # عرض خريطة حرارية للمناطق
+        # عرض الخريطة الملونة للمناطق
         st.markdown("#### توزيع المشاريع حسب المناطق")
         
-        # في تطبيق حقيقي، يمكن استخدام خريطة حرارية حقيقية للمملكة
-        st.image("https://via.placeholder.com/800x400?text=خريطة+حرارية+للمشاريع+حسب+المناطق", use_column_width=True)
+        metric = st.radio(
+            "المؤشر",
+            options=list(REGION_METRICS),
+            horizontal=True,
+            key="region_metric"
+        )
+        column, value_format = REGION_METRICS[metric]
+        
+        st.plotly_chart(
+            regions_figure(mapped, column, _regions_geojson(), title=metric, value_format=value_format),
+            use_container_width=True
+        )
+        
+        unmatched = regions_df[regions_df["region"] == UNSPECIFIED]
+        if not unmatched.empty and (unmatched["project_count"].sum() or unmatched["tender_count"].sum()):
+            st.caption(
+                f"{int(unmatched['project_count'].sum())} مشروع و{int(unmatched['tender_count'].sum())} مناقصة "
+                "بمواقع غير معروفة لا تظهر على الخريطة"
+            )
         
         # عرض إحصائيات المناطق
         st.markdown("#### إحصائيات المناطق")
         
-        # عرض الجدول
+        display_df = regions_df.rename(columns={
+            "region": "المنطقة",
+            **{column: label for label, (column, _) in REGION_METRICS.items()}
+        })
         st.dataframe(
-            regions_df,
+            display_df.round(1),
             use_container_width=True,
             hide_index=True
         )
         
-        # عرض رسوم بيانية للمقارنة
+        # عرض رسم بياني للمقارنة
         st.markdown("#### مقارنة المناطق")
         
-        chart_type = st.radio(
-            "نوع الرسم البياني",
-            options=["عدد المشاريع", "إجمالي الميزانية", "متوسط مدة المشروع"],
-            horizontal=True
-        )
-        
-        if chart_type == "عدد المشاريع":
-            chart_data = regions_df[["المنطقة", "عدد المشاريع"]].sort_values(by="عدد المشاريع", ascending=False)
-            st.bar_chart(chart_data.set_index("المنطقة"))
-        elif chart_type == "إجمالي الميزانية":
-            chart_data = regions_df[["المنطقة", "إجمالي الميزانية (مليون ريال)"]].sort_values(by="إجمالي الميزانية (مليون ريال)", ascending=False)
-            st.bar_chart(chart_data.set_index("المنطقة"))
+        chart_data = display_df[["المنطقة", metric]].dropna().sort_values(by=metric, ascending=False)
+        if chart_data.empty:
+            st.info(f"لا توجد بيانات كافية لمؤشر {metric}")
         else:
-            chart_data = regions_df[["المنطقة", "متوسط مدة المشروع (شهر)"]].sort_values(by="متوسط مدة المشروع (شهر)", ascending=False)
             st.bar_chart(chart_data.set_index("المنطقة"))
         
         # تحليل الكثافة
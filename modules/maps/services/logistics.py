@@ -0,0 +1,219 @@
+"""
+محرك مسافات النقل وتكاليف التوريد إلى المواقع
+
+يحسب مصفوفة المسافات بين مستودعات الموردين ومواقع المشاريع دفعة واحدة بصيغة
+هافرساين (haversine) على كل الأزواج، مضروبة في معامل تعرج الطرق لتقريب مسافة
+الطريق الفعلية. المصفوفة تبنى مرة واحدة للموردين والمواقع المعروفة، وتحفظ أعمدة
+المواقع الجديدة عند أول طلب لها. من المسافة ووزن وحدة المادة تقدر تكلفة النقل لكل
+وحدة (تحميل وتفريغ + أجرة الطن لكل كيلومتر) والسعر الموصل إلى الموقع.
+"""
+
+import numpy as np
+import pandas as pd
+
+# نصف قطر الأرض بالكيلومتر
+EARTH_RADIUS_KM = 6371.0
+
+# معامل تعرج الطرق (مسافة الطريق إلى المسافة المستقيمة)
+ROAD_FACTOR = 1.25
+
+# أجرة النقل بالشاحنات (ريال لكل طن لكل كيلومتر)
+HAUL_RATE = 0.15
+
+# تكلفة التحميل والتفريغ (ريال لكل طن)
+LOADING_COST = 8.0
+
+# إحداثيات المدن والموانئ الرئيسية [خط العرض، خط الطول]
+CITY_COORDINATES = {
+    "الرياض": [24.7136, 46.6753],
+    "جدة": [21.5433, 39.1728],
+    "مكة المكرمة": [21.3891, 39.8579],
+    "المدينة المنورة": [24.5247, 39.5692],
+    "الدمام": [26.4207, 50.0888],
+    "الجبيل": [27.0046, 49.6460],
+    "ينبع": [24.0895, 38.0618],
+    "القصيم": [26.3260, 43.9750],
+    "أبها": [18.2164, 42.5053],
+    "تبوك": [28.3835, 36.5662],
+    "حائل": [27.5114, 41.7208],
+    "جازان": [16.8892, 42.5511],
+    "نجران": [17.4933, 44.1277],
+    "الباحة": [20.0129, 41.4677],
+    "الجوف": [29.9697, 40.2064],
+    "عرعر": [30.9753, 41.0381],
+}
+
+# مدينة مستودع كل مورد في كتالوج المواد
+SUPPLIER_CITIES = {
+    "شركة أسمنت اليمامة": "الرياض",
+    "شركة أسمنت ينبع": "ينبع",
+    "كسارات الرياض": "الرياض",
+    "مصنع الرياض للطابوق": "الرياض",
+    "شركة حديد الراجحي": "الرياض",
+    "أرامكو": "الدمام",
+    "مصنع الإسفلت المركزي": "الرياض",
+    "مصنع الخرسانة الجاهزة": "الرياض",
+    "مصنع الأنابيب الخرسانية": "الرياض",
+    "الشركة السعودية للأنابيب": "الدمام",
+    "الشركة السعودية للكابلات": "جدة",
+    "شركة الدهانات السعودية": "جدة",
+    "شركة السيراميك السعودية": "الرياض",
+    "شركة الجبس السعودية": "الرياض",
+    "مصنع المسبوكات الحديدية": "الجبيل",
+}
+
+# مدينة التوريد للمواد المستوردة (ميناء الوصول) وللموردين غير المعروفين
+IMPORT_CITY = "الدمام"
+DEFAULT_SUPPLY_CITY = "الرياض"
+
+# وزن الوحدة بالطن حسب وحدة القياس (الوحدات غير المدرجة تحتاج وزناً صريحاً للمادة)
+UNIT_WEIGHTS = {
+    "طن": 1.0,
+    "كجم": 0.001,
+    "م3": 1.8,
+    "متر مكعب": 1.8,
+    "لتر": 0.0012,
+}
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """
+    مصفوفة المسافات المستقيمة على سطح الأرض بين مجموعتين من النقاط
+
+    المعلمات:
+        lat1, lon1 (array): إحداثيات المجموعة الأولى بالدرجات
+        lat2, lon2 (array): إحداثيات المجموعة الثانية بالدرجات
+
+    العوائد:
+        ndarray: المسافات بالكيلومتر (المجموعة الأولى × المجموعة الثانية)
+    """
+    lat1, lon1 = np.radians(np.asarray(lat1, dtype=float))[:, None], np.radians(np.asarray(lon1, dtype=float))[:, None]
+    lat2, lon2 = np.radians(np.asarray(lat2, dtype=float))[None, :], np.radians(np.asarray(lon2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def supply_city(supplier, origin=None):
+    """
+    مدينة توريد المادة حسب المورد والمنشأ
+
+    المعلمات:
+        supplier (str): اسم المورد
+        origin (str): منشأ المادة (محلي أو مستورد)
+
+    العوائد:
+        str: اسم المدينة في CITY_COORDINATES
+    """
+    if supplier in CITY_COORDINATES:
+        return supplier
+    if supplier in SUPPLIER_CITIES:
+        return SUPPLIER_CITIES[supplier]
+    return IMPORT_CITY if origin == "مستورد" else DEFAULT_SUPPLY_CITY
+
+
+class LogisticsEngine:
+    """مسافات النقل من مدن التوريد إلى المواقع وتكاليف توريد المواد"""
+
+    def __init__(self, sites=None, road_factor=ROAD_FACTOR, haul_rate=HAUL_RATE, loading_cost=LOADING_COST):
+        """
+        تهيئة المحرك وبناء مصفوفة المسافات
+
+        المعلمات:
+            sites (dict|list): المواقع {الاسم: [خط العرض، خط الطول]} أو مشاريع بحقلي id وcoordinates
+                (الافتراضي المدن الرئيسية)
+            road_factor (float): معامل تعرج الطرق
+            haul_rate (float): أجرة النقل (ريال/طن/كم)
+            loading_cost (float): تكلفة التحميل والتفريغ (ريال/طن)
+        """
+        if sites is None:
+            sites = CITY_COORDINATES
+        if not isinstance(sites, dict):
+            sites = {site["id"]: site["coordinates"] for site in sites}
+
+        self.road_factor = road_factor
+        self.haul_rate = haul_rate
+        self.loading_cost = loading_cost
+
+        self.sources = pd.Index(list(CITY_COORDINATES))
+        self.sites = pd.Index(list(sites))
+        self._source_coordinates = np.array(list(CITY_COORDINATES.values()), dtype=float).reshape(-1, 2)
+        site_coordinates = np.array(list(sites.values()), dtype=float).reshape(-1, 2)
+        self.distances = road_factor * haversine_matrix(self._source_coordinates[:, 0], self._source_coordinates[:, 1],
+                                                        site_coordinates[:, 0], site_coordinates[:, 1])
+        self._columns = {}
+
+    def site_distances(self, site):
+        """
+        مسافات الطريق من كل مدن التوريد إلى موقع
+
+        المعلمات:
+            site (str|list): اسم موقع معروف أو إحداثياته [خط العرض، خط الطول]
+
+        العوائد:
+            ndarray: المسافة بالكيلومتر لكل مدينة توريد (بترتيب self.sources)
+        """
+        if isinstance(site, str):
+            if site not in self.sites:
+                raise ValueError(f"الموقع غير معروف: {site}")
+            return self.distances[:, self.sites.get_loc(site)]
+
+        key = tuple(np.round(np.asarray(site, dtype=float), 6))
+        if key not in self._columns:
+            self._columns[key] = self.road_factor * haversine_matrix(
+                self._source_coordinates[:, 0], self._source_coordinates[:, 1], [key[0]], [key[1]]
+            )[:, 0]
+        return self._columns[key]
+
+    def distance(self, supplier, site, origin=None):
+        """
+        مسافة الطريق من مورد إلى موقع بالكيلومتر
+
+        المعلمات:
+            supplier (str): اسم المورد أو مدينة التوريد
+            site (str|list): اسم الموقع أو إحداثياته
+            origin (str): منشأ المادة
+
+        العوائد:
+            float: المسافة بالكيلومتر
+        """
+        return float(self.site_distances(site)[self.sources.get_loc(supply_city(supplier, origin))])
+
+    def delivered_costs(self, materials, site):
+        """
+        تقدير تكلفة النقل والسعر الموصل لكل مادة إلى موقع
+
+        المعلمات:
+            materials (list|DataFrame): مواد بأعمدة price, unit, supplier, origin وweight اختيارياً (طن/وحدة)
+            site (str|list): اسم الموقع أو إحداثياته
+
+        العوائد:
+            DataFrame: المواد مع supply_city, distance_km, unit_weight, haul_cost (ريال/وحدة)،
+                delivered_price وhaul_share (نسبة النقل من سعر المادة)؛ haul_cost فارغة إذا لم يعرف الوزن
+        """
+        materials = pd.DataFrame(materials).reset_index(drop=True)
+        if materials.empty:
+            return materials.assign(supply_city=[], distance_km=[], unit_weight=[], haul_cost=[],
+                                    delivered_price=[], haul_share=[])
+
+        origins = materials["origin"] if "origin" in materials.columns else pd.Series(None, index=materials.index)
+        cities = [supply_city(supplier, origin) for supplier, origin in zip(materials["supplier"], origins)]
+        distance = self.site_distances(site)[self.sources.get_indexer(cities)]
+
+        weight = materials["unit"].map(UNIT_WEIGHTS).astype(float)
+        if "weight" in materials.columns:
+            weight = pd.to_numeric(materials["weight"], errors="coerce").fillna(weight)
+        weight = weight.to_numpy(dtype=float)
+
+        price = pd.to_numeric(materials["price"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        haul = weight * (self.loading_cost + self.haul_rate * distance)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(price > 0, haul / price, np.nan)
+
+        return materials.assign(
+            supply_city=cities,
+            distance_km=distance,
+            unit_weight=weight,
+            haul_cost=haul,
+            delivered_price=price + np.nan_to_num(haul),
+            haul_share=share,
+        )
@@ -0,0 +1,271 @@
+"""
+تحليل المناطق - مؤشرات المشاريع والمناقصات مجمعة حسب المنطقة الإدارية
+
+تحسب المؤشرات باستعلام SQL تجميعي واحد على جدول المشاريع في قاعدة بيانات النظام
+وجدول المناقصات التاريخية (قاعدة مرفقة بـ ATTACH)، مع ربط المواقع (المدن) بمناطقها
+عبر جدول قيم داخل الاستعلام. تحفظ النتيجة مع إصدار البيانات (PRAGMA data_version
+لكل قاعدة) فلا يعاد الاستعلام إلا بعد تعديل أحد الجدولين من اتصال آخر. المناقصات
+النموذجية (is_sample) لا تدخل في مؤشرات المناطق.
+
+حدود المناطق مبسطة ومحفوظة محلياً في ملف GeoJSON، وترسم الخريطة الملونة مضلعات
+مملوءة على محاور Plotly العادية بدلاً من go.Choropleth، لأن الأخير يحمّل خريطة
+الأساس (topojson) من الإنترنت، فتعمل الخريطة في البيئات المعزولة عن الشبكة.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
+
+from modules.ai_assistant.services.tender_history import WON_STATUSES, LOST_STATUSES
+from utils.sql import sql_in
+
+logger = logging.getLogger('tender_system.maps')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# حدود المناطق الإدارية المبسطة (الحلقات الخارجية باتجاه عقارب الساعة كما يتوقع رسم plotly)
+REGIONS_GEOJSON = os.path.join(ROOT_DIR, "assets", "geo", "saudi_regions.geojson")
+
+# المناطق الإدارية
+REGIONS = (
+    "الرياض", "مكة المكرمة", "المدينة المنورة", "القصيم", "المنطقة الشرقية", "عسير", "تبوك",
+    "حائل", "الحدود الشمالية", "جازان", "نجران", "الباحة", "الجوف",
+)
+
+# المدن والمسميات المختصرة -> المنطقة الإدارية
+LOCATION_REGIONS = {
+    "جدة": "مكة المكرمة",
+    "مكة": "مكة المكرمة",
+    "الطائف": "مكة المكرمة",
+    "المدينة": "المدينة المنورة",
+    "ينبع": "المدينة المنورة",
+    "بريدة": "القصيم",
+    "عنيزة": "القصيم",
+    "الدمام": "المنطقة الشرقية",
+    "الخبر": "المنطقة الشرقية",
+    "الظهران": "المنطقة الشرقية",
+    "الجبيل": "المنطقة الشرقية",
+    "الأحساء": "المنطقة الشرقية",
+    "حفر الباطن": "المنطقة الشرقية",
+    "الشرقية": "المنطقة الشرقية",
+    "أبها": "عسير",
+    "خميس مشيط": "عسير",
+    "عرعر": "الحدود الشمالية",
+    "سكاكا": "الجوف",
+}
+
+UNSPECIFIED = "غير محدد"
+
+# تدرج ألوان الخريطة ولون المناطق بلا بيانات
+COLOR_SCALE = "Blues"
+NO_DATA_COLOR = "#ECEFF1"
+
+# متوسط أيام الشهر لحساب مدة المشروع بالأشهر
+DAYS_PER_MONTH = 30.4375
+
+# أعمدة نتيجة التحليل
+COLUMNS = ["region", "project_count", "tender_count", "total_budget", "avg_duration_months",
+           "win_rate", "avg_price_per_sqm"]
+
+
+def load_regions_geojson(path=REGIONS_GEOJSON):
+    """قراءة حدود المناطق من ملف GeoJSON المحلي (معرف كل منطقة اسمها)"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regions_figure(summary, column, geojson=None, title=None, value_format=",.0f"):
+    """
+    خريطة ملونة للمناطق حسب مؤشر
+
+    المعلمات:
+        summary (DataFrame): مؤشرات المناطق بعمود region (من RegionalAnalytics.summary)
+        column (str): عمود المؤشر المستخدم في التلوين
+        geojson (dict): حدود المناطق (الافتراضي الملف المحلي)
+        title (str): عنوان مقياس الألوان
+        value_format (str): تنسيق القيم في التلميحات
+
+    العوائد:
+        Figure: مخطط Plotly بمضلع مملوء لكل منطقة ومقياس ألوان
+    """
+    geojson = geojson or load_regions_geojson()
+    values = summary.set_index("region")[column].astype(float)
+    known = values.dropna()
+    low, high = (float(known.min()), float(known.max())) if len(known) else (0.0, 1.0)
+    span = high - low or 1.0
+
+    fig = go.Figure()
+    centers = []
+    for feature in geojson["features"]:
+        name = feature["id"]
+        value = values.get(name, np.nan)
+        color = NO_DATA_COLOR if pd.isna(value) else sample_colorscale(COLOR_SCALE, [(value - low) / span])[0]
+        polygons = feature["geometry"]["coordinates"]
+        if feature["geometry"]["type"] == "Polygon":
+            polygons = [polygons]
+        ring = np.array(max((polygon[0] for polygon in polygons), key=len))
+        lon = np.concatenate([np.append(np.array(polygon[0])[:, 0], np.nan) for polygon in polygons])
+        lat = np.concatenate([np.append(np.array(polygon[0])[:, 1], np.nan) for polygon in polygons])
+        text = f"{name}<br>{'لا توجد بيانات' if pd.isna(value) else format(value, value_format)}"
+        fig.add_trace(go.Scatter(
+            x=lon, y=lat, mode="lines", fill="toself", fillcolor=color,
+            line=dict(color="white", width=1), hoveron="fills", hoverinfo="text", text=text, name=name
+        ))
+        centers.append((name, ring[:-1, 0].mean(), ring[:-1, 1].mean()))
+
+    fig.add_trace(go.Scatter(
+        x=[center[1] for center in centers], y=[center[2] for center in centers],
+        text=[center[0] for center in centers], mode="text", textfont=dict(size=10), hoverinfo="skip"
+    ))
+    # أثر غير مرئي لعرض مقياس الألوان
+    fig.add_trace(go.Scatter(
+        x=[None], y=[None], mode="markers", hoverinfo="skip",
+        marker=dict(colorscale=COLOR_SCALE, cmin=low, cmax=high, color=[low], showscale=True,
+                    colorbar=dict(title=title or column, thickness=12))
+    ))
+    fig.update_layout(
+        showlegend=False,
+        margin=dict(l=0, r=0, t=10, b=0),
+        height=520,
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(visible=False),
+        # تصحيح تمدد خطوط الطول عند خط عرض المملكة تقريباً
+        yaxis=dict(visible=False, scaleanchor="x", scaleratio=1 / np.cos(np.radians(24))),
+    )
+    return fig
+
+
+class RegionalAnalytics:
+    """مؤشرات المناطق من جداول المشاريع والمناقصات"""
+
+    def __init__(self, db_path, history_db_path=None):
+        """
+        تهيئة التحليل
+
+        المعلمات:
+            db_path (str): مسار قاعدة بيانات النظام (جدول projects)
+            history_db_path (str): مسار قاعدة المناقصات التاريخية (جدول tender_history)، اختياري
+        """
+        self.db_path = db_path
+        self.history_db_path = history_db_path
+        self._lock = threading.RLock()
+        self._cache = None
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._schemas = ["main"]
+        if history_db_path:
+            self.connection.execute("ATTACH DATABASE ? AS history", (history_db_path,))
+            self._schemas.append("history")
+
+    def data_version(self):
+        """إصدار البيانات الحالي لكل قاعدة (يتغير مع كل معاملة مثبتة من اتصال آخر)"""
+        with self._lock:
+            return tuple(self.connection.execute(f"PRAGMA {schema}.data_version").fetchone()[0]
+                         for schema in self._schemas)
+
+    def _has_table(self, schema, table):
+        """التحقق من وجود جدول في قاعدة"""
+        return self.connection.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def _has_column(self, schema, table, column):
+        """التحقق من وجود عمود في جدول"""
+        return any(row[1] == column for row in self.connection.execute(f"PRAGMA {schema}.table_info({table})"))
+
+    def _query(self):
+        """الاستعلام التجميعي ومعاملاته المسماة"""
+        mapping = [(region, region) for region in REGIONS] + list(LOCATION_REGIONS.items())
+        params = {"unspecified": UNSPECIFIED}
+        for index, (location, region) in enumerate(mapping):
+            params[f"location_{index}"] = location
+            params[f"region_{index}"] = region
+        region = "COALESCE(m.region, :unspecified)"
+
+        if "history" in self._schemas and self._has_table("history", "tender_history"):
+            # استبعاد السجل النموذجي الذي يهيأ به المخزن الفارغ
+            actual = "WHERE t.is_sample = 0" if self._has_column("history", "tender_history", "is_sample") else ""
+            tender_stats = f'''
+            SELECT {region} AS region,
+                   COUNT(*) AS tender_count,
+                   SUM(t.estimated_budget) AS total_budget,
+                   SUM({sql_in("t.status", WON_STATUSES, params, "won")}) AS won_count,
+                   SUM({sql_in("t.status", WON_STATUSES + LOST_STATUSES, params, "decided")}) AS decided_count,
+                   SUM(CASE WHEN t.area > 0 THEN t.bid_price END)
+                       / SUM(CASE WHEN t.area > 0 AND t.bid_price IS NOT NULL THEN t.area END) AS avg_price_per_sqm,
+                   AVG(t.duration_months) AS avg_duration
+            FROM history.tender_history t LEFT JOIN region_map m ON m.location = TRIM(t.location)
+            {actual}
+            GROUP BY 1
+            '''
+        else:
+            tender_stats = '''
+            SELECT NULL AS region, 0 AS tender_count, 0 AS total_budget, 0 AS won_count, 0 AS decided_count,
+                   NULL AS avg_price_per_sqm, NULL AS avg_duration
+            WHERE 0
+            '''
+
+        sql = f'''
+        WITH region_map(location, region) AS (
+            VALUES {", ".join(f"(:location_{index}, :region_{index})" for index in range(len(mapping)))}
+        ),
+        project_stats AS (
+            SELECT {region} AS region,
+                   COUNT(*) AS project_count,
+                   AVG((julianday(p.end_date) - julianday(p.start_date)) / {DAYS_PER_MONTH}) AS avg_duration
+            FROM main.projects p LEFT JOIN region_map m ON m.location = TRIM(p.location)
+            GROUP BY 1
+        ),
+        tender_stats AS ({tender_stats}),
+        regions AS (
+            SELECT region FROM region_map
+            UNION SELECT region FROM project_stats
+            UNION SELECT region FROM tender_stats
+        )
+        SELECT r.region,
+               COALESCE(p.project_count, 0),
+               COALESCE(t.tender_count, 0),
+               COALESCE(t.total_budget, 0),
+               COALESCE(p.avg_duration, t.avg_duration),
+               CAST(t.won_count AS REAL) / NULLIF(t.decided_count, 0),
+               t.avg_price_per_sqm
+        FROM regions r
+        LEFT JOIN project_stats p ON p.region = r.region
+        LEFT JOIN tender_stats t ON t.region = r.region
+        '''
+        return sql, params
+
+    def summary(self):
+        """
+        مؤشرات كل منطقة
+
+        العوائد:
+            DataFrame: region, project_count, tender_count, total_budget (ريال), avg_duration_months,
+                win_rate (كسر عشري من المناقصات المحسومة), avg_price_per_sqm (ريال/م2 مرجحاً بالمساحة)؛
+                كل المناطق الإدارية مرتبة بعدد المشاريع ثم المناقصات، و"غير محدد" للمواقع غير المعروفة
+        """
+        with self._lock:
+            version = self.data_version()
+            if self._cache is not None and self._cache[0] == version:
+                return self._cache[1].copy()
+
+            sql, params = self._query()
+            rows = self.connection.execute(sql, params).fetchall()
+            frame = pd.DataFrame(rows, columns=COLUMNS).sort_values(
+                ["project_count", "tender_count", "region"], ascending=[False, False, True]
+            ).reset_index(drop=True)
+            self._cache = (version, frame)
+            logger.info(f"تم حساب مؤشرات {len(frame)} منطقة")
+            return frame.copy()
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,149 @@
+"""
+فهرس مكاني لمواقع المشاريع
+
+يقسم الفهرس سطح الأرض إلى شبكة خلايا ثابتة (على غرار geohash) ويرتب المشاريع
+حسب رقم خليتها، فيصبح كل صف من الخلايا داخل مستطيل البحث مدى متصلاً يحدد
+بالبحث الثنائي دون المرور على كل المشاريع. التجميع على الخادم يدمج المشاريع
+المتقاربة في خلايا بحجم ثابت بالبكسل عند مستوى التكبير الحالي، فلا يرسل إلى
+الخريطة إلا عدد محدود من العلامات مهما كثرت المواقع.
+"""
+
+import numpy as np
+import pandas as pd
+
+# حجم خلية الفهرس بالدرجات
+DEFAULT_CELL_SIZE = 0.25
+
+# حجم خلية التجميع بالبكسل على الخريطة
+CLUSTER_PIXELS = 60
+
+# عرض بلاطة الخريطة بالبكسل (Web Mercator)
+TILE_SIZE = 256
+
+
+class ProjectSpatialIndex:
+    """فهرس شبكي لإحداثيات المشاريع مع الاستعلام بالمستطيل والتجميع"""
+
+    def __init__(self, projects, cell_size=DEFAULT_CELL_SIZE):
+        """
+        بناء الفهرس
+
+        المعلمات:
+            projects (list|DataFrame): المشاريع مع coordinates ([خط العرض، خط الطول]) أو lat وlon
+            cell_size (float): حجم خلية الفهرس بالدرجات
+        """
+        self.projects = pd.DataFrame(projects).reset_index(drop=True)
+        if "coordinates" in self.projects.columns:
+            coordinates = np.array(self.projects["coordinates"].tolist(), dtype=float).reshape(-1, 2)
+            self.lat, self.lon = coordinates[:, 0], coordinates[:, 1]
+        else:
+            self.lat = self.projects["lat"].to_numpy(dtype=float)
+            self.lon = self.projects["lon"].to_numpy(dtype=float)
+
+        self.cell_size = cell_size
+        self.columns = int(np.ceil(360 / cell_size))
+        keys = self._cell_rows(self.lat) * self.columns + self._cell_columns(self.lon)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.projects)
+
+    def _cell_rows(self, lat):
+        return np.floor((np.clip(lat, -90, 90) + 90) / self.cell_size).astype(np.int64)
+
+    def _cell_columns(self, lon):
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_size).astype(np.int64), 0, self.columns - 1)
+
+    def query_bbox(self, south, west, north, east, mask=None):
+        """
+        المشاريع داخل مستطيل
+
+        المعلمات:
+            south, west, north, east (float): حدود المستطيل (يدعم عبور خط الطول 180)
+            mask (array): قناع منطقي لتصفية إضافية على المشاريع
+
+        العوائد:
+            ndarray: أرقام المشاريع مرتبة تصاعدياً
+        """
+        if west > east:
+            return np.union1d(self.query_bbox(south, west, north, 180, mask),
+                              self.query_bbox(south, -180, north, east, mask))
+
+        first_row, last_row = self._cell_rows(np.array([south, north]))
+        first_column, last_column = self._cell_columns(np.array([west, east]))
+        rows = np.arange(first_row, last_row + 1) * self.columns
+        starts = np.searchsorted(self.keys, rows + first_column, side="left")
+        ends = np.searchsorted(self.keys, rows + last_column, side="right")
+        if not len(rows) or not (ends > starts).any():
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends) if end > start])
+        inside = ((self.lat[candidates] >= south) & (self.lat[candidates] <= north)
+                  & (self.lon[candidates] >= west) & (self.lon[candidates] <= east))
+        if mask is not None:
+            inside &= np.asarray(mask)[candidates]
+        return np.sort(candidates[inside])
+
+    def filter(self, statuses=None, locations=None, budget_range=None):
+        """
+        قناع المشاريع المطابقة للفلاتر
+
+        المعلمات:
+            statuses (list): الحالات المطلوبة (None أو فارغة للكل)
+            locations (list): المواقع المطلوبة (None أو فارغة للكل)
+            budget_range (tuple): أدنى وأعلى ميزانية بالريال
+
+        العوائد:
+            ndarray: قناع منطقي بطول المشاريع
+        """
+        mask = np.ones(len(self.projects), dtype=bool)
+        if statuses:
+            mask &= self.projects["status"].isin(statuses).to_numpy()
+        if locations:
+            mask &= self.projects["location"].isin(locations).to_numpy()
+        if budget_range is not None:
+            budget = self.projects["budget"].to_numpy(dtype=float)
+            mask &= (budget >= budget_range[0]) & (budget <= budget_range[1])
+        return mask
+
+    def clusters(self, indices, zoom, pixels=CLUSTER_PIXELS):
+        """
+        تجميع المشاريع في خلايا بحجم ثابت بالبكسل عند مستوى التكبير
+
+        المعلمات:
+            indices (array): أرقام المشاريع المراد تجميعها
+            zoom (int): مستوى تكبير الخريطة
+            pixels (int): حجم خلية التجميع بالبكسل
+
+        العوائد:
+            DataFrame: lat, lon (متوسط المواقع), count, budget, status (الحالة الغالبة)،
+                project (رقم المشروع إذا كانت المجموعة مشروعاً واحداً وإلا -1)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return pd.DataFrame(columns=["lat", "lon", "count", "budget", "status", "project"])
+
+        degrees = pixels * 360 / (TILE_SIZE * 2 ** zoom)
+        lat, lon = self.lat[indices], self.lon[indices]
+        cells = np.floor(lat / degrees).astype(np.int64) * (int(360 / degrees) + 2) + np.floor(lon / degrees).astype(np.int64)
+        _, groups, counts = np.unique(cells, return_inverse=True, return_counts=True)
+
+        frame = pd.DataFrame({
+            "group": groups,
+            "lat": lat,
+            "lon": lon,
+            "budget": self.projects["budget"].to_numpy(dtype=float)[indices] if "budget" in self.projects else 0.0,
+            "status": self.projects["status"].to_numpy()[indices] if "status" in self.projects else "",
+            "project": indices,
+        })
+        grouped = frame.groupby("group")
+        result = pd.DataFrame({
+            "lat": grouped["lat"].mean(),
+            "lon": grouped["lon"].mean(),
+            "count": counts,
+            "budget": grouped["budget"].sum(),
+            "status": grouped["status"].agg(lambda statuses: statuses.value_counts().index[0]),
+            "project": np.where(counts == 1, grouped["project"].first(), -1),
+        })
+        return result.reset_index(drop=True)
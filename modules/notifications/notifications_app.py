@@ -16,6 +16,23 @@ sys.path.append(str(Path(__file__).parent.parent))
 # استيراد محسن واجهة المستخدم
 from styling.enhanced_ui import UIEnhancer
 
+from modules.notifications.services.notification_store import NotificationStore
+from modules.notifications.services.deadline_scheduler import DeadlineScheduler
+from modules.notifications.services.delivery_queue import create_delivery_queue
+from config import AppConfig
+
+
+@st.cache_resource
+def get_notification_services(db_path=None):
+    """الحصول على مخزن الإشعارات ومجدول المواعيد وطابور الإرسال المشتركة بين الجلسات"""
+    store = NotificationStore(db_path)
+    delivery_queue = create_delivery_queue(store, AppConfig().get_notifications_config())
+    delivery_queue.start()
+    scheduler = DeadlineScheduler(store)
+    scheduler.start()
+    return store, scheduler, delivery_queue
+
+
 class NotificationsApp:
     """تطبيق الإشعارات الذكية"""
     
@@ -150,6 +167,21 @@ class NotificationsApp:
             "push_notifications": True,
             "notification_frequency": "realtime"
         }
+
+        self.store, self.scheduler, self.delivery_queue = get_notification_services()
+        self.user_id = st.session_state.get("user_id", 0)
+
+        # إضافة البيانات النموذجية عند أول تشغيل فقط
+        if self.store.count() == 0:
+            self.store.add_many(self.notifications_data, notify=False)
+
+        # توليد التذكيرات المستحقة فوراً (عملية رخيصة إذا لم يحن موعد أي تذكير)
+        self.scheduler.run_due()
+
+    @staticmethod
+    def format_notification_id(notification_id):
+        """تنسيق معرف الإشعار للعرض"""
+        return f"N{notification_id:03d}"
     
     def run(self):
         """تشغيل تطبيق الإشعارات الذكية"""
@@ -218,9 +250,6 @@ class NotificationsApp:
                 horizontal=True
             )
         
-        # تطبيق الفلاتر
-        filtered_notifications = self.notifications_data
-        
         # تحويل أنواع الإشعارات من الإنجليزية إلى العربية للفلترة
         type_mapping = {
             "موعد نهائي": "deadline",
@@ -242,21 +271,23 @@ class NotificationsApp:
             "منخفضة": "low"
         }
         
+        # بناء فلاتر الاستعلام من قاعدة البيانات
+        filters = {"user_id": self.user_id}
+        
         if "الكل" not in type_filter and type_filter:
-            filtered_types = [type_mapping[t] for t in type_filter if t in type_mapping]
-            filtered_notifications = [n for n in filtered_notifications if n["type"] in filtered_types]
+            filters["types"] = [type_mapping[t] for t in type_filter if t in type_mapping]
         
         if "الكل" not in priority_filter and priority_filter:
-            filtered_priorities = [priority_mapping[p] for p in priority_filter if p in priority_mapping]
-            filtered_notifications = [n for n in filtered_notifications if n["priority"] in filtered_priorities]
+            filters["priorities"] = [priority_mapping[p] for p in priority_filter if p in priority_mapping]
         
         if read_filter == "غير مقروءة":
-            filtered_notifications = [n for n in filtered_notifications if not n["is_read"]]
+            filters["is_read"] = False
         elif read_filter == "مقروءة":
-            filtered_notifications = [n for n in filtered_notifications if n["is_read"]]
+            filters["is_read"] = True
         
         # عرض عدد الإشعارات غير المقروءة
-        unread_count = len([n for n in filtered_notifications if not n["is_read"]])
+        unread_count = self.store.unread_count(self.user_id)
+        total_count = self.store.count(**filters)
         
         st.markdown(f"**عدد الإشعارات غير المقروءة:** {unread_count}")
         
@@ -264,18 +295,34 @@ class NotificationsApp:
         col1, col2 = st.columns([1, 1])
         with col1:
             if st.button("تحديث الإشعارات", use_container_width=True):
+                self.scheduler.run_due()
                 st.success("تم تحديث الإشعارات بنجاح")
         
         with col2:
             if st.button("تعليم الكل كمقروء", use_container_width=True):
-                st.success("تم تعليم جميع الإشعارات كمقروءة")
+                updated = self.store.mark_all_read(**{key: value for key, value in filters.items() if key != "is_read"})
+                st.success(f"تم تعليم {updated} إشعار كمقروء")
+                st.rerun()
+        
+        # ترقيم الصفحات
+        page_size = 20
+        page_count = max(1, (total_count + page_size - 1) // page_size)
+        page = st.number_input("الصفحة", min_value=1, max_value=page_count, value=1, step=1) if page_count > 1 else 1
         
         # عرض الإشعارات
-        if not filtered_notifications:
+        notifications = self.store.query(limit=page_size, offset=(page - 1) * page_size, **filters)
+        
+        if not notifications:
             st.info("لا توجد إشعارات تطابق الفلاتر المحددة")
         else:
-            for notification in filtered_notifications:
+            st.caption(f"عرض {len(notifications)} من أصل {total_count} إشعار")
+            for notification in notifications:
                 self.display_notification(notification)
+            
+            unread_ids = [n["id"] for n in notifications if not n["is_read"]]
+            if unread_ids and st.button("تعليم إشعارات هذه الصفحة كمقروءة"):
+                self.store.mark_read(unread_ids, user_id=self.user_id)
+                st.rerun()
     
     def display_notification(self, notification):
         """عرض إشعار واحد"""
@@ -458,6 +505,25 @@ class NotificationsApp:
             
             if st.button("حفظ الإعدادات المتقدمة"):
                 st.success("تم حفظ الإعدادات المتقدمة بنجاح")
+        
+        # حالة طابور الإرسال (البريد الإلكتروني والروابط)
+        with st.expander("حالة طابور الإرسال"):
+            outbox_stats = self.delivery_queue.stats()
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("قيد الإرسال", outbox_stats["pending"] + outbox_stats["sending"])
+            
+            with col2:
+                st.metric("تم الإرسال", outbox_stats["sent"])
+            
+            with col3:
+                st.metric("فشل الإرسال", outbox_stats["failed"])
+            
+            if outbox_stats["failed"] and st.button("إعادة محاولة الرسائل الفاشلة"):
+                retried = self.delivery_queue.retry_failed()
+                st.success(f"تمت إعادة {retried} رسالة إلى طابور الإرسال")
     
     def create_notification(self):
         """إنشاء إشعار جديد"""
@@ -523,30 +589,55 @@ class NotificationsApp:
             submit_button = st.form_submit_button("إنشاء الإشعار")
             
             if submit_button and title and message:
-                # إنشاء إشعار جديد (في تطبيق حقيقي، سيتم حفظ الإشعار في قاعدة البيانات)
-                new_id = f"N{len(self.notifications_data) + 1:03d}"
-                
                 # تحويل التاريخ والوقت إلى تنسيق ISO
                 notification_datetime = datetime.datetime.combine(notification_date, notification_time)
-                notification_datetime_iso = notification_datetime.isoformat()
                 
-                # إضافة الإشعار الجديد إلى قائمة الإشعارات
-                self.notifications_data.append({
-                    "id": new_id,
-                    "title": title,
-                    "message": message,
-                    "type": notification_type_en,
-                    "priority": priority_en,
-                    "related_entity": related_entity,
-                    "created_at": notification_datetime_iso,
-                    "is_read": False
-                })
+                # حفظ الإشعار الجديد في مخزن الإشعارات
+                new_id = self.store.add(
+                    title=title,
+                    message=message,
+                    type=notification_type_en,
+                    priority=priority_en,
+                    related_entity=related_entity,
+                    created_at=notification_datetime
+                )
                 
-                st.success("تم إنشاء الإشعار بنجاح")
+                st.success(f"تم إنشاء الإشعار {self.format_notification_id(new_id)} بنجاح")
                 
                 # عرض الإشعار الجديد
                 st.markdown("### الإشعار الجديد")
-                self.display_notification(self.notifications_data[-1])
+                self.display_notification(self.store.get(new_id))
+        
+        # جدولة تذكيرات موعد إقفال مناقصة
+        st.markdown("### تذكيرات مواعيد الإقفال")
+        
+        with st.form("deadline_reminder_form"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                tender_id = st.text_input("رقم المناقصة")
+                tender_title = st.text_input("عنوان المناقصة")
+            
+            with col2:
+                closing_date = st.date_input(
+                    "تاريخ الإقفال",
+                    value=datetime.datetime.now().date() + datetime.timedelta(days=14)
+                )
+                closing_time = st.time_input("وقت الإقفال", value=datetime.time(12, 0))
+            
+            if st.form_submit_button("جدولة التذكيرات") and tender_id:
+                self.scheduler.schedule(
+                    tender_id,
+                    tender_title or tender_id,
+                    datetime.datetime.combine(closing_date, closing_time),
+                    user_id=self.user_id
+                )
+                self.scheduler.run_due()
+                st.success(f"تمت جدولة تذكيرات المناقصة {tender_id} قبل الإقفال بـ 7 و3 و1 أيام")
+        
+        next_due = self.scheduler.next_due_time()
+        if next_due:
+            st.caption(f"التذكير التالي: {next_due.strftime('%Y-%m-%d %H:%M')}")
         
         # إنشاء إشعارات متعددة
         st.markdown("### إنشاء إشعارات متعددة")
@@ -589,28 +680,30 @@ class NotificationsApp:
         with col2:
             entity_filter = st.text_input("الكيان المرتبط")
         
-        # تحويل البيانات إلى DataFrame
-        notifications_df = pd.DataFrame(self.notifications_data)
-        
-        # تحويل عمود التاريخ إلى نوع datetime
-        notifications_df["created_at"] = pd.to_datetime(notifications_df["created_at"])
+        # بناء فلاتر الاستعلام (تطبق في قاعدة البيانات باستخدام الفهارس)
+        filters = {"user_id": self.user_id}
         
-        # تطبيق فلتر التاريخ
         if len(date_range) == 2:
             start_date, end_date = date_range
-            start_date = pd.to_datetime(start_date)
-            end_date = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            
-            notifications_df = notifications_df[
-                (notifications_df["created_at"] >= start_date) &
-                (notifications_df["created_at"] <= end_date)
-            ]
+            filters["start"] = datetime.datetime.combine(start_date, datetime.time.min)
+            filters["end"] = datetime.datetime.combine(end_date, datetime.time.max)
         
-        # تطبيق فلتر الكيان المرتبط
         if entity_filter:
-            notifications_df = notifications_df[
-                notifications_df["related_entity"].str.contains(entity_filter, case=False)
-            ]
+            filters["related_entity"] = entity_filter
+        
+        # تحميل أحدث الإشعارات فقط للعرض، بينما تحسب الإحصائيات بالتجميع في قاعدة البيانات
+        history_limit = 500
+        notifications_df = pd.DataFrame(
+            self.store.query(limit=history_limit, **filters),
+            columns=["id", "title", "type", "priority", "related_entity", "created_at", "is_read"]
+        )
+        
+        if notifications_df.empty:
+            st.info("لا توجد إشعارات في الفترة المحددة")
+            return
+        
+        notifications_df["created_at"] = pd.to_datetime(notifications_df["created_at"])
+        notifications_df["id"] = notifications_df["id"].map(self.format_notification_id)
         
         # تحويل أنواع الإشعارات من الإنجليزية إلى العربية
         type_mapping = {
@@ -663,33 +756,41 @@ class NotificationsApp:
         # إحصائيات الإشعارات
         st.markdown("### إحصائيات الإشعارات")
         
+        read_counts = self.store.count_by("is_read", **filters)
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            total_count = len(notifications_df)
+            total_count = sum(read_counts.values())
             st.metric("إجمالي الإشعارات", total_count)
+            if total_count > history_limit:
+                st.caption(f"يعرض الجدول أحدث {history_limit} إشعار")
         
         with col2:
-            read_count = len(notifications_df[notifications_df["is_read"] == True])
+            read_count = read_counts.get(1, 0)
             st.metric("الإشعارات المقروءة", read_count)
         
         with col3:
-            unread_count = len(notifications_df[notifications_df["is_read"] == False])
+            unread_count = read_counts.get(0, 0)
             st.metric("الإشعارات غير المقروءة", unread_count)
         
         # رسم بياني لتوزيع الإشعارات حسب النوع
         st.markdown("#### توزيع الإشعارات حسب النوع")
         
-        type_counts = notifications_df["type_ar"].value_counts().reset_index()
-        type_counts.columns = ["النوع", "العدد"]
+        type_counts = pd.DataFrame(
+            [(type_mapping.get(key, key), value) for key, value in self.store.count_by("type", **filters).items()],
+            columns=["النوع", "العدد"]
+        )
         
         st.bar_chart(type_counts, x="النوع", y="العدد")
         
         # رسم بياني لتوزيع الإشعارات حسب الأولوية
         st.markdown("#### توزيع الإشعارات حسب الأولوية")
         
-        priority_counts = notifications_df["priority_ar"].value_counts().reset_index()
-        priority_counts.columns = ["الأولوية", "العدد"]
+        priority_counts = pd.DataFrame(
+            [(priority_mapping.get(key, key), value) for key, value in self.store.count_by("priority", **filters).items()],
+            columns=["الأولوية", "العدد"]
+        )
         
         st.bar_chart(priority_counts, x="الأولوية", y="العدد")
         
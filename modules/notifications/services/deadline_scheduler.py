@@ -0,0 +1,281 @@
+"""
+مجدول المواعيد النهائية - توليد تذكيرات مواعيد إقفال المناقصات
+
+يحتفظ المجدول بكومة (heap) من أوقات التذكير مرتبة زمنياً، فلا يحتاج إلى
+فحص جميع المناقصات دورياً: يكفي النظر إلى رأس الكومة لمعرفة موعد التذكير
+التالي، ويمكن لخيط خلفي الانتظار حتى هذا الموعد بالضبط ثم توليد الإشعارات.
+لكل تذكير (المناقصة، أيام التذكير) مدخل واحد نشط في الكومة، وتبطل المدخلات
+القديمة عند إعادة الجدولة أو الإلغاء.
+تحفظ المواعيد وحالة التذكيرات في قاعدة بيانات مخزن الإشعارات حتى لا تتكرر
+التذكيرات بعد إعادة تشغيل التطبيق.
+"""
+
+import heapq
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('tender_system.notifications')
+
+# أيام التذكير الافتراضية قبل موعد الإقفال
+DEFAULT_REMINDER_DAYS = (7, 3, 1)
+
+
+class DeadlineScheduler:
+    """مجدول تذكيرات مواعيد إقفال المناقصات"""
+
+    def __init__(self, store, reminder_days=DEFAULT_REMINDER_DAYS, clock=None):
+        """
+        تهيئة المجدول
+
+        المعلمات:
+            store (NotificationStore): مخزن الإشعارات الذي تضاف إليه التذكيرات
+            reminder_days (tuple): عدد الأيام قبل الإقفال لكل تذكير
+            clock (callable): دالة تعيد الوقت الحالي (للاختبار)
+        """
+        self.store = store
+        self.reminder_days = tuple(sorted(set(reminder_days), reverse=True))
+        self.clock = clock or datetime.datetime.now
+
+        self._heap = []
+        self._entries = {}
+        self._deadlines = {}
+        self._condition = threading.Condition(threading.RLock())
+        self._thread = None
+        self._stopped = False
+
+        self._create_tables()
+        self._load()
+
+    def _create_tables(self):
+        """إنشاء جداول المواعيد والتذكيرات المرسلة"""
+        with self.store._lock:
+            cursor = self.store.connection.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tender_deadlines (
+                tender_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                closing_at TEXT NOT NULL,
+                user_id INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS deadline_reminders (
+                tender_id TEXT NOT NULL,
+                days_before INTEGER NOT NULL,
+                closing_at TEXT NOT NULL,
+                sent_at TEXT NOT NULL,
+                PRIMARY KEY (tender_id, days_before, closing_at)
+            )
+            ''')
+
+            self.store.connection.commit()
+
+    def _load(self):
+        """تحميل المواعيد المحفوظة وبناء الكومة من التذكيرات غير المرسلة"""
+        with self.store._lock:
+            deadlines = self.store.connection.execute(
+                "SELECT tender_id, title, closing_at, user_id FROM tender_deadlines"
+            ).fetchall()
+            sent = set(self.store.connection.execute(
+                "SELECT tender_id, days_before, closing_at FROM deadline_reminders"
+            ).fetchall())
+
+        with self._condition:
+            for tender_id, title, closing_at, user_id in deadlines:
+                self._deadlines[tender_id] = (title, closing_at, user_id)
+                for days in self.reminder_days:
+                    if (tender_id, days, closing_at) not in sent:
+                        self._push(tender_id, closing_at, days)
+
+    def _push(self, tender_id, closing_at, days):
+        """إضافة تذكير إلى الكومة مع إبطال المدخل السابق للتذكير نفسه"""
+        self._invalidate(tender_id, days)
+        remind_at = datetime.datetime.fromisoformat(closing_at) - datetime.timedelta(days=days)
+        entry = [remind_at, tender_id, days, closing_at, True]
+        self._entries[(tender_id, days)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _invalidate(self, tender_id, days):
+        """إبطال مدخل التذكير في الكومة (يزال عند وصوله إلى رأسها)"""
+        entry = self._entries.pop((tender_id, days), None)
+        if entry is not None:
+            entry[-1] = False
+
+    def schedule(self, tender_id, title, closing_at, user_id=0):
+        """
+        جدولة تذكيرات موعد إقفال مناقصة (أو تحديث موعدها)
+
+        المعلمات:
+            tender_id (str): رقم المناقصة
+            title (str): عنوان المناقصة
+            closing_at (datetime|date|str): موعد الإقفال
+            user_id (int): المستخدم المستهدف (0 لجميع المستخدمين)
+        """
+        if isinstance(closing_at, datetime.datetime):
+            closing_at = closing_at.isoformat(timespec="seconds")
+        elif isinstance(closing_at, datetime.date):
+            closing_at = datetime.datetime.combine(closing_at, datetime.time()).isoformat(timespec="seconds")
+        else:
+            closing_at = datetime.datetime.fromisoformat(closing_at).isoformat(timespec="seconds")
+
+        with self.store._lock:
+            self.store.connection.execute('''
+            INSERT INTO tender_deadlines (tender_id, title, closing_at, user_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT (tender_id) DO UPDATE SET title = excluded.title, closing_at = excluded.closing_at, user_id = excluded.user_id
+            ''', (tender_id, title, closing_at, user_id))
+            self.store.connection.commit()
+            sent = {days for days, in self.store.connection.execute(
+                "SELECT days_before FROM deadline_reminders WHERE tender_id = ? AND closing_at = ?",
+                (tender_id, closing_at)
+            )}
+
+        with self._condition:
+            # إعادة الجدولة تستبدل مدخلات المناقصة في الكومة ولا تعيد التذكيرات المرسلة للموعد نفسه
+            self._deadlines[tender_id] = (title, closing_at, user_id)
+            for days in self.reminder_days:
+                if days in sent:
+                    self._invalidate(tender_id, days)
+                else:
+                    self._push(tender_id, closing_at, days)
+            self._condition.notify_all()
+
+    def cancel(self, tender_id):
+        """إلغاء تذكيرات مناقصة"""
+        with self.store._lock:
+            self.store.connection.execute("DELETE FROM tender_deadlines WHERE tender_id = ?", (tender_id,))
+            self.store.connection.commit()
+
+        with self._condition:
+            self._deadlines.pop(tender_id, None)
+            for days in self.reminder_days:
+                self._invalidate(tender_id, days)
+            self._condition.notify_all()
+
+    def next_due_time(self):
+        """موعد التذكير التالي، أو None إذا لم توجد تذكيرات"""
+        with self._condition:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_stale(self):
+        """إزالة التذكيرات المبطلة (الملغاة أو المعاد جدولتها) من رأس الكومة"""
+        while self._heap and not self._heap[0][-1]:
+            heapq.heappop(self._heap)
+
+    def run_due(self, now=None):
+        """
+        توليد إشعارات جميع التذكيرات التي حان موعدها
+
+        المعلمات:
+            now (datetime): الوقت الحالي (افتراضياً وقت الساعة)
+
+        العوائد:
+            list: معرفات الإشعارات المضافة
+        """
+        now = now or self.clock()
+        due = []
+
+        with self._condition:
+            while True:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, tender_id, days, closing_at, _ = heapq.heappop(self._heap)
+                del self._entries[(tender_id, days)]
+                title, _, user_id = self._deadlines[tender_id]
+                closing = datetime.datetime.fromisoformat(closing_at)
+
+                # لا معنى لتذكير بموعد انقضى بالفعل
+                if closing <= now:
+                    due.append((tender_id, days, closing_at, None))
+                    continue
+
+                due.append((tender_id, days, closing_at, {
+                    "user_id": user_id,
+                    "title": f"اقتراب موعد إقفال مناقصة {tender_id}",
+                    "message": f"يتبقى {days} {'يوم' if days == 1 else 'أيام'} على موعد إقفال المناقصة {tender_id}: {title} "
+                               f"({closing.strftime('%Y-%m-%d %H:%M')}).",
+                    "type": "deadline",
+                    "priority": "high" if days <= 3 else "medium",
+                    "related_entity": tender_id,
+                    "created_at": now
+                }))
+
+        if not due:
+            return []
+
+        sent_at = now.isoformat(timespec="seconds")
+
+        with self.store._lock:
+            # استبعاد التذكيرات المسجلة كمرسلة (من مجدول آخر على القاعدة نفسها مثلاً)
+            tender_ids = list({tender_id for tender_id, _, _, _ in due})
+            sent = set(self.store.connection.execute(
+                f"SELECT tender_id, days_before, closing_at FROM deadline_reminders "
+                f"WHERE tender_id IN ({', '.join(['?'] * len(tender_ids))})",
+                tender_ids
+            ).fetchall())
+            due = [item for item in due if item[:3] not in sent]
+
+            # عند استحقاق عدة تذكيرات للمناقصة نفسها معاً يكتفى بأقربها إلى موعد الإقفال
+            nearest = {}
+            for tender_id, days, closing_at, notification in due:
+                if notification and days < nearest.get((tender_id, closing_at), float("inf")):
+                    nearest[(tender_id, closing_at)] = days
+            notifications = [
+                notification for tender_id, days, closing_at, notification in due
+                if notification and nearest[(tender_id, closing_at)] == days
+            ]
+
+            self.store.connection.executemany(
+                "INSERT OR IGNORE INTO deadline_reminders (tender_id, days_before, closing_at, sent_at) VALUES (?, ?, ?, ?)",
+                [(tender_id, days, closing_at, sent_at) for tender_id, days, closing_at, _ in due]
+            )
+            ids = self.store.add_many(notifications) if notifications else []
+
+        if ids:
+            logger.info(f"تم توليد {len(ids)} تذكير بمواعيد الإقفال")
+        return ids
+
+    def start(self):
+        """تشغيل خيط خلفي ينتظر موعد التذكير التالي دون فحص دوري"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """إيقاف الخيط الخلفي"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        """حلقة الخيط الخلفي"""
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                next_due = self.next_due_time()
+                if next_due is None:
+                    # لا توجد تذكيرات: الانتظار حتى تجدول مناقصة جديدة
+                    self._condition.wait()
+                    continue
+                delay = (next_due - self.clock()).total_seconds()
+                if delay > 0:
+                    self._condition.wait(min(delay, threading.TIMEOUT_MAX))
+                    continue
+
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"خطأ في توليد تذكيرات المواعيد: {str(e)}")
+                with self._condition:
+                    self._condition.wait(60)
@@ -0,0 +1,549 @@
+"""
+طابور إرسال الإشعارات - إرسال الإشعارات عبر البريد الإلكتروني والروابط (Webhooks)
+
+تحفظ الرسائل أولاً في جدول صادر (outbox) داخل قاعدة بيانات الإشعارات، ثم
+يتولى خيط خلفي إرسالها على دفعات، فلا تتوقف واجهة Streamlit أثناء الإرسال.
+يعيد الخيط استخدام اتصال SMTP نفسه لكل الدفعة، ويلتزم بحد لمعدل الإرسال،
+ويعيد محاولة الرسائل الفاشلة بتأخير متزايد حتى حد أقصى من المحاولات.
+
+تُحجز رسائل الدفعة قبل إرسالها (الحالة sending) في معاملة واحدة، فلا يرسل
+الرسالة نفسها طابوران يعملان على القاعدة نفسها، وتعود الرسائل المحجوزة إلى
+الطابور إذا لم يكتمل إرسالها خلال مهلة الحجز (توقف العملية أثناء الإرسال مثلاً).
+"""
+
+import json
+import time
+import smtplib
+import logging
+import datetime
+import threading
+from email.message import EmailMessage
+
+import requests
+
+logger = logging.getLogger('tender_system.notifications')
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class DeliveryChannel:
+    """الفئة الأساسية لقنوات الإرسال"""
+
+    name = "base"
+
+    def send(self, recipient, subject, body):
+        """
+        إرسال رسالة واحدة (يرفع استثناءً عند الفشل)
+
+        المعلمات:
+            recipient (str): المستلم (بريد إلكتروني أو رابط)
+            subject (str): عنوان الرسالة
+            body (str): نص الرسالة
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """إغلاق أي اتصال مفتوح"""
+
+
+class EmailChannel(DeliveryChannel):
+    """قناة البريد الإلكتروني مع إعادة استخدام اتصال SMTP"""
+
+    name = "email"
+
+    def __init__(self, server, port=587, username="", password="", sender=None, use_tls=True, timeout=30):
+        """
+        تهيئة قناة البريد الإلكتروني
+
+        المعلمات:
+            server (str): خادم SMTP
+            port (int): منفذ الخادم
+            username (str): اسم المستخدم (اختياري)
+            password (str): كلمة المرور
+            sender (str): عنوان المرسل
+            use_tls (bool): استخدام STARTTLS إذا دعمه الخادم
+            timeout (int): مهلة الاتصال بالثواني
+        """
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username or f"notifications@{server}"
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connect(self):
+        """فتح اتصال SMTP جديد"""
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.use_tls and smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def send(self, recipient, subject, body):
+        """إرسال رسالة بريد إلكتروني عبر الاتصال المفتوح"""
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body)
+
+        if self._smtp is None:
+            self._smtp = self._connect()
+
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # انقطع الاتصال المعاد استخدامه: إعادة الاتصال مرة واحدة
+            self._smtp = self._connect()
+            self._smtp.send_message(message)
+
+    def close(self):
+        """إغلاق اتصال SMTP"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._smtp = None
+
+
+class WebhookChannel(DeliveryChannel):
+    """قناة الروابط (Webhooks) بإرسال JSON عبر جلسة HTTP مشتركة"""
+
+    name = "webhook"
+
+    def __init__(self, timeout=10):
+        """
+        تهيئة قناة الروابط
+
+        المعلمات:
+            timeout (int): مهلة الطلب بالثواني
+        """
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def send(self, recipient, subject, body):
+        """إرسال الرسالة إلى الرابط"""
+        response = self._session.post(
+            recipient,
+            data=json.dumps({"title": subject, "message": body}, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json; charset=utf-8"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def close(self):
+        """إغلاق جلسة HTTP"""
+        self._session.close()
+
+
+class RateLimiter:
+    """محدد معدل بطريقة دلو الرموز (token bucket)"""
+
+    def __init__(self, rate, burst=None):
+        """
+        تهيئة المحدد
+
+        المعلمات:
+            rate (float): عدد الرسائل المسموح بها في الثانية، أو None بلا حد
+            burst (int): أقصى عدد رسائل متتالية دون انتظار
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        """الانتظار حتى يتوفر رمز إرسال"""
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self.rate)
+
+
+class DeliveryQueue:
+    """طابور إرسال الإشعارات المحفوظ في قاعدة البيانات"""
+
+    def __init__(self, store, channels, batch_size=20, rate_per_second=5, max_attempts=5,
+                 base_backoff=30, max_backoff=3600, claim_timeout=600):
+        """
+        تهيئة الطابور
+
+        المعلمات:
+            store (NotificationStore): مخزن الإشعارات (يستخدم اتصاله لجدول الصادر)
+            channels (dict): اسم القناة -> DeliveryChannel
+            batch_size (int): عدد الرسائل المسحوبة في كل دفعة
+            rate_per_second (float): الحد الأقصى للرسائل في الثانية
+            max_attempts (int): عدد المحاولات قبل اعتبار الرسالة فاشلة
+            base_backoff (float): تأخير أول إعادة محاولة بالثواني (يتضاعف بعد كل فشل)
+            max_backoff (float): الحد الأقصى للتأخير بالثواني
+            claim_timeout (float): مهلة حجز الرسائل بالثواني قبل إعادتها إلى الطابور
+        """
+        self.store = store
+        self.channels = dict(channels)
+        self.batch_size = max(1, batch_size)
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+
+        # لا يؤخذ قفل المخزن أثناء حجز _condition: مستدعو enqueue_many قد يحجزون قفل المخزن
+        # (DeadlineScheduler.run_due) ثم ينتظرون _condition
+        self._condition = threading.Condition()
+        self._wakeups = 0
+        self._thread = None
+        self._stopped = False
+
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جدول الصادر"""
+        with self.store._lock:
+            cursor = self.store.connection.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_id INTEGER,
+                channel TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                sent_at TEXT,
+                claimed_at REAL
+            )
+            ''')
+
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(notification_outbox)")}
+            if "claimed_at" not in columns:
+                cursor.execute("ALTER TABLE notification_outbox ADD COLUMN claimed_at REAL")
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_outbox_status_next
+            ON notification_outbox (status, next_attempt_at)
+            ''')
+
+            self.store.connection.commit()
+
+    def enqueue(self, channel, recipient, subject, body, notification_id=None):
+        """
+        إضافة رسالة إلى الطابور
+
+        العوائد:
+            int: معرف الرسالة
+        """
+        return self.enqueue_many([(channel, recipient, subject, body, notification_id)])[0]
+
+    def enqueue_many(self, messages):
+        """
+        إضافة مجموعة رسائل إلى الطابور في معاملة واحدة
+
+        المعلمات:
+            messages (list): قائمة (القناة، المستلم، العنوان، النص، معرف الإشعار)
+
+        العوائد:
+            list: معرفات الرسائل
+        """
+        for channel, _, _, _, _ in messages:
+            if channel not in self.channels:
+                raise ValueError(f"قناة الإرسال غير معروفة: {channel}")
+
+        now = time.time()
+        created_at = datetime.datetime.now().isoformat(timespec="seconds")
+        ids = []
+
+        with self.store._lock:
+            cursor = self.store.connection.cursor()
+            for channel, recipient, subject, body, notification_id in messages:
+                cursor.execute('''
+                INSERT INTO notification_outbox (notification_id, channel, recipient, subject, body, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (notification_id, channel, recipient, subject, body, now, created_at))
+                ids.append(cursor.lastrowid)
+            self.store.connection.commit()
+
+        self._wake()
+        return ids
+
+    def subscribe_to(self, recipients):
+        """
+        إرسال كل إشعار جديد في المخزن تلقائياً إلى المستلمين
+
+        المعلمات:
+            recipients (dict): اسم القناة -> قائمة المستلمين
+        """
+        targets = [
+            (channel, recipient)
+            for channel, channel_recipients in recipients.items() if channel in self.channels
+            for recipient in channel_recipients if recipient
+        ]
+        if not targets:
+            return
+
+        def _on_notifications(notifications):
+            self.enqueue_many([
+                (channel, recipient, notification["title"], notification["message"], notification["id"])
+                for notification in notifications
+                for channel, recipient in targets
+            ])
+
+        self.store.subscribe(_on_notifications)
+
+    def process_once(self, now=None):
+        """
+        إرسال دفعة واحدة من الرسائل المستحقة
+
+        المعلمات:
+            now (float): الوقت الحالي بثواني العصر (للاختبار)
+
+        العوائد:
+            dict: {"sent": عدد المرسلة، "retried": عدد المؤجلة، "failed": عدد الفاشلة نهائياً}
+        """
+        now = time.time() if now is None else now
+        rows = self._claim(now)
+
+        result = {"sent": 0, "retried": 0, "failed": 0}
+        if not rows:
+            return result
+
+        sent = []
+        retried = []
+        failed = []
+
+        for message_id, channel_name, recipient, subject, body, attempts in rows:
+            self.rate_limiter.acquire()
+            try:
+                self.channels[channel_name].send(recipient, subject, body)
+                sent.append(message_id)
+            except Exception as e:
+                attempts += 1
+                error = str(e)[:500]
+                logger.warning(f"فشل إرسال الرسالة {message_id} عبر {channel_name} (المحاولة {attempts}): {error}")
+                if attempts >= self.max_attempts:
+                    failed.append((attempts, error, message_id))
+                else:
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+                    retried.append((attempts, now + delay, error, message_id))
+
+        sent_at = datetime.datetime.now().isoformat(timespec="seconds")
+
+        with self.store._lock:
+            cursor = self.store.connection.cursor()
+            cursor.executemany(
+                "UPDATE notification_outbox SET status = ?, attempts = attempts + 1, sent_at = ? WHERE id = ?",
+                [(STATUS_SENT, sent_at, message_id) for message_id in sent]
+            )
+            cursor.executemany(
+                f"UPDATE notification_outbox SET status = '{STATUS_PENDING}', attempts = ?, next_attempt_at = ?, "
+                f"last_error = ? WHERE id = ?",
+                retried
+            )
+            cursor.executemany(
+                f"UPDATE notification_outbox SET status = '{STATUS_FAILED}', attempts = ?, last_error = ? WHERE id = ?",
+                failed
+            )
+            self.store.connection.commit()
+
+        result.update(sent=len(sent), retried=len(retried), failed=len(failed))
+        return result
+
+    def _claim(self, now):
+        """
+        حجز دفعة الرسائل المستحقة في معاملة واحدة
+
+        تشمل الدفعة الرسائل المعلقة التي حان موعدها والمحجوزة التي انقضت مهلة حجزها.
+        تحجز بتحويلها إلى الحالة sending مع وقت الحجز، وتعاد فقط الرسائل التي حجزها
+        هذا الاستدعاء.
+
+        المعلمات:
+            now (float): الوقت الحالي بثواني العصر
+
+        العوائد:
+            list: صفوف (المعرف، القناة، المستلم، العنوان، النص، المحاولات)
+        """
+        connection = self.store.connection
+        with self.store._lock:
+            # BEGIN IMMEDIATE يحجز قفل الكتابة قبل القراءة فلا يختار اتصال آخر الرسائل نفسها
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                candidates = [row[0] for row in connection.execute('''
+                SELECT id FROM notification_outbox
+                WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND claimed_at <= ?)
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+                ''', (STATUS_PENDING, now, STATUS_SENDING, now - self.claim_timeout, self.batch_size))]
+                if not candidates:
+                    connection.commit()
+                    return []
+
+                placeholders = ', '.join(['?'] * len(candidates))
+                connection.execute(f'''
+                UPDATE notification_outbox SET status = ?, claimed_at = ?
+                WHERE id IN ({placeholders}) AND (status = ? OR (status = ? AND claimed_at <= ?))
+                ''', [STATUS_SENDING, now] + candidates + [STATUS_PENDING, STATUS_SENDING, now - self.claim_timeout])
+                rows = connection.execute(f'''
+                SELECT id, channel, recipient, subject, body, attempts
+                FROM notification_outbox
+                WHERE id IN ({placeholders}) AND status = ? AND claimed_at = ?
+                ORDER BY next_attempt_at, id
+                ''', candidates + [STATUS_SENDING, now]).fetchall()
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        return rows
+
+    def _next_attempt_at(self):
+        """موعد أقرب رسالة معلقة (أو انتهاء حجز رسالة محجوزة)، أو None إذا كان الطابور فارغاً"""
+        with self.store._lock:
+            return self.store.connection.execute(
+                "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE claimed_at + ? END) "
+                "FROM notification_outbox WHERE status IN (?, ?)",
+                (STATUS_PENDING, self.claim_timeout, STATUS_PENDING, STATUS_SENDING)
+            ).fetchone()[0]
+
+    def stats(self):
+        """عدد الرسائل حسب الحالة"""
+        with self.store._lock:
+            rows = self.store.connection.execute(
+                "SELECT status, COUNT(*) FROM notification_outbox GROUP BY status"
+            ).fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_SENDING: 0, STATUS_SENT: 0, STATUS_FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def retry_failed(self):
+        """إعادة الرسائل الفاشلة إلى الطابور"""
+        with self.store._lock:
+            cursor = self.store.connection.execute(
+                "UPDATE notification_outbox SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), STATUS_FAILED)
+            )
+            self.store.connection.commit()
+
+        self._wake()
+        return cursor.rowcount
+
+    def _wake(self):
+        """إيقاظ خيط الإرسال بعد تغير الطابور"""
+        with self._condition:
+            self._wakeups += 1
+            self._condition.notify_all()
+
+    def start(self):
+        """تشغيل خيط الإرسال الخلفي"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="notification-delivery", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """إيقاف خيط الإرسال وإغلاق اتصالات القنوات"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for channel in self.channels.values():
+            channel.close()
+
+    def _run(self):
+        """حلقة خيط الإرسال"""
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                wakeups = self._wakeups
+
+            # قراءة الموعد خارج _condition، ثم التحقق تحته من عدم تغير الطابور أثناء القراءة
+            next_attempt_at = self._next_attempt_at()
+
+            with self._condition:
+                if self._stopped:
+                    return
+                if self._wakeups != wakeups:
+                    continue
+
+                if next_attempt_at is None:
+                    # الطابور فارغ: الانتظار حتى تضاف رسالة جديدة
+                    self._condition.wait()
+                    continue
+
+                delay = next_attempt_at - time.time()
+                if delay > 0:
+                    # إغلاق اتصالات القنوات الخاملة أثناء الانتظار الطويل
+                    if delay > 60:
+                        for channel in self.channels.values():
+                            channel.close()
+                    self._condition.wait(min(delay, threading.TIMEOUT_MAX))
+                    continue
+
+            try:
+                self.process_once()
+            except Exception as e:
+                logger.error(f"خطأ في معالجة طابور الإرسال: {str(e)}")
+                with self._condition:
+                    self._condition.wait(self.base_backoff)
+
+
+def create_delivery_queue(store, notifications_config):
+    """
+    إنشاء طابور الإرسال من إعدادات الإشعارات في AppConfig
+
+    المعلمات:
+        store (NotificationStore): مخزن الإشعارات
+        notifications_config (dict): ناتج AppConfig.get_notifications_config()
+
+    العوائد:
+        DeliveryQueue: الطابور مشتركاً في إشعارات المخزن
+    """
+    channels = {"webhook": WebhookChannel()}
+    if notifications_config.get("email_enabled") and notifications_config.get("email_server"):
+        channels["email"] = EmailChannel(
+            notifications_config["email_server"],
+            notifications_config.get("email_port", 587),
+            notifications_config.get("email_username", ""),
+            notifications_config.get("email_password", ""),
+            sender=notifications_config.get("email_sender") or None,
+            use_tls=notifications_config.get("email_use_tls", True)
+        )
+
+    queue = DeliveryQueue(
+        store,
+        channels,
+        rate_per_second=notifications_config.get("delivery_rate_per_second", 5),
+        max_attempts=notifications_config.get("delivery_max_attempts", 5)
+    )
+
+    if notifications_config.get("enabled", True):
+        queue.subscribe_to({
+            "email": notifications_config.get("email_recipients", []),
+            "webhook": notifications_config.get("webhook_urls", [])
+        })
+
+    return queue
@@ -0,0 +1,409 @@
+"""
+مخزن الإشعارات - حفظ الإشعارات في قاعدة بيانات SQLite مع استعلامات مفهرسة
+
+يدعم المخزن الاستعلام حسب المستخدم وحالة القراءة والأولوية والنوع والفترة
+الزمنية مع الترقيم، وتعليم الإشعارات كمقروءة دفعة واحدة، بحيث تبقى أيقونة
+الإشعارات سريعة حتى مع عشرات الآلاف من الإشعارات التاريخية.
+
+حالة قراءة الإشعار الخاص في عمود is_read، أما الإشعار العام فيقرؤه كل مستخدم
+على حدة، فتحفظ قراءته في جدول إيصالات لكل (إشعار، مستخدم) حتى لا يعلَّم مقروءاً
+لجميع المستخدمين عند قراءة أحدهم له.
+"""
+
+import os
+import sqlite3
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('tender_system.notifications')
+
+# المستخدم 0 يمثل الإشعارات العامة لجميع المستخدمين
+ALL_USERS = 0
+
+PRIORITY_RANKS = {"high": 3, "medium": 2, "low": 1}
+
+_COLUMNS = ("id", "user_id", "title", "message", "type", "priority", "related_entity", "created_at", "is_read", "read_at")
+
+
+def _has_receipts(user_id):
+    """هل تحسب حالة قراءة الإشعارات العامة من إيصالات المستخدم"""
+    return user_id is not None and user_id != ALL_USERS
+
+
+def _read_columns(user_id):
+    """تعبيرا SQL لحالة القراءة ووقتها كما يراها المستخدم"""
+    if not _has_receipts(user_id):
+        return "is_read", "read_at"
+    receipt = (f"FROM notification_receipts r WHERE r.notification_id = notifications.id "
+               f"AND r.user_id = {int(user_id)}")
+    return (
+        f"(CASE WHEN user_id = {ALL_USERS} THEN EXISTS (SELECT 1 {receipt}) ELSE is_read END)",
+        f"(CASE WHEN user_id = {ALL_USERS} THEN (SELECT r.read_at {receipt}) ELSE read_at END)"
+    )
+
+
+def _select_columns(user_id):
+    """أعمدة الاستعلام مع حالة القراءة الخاصة بالمستخدم"""
+    is_read, read_at = _read_columns(user_id)
+    return ", ".join(_COLUMNS[:-2] + (f"{is_read} AS is_read", f"{read_at} AS read_at"))
+
+
+class NotificationStore:
+    """مخزن الإشعارات الدائم"""
+
+    def __init__(self, db_path=None):
+        """
+        تهيئة مخزن الإشعارات
+
+        المعلمات:
+            db_path (str): مسار ملف قاعدة البيانات، أو ":memory:" لمخزن مؤقت
+        """
+        self.db_path = db_path or os.path.join('data', 'notifications.db')
+        self._lock = threading.RLock()
+        self._listeners = []
+
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جداول الإشعارات وفهارسها"""
+        with self._lock:
+            cursor = self.connection.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL DEFAULT 0,
+                title TEXT NOT NULL,
+                message TEXT NOT NULL,
+                type TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                priority_rank INTEGER NOT NULL,
+                related_entity TEXT,
+                created_at TEXT NOT NULL,
+                is_read INTEGER NOT NULL DEFAULT 0,
+                read_at TEXT
+            )
+            ''')
+
+            # فهرس أيقونة الإشعارات: غير المقروءة لكل مستخدم مرتبة زمنياً
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_read
+            ON notifications (user_id, is_read, created_at)
+            ''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_priority
+            ON notifications (user_id, priority_rank, created_at)
+            ''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notifications_created
+            ON notifications (created_at)
+            ''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notifications_entity
+            ON notifications (related_entity)
+            ''')
+
+            # إيصالات قراءة الإشعارات العامة لكل مستخدم
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notification_receipts (
+                notification_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                read_at TEXT NOT NULL,
+                PRIMARY KEY (notification_id, user_id)
+            ) WITHOUT ROWID
+            ''')
+
+            self.connection.commit()
+
+    @staticmethod
+    def _row_to_dict(row):
+        """تحويل صف من قاعدة البيانات إلى قاموس إشعار"""
+        notification = dict(zip(_COLUMNS, row))
+        notification["is_read"] = bool(notification["is_read"])
+        return notification
+
+    @staticmethod
+    def _build_where(user_id=None, types=None, priorities=None, is_read=None, related_entity=None,
+                     start=None, end=None, ids=None):
+        """بناء شرط WHERE ومعاملاته من الفلاتر"""
+        clauses = []
+        params = []
+
+        if user_id is not None:
+            clauses.append("user_id IN (?, ?)")
+            params.extend([ALL_USERS, user_id])
+
+        if types:
+            clauses.append(f"type IN ({', '.join(['?'] * len(types))})")
+            params.extend(types)
+
+        if priorities:
+            clauses.append(f"priority IN ({', '.join(['?'] * len(priorities))})")
+            params.extend(priorities)
+
+        if is_read is not None:
+            clauses.append(f"{_read_columns(user_id)[0]} = ?")
+            params.append(1 if is_read else 0)
+
+        if related_entity:
+            clauses.append("related_entity LIKE ?")
+            params.append(f"%{related_entity}%")
+
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(_to_iso(start))
+
+        if end is not None:
+            clauses.append("created_at <= ?")
+            params.append(_to_iso(end))
+
+        if ids:
+            clauses.append(f"id IN ({', '.join(['?'] * len(ids))})")
+            params.extend(ids)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def add(self, title, message, type="update", priority="medium", related_entity=None,
+            created_at=None, user_id=ALL_USERS, is_read=False):
+        """
+        إضافة إشعار جديد
+
+        العوائد:
+            int: معرف الإشعار
+        """
+        return self.add_many([{
+            "title": title,
+            "message": message,
+            "type": type,
+            "priority": priority,
+            "related_entity": related_entity,
+            "created_at": created_at,
+            "user_id": user_id,
+            "is_read": is_read
+        }])[0]
+
+    def add_many(self, notifications, notify=True):
+        """
+        إضافة مجموعة من الإشعارات في معاملة واحدة
+
+        المعلمات:
+            notifications (list): قائمة قواميس الإشعارات
+            notify (bool): إبلاغ المشتركين بالإشعارات الجديدة
+
+        العوائد:
+            list: معرفات الإشعارات المضافة
+        """
+        ids = []
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                for notification in notifications:
+                    priority = notification.get("priority", "medium")
+                    cursor.execute('''
+                    INSERT INTO notifications (user_id, title, message, type, priority, priority_rank, related_entity, created_at, is_read)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        notification.get("user_id", ALL_USERS),
+                        notification["title"],
+                        notification["message"],
+                        notification.get("type", "update"),
+                        priority,
+                        PRIORITY_RANKS.get(priority, 2),
+                        notification.get("related_entity"),
+                        _to_iso(notification.get("created_at")) or now,
+                        1 if notification.get("is_read") else 0
+                    ))
+                    ids.append(cursor.lastrowid)
+
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في إضافة الإشعارات: {str(e)}")
+                self.connection.rollback()
+                raise
+
+        # إبلاغ المشتركين (مثل طابور الإرسال) بعد تثبيت المعاملة وخارج كتلة القفل؛ قد يبقى القفل
+        # محجوزاً إذا استدعيت الدالة والقفل بيد المستدعي (مثل DeadlineScheduler.run_due)، وهو قفل
+        # متكرر فيستطيع المشترك الكتابة في المخزن من الخيط نفسه
+        if ids and notify and self._listeners:
+            added = [dict(notification, id=notification_id) for notification, notification_id in zip(notifications, ids)]
+            for listener in list(self._listeners):
+                try:
+                    listener(added)
+                except Exception as e:
+                    logger.error(f"خطأ في معالجة الإشعارات الجديدة: {str(e)}")
+
+        return ids
+
+    def subscribe(self, listener):
+        """
+        الاشتراك في الإشعارات الجديدة
+
+        المعلمات:
+            listener (callable): دالة تستقبل قائمة الإشعارات المضافة
+        """
+        self._listeners.append(listener)
+
+    def query(self, user_id=None, types=None, priorities=None, is_read=None, related_entity=None,
+              start=None, end=None, order_by="created_at", limit=50, offset=0):
+        """
+        الاستعلام عن الإشعارات مع الترقيم
+
+        المعلمات:
+            user_id (int): معرف المستخدم (تشمل النتائج الإشعارات العامة)
+            types (list): أنواع الإشعارات
+            priorities (list): الأولويات
+            is_read (bool): حالة القراءة، أو None للجميع
+            related_entity (str): جزء من رمز الكيان المرتبط
+            start, end (datetime|str): حدود الفترة الزمنية
+            order_by (str): "created_at" أو "priority"
+            limit (int): عدد الإشعارات في الصفحة، أو None لجميعها
+            offset (int): بداية الصفحة
+
+        العوائد:
+            list: قائمة الإشعارات
+        """
+        where, params = self._build_where(user_id, types, priorities, is_read, related_entity, start, end)
+        order = "priority_rank DESC, created_at DESC" if order_by == "priority" else "created_at DESC, id DESC"
+        query = f"SELECT {_select_columns(user_id)} FROM notifications {where} ORDER BY {order}"
+
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params = params + [limit, offset]
+
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self, **filters):
+        """عدد الإشعارات المطابقة للفلاتر"""
+        where, params = self._build_where(**filters)
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM notifications {where}", params).fetchone()[0]
+
+    def unread_count(self, user_id=None):
+        """عدد الإشعارات غير المقروءة للمستخدم"""
+        return self.count(user_id=user_id, is_read=False)
+
+    def count_by(self, column, **filters):
+        """
+        عدد الإشعارات مجمعة حسب عمود
+
+        المعلمات:
+            column (str): "type" أو "priority" أو "is_read"
+
+        العوائد:
+            dict: القيمة -> العدد
+        """
+        if column not in ("type", "priority", "is_read", "related_entity"):
+            raise ValueError(f"لا يمكن التجميع حسب العمود {column}")
+
+        where, params = self._build_where(**filters)
+        expression = _read_columns(filters.get("user_id"))[0] if column == "is_read" else column
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {expression}, COUNT(*) FROM notifications {where} GROUP BY 1", params
+            ).fetchall()
+        return dict(rows)
+
+    def get(self, notification_id, user_id=None):
+        """الحصول على إشعار بواسطة المعرف (مع حالة قراءته للمستخدم إن حدد)"""
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT {_select_columns(user_id)} FROM notifications WHERE id = ?", (notification_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def mark_read(self, ids, user_id=None):
+        """
+        تعليم مجموعة إشعارات كمقروءة
+
+        المعلمات:
+            ids (list): معرفات الإشعارات
+            user_id (int): المستخدم القارئ (تسجل قراءته للإشعارات العامة في إيصالاته)
+
+        العوائد:
+            int: عدد الإشعارات المحدثة
+        """
+        if not ids:
+            return 0
+        return self.mark_all_read(ids=list(ids), user_id=user_id)
+
+    def mark_all_read(self, **filters):
+        """
+        تعليم جميع الإشعارات المطابقة للفلاتر كمقروءة
+
+        عند تحديد مستخدم تعلَّم إشعاراته الخاصة في جدول الإشعارات، وتسجل قراءة
+        الإشعارات العامة في إيصالاته فقط فتبقى غير مقروءة لبقية المستخدمين.
+
+        العوائد:
+            int: عدد الإشعارات المحدثة
+        """
+        filters["is_read"] = False
+        where, params = self._build_where(**filters)
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        user_id = filters.get("user_id")
+
+        with self._lock:
+            if not _has_receipts(user_id):
+                cursor = self.connection.execute(
+                    f"UPDATE notifications SET is_read = 1, read_at = ? {where}", [now] + params
+                )
+                self.connection.commit()
+                return cursor.rowcount
+
+            try:
+                updated = self.connection.execute(
+                    f"UPDATE notifications SET is_read = 1, read_at = ? {where} AND user_id = ?",
+                    [now] + params + [user_id]
+                ).rowcount
+                updated += self.connection.execute(f'''
+                INSERT OR IGNORE INTO notification_receipts (notification_id, user_id, read_at)
+                SELECT id, ?, ? FROM notifications {where} AND user_id = ?
+                ''', [user_id, now] + params + [ALL_USERS]).rowcount
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في تعليم الإشعارات كمقروءة: {str(e)}")
+                self.connection.rollback()
+                raise
+            return updated
+
+    def delete_older_than(self, days):
+        """حذف الإشعارات المقروءة الأقدم من فترة الاحتفاظ"""
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+        with self._lock:
+            cursor = self.connection.execute(
+                "DELETE FROM notifications WHERE is_read = 1 AND created_at < ?", (_to_iso(cutoff),)
+            )
+            self.connection.execute(
+                "DELETE FROM notification_receipts WHERE notification_id NOT IN (SELECT id FROM notifications)"
+            )
+            self.connection.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """إغلاق الاتصال بقاعدة البيانات"""
+        with self._lock:
+            self.connection.close()
+
+
+def _to_iso(value):
+    """تحويل التاريخ إلى نص ISO قابل للمقارنة"""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(timespec="seconds")
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).isoformat(timespec="seconds")
+    return str(value)
@@ -0,0 +1,285 @@
+"""
+فهرس أسعار المنافسين - موقع سعرنا لكل متر مربع من أسعار السوق
+
+يحفظ الفهرس بيانات المنافسين في قاعدة SQLite ويحتفظ في الذاكرة لكل (نوع مشروع،
+منطقة) بمصفوفة أسعار مرتبة مع معرفات المنافسين، تبنى عند أول استعلام عنها.
+تجيب استعلامات الترتيب المئوي وأقرب المنافسين بالبحث الثنائي في المصفوفة
+المرتبة، وتدرج الإضافات الجديدة في مواضعها في المصفوفات المحملة دون إعادة بنائها.
+تعاد قراءة المصفوفات عند تعديل قاعدة البيانات من اتصال آخر (PRAGMA data_version).
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger('tender_system.pricing.competitors')
+
+# اسم شركتنا في بيانات المقارنة (لا يدخل في أسعار السوق)
+OUR_COMPANY = "شركتنا"
+
+UNSPECIFIED_REGION = "غير محدد"
+
+_COLUMNS = (
+    "id", "competitor", "project_type", "region", "price_per_sqm",
+    "delivery_time", "quality_rating", "market_share",
+)
+
+
+class CompetitorIndex:
+    """فهرس أسعار المنافسين لكل نوع مشروع ومنطقة"""
+
+    def __init__(self, db_path=None):
+        """
+        تهيئة الفهرس
+
+        المعلمات:
+            db_path (str): مسار ملف قاعدة البيانات، أو ":memory:" لفهرس مؤقت
+        """
+        self.db_path = db_path or os.path.join('data', 'competitor_index.db')
+        self._lock = threading.RLock()
+        # (نوع المشروع، المنطقة) -> (الأسعار مرتبة، المعرفات بالترتيب نفسه)؛ None تعني الكل
+        self._arrays = {}
+        self._data_version = None
+
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جدول أسعار المنافسين وفهرسه"""
+        with self._lock:
+            self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS competitor_prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                competitor TEXT NOT NULL,
+                project_type TEXT NOT NULL,
+                region TEXT NOT NULL,
+                price_per_sqm REAL NOT NULL,
+                delivery_time INTEGER,
+                quality_rating REAL,
+                market_share REAL,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_competitor_prices_key
+            ON competitor_prices (project_type, region, price_per_sqm);
+            ''')
+            self.connection.commit()
+
+    def _sorted(self, project_type=None, region=None):
+        """
+        المصفوفة المرتبة لمفتاح، تبنى من قاعدة البيانات عند أول طلب
+
+        العوائد:
+            tuple: (الأسعار مرتبة تصاعدياً، معرفات المنافسين)
+        """
+        key = (project_type, region)
+        with self._lock:
+            version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._arrays.clear()
+                self._data_version = version
+
+            if key not in self._arrays:
+                clauses, params = _filters(project_type, region)
+                rows = self.connection.execute(
+                    f"SELECT price_per_sqm, id FROM competitor_prices WHERE {' AND '.join(clauses)} "
+                    "ORDER BY price_per_sqm, id",
+                    params
+                ).fetchall()
+                self._arrays[key] = (
+                    np.array([row[0] for row in rows], dtype=float),
+                    np.array([row[1] for row in rows], dtype=np.int64),
+                )
+            return self._arrays[key]
+
+    def add(self, competitor, project_type, price_per_sqm, region=None, delivery_time=None,
+            quality_rating=None, market_share=None):
+        """
+        إضافة سعر منافس وإدراجه في المصفوفات المحملة
+
+        العوائد:
+            int: معرف السجل الجديد
+        """
+        region = region or UNSPECIFIED_REGION
+        price_per_sqm = float(price_per_sqm)
+        with self._lock:
+            cursor = self.connection.execute('''
+            INSERT INTO competitor_prices (competitor, project_type, region, price_per_sqm,
+                                           delivery_time, quality_rating, market_share)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (competitor, project_type, region, price_per_sqm, delivery_time, quality_rating, market_share))
+            self.connection.commit()
+            row_id = cursor.lastrowid
+
+            if competitor != OUR_COMPANY:
+                for key, (prices, ids) in list(self._arrays.items()):
+                    if key[0] in (None, project_type) and key[1] in (None, region):
+                        position = int(np.searchsorted(prices, price_per_sqm, side="right"))
+                        self._arrays[key] = (
+                            np.insert(prices, position, price_per_sqm),
+                            np.insert(ids, position, row_id),
+                        )
+            return row_id
+
+    def add_many(self, competitors):
+        """إضافة مجموعة منافسين (قواميس بمعاملات add)"""
+        return [self.add(**competitor) for competitor in competitors]
+
+    def remove(self, competitor_id):
+        """حذف سجل منافس من قاعدة البيانات والمصفوفات المحملة"""
+        with self._lock:
+            self.connection.execute("DELETE FROM competitor_prices WHERE id = ?", (competitor_id,))
+            self.connection.commit()
+            for key, (prices, ids) in list(self._arrays.items()):
+                keep = ids != competitor_id
+                if not keep.all():
+                    self._arrays[key] = (prices[keep], ids[keep])
+
+    def count(self):
+        """عدد السجلات المحفوظة"""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM competitor_prices").fetchone()[0]
+
+    def competitors(self, project_type=None, region=None):
+        """
+        سجلات المنافسين (بما فيها شركتنا)
+
+        العوائد:
+            list: قواميس بمفاتيح id, competitor, project_type, region, price_per_sqm,
+                delivery_time, quality_rating, market_share
+        """
+        clauses, params = _filters(project_type, region, include_own=True)
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM competitor_prices WHERE {' AND '.join(clauses)} ORDER BY id",
+                params
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def _records(self, ids):
+        """سجلات المنافسين بمعرفاتها بالترتيب المطلوب"""
+        ids = [int(value) for value in ids]
+        if not ids:
+            return []
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM competitor_prices WHERE id IN ({', '.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        by_id = {row[0]: dict(zip(_COLUMNS, row)) for row in rows}
+        return [by_id[value] for value in ids if value in by_id]
+
+    def percentile_ranks(self, prices, project_type=None, region=None):
+        """
+        الترتيب المئوي لمجموعة أسعار بين أسعار المنافسين
+
+        الترتيب المئوي هو نسبة المنافسين الأرخص من السعر (مع احتساب نصف
+        المساوين له)، فالقيمة 0 تعني أرخص من الجميع و100 أغلى من الجميع.
+
+        المعلمات:
+            prices (array): أسعار المتر المربع المرشحة بأي شكل
+            project_type (str): نوع المشروع (None لكل الأنواع)
+            region (str): المنطقة (None لكل المناطق)
+
+        العوائد:
+            ndarray: الترتيب المئوي لكل سعر (NaN عند غياب المنافسين)
+        """
+        sorted_prices, _ = self._sorted(project_type, region)
+        prices = np.asarray(prices, dtype=float)
+        if not len(sorted_prices):
+            return np.full(prices.shape, np.nan)
+        below = np.searchsorted(sorted_prices, prices, side="left")
+        not_above = np.searchsorted(sorted_prices, prices, side="right")
+        return (below + not_above) / 2 / len(sorted_prices) * 100
+
+    def nearest(self, price, project_type=None, region=None, k=3):
+        """
+        أقرب المنافسين سعراً
+
+        المعلمات:
+            price (float): سعر المتر المربع
+            project_type (str): نوع المشروع
+            region (str): المنطقة
+            k (int): عدد المنافسين
+
+        العوائد:
+            list: سجلات المنافسين مرتبة من الأقرب، مع الفرق عن السعر في price_gap
+        """
+        prices, ids = self._sorted(project_type, region)
+        low = int(np.searchsorted(prices, price, side="left")) - 1
+        high = low + 1
+        chosen = []
+        while len(chosen) < k and (low >= 0 or high < len(prices)):
+            if high >= len(prices) or (low >= 0 and price - prices[low] <= prices[high] - price):
+                chosen.append(low)
+                low -= 1
+            else:
+                chosen.append(high)
+                high += 1
+
+        records = self._records(ids[chosen])
+        for record in records:
+            record["price_gap"] = record["price_per_sqm"] - float(price)
+        return records
+
+    def position(self, price, project_type=None, region=None):
+        """
+        موقع سعر من أسعار المنافسين
+
+        العوائد:
+            dict: count, percentile, rank (ترتيب السعر إذا أضيف، 1 الأرخص)، min, median,
+                max، below و above (أقرب منافس أرخص وأغلى، أو None)
+        """
+        prices, ids = self._sorted(project_type, region)
+        count = len(prices)
+        if not count:
+            return {"count": 0, "percentile": None, "rank": 1, "min": None, "median": None,
+                    "max": None, "below": None, "above": None}
+
+        below = int(np.searchsorted(prices, price, side="left"))
+        above = int(np.searchsorted(prices, price, side="right"))
+        neighbours = self._records([ids[index] for index in (below - 1, above) if 0 <= index < count])
+        by_id = {record["id"]: record for record in neighbours}
+
+        return {
+            "count": count,
+            "percentile": (below + above) / 2 / count * 100,
+            "rank": below + 1,
+            "min": float(prices[0]),
+            "median": float(np.median(prices)),
+            "max": float(prices[-1]),
+            "below": by_id.get(int(ids[below - 1])) if below > 0 else None,
+            "above": by_id.get(int(ids[above])) if above < count else None,
+        }
+
+    def seed(self, competitors):
+        """تهيئة فهرس فارغ بمنافسين افتراضيين"""
+        with self._lock:
+            if self.count() == 0:
+                self.add_many(competitors)
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
+
+
+def _filters(project_type, region, include_own=False):
+    """شروط SQL للمفتاح (None تعني الكل)"""
+    clauses, params = ["1 = 1"], []
+    if project_type is not None:
+        clauses.append("project_type = ?")
+        params.append(project_type)
+    if region is not None:
+        clauses.append("region = ?")
+        params.append(region)
+    if not include_own:
+        clauses.append("competitor != ?")
+        params.append(OUR_COMPANY)
+    return clauses, params
@@ -0,0 +1,501 @@
+"""
+محرك سيناريوهات التسعير - سيناريوهات محفوظة كتعديلات على نموذج التكلفة الأساسي
+
+يحفظ المحرك بنود التكلفة الأساسية والسيناريوهات في قاعدة SQLite. كل سيناريو هو
+هامش ربح ومجموعة تعديلات (نسبة مئوية أو مبلغ) على بند أو فئة أو فئة فرعية من
+النموذج الأساسي، وليس نسخة كاملة منه. يحمل النموذج الأساسي رقم إصدار تزيده
+مشغلات قاعدة البيانات عند كل تعديل على بنوده، وتحفظ إجمالي تكلفة كل سيناريو مع
+رقم الإصدار الذي حسبت عليه، فلا يعاد الحساب إلا عند تغير النموذج الأساسي أو
+تعديلات السيناريو نفسه. تقيم السيناريوهات المتعددة معاً في عملية مصفوفية واحدة
+(سيناريوهات × بنود).
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('tender_system.pricing.scenarios')
+
+# فئة بنود الربح المستثناة من إجمالي التكلفة
+PROFIT_CATEGORY = "أرباح"
+
+# نطاقات التعديل -> عمود البند الذي يطابقه هدف التعديل
+DELTA_SCOPES = {
+    "item": "id",
+    "category": "category",
+    "subcategory": "subcategory",
+}
+
+
+class ScenarioEngine:
+    """محرك سيناريوهات التسعير المحفوظة"""
+
+    def __init__(self, db_path=None):
+        """
+        تهيئة المحرك
+
+        المعلمات:
+            db_path (str): مسار ملف قاعدة البيانات، أو ":memory:" لمحرك مؤقت
+        """
+        self.db_path = db_path or os.path.join('data', 'pricing_scenarios.db')
+        self._lock = threading.RLock()
+        self._base_cache = (None, None)
+
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جداول النموذج الأساسي والسيناريوهات ومشغلات رقم الإصدار"""
+        with self._lock:
+            self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS base_cost_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category TEXT NOT NULL,
+                subcategory TEXT,
+                description TEXT,
+                amount REAL NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS scenario_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+
+            INSERT OR IGNORE INTO scenario_meta (key, value) VALUES ('base_version', 0);
+
+            CREATE TABLE IF NOT EXISTS price_scenarios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                profit_margin REAL NOT NULL DEFAULT 0,
+                is_active INTEGER NOT NULL DEFAULT 0,
+                total_cost REAL,
+                base_version INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS scenario_deltas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scenario_id INTEGER NOT NULL REFERENCES price_scenarios (id) ON DELETE CASCADE,
+                scope TEXT NOT NULL,
+                target TEXT NOT NULL,
+                percent REAL NOT NULL DEFAULT 0,
+                amount REAL NOT NULL DEFAULT 0
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_scenario_deltas_scenario
+            ON scenario_deltas (scenario_id);
+            ''')
+
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                self.connection.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_base_cost_items_{event.lower()} AFTER {event} ON base_cost_items
+                BEGIN
+                    UPDATE scenario_meta SET value = value + 1 WHERE key = 'base_version';
+                END
+                ''')
+            self.connection.commit()
+
+    # ------------------------------------------------------------------
+    # النموذج الأساسي
+    # ------------------------------------------------------------------
+
+    def base_version(self):
+        """رقم إصدار النموذج الأساسي (يزيد مع كل تعديل على بنوده)"""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT value FROM scenario_meta WHERE key = 'base_version'"
+            ).fetchone()[0]
+
+    def base_items(self):
+        """
+        بنود التكلفة الأساسية
+
+        العوائد:
+            list: قواميس بمفاتيح id, category, subcategory, description, amount
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT id, category, subcategory, description, amount FROM base_cost_items ORDER BY id"
+            ).fetchall()
+        return [
+            {"id": row[0], "category": row[1], "subcategory": row[2], "description": row[3], "amount": row[4]}
+            for row in rows
+        ]
+
+    def replace_base(self, items):
+        """
+        استبدال النموذج الأساسي بالكامل (للتهيئة أو الاستيراد)
+
+        المعلمات:
+            items (list): قواميس بنود التكلفة، ويحفظ id إن وجد لتبقى تعديلات البنود صالحة
+        """
+        with self._lock:
+            try:
+                self.connection.execute("DELETE FROM base_cost_items")
+                self.connection.executemany(
+                    "INSERT INTO base_cost_items (id, category, subcategory, description, amount) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (item.get("id"), item["category"], item.get("subcategory"), item.get("description"),
+                         float(item.get("amount") or 0))
+                        for item in items
+                    ]
+                )
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في استبدال نموذج التكلفة الأساسي: {str(e)}")
+                self.connection.rollback()
+                raise
+
+    def add_base_item(self, category, subcategory, description, amount):
+        """
+        إضافة بند تكلفة إلى النموذج الأساسي
+
+        العوائد:
+            int: معرف البند الجديد
+        """
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT INTO base_cost_items (category, subcategory, description, amount) VALUES (?, ?, ?, ?)",
+                (category, subcategory, description, float(amount))
+            )
+            self.connection.commit()
+            return cursor.lastrowid
+
+    def update_base_item(self, item_id, **fields):
+        """
+        تعديل بند تكلفة أساسي
+
+        المعلمات:
+            item_id (int): معرف البند
+            **fields: الحقول المعدلة من category, subcategory, description, amount
+        """
+        unknown = set(fields) - {"category", "subcategory", "description", "amount"}
+        if unknown:
+            raise ValueError(f"حقول غير معروفة: {sorted(unknown)}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self._lock:
+            self.connection.execute(
+                f"UPDATE base_cost_items SET {assignments} WHERE id = ?", list(fields.values()) + [item_id]
+            )
+            self.connection.commit()
+
+    def delete_base_item(self, item_id):
+        """حذف بند تكلفة أساسي"""
+        with self._lock:
+            self.connection.execute("DELETE FROM base_cost_items WHERE id = ?", (item_id,))
+            self.connection.commit()
+
+    def _base_arrays(self):
+        """مصفوفات النموذج الأساسي مخزنة مؤقتاً لكل رقم إصدار"""
+        with self._lock:
+            version = self.base_version()
+            cached_version, arrays = self._base_cache
+            if cached_version == version:
+                return version, arrays
+
+            items = self.base_items()
+            categories = list(dict.fromkeys(item["category"] for item in items))
+            arrays = {
+                "id": np.array([str(item["id"]) for item in items], dtype=object),
+                "category": np.array([item["category"] for item in items], dtype=object),
+                "subcategory": np.array([item["subcategory"] or "" for item in items], dtype=object),
+                "amount": np.array([item["amount"] for item in items], dtype=float),
+                "categories": categories,
+            }
+            arrays["is_cost"] = (arrays["category"] != PROFIT_CATEGORY).astype(float)
+            arrays["category_matrix"] = (
+                arrays["category"][:, None] == np.array(categories, dtype=object)[None, :]
+            ).astype(float)
+            self._base_cache = (version, arrays)
+            return version, arrays
+
+    def base_total(self, include_profit=False):
+        """إجمالي النموذج الأساسي (تكاليف فقط، أو مع بنود الربح)"""
+        _, base = self._base_arrays()
+        if include_profit:
+            return float(base["amount"].sum())
+        return float(base["amount"] @ base["is_cost"])
+
+    # ------------------------------------------------------------------
+    # التقييم المصفوفي
+    # ------------------------------------------------------------------
+
+    def evaluate(self, scenarios):
+        """
+        تقييم مجموعة سيناريوهات على النموذج الأساسي الحالي في عملية مصفوفية واحدة
+
+        المعلمات:
+            scenarios (list): قواميس بمفتاحي profit_margin و deltas، وكل تعديل قاموس
+                بمفاتيح scope (item|category|subcategory) و target و percent و amount
+
+        العوائد:
+            dict: total_cost, profit, total_price (مصفوفات بطول السيناريوهات)،
+                lines (سيناريوهات × بنود)، categories و by_category (سيناريوهات × فئات)
+        """
+        _, base = self._base_arrays()
+        n_scenarios, n_items = len(scenarios), len(base["amount"])
+
+        deltas = [(index, delta) for index, scenario in enumerate(scenarios) for delta in scenario.get("deltas") or ()]
+        factors = np.ones((n_scenarios, n_items))
+        additions = np.zeros((n_scenarios, n_items))
+
+        if deltas:
+            scenario_index = np.array([index for index, _ in deltas], dtype=int)
+            scopes = np.array([delta.get("scope", "category") for _, delta in deltas], dtype=object)
+            targets = np.array([str(delta["target"]) for _, delta in deltas], dtype=object)
+            percents = np.array([float(delta.get("percent") or 0) for _, delta in deltas])
+            amounts = np.array([float(delta.get("amount") or 0) for _, delta in deltas])
+
+            unknown = set(scopes) - set(DELTA_SCOPES)
+            if unknown:
+                raise ValueError(f"نطاقات تعديل غير معروفة: {sorted(unknown)}")
+
+            # مصفوفة المطابقة: تعديلات × بنود
+            matches = np.zeros((len(deltas), n_items), dtype=bool)
+            for scope, column in DELTA_SCOPES.items():
+                rows = scopes == scope
+                if rows.any():
+                    matches[rows] = targets[rows][:, None] == base[column][None, :]
+
+            np.multiply.at(factors, scenario_index, np.where(matches, 1 + percents[:, None] / 100, 1.0))
+
+            # توزيع المبلغ المضاف على بنود النطاق بنسبة مبالغها الأساسية (أو بالتساوي إن كانت صفرية)
+            weights = matches * base["amount"][None, :]
+            totals = weights.sum(axis=1, keepdims=True)
+            counts = matches.sum(axis=1, keepdims=True)
+            shares = np.where(totals > 0, weights / np.where(totals > 0, totals, 1),
+                              matches / np.maximum(counts, 1))
+            np.add.at(additions, scenario_index, shares * amounts[:, None])
+
+        lines = base["amount"][None, :] * factors + additions
+        total_cost = lines @ base["is_cost"]
+        margins = np.array([float(scenario.get("profit_margin") or 0) for scenario in scenarios])
+        profit = total_cost * margins / 100
+
+        return {
+            "total_cost": total_cost,
+            "profit": profit,
+            "total_price": total_cost + profit,
+            "lines": lines,
+            "categories": base["categories"],
+            "by_category": lines @ base["category_matrix"],
+        }
+
+    # ------------------------------------------------------------------
+    # السيناريوهات المحفوظة
+    # ------------------------------------------------------------------
+
+    def add_scenario(self, name, description="", profit_margin=0.0, deltas=(), is_active=False):
+        """
+        حفظ سيناريو جديد
+
+        المعلمات:
+            name (str): اسم السيناريو
+            description (str): الوصف
+            profit_margin (float): هامش الربح (%)
+            deltas (list): تعديلات السيناريو على النموذج الأساسي (بصيغة evaluate)
+            is_active (bool): تفعيل السيناريو (يعطل بقية السيناريوهات)
+
+        العوائد:
+            int: معرف السيناريو الجديد
+        """
+        rows = [_delta_row(delta) for delta in deltas]
+        with self._lock:
+            try:
+                cursor = self.connection.execute(
+                    "INSERT INTO price_scenarios (name, description, profit_margin) VALUES (?, ?, ?)",
+                    (name, description, float(profit_margin))
+                )
+                scenario_id = cursor.lastrowid
+                self.connection.executemany(
+                    "INSERT INTO scenario_deltas (scenario_id, scope, target, percent, amount) VALUES (?, ?, ?, ?, ?)",
+                    [(scenario_id,) + row for row in rows]
+                )
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في حفظ سيناريو التسعير: {str(e)}")
+                self.connection.rollback()
+                raise
+
+        if is_active:
+            self.set_active(scenario_id)
+        return scenario_id
+
+    def update_scenario(self, scenario_id, name=None, description=None, profit_margin=None, deltas=None):
+        """تعديل سيناريو محفوظ؛ استبدال تعديلاته يلغي إجماليه المخزن"""
+        fields = {"name": name, "description": description, "profit_margin": profit_margin}
+        fields = {field: value for field, value in fields.items() if value is not None}
+        with self._lock:
+            try:
+                if fields:
+                    self.connection.execute(
+                        f"UPDATE price_scenarios SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+                        list(fields.values()) + [scenario_id]
+                    )
+                if deltas is not None:
+                    self.connection.execute("DELETE FROM scenario_deltas WHERE scenario_id = ?", (scenario_id,))
+                    self.connection.executemany(
+                        "INSERT INTO scenario_deltas (scenario_id, scope, target, percent, amount) VALUES (?, ?, ?, ?, ?)",
+                        [(scenario_id,) + _delta_row(delta) for delta in deltas]
+                    )
+                    self.connection.execute(
+                        "UPDATE price_scenarios SET base_version = NULL WHERE id = ?", (scenario_id,)
+                    )
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في تعديل سيناريو التسعير: {str(e)}")
+                self.connection.rollback()
+                raise
+
+    def delete_scenario(self, scenario_id):
+        """حذف سيناريو وتعديلاته"""
+        with self._lock:
+            self.connection.execute("DELETE FROM scenario_deltas WHERE scenario_id = ?", (scenario_id,))
+            self.connection.execute("DELETE FROM price_scenarios WHERE id = ?", (scenario_id,))
+            self.connection.commit()
+
+    def set_active(self, scenario_id, active=True):
+        """تفعيل سيناريو (مع تعطيل البقية) أو تعطيله"""
+        with self._lock:
+            if active:
+                self.connection.execute(
+                    "UPDATE price_scenarios SET is_active = (id = ?)", (scenario_id,)
+                )
+            else:
+                self.connection.execute(
+                    "UPDATE price_scenarios SET is_active = 0 WHERE id = ?", (scenario_id,)
+                )
+            self.connection.commit()
+
+    def scenario_deltas(self, scenario_ids=None):
+        """
+        تعديلات السيناريوهات
+
+        العوائد:
+            dict: معرف السيناريو -> قائمة التعديلات
+        """
+        query = "SELECT scenario_id, scope, target, percent, amount FROM scenario_deltas"
+        params = []
+        if scenario_ids is not None:
+            scenario_ids = list(scenario_ids)
+            query += f" WHERE scenario_id IN ({', '.join('?' * len(scenario_ids))})"
+            params = scenario_ids
+        with self._lock:
+            rows = self.connection.execute(query + " ORDER BY id", params).fetchall()
+
+        deltas = {}
+        for scenario_id, scope, target, percent, amount in rows:
+            deltas.setdefault(scenario_id, []).append(
+                {"scope": scope, "target": target, "percent": percent, "amount": amount}
+            )
+        return deltas
+
+    def scenarios(self):
+        """
+        السيناريوهات المحفوظة بإجمالياتها
+
+        تعاد الإجماليات المخزنة كما هي، ويعاد حساب السيناريوهات التي حسبت على
+        إصدار سابق من النموذج الأساسي (أو عدلت تعديلاتها) معاً في عملية واحدة.
+
+        العوائد:
+            list: قواميس بمفاتيح id, name, description, total_cost, profit_margin,
+                total_price, is_active, deltas
+        """
+        with self._lock:
+            version = self.base_version()
+            rows = self.connection.execute('''
+            SELECT id, name, description, profit_margin, is_active, total_cost, base_version
+            FROM price_scenarios ORDER BY id
+            ''').fetchall()
+            deltas = self.scenario_deltas()
+
+            stale = [row for row in rows if row[6] != version]
+            if stale:
+                result = self.evaluate([
+                    {"profit_margin": row[3], "deltas": deltas.get(row[0], [])} for row in stale
+                ])
+                self.connection.executemany(
+                    "UPDATE price_scenarios SET total_cost = ?, base_version = ? WHERE id = ?",
+                    [(float(cost), version, row[0]) for row, cost in zip(stale, result["total_cost"])]
+                )
+                self.connection.commit()
+                totals = dict(zip((row[0] for row in stale), result["total_cost"]))
+            else:
+                totals = {}
+
+        scenarios = []
+        for scenario_id, name, description, margin, is_active, total_cost, _ in rows:
+            total_cost = float(totals.get(scenario_id, total_cost))
+            scenarios.append({
+                "id": scenario_id,
+                "name": name,
+                "description": description,
+                "total_cost": total_cost,
+                "profit_margin": margin,
+                "total_price": total_cost * (1 + margin / 100),
+                "is_active": bool(is_active),
+                "deltas": deltas.get(scenario_id, []),
+            })
+        return scenarios
+
+    def compare(self, scenario_ids=None):
+        """
+        مقارنة السيناريوهات جنباً إلى جنب مع تفصيل التكلفة حسب الفئة
+
+        المعلمات:
+            scenario_ids (list): معرفات السيناريوهات (الافتراضي جميعها)
+
+        العوائد:
+            DataFrame: صف لكل سيناريو بمبلغ كل فئة وإجمالي التكلفة والربح والسعر
+        """
+        scenarios = self.scenarios()
+        if scenario_ids is not None:
+            wanted = set(scenario_ids)
+            scenarios = [scenario for scenario in scenarios if scenario["id"] in wanted]
+
+        result = self.evaluate(scenarios)
+        df = pd.DataFrame(result["by_category"], columns=result["categories"])
+        df.insert(0, "السيناريو", [scenario["name"] for scenario in scenarios])
+        df["إجمالي التكلفة"] = result["total_cost"]
+        df["هامش الربح (%)"] = [scenario["profit_margin"] for scenario in scenarios]
+        df["الربح"] = result["profit"]
+        df["السعر الإجمالي"] = result["total_price"]
+        return df
+
+    def seed(self, base_items, scenarios):
+        """
+        تهيئة محرك فارغ بنموذج أساسي وسيناريوهات افتراضية
+
+        المعلمات:
+            base_items (list): بنود التكلفة الأساسية
+            scenarios (list): قواميس معاملات add_scenario
+        """
+        with self._lock:
+            if not self.base_items():
+                self.replace_base(base_items)
+            if self.connection.execute("SELECT COUNT(*) FROM price_scenarios").fetchone()[0] == 0:
+                for scenario in scenarios:
+                    self.add_scenario(**scenario)
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
+
+
+def _delta_row(delta):
+    """تحويل تعديل إلى صف جدول scenario_deltas مع التحقق من نطاقه"""
+    scope = delta.get("scope", "category")
+    if scope not in DELTA_SCOPES:
+        raise ValueError(f"نطاق تعديل غير معروف: {scope}")
+    return (scope, str(delta["target"]), float(delta.get("percent") or 0), float(delta.get("amount") or 0))
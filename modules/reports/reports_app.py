@@ -1,8 +1,43 @@
+import io
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
-import time
+
+from config import AppConfig
+from database.db_connector import DatabaseConnector
+from modules.reports.services.report_aggregates import ReportAggregates
+from modules.reports.services.report_builder import (
+    ReportEngine, ReportPlan, REPORT_FIELDS, REPORT_FILTERS, write_excel_rows
+)
+from modules.reports.services.report_scheduler import (
+    CronSchedule, SCHEDULE_ALIASES, create_report_scheduler
+)
+
+
+@st.cache_resource
+def get_report_aggregates():
+    """الحصول على ملخصات التقارير المشتركة بين الجلسات"""
+    config = AppConfig()
+    # التأكد من إنشاء جداول النظام وترحيلها قبل تثبيت المشغلات
+    DatabaseConnector(config).close()
+    return ReportAggregates(config.get_database_config()["path"])
+
+
+@st.cache_resource
+def get_report_engine():
+    """الحصول على محرك التقارير المخصصة المشترك بين الجلسات"""
+    return ReportEngine(get_report_aggregates().db_path)
+
+
+@st.cache_resource
+def get_report_scheduler():
+    """الحصول على مجدول التقارير المشترك بين الجلسات مع تشغيل عماله في الخلفية"""
+    scheduler = create_report_scheduler(get_report_engine(), AppConfig().get_reports_config())
+    scheduler.start()
+    return scheduler
+
 
 class ReportsApp:
     """وحدة التقارير والتحليلات"""
@@ -12,6 +47,10 @@ class ReportsApp:
         # تهيئة متغير السمة في حالة الجلسة إذا لم يكن موجوداً
         if 'theme' not in st.session_state:
             st.session_state.theme = 'light'
+        
+        self.aggregates = get_report_aggregates()
+        self.report_engine = get_report_engine()
+        self.report_scheduler = get_report_scheduler()
 
     def run(self):
         """
@@ -136,7 +175,7 @@ class ReportsApp:
         
         st.markdown("<h1 class='module-title'>وحدة التقارير والتحليلات</h1>", unsafe_allow_html=True)
         
-        tabs = st.tabs(["لوحة المعلومات", "تقارير المشاريع", "تقارير التسعير", "تقارير المخاطر", "التقارير المخصصة"])
+        tabs = st.tabs(["لوحة المعلومات", "تقارير المشاريع", "تقارير التسعير", "تقارير المخاطر", "التقارير المخصصة", "التقارير المجدولة"])
         
         with tabs[0]:
             self._render_dashboard_tab()
@@ -152,6 +191,9 @@ class ReportsApp:
         
         with tabs[4]:
             self._render_custom_reports_tab()
+        
+        with tabs[5]:
+            self._render_scheduled_reports_tab()
 
     def _render_dashboard_tab(self):
         """عرض تبويب لوحة المعلومات"""
@@ -275,118 +317,297 @@ class ReportsApp:
             report_description = st.text_area("وصف التقرير")
         
         with col2:
-            report_fields = st.multiselect(
-                "حقول التقرير",
-                ["رقم المشروع", "اسم المشروع", "نوع المشروع", "حالة المشروع", "تاريخ البدء", "تاريخ الانتهاء", "الميزانية", "التكلفة الفعلية", "نسبة الإنجاز", "المخاطر", "الموقع", "المالك", "المقاول"]
-            )
-            
-            report_filters = st.multiselect(
-                "تصفية التقرير",
-                ["نوع المشروع", "حالة المشروع", "الفترة الزمنية", "الميزانية", "الموقع", "المالك", "المقاول"]
-            )
+            report_fields = st.multiselect("حقول التقرير", list(REPORT_FIELDS))
+            report_filters = st.multiselect("تصفية التقرير", list(REPORT_FILTERS))
+        
+        # قيم الفلاتر المختارة
+        filters = []
+        for filter_name in report_filters:
+            field = REPORT_FILTERS[filter_name]
+            if filter_name == "الفترة الزمنية":
+                period = st.date_input(
+                    "تاريخ البدء بين",
+                    value=(datetime.now().date() - timedelta(days=365), datetime.now().date()),
+                    key="custom_report_period"
+                )
+                if len(period) == 2:
+                    filters.append((field, "between", list(period)))
+            elif filter_name == "الميزانية":
+                budget_col1, budget_col2 = st.columns(2)
+                with budget_col1:
+                    min_budget = st.number_input("الحد الأدنى للميزانية", min_value=0.0, value=0.0, step=100000.0)
+                with budget_col2:
+                    max_budget = st.number_input("الحد الأقصى للميزانية", min_value=0.0, value=0.0, step=100000.0)
+                if min_budget:
+                    filters.append((field, "gte", min_budget))
+                if max_budget:
+                    filters.append((field, "lte", max_budget))
+            else:
+                options = self._get_filter_options(filter_name)
+                selected_values = st.multiselect(filter_name, options, key=f"custom_report_filter_{filter_name}")
+                if selected_values:
+                    filters.append((field, "in", selected_values))
         
-        if st.button("إنشاء التقرير"):
-            if report_name and report_description and report_fields:
-                with st.spinner("جاري إنشاء التقرير..."):
-                    time.sleep(2)  # محاكاة وقت المعالجة
-                    st.success("تم إنشاء التقرير بنجاح!")
-                    
-                    # عرض التقرير المخصص (محاكاة)
-                    custom_report_data = self._generate_custom_report(report_fields)
-                    st.dataframe(custom_report_data)
-                    
-                    # تصدير التقرير
-                    st.download_button(
-                        label="تصدير التقرير (Excel)",
-                        data=self._export_to_excel(custom_report_data),
-                        file_name=f"{report_name}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+        col1, col2 = st.columns(2)
+        with col1:
+            sort_by = st.selectbox("ترتيب حسب", ["(بدون)"] + report_fields)
+        with col2:
+            descending = st.checkbox("ترتيب تنازلي")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            create_clicked = st.button("إنشاء التقرير")
+        with col2:
+            save_clicked = st.button("حفظ التقرير")
+        
+        if create_clicked or save_clicked:
+            if report_name and report_fields:
+                plan = ReportPlan(report_fields, filters, None if sort_by == "(بدون)" else sort_by, descending)
+                st.session_state.custom_report = {"name": report_name, "plan": plan.to_dict(), "compiled": None}
+                if save_clicked:
+                    self.report_engine.save(report_name, plan, report_description)
+                    st.success("تم حفظ التقرير بنجاح!")
             else:
-                st.warning("يرجى ملء جميع الحقول المطلوبة")
+                st.warning("يرجى إدخال اسم التقرير واختيار حقل واحد على الأقل")
+        
+        if st.session_state.get("custom_report"):
+            self._render_custom_report_result(st.session_state.custom_report)
         
         st.markdown("#### التقارير المخصصة المحفوظة")
         
-        saved_reports = [
-            {"id": 1, "name": "تقرير المشاريع المتأخرة في الرياض", "created_at": "2025-03-15", "last_run": "2025-03-30"},
-            {"id": 2, "name": "تقرير مشاريع الطرق ذات المخاطر العالية", "created_at": "2025-03-10", "last_run": "2025-03-28"},
-            {"id": 3, "name": "تقرير المشاريع المكتملة في الربع الأول", "created_at": "2025-03-05", "last_run": "2025-03-25"}
-        ]
+        saved_reports = self.report_engine.list_saved()
+        if not saved_reports:
+            st.info("لا توجد تقارير محفوظة")
+            return
+        
+        saved_reports_df = pd.DataFrame(saved_reports, columns=["id", "name", "description", "created_at", "last_run"])
+        st.dataframe(saved_reports_df, hide_index=True)
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            saved_id = st.selectbox(
+                "اختر تقريراً محفوظاً",
+                saved_reports_df["id"],
+                format_func=lambda report_id: saved_reports_df.set_index("id").loc[report_id, "name"]
+            )
+        with col2:
+            if st.button("تشغيل التقرير المحفوظ"):
+                loaded = self.report_engine.load_saved(int(saved_id))
+                if loaded:
+                    name, plan, compiled = loaded
+                    st.session_state.custom_report = {"name": name, "plan": plan.to_dict(), "compiled": compiled}
+                    st.rerun()
+    
+    def _render_custom_report_result(self, custom_report):
+        """عرض صفحة من نتائج التقرير المخصص مع التصدير"""
+        plan = ReportPlan.from_dict(custom_report["plan"])
+        compiled = custom_report.get("compiled")
+        page_size = 50
+        
+        st.markdown(f"#### {custom_report['name']}")
+        
+        total = self.report_engine.run(plan, 1, page_size, compiled=compiled)["total"]
+        page_count = max(1, (total + page_size - 1) // page_size)
+        page = st.number_input("الصفحة", min_value=1, max_value=page_count, value=1, step=1, key="custom_report_page") if page_count > 1 else 1
+        
+        st.dataframe(self._generate_custom_report(plan, page, page_size, compiled), hide_index=True)
+        st.caption(f"إجمالي الصفوف: {total}")
+        
+        # تصدير التقرير
+        if st.button("تجهيز ملف Excel"):
+            with st.spinner("جاري تصدير التقرير..."):
+                st.download_button(
+                    label="تنزيل التقرير (Excel)",
+                    data=self._export_to_excel(plan, compiled),
+                    file_name=f"{custom_report['name']}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+    
+    def _render_scheduled_reports_tab(self):
+        """عرض تبويب التقارير المجدولة وملفاتها الجاهزة"""
+        
+        st.markdown("### التقارير المجدولة")
+        st.info("تولد التقارير المجدولة في الخلفية، ويمكن تنزيل ملفاتها من القائمة أدناه عند اكتمالها.")
+        
+        saved_reports = self.report_engine.list_saved()
+        schedule_presets = {
+            "يومي (06:00)": SCHEDULE_ALIASES["@daily"],
+            "أسبوعي (الأحد 07:00)": SCHEDULE_ALIASES["@weekly"],
+            "شهري (أول الشهر 07:00)": SCHEDULE_ALIASES["@monthly"],
+            "مخصص (cron)": None
+        }
+        
+        st.markdown("#### إضافة مهمة مجدولة")
+        if not saved_reports:
+            st.warning("يرجى حفظ تقرير مخصص أولاً من تبويب التقارير المخصصة")
+        else:
+            saved_names = {report_id: name for report_id, name, *_ in saved_reports}
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                saved_report_id = st.selectbox("التقرير", list(saved_names), format_func=saved_names.get, key="schedule_report")
+                job_name = st.text_input("اسم المهمة", value=saved_names[saved_report_id], key="schedule_job_name")
+            with col2:
+                preset = st.selectbox("التكرار", list(schedule_presets), index=1, key="schedule_preset")
+                schedule = schedule_presets[preset] or st.text_input(
+                    "تعبير الجدول (الدقيقة الساعة اليوم الشهر يوم-الأسبوع)", value="0 7 * * 0", key="schedule_cron"
+                )
+                default_format = "excel" if AppConfig().get_reports_config().get("default_format") in ("excel", "xlsx") else "pdf"
+                report_format = st.radio(
+                    "صيغة الملف", ["pdf", "excel"], index=["pdf", "excel"].index(default_format),
+                    format_func={"pdf": "PDF", "excel": "Excel"}.get, horizontal=True, key="schedule_format"
+                )
+            
+            if st.button("إضافة المهمة"):
+                try:
+                    CronSchedule(schedule)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    self.report_scheduler.add_job(job_name or saved_names[saved_report_id], saved_report_id, schedule, report_format)
+                    st.success("تمت إضافة المهمة المجدولة")
+        
+        st.markdown("#### المهام")
+        jobs = self.report_scheduler.jobs()
+        if not jobs:
+            st.info("لا توجد مهام مجدولة")
+        else:
+            jobs_df = pd.DataFrame(jobs)[["id", "name", "format", "schedule", "enabled", "next_run_at", "last_run_at"]]
+            jobs_df.columns = ["المعرف", "المهمة", "الصيغة", "الجدول", "مفعلة", "التشغيل القادم", "آخر تشغيل"]
+            jobs_df["مفعلة"] = jobs_df["مفعلة"].map({1: "نعم", 0: "لا"})
+            st.dataframe(jobs_df, hide_index=True)
+            
+            job_names = {job["id"]: job["name"] for job in jobs}
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+            with col1:
+                job_id = st.selectbox("المهمة", list(job_names), format_func=job_names.get, key="schedule_selected_job")
+            enabled = next(job["enabled"] for job in jobs if job["id"] == job_id)
+            with col2:
+                if st.button("تشغيل الآن"):
+                    self.report_scheduler.request_run(job_id)
+                    st.success("تمت إضافة التقرير إلى طابور التوليد")
+            with col3:
+                if st.button("إيقاف" if enabled else "تفعيل"):
+                    self.report_scheduler.set_enabled(job_id, not enabled)
+                    st.rerun()
+            with col4:
+                if st.button("حذف المهمة"):
+                    self.report_scheduler.remove_job(job_id)
+                    st.rerun()
+        
+        pending = self.report_scheduler.runs(statuses=["queued", "running", "failed"], limit=20)
+        if pending:
+            with st.expander("حالة التوليد"):
+                status_labels = {"queued": "في الانتظار", "running": "قيد التوليد", "failed": "فشل"}
+                st.dataframe(pd.DataFrame([
+                    {
+                        "المهمة": run["job_name"],
+                        "الحالة": status_labels[run["status"]],
+                        "وقت الطلب": run["requested_at"],
+                        "الخطأ": run["error"] or ""
+                    }
+                    for run in pending
+                ]), hide_index=True)
+                if st.button("تحديث"):
+                    st.rerun()
+        
+        st.markdown("#### الملفات الجاهزة")
+        artifacts = self.report_scheduler.artifacts(limit=50)
+        if not artifacts:
+            st.info("لا توجد ملفات جاهزة بعد")
+            return
+        
+        st.dataframe(pd.DataFrame([
+            {
+                "التقرير": artifact["job_name"] or "-",
+                "الملف": os.path.basename(artifact["artifact_path"]),
+                "وقت الإنشاء": artifact["finished_at"],
+                "عدد الصفوف": artifact["row_count"],
+                "الحجم (KB)": round(artifact["file_size"] / 1024, 1)
+            }
+            for artifact in artifacts
+        ]), hide_index=True)
         
-        saved_reports_df = pd.DataFrame(saved_reports)
-        st.dataframe(saved_reports_df)
+        # تحميل محتوى الملف المختار فقط بدلاً من قراءة كل الملفات في كل إعادة تشغيل
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            artifact = st.selectbox(
+                "الملف المطلوب تنزيله",
+                artifacts,
+                format_func=lambda item: f"{item['job_name'] or '-'} — {os.path.basename(item['artifact_path'])}",
+                key="artifact_download_choice"
+            )
+        with col2:
+            with open(artifact["artifact_path"], "rb") as artifact_file:
+                st.download_button(
+                    "تنزيل",
+                    data=artifact_file.read(),
+                    file_name=os.path.basename(artifact["artifact_path"]),
+                    key=f"artifact_{artifact['id']}"
+                )
+    
+    def _get_filter_options(self, filter_name):
+        """قيم الفلاتر المتاحة من الجداول التجميعية"""
+        if filter_name == "حالة المشروع":
+            return [status for status, _ in self.aggregates.status_counts()]
+        dimension = {"نوع المشروع": "type", "الموقع": "location", "المالك": "client"}[filter_name]
+        return [value for value, _ in self.aggregates.dimension_counts(dimension, limit=200)]
 
-    # تنفيذ دوال الحصول على البيانات
+    # تنفيذ دوال الحصول على البيانات (من الجداول التجميعية)
     
     def _get_total_projects(self):
         """الحصول على إجمالي عدد المشاريع"""
-        # محاكاة البيانات
-        return 120
+        return self.aggregates.project_totals()["total"]
     
     def _get_active_projects(self):
         """الحصول على عدد المشاريع النشطة"""
-        # محاكاة البيانات
-        return 45
+        return self.aggregates.project_totals()["active"]
     
     def _get_won_projects(self):
         """الحصول على عدد المشاريع المرساة"""
-        # محاكاة البيانات
-        return 30
+        return self.aggregates.project_totals()["won"]
     
     def _get_avg_local_content(self):
         """الحصول على متوسط المحتوى المحلي"""
-        # محاكاة البيانات
-        return 75.5
+        return self.aggregates.project_totals()["avg_local_content"]
     
     def _get_project_status_data(self):
         """الحصول على بيانات توزيع المشاريع حسب الحالة"""
-        # محاكاة البيانات
-        data = {
-            'status': ['جديد', 'قيد التقديم', 'تم التقديم', 'فائز', 'خاسر', 'ملغي'],
-            'count': [25, 20, 15, 30, 25, 5]
-        }
-        return pd.DataFrame(data)
+        return pd.DataFrame(self.aggregates.status_counts(), columns=['status', 'count'])
     
     def _get_monthly_project_data(self):
         """الحصول على بيانات اتجاه المشاريع الشهري"""
-        # محاكاة البيانات
-        data = {
-            'month': ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو'],
-            'new': [10, 15, 12, 8, 20, 18],
-            'submitted': [8, 12, 10, 6, 15, 14],
-            'won': [5, 8, 6, 4, 10, 9]
-        }
-        return pd.DataFrame(data)
+        return pd.DataFrame(self.aggregates.monthly_counts(), columns=['month', 'new', 'submitted', 'won'])
     
     def _get_project_type_data(self):
         """الحصول على بيانات توزيع المشاريع حسب النوع"""
-        # محاكاة البيانات
-        data = {
-            'type': ['مباني', 'طرق', 'جسور', 'أنفاق', 'بنية تحتية', 'أخرى'],
-            'count': [40, 30, 15, 10, 20, 5]
-        }
-        return pd.DataFrame(data)
+        return pd.DataFrame(self.aggregates.dimension_counts("type"), columns=['type', 'count'])
     
     def _get_project_location_data(self):
         """الحصول على بيانات توزيع المشاريع حسب الموقع"""
-        # محاكاة البيانات
-        data = {
-            'location': ['الرياض', 'جدة', 'الدمام', 'مكة', 'المدينة', 'أخرى'],
-            'count': [35, 25, 20, 15, 10, 15]
-        }
-        return pd.DataFrame(data)
+        return pd.DataFrame(self.aggregates.dimension_counts("location"), columns=['location', 'count'])
     
     def _get_latest_projects(self):
         """الحصول على بيانات أحدث المشاريع"""
-        # محاكاة البيانات
-        data = {
-            'رقم المشروع': ['P-2025-001', 'P-2025-002', 'P-2025-003', 'P-2025-004', 'P-2025-005'],
-            'اسم المشروع': ['إنشاء مبنى إداري', 'تطوير شبكة طرق', 'إنشاء جسر', 'بناء مدرسة', 'تطوير شبكة مياه'],
-            'نوع المشروع': ['مباني', 'طرق', 'جسور', 'مباني', 'بنية تحتية'],
-            'حالة المشروع': ['جديد', 'قيد التقديم', 'تم التقديم', 'فائز', 'جديد'],
-            'تاريخ الإضافة': ['2025-03-30', '2025-03-28', '2025-03-25', '2025-03-20', '2025-03-18']
-        }
-        return pd.DataFrame(data)
+        return pd.DataFrame(
+            self.aggregates.latest_projects(),
+            columns=['رقم المشروع', 'اسم المشروع', 'الجهة', 'نوع المشروع', 'حالة المشروع', 'تاريخ الإضافة']
+        )
+    
+    def _get_projects_table(self, **filters):
+        """الحصول على جدول المشاريع مع إجمالي التسعير وعدد المخاطر"""
+        return pd.DataFrame(
+            self.aggregates.projects(**filters),
+            columns=['رقم المشروع', 'اسم المشروع', 'الجهة', 'نوع المشروع', 'الموقع', 'حالة المشروع',
+                     'تاريخ البدء', 'تاريخ الانتهاء', 'إجمالي التسعير', 'عدد المخاطر']
+        )
+    
+    def _get_risks_table(self, **filters):
+        """الحصول على جدول المخاطر"""
+        return pd.DataFrame(
+            self.aggregates.risks(**filters),
+            columns=['المخاطرة', 'المشروع', 'الفئة', 'الاحتمالية', 'التأثير', 'مستوى الخطورة', 'استراتيجية التخفيف']
+        )
     
     # تنفيذ دوال عرض التقارير
     
@@ -395,11 +616,219 @@ class ReportsApp:
         
         st.markdown("#### تقرير حالة المشاريع")
         
-        # محاكاة بيانات التقرير
-        data = {
-            'رقم المشروع': ['P-2025-001', 'P-2025-002', 'P-2025-003', 'P-2025-004', 'P-2025-005', 'P-2025-006', 'P-2025-007', 'P-2025-008', 'P-2025-009', 'P-2025-010'],
-            'اسم المشروع': ['إنشاء مبنى إداري', 'تطوير شبكة طرق', 'إنشاء جسر', 'بناء مدرسة', 'تطوير شبكة مياه', 'إنشاء مستشفى', 'بناء مركز تجاري', 'تطوير حديقة عامة', 'إنشاء مصنع', 'تطوير مطار'],
-            'نوع المشروع': ['مباني', 'طرق', 'جسور', 'مباني', 'بنية تحتية', 'مباني', 'مباني', 'أخرى', 'مباني', 'بنية تحتية'],
-            '
-(Content truncated due to size limit. Use line ranges to read in chunks)
-        
\ No newline at end of file
+        status_data = self._get_project_status_data()
+        if status_data.empty:
+            st.info("لا توجد مشاريع مسجلة")
+            return
+        
+        fig = px.bar(status_data, x='status', y='count', title='عدد المشاريع حسب الحالة')
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.dataframe(self._get_projects_table(), use_container_width=True, hide_index=True)
+    
+    def _render_project_performance_report(self):
+        """عرض تقرير أداء المشاريع"""
+        
+        st.markdown("#### تقرير أداء المشاريع")
+        
+        pricing_data = pd.DataFrame(
+            self.aggregates.pricing_by_project(),
+            columns=['رقم المشروع', 'اسم المشروع', 'عدد البنود', 'إجمالي التسعير']
+        )
+        if pricing_data.empty:
+            st.info("لا توجد بنود تسعير مسجلة للمشاريع")
+            return
+        
+        fig = px.bar(pricing_data, x='اسم المشروع', y='إجمالي التسعير', title='إجمالي التسعير حسب المشروع')
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(pricing_data, use_container_width=True, hide_index=True)
+    
+    def _render_delayed_projects_report(self):
+        """عرض تقرير المشاريع المتأخرة"""
+        
+        st.markdown("#### تقرير المشاريع المتأخرة")
+        
+        filters = {
+            "exclude_statuses": ("مكتمل", "ملغي", "خاسر"),
+            "ended_before": datetime.now().strftime("%Y-%m-%d"),
+        }
+        delayed_projects = self._get_projects_table(**filters)
+        
+        st.metric("عدد المشاريع المتأخرة", self.aggregates.count_projects(**filters))
+        if delayed_projects.empty:
+            st.success("لا توجد مشاريع متأخرة")
+        else:
+            st.dataframe(delayed_projects, use_container_width=True, hide_index=True)
+    
+    def _render_completed_projects_report(self):
+        """عرض تقرير المشاريع المكتملة"""
+        
+        st.markdown("#### تقرير المشاريع المكتملة")
+        
+        completed_projects = self._get_projects_table(statuses=("مكتمل",))
+        
+        st.metric("عدد المشاريع المكتملة", self.aggregates.count_projects(statuses=("مكتمل",)))
+        if completed_projects.empty:
+            st.info("لا توجد مشاريع مكتملة")
+        else:
+            st.dataframe(completed_projects, use_container_width=True, hide_index=True)
+    
+    def _render_price_analysis_report(self):
+        """عرض تقرير تحليل الأسعار"""
+        
+        st.markdown("#### تقرير تحليل الأسعار")
+        
+        pricing_data = pd.DataFrame(
+            self.aggregates.pricing_by_project(limit=1000),
+            columns=['رقم المشروع', 'اسم المشروع', 'عدد البنود', 'إجمالي التسعير']
+        )
+        if pricing_data.empty:
+            st.info("لا توجد بنود تسعير مسجلة")
+            return
+        
+        totals = self.aggregates.pricing_totals()
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("عدد المشاريع المسعرة", totals["projects"])
+        
+        with col2:
+            st.metric("إجمالي البنود", int(totals["items"]))
+        
+        with col3:
+            st.metric("إجمالي قيمة التسعير", f"{totals['total_price']:,.0f} ريال")
+        
+        st.dataframe(pricing_data, use_container_width=True, hide_index=True)
+    
+    def _render_price_comparison_report(self):
+        """عرض تقرير مقارنة الأسعار"""
+        
+        st.markdown("#### تقرير مقارنة الأسعار")
+        
+        pricing_data = pd.DataFrame(
+            self.aggregates.pricing_by_project(),
+            columns=['رقم المشروع', 'اسم المشروع', 'عدد البنود', 'إجمالي التسعير']
+        )
+        if pricing_data.empty:
+            st.info("لا توجد بنود تسعير مسجلة")
+            return
+        
+        pricing_data['متوسط قيمة البند'] = pricing_data['إجمالي التسعير'] / pricing_data['عدد البنود']
+        
+        fig = px.bar(pricing_data, x='اسم المشروع', y='متوسط قيمة البند', title='متوسط قيمة البند حسب المشروع')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def _render_price_trends_report(self):
+        """عرض تقرير اتجاهات الأسعار"""
+        
+        st.markdown("#### تقرير اتجاهات الأسعار")
+        
+        trend_data = pd.DataFrame(self.aggregates.pricing_by_month(), columns=['الشهر', 'عدد البنود', 'إجمالي التسعير'])
+        if trend_data.empty:
+            st.info("لا توجد بنود تسعير مسجلة")
+            return
+        
+        fig = px.line(trend_data, x='الشهر', y='إجمالي التسعير', title='إجمالي التسعير الشهري', markers=True)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def _render_competitors_analysis_report(self):
+        """عرض تقرير تحليل المنافسين"""
+        
+        st.markdown("#### تقرير تحليل المنافسين")
+        
+        client_data = pd.DataFrame(self.aggregates.dimension_counts("client"), columns=['الجهة', 'عدد المشاريع'])
+        
+        st.info("لا تحفظ قاعدة البيانات عروض المنافسين بعد، ويعرض التقرير توزيع المشاريع حسب الجهات المالكة.")
+        if not client_data.empty:
+            fig = px.bar(client_data, x='الجهة', y='عدد المشاريع', title='عدد المشاريع حسب الجهة')
+            st.plotly_chart(fig, use_container_width=True)
+    
+    def _render_risk_analysis_report(self):
+        """عرض تقرير تحليل المخاطر"""
+        
+        st.markdown("#### تقرير تحليل المخاطر")
+        
+        risk_data = pd.DataFrame(self.aggregates.risk_counts(("category", "risk_level")), columns=['الفئة', 'مستوى الخطورة', 'العدد'])
+        if risk_data.empty:
+            st.info("لا توجد مخاطر مسجلة")
+            return
+        
+        fig = px.bar(risk_data, x='الفئة', y='العدد', color='مستوى الخطورة', title='المخاطر حسب الفئة ومستوى الخطورة')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def _render_risk_matrix_report(self):
+        """عرض تقرير مصفوفة المخاطر"""
+        
+        st.markdown("#### تقرير مصفوفة المخاطر")
+        
+        matrix_data = pd.DataFrame(self.aggregates.risk_counts(("probability", "impact")), columns=['الاحتمالية', 'التأثير', 'العدد'])
+        if matrix_data.empty:
+            st.info("لا توجد مخاطر مسجلة")
+            return
+        
+        matrix = matrix_data.pivot_table(index='الاحتمالية', columns='التأثير', values='العدد', fill_value=0)
+        fig = px.imshow(matrix, text_auto=True, title='مصفوفة الاحتمالية والتأثير', color_continuous_scale='Reds')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def _render_risk_monitoring_report(self):
+        """عرض تقرير متابعة المخاطر"""
+        
+        st.markdown("#### تقرير متابعة المخاطر")
+        
+        high_levels = ("عالي", "عالية", "مرتفع")
+        high_risks = self._get_risks_table(risk_levels=high_levels)
+        
+        st.metric("المخاطر العالية", self.aggregates.count_risks(risk_levels=high_levels))
+        if high_risks.empty:
+            st.success("لا توجد مخاطر عالية مسجلة")
+        else:
+            st.dataframe(high_risks, use_container_width=True, hide_index=True)
+    
+    def _render_risk_mitigation_report(self):
+        """عرض تقرير استراتيجيات التخفيف"""
+        
+        st.markdown("#### تقرير استراتيجيات التخفيف")
+        
+        col1, col2 = st.columns(2)
+        
+        mitigated = self._get_risks_table(with_mitigation=True)
+        
+        with col1:
+            st.metric("مخاطر لها استراتيجية تخفيف", self.aggregates.count_risks(with_mitigation=True))
+        
+        with col2:
+            st.metric("مخاطر بدون استراتيجية تخفيف", self.aggregates.count_risks(with_mitigation=False))
+        
+        if not mitigated.empty:
+            st.dataframe(mitigated, use_container_width=True, hide_index=True)
+    
+    # التقارير المخصصة
+    
+    def _generate_custom_report(self, plan, page=1, page_size=50, compiled=None):
+        """
+        تنفيذ صفحة من تقرير مخصص
+        
+        المعلمات:
+            plan (ReportPlan|list): خطة التقرير أو قائمة الحقول
+            page (int): رقم الصفحة
+            page_size (int): عدد الصفوف في الصفحة
+            compiled (dict): خطة مترجمة محفوظة (اختياري)
+        """
+        if not isinstance(plan, ReportPlan):
+            plan = ReportPlan(plan)
+        result = self.report_engine.run(plan, page, page_size, compiled=compiled)
+        return pd.DataFrame(result["rows"], columns=result["columns"])
+    
+    def _export_to_excel(self, data, compiled=None):
+        """
+        تصدير التقرير إلى ملف Excel
+        
+        عند تمرير خطة تقرير تقرأ الصفوف من قاعدة البيانات على دفعات وتكتب
+        مباشرة إلى الملف دون تحميلها كاملة في الذاكرة.
+        """
+        if isinstance(data, ReportPlan):
+            return self.report_engine.export_excel(data, compiled=compiled)
+        
+        output = io.BytesIO()
+        write_excel_rows(list(data.columns), data.itertuples(index=False), output)
+        return output.getvalue()
@@ -0,0 +1,467 @@
+"""
+الجداول التجميعية للتقارير - ملخصات محدثة تلقائياً لجداول المشاريع والتسعير والمخاطر والتقارير
+
+تحدث الملخصات عند كل كتابة عبر مشغلات (Triggers) في قاعدة البيانات نفسها، فتبقى
+متزامنة مع الجداول الأصلية ضمن المعاملة ذاتها، ويقرأ كل عنصر في لوحة المعلومات
+استعلاماً واحداً على جدول صغير لا يكبر بتراكم سنوات المشاريع (حجمه بعدد الحالات
+أو الأشهر أو الفئات وليس بعدد السجلات). يمكن إعادة بناء الملخصات بالكامل عبر
+refresh() عند الترحيل أو للتحقق الدوري.
+"""
+
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('tender_system.reports')
+
+# تصنيف حالات المشاريع
+ACTIVE_STATUSES = ("نشط", "جديد", "قيد التقديم", "تم التقديم")
+SUBMITTED_STATUSES = ("تم التقديم", "فائز", "خاسر")
+WON_STATUSES = ("فائز",)
+
+UNSPECIFIED = "غير محدد"
+
+# تعريف الجداول التجميعية: الاسم -> (تعريف الأعمدة، المفتاح الأساسي)
+_SUMMARY_TABLES = {
+    "agg_project_status": (
+        "status TEXT NOT NULL, project_count INTEGER NOT NULL DEFAULT 0, "
+        "local_content_sum REAL NOT NULL DEFAULT 0, local_content_count INTEGER NOT NULL DEFAULT 0",
+        "status"
+    ),
+    "agg_project_month": (
+        "month TEXT NOT NULL, status TEXT NOT NULL, project_count INTEGER NOT NULL DEFAULT 0",
+        "month, status"
+    ),
+    "agg_project_dimension": (
+        "dimension TEXT NOT NULL, value TEXT NOT NULL, project_count INTEGER NOT NULL DEFAULT 0",
+        "dimension, value"
+    ),
+    "agg_pricing_project": (
+        "project_id INTEGER NOT NULL, item_count INTEGER NOT NULL DEFAULT 0, total_price REAL NOT NULL DEFAULT 0",
+        "project_id"
+    ),
+    "agg_pricing_month": (
+        "month TEXT NOT NULL, item_count INTEGER NOT NULL DEFAULT 0, total_price REAL NOT NULL DEFAULT 0",
+        "month"
+    ),
+    "agg_risk": (
+        "category TEXT NOT NULL, probability TEXT NOT NULL, impact TEXT NOT NULL, risk_level TEXT NOT NULL, "
+        "risk_count INTEGER NOT NULL DEFAULT 0",
+        "category, probability, impact, risk_level"
+    ),
+    "agg_report": (
+        "report_type TEXT NOT NULL, status TEXT NOT NULL, report_count INTEGER NOT NULL DEFAULT 0",
+        "report_type, status"
+    ),
+}
+
+
+def _month(expression):
+    """تعبير SQL لاستخراج الشهر (YYYY-MM) من تاريخ الإنشاء"""
+    return f"substr(COALESCE({expression}, CURRENT_TIMESTAMP), 1, 7)"
+
+
+def _value(expression):
+    """تعبير SQL لقيمة بعد نصية مع قيمة افتراضية للفارغ"""
+    return f"COALESCE(NULLIF(TRIM({expression}), ''), '{UNSPECIFIED}')"
+
+
+def _project_statements(row, sign):
+    """عبارات تحديث ملخصات المشاريع لصف جديد (sign=+1) أو محذوف (sign=-1)"""
+    return [
+        f'''
+        INSERT INTO agg_project_status (status, project_count, local_content_sum, local_content_count)
+        VALUES ({_value(f"{row}.status")}, {sign}, {sign} * COALESCE({row}.local_content, 0),
+                {sign} * ({row}.local_content IS NOT NULL))
+        ON CONFLICT (status) DO UPDATE SET
+            project_count = project_count + excluded.project_count,
+            local_content_sum = local_content_sum + excluded.local_content_sum,
+            local_content_count = local_content_count + excluded.local_content_count;
+        ''',
+        f'''
+        INSERT INTO agg_project_month (month, status, project_count)
+        VALUES ({_month(f"{row}.created_at")}, {_value(f"{row}.status")}, {sign})
+        ON CONFLICT (month, status) DO UPDATE SET project_count = project_count + excluded.project_count;
+        ''',
+    ] + [
+        f'''
+        INSERT INTO agg_project_dimension (dimension, value, project_count)
+        VALUES ('{dimension}', {_value(f"{row}.{column}")}, {sign})
+        ON CONFLICT (dimension, value) DO UPDATE SET project_count = project_count + excluded.project_count;
+        '''
+        for dimension, column in (("type", "project_type"), ("location", "location"), ("client", "client"))
+    ]
+
+
+def _pricing_statements(row, sign):
+    """عبارات تحديث ملخصات التسعير"""
+    return [
+        f'''
+        INSERT INTO agg_pricing_project (project_id, item_count, total_price)
+        VALUES (COALESCE({row}.project_id, 0), {sign}, {sign} * COALESCE({row}.total_price, 0))
+        ON CONFLICT (project_id) DO UPDATE SET
+            item_count = item_count + excluded.item_count,
+            total_price = total_price + excluded.total_price;
+        ''',
+        f'''
+        INSERT INTO agg_pricing_month (month, item_count, total_price)
+        VALUES ({_month(f"{row}.created_at")}, {sign}, {sign} * COALESCE({row}.total_price, 0))
+        ON CONFLICT (month) DO UPDATE SET
+            item_count = item_count + excluded.item_count,
+            total_price = total_price + excluded.total_price;
+        ''',
+    ]
+
+
+def _risk_statements(row, sign):
+    """عبارات تحديث ملخص المخاطر"""
+    return [
+        f'''
+        INSERT INTO agg_risk (category, probability, impact, risk_level, risk_count)
+        VALUES ({_value(f"{row}.category")}, {_value(f"{row}.probability")}, {_value(f"{row}.impact")},
+                {_value(f"{row}.risk_level")}, {sign})
+        ON CONFLICT (category, probability, impact, risk_level) DO UPDATE SET risk_count = risk_count + excluded.risk_count;
+        '''
+    ]
+
+
+def _report_statements(row, sign):
+    """عبارات تحديث ملخص التقارير"""
+    return [
+        f'''
+        INSERT INTO agg_report (report_type, status, report_count)
+        VALUES ({_value(f"{row}.report_type")}, {_value(f"{row}.status")}, {sign})
+        ON CONFLICT (report_type, status) DO UPDATE SET report_count = report_count + excluded.report_count;
+        '''
+    ]
+
+
+# الجداول الأصلية -> دالة توليد عبارات التحديث
+_SOURCES = {
+    "projects": _project_statements,
+    "pricing_items": _pricing_statements,
+    "risks": _risk_statements,
+    "reports": _report_statements,
+}
+
+# إعادة البناء الكاملة: الجدول التجميعي -> استعلام التجميع من الجدول الأصلي
+_REBUILD_QUERIES = {
+    "agg_project_status": f'''
+        SELECT {_value("status")}, COUNT(*), COALESCE(SUM(local_content), 0), COUNT(local_content)
+        FROM projects GROUP BY 1
+    ''',
+    "agg_project_month": f'''
+        SELECT {_month("created_at")}, {_value("status")}, COUNT(*) FROM projects GROUP BY 1, 2
+    ''',
+    "agg_project_dimension": f'''
+        SELECT 'type', {_value("project_type")}, COUNT(*) FROM projects GROUP BY 2
+        UNION ALL
+        SELECT 'location', {_value("location")}, COUNT(*) FROM projects GROUP BY 2
+        UNION ALL
+        SELECT 'client', {_value("client")}, COUNT(*) FROM projects GROUP BY 2
+    ''',
+    "agg_pricing_project": '''
+        SELECT COALESCE(project_id, 0), COUNT(*), COALESCE(SUM(total_price), 0) FROM pricing_items GROUP BY 1
+    ''',
+    "agg_pricing_month": f'''
+        SELECT {_month("created_at")}, COUNT(*), COALESCE(SUM(total_price), 0) FROM pricing_items GROUP BY 1
+    ''',
+    "agg_risk": f'''
+        SELECT {_value("category")}, {_value("probability")}, {_value("impact")}, {_value("risk_level")}, COUNT(*)
+        FROM risks GROUP BY 1, 2, 3, 4
+    ''',
+    "agg_report": f'''
+        SELECT {_value("report_type")}, {_value("status")}, COUNT(*) FROM reports GROUP BY 1, 2
+    ''',
+}
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+class ReportAggregates:
+    """ملخصات لوحة معلومات التقارير"""
+
+    def __init__(self, db_path):
+        """
+        تهيئة الملخصات وإنشاء الجداول والمشغلات إذا لم تكن موجودة
+
+        المعلمات:
+            db_path (str): مسار قاعدة بيانات النظام (التي أنشأها DatabaseConnector)
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._install()
+
+    def _install(self):
+        """إنشاء الجداول التجميعية والمشغلات، وبناء الملخصات عند إنشائها لأول مرة"""
+        with self._lock:
+            existing = {
+                row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            missing = [name for name in _SUMMARY_TABLES if name not in existing]
+
+            cursor = self.connection.cursor()
+            for name, (columns, key) in _SUMMARY_TABLES.items():
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} ({columns}, PRIMARY KEY ({key}))")
+
+            for source, statements in _SOURCES.items():
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{source}_agg_insert AFTER INSERT ON {source}
+                BEGIN {"".join(statements("NEW", 1))} END
+                ''')
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{source}_agg_delete AFTER DELETE ON {source}
+                BEGIN {"".join(statements("OLD", -1))} END
+                ''')
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{source}_agg_update AFTER UPDATE ON {source}
+                BEGIN {"".join(statements("OLD", -1) + statements("NEW", 1))} END
+                ''')
+
+            # فهرس أحدث المشاريع
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at)")
+            self.connection.commit()
+
+        if missing:
+            self.refresh(missing)
+
+    def refresh(self, tables=None):
+        """
+        إعادة بناء الملخصات بالكامل من الجداول الأصلية
+
+        المعلمات:
+            tables (list): أسماء الجداول التجميعية، أو None لجميعها
+        """
+        tables = tables or list(_SUMMARY_TABLES)
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                for name in tables:
+                    cursor.execute(f"DELETE FROM {name}")
+                    cursor.execute(f"INSERT INTO {name} {_REBUILD_QUERIES[name]}")
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في إعادة بناء ملخصات التقارير: {str(e)}")
+                self.connection.rollback()
+                raise
+        logger.info(f"تمت إعادة بناء {len(tables)} من ملخصات التقارير")
+
+    def _fetch_all(self, query, params=()):
+        with self._lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def project_totals(self):
+        """
+        مؤشرات المشاريع الرئيسية
+
+        العوائد:
+            dict: total, active, won, avg_local_content
+        """
+        active = _placeholders(ACTIVE_STATUSES)
+        won = _placeholders(WON_STATUSES)
+        row = self._fetch_all(f'''
+        SELECT
+            COALESCE(SUM(project_count), 0),
+            COALESCE(SUM(CASE WHEN status IN ({active}) THEN project_count END), 0),
+            COALESCE(SUM(CASE WHEN status IN ({won}) THEN project_count END), 0),
+            COALESCE(SUM(local_content_sum), 0),
+            COALESCE(SUM(local_content_count), 0)
+        FROM agg_project_status
+        ''', ACTIVE_STATUSES + WON_STATUSES)[0]
+
+        total, active_count, won_count, local_content_sum, local_content_count = row
+        return {
+            "total": total,
+            "active": active_count,
+            "won": won_count,
+            "avg_local_content": local_content_sum / local_content_count if local_content_count else 0.0
+        }
+
+    def status_counts(self):
+        """عدد المشاريع حسب الحالة"""
+        return self._fetch_all(
+            "SELECT status, project_count FROM agg_project_status WHERE project_count > 0 ORDER BY project_count DESC"
+        )
+
+    def monthly_counts(self, months=12):
+        """
+        اتجاه المشاريع الشهري
+
+        العوائد:
+            list: (الشهر، الجديدة، المقدمة، الفائزة) لآخر عدد من الأشهر
+        """
+        submitted = _placeholders(SUBMITTED_STATUSES)
+        won = _placeholders(WON_STATUSES)
+        rows = self._fetch_all(f'''
+        SELECT
+            month,
+            SUM(project_count),
+            SUM(CASE WHEN status IN ({submitted}) THEN project_count ELSE 0 END),
+            SUM(CASE WHEN status IN ({won}) THEN project_count ELSE 0 END)
+        FROM agg_project_month
+        GROUP BY month
+        HAVING SUM(project_count) > 0
+        ORDER BY month DESC
+        LIMIT ?
+        ''', SUBMITTED_STATUSES + WON_STATUSES + (months,))
+        return rows[::-1]
+
+    def dimension_counts(self, dimension, limit=10):
+        """عدد المشاريع حسب بعد (type أو location أو client)"""
+        return self._fetch_all('''
+        SELECT value, project_count FROM agg_project_dimension
+        WHERE dimension = ? AND project_count > 0
+        ORDER BY project_count DESC
+        LIMIT ?
+        ''', (dimension, limit))
+
+    def latest_projects(self, limit=5):
+        """أحدث المشاريع باستخدام فهرس تاريخ الإنشاء"""
+        return self._fetch_all('''
+        SELECT id, name, client, COALESCE(project_type, ?), status, substr(created_at, 1, 10)
+        FROM projects ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (UNSPECIFIED, limit))
+
+    @staticmethod
+    def _project_filters(statuses=None, exclude_statuses=None, ended_before=None):
+        """شرط WHERE ومعاملاته لفلاتر المشاريع"""
+        clauses = []
+        params = []
+        if statuses:
+            clauses.append(f"p.status IN ({_placeholders(statuses)})")
+            params.extend(statuses)
+        if exclude_statuses:
+            clauses.append(f"p.status NOT IN ({_placeholders(exclude_statuses)})")
+            params.extend(exclude_statuses)
+        if ended_before:
+            clauses.append("p.end_date < ?")
+            params.append(ended_before)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    @staticmethod
+    def _risk_filters(risk_levels=None, with_mitigation=None):
+        """شرط WHERE ومعاملاته لفلاتر المخاطر"""
+        clauses = []
+        params = []
+        if risk_levels:
+            clauses.append(f"r.risk_level IN ({_placeholders(risk_levels)})")
+            params.extend(risk_levels)
+        if with_mitigation is True:
+            clauses.append("COALESCE(TRIM(r.mitigation_strategy), '') <> ''")
+        elif with_mitigation is False:
+            clauses.append("COALESCE(TRIM(r.mitigation_strategy), '') = ''")
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def projects(self, statuses=None, exclude_statuses=None, ended_before=None, limit=200):
+        """
+        قائمة المشاريع مع إجمالي التسعير وعدد المخاطر
+
+        المعلمات:
+            statuses (tuple): الحالات المطلوبة فقط
+            exclude_statuses (tuple): الحالات المستبعدة
+            ended_before (str): تاريخ (YYYY-MM-DD) لانتهاء المشروع قبله
+            limit (int): الحد الأقصى لعدد المشاريع
+
+        العوائد:
+            list: (المعرف، الاسم، الجهة، النوع، الموقع، الحالة، البدء، الانتهاء، إجمالي التسعير، عدد المخاطر)
+        """
+        where, params = self._project_filters(statuses, exclude_statuses, ended_before)
+
+        return self._fetch_all(f'''
+        SELECT p.id, p.name, p.client, COALESCE(p.project_type, ?), COALESCE(p.location, ?), p.status,
+               p.start_date, p.end_date, COALESCE(a.total_price, 0),
+               (SELECT COUNT(*) FROM risks r WHERE r.project_id = p.id)
+        FROM projects p LEFT JOIN agg_pricing_project a ON a.project_id = p.id
+        {where}
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT ?
+        ''', [UNSPECIFIED, UNSPECIFIED] + params + [limit])
+
+    def count_projects(self, statuses=None, exclude_statuses=None, ended_before=None):
+        """عدد المشاريع المطابقة لفلاتر projects دون حد أقصى"""
+        where, params = self._project_filters(statuses, exclude_statuses, ended_before)
+        return self._fetch_all(f"SELECT COUNT(*) FROM projects p {where}", params)[0][0]
+
+    def risks(self, risk_levels=None, with_mitigation=None, limit=200):
+        """
+        قائمة المخاطر مع أسماء مشاريعها
+
+        العوائد:
+            list: (الاسم، المشروع، الفئة، الاحتمالية، التأثير، المستوى، استراتيجية التخفيف)
+        """
+        where, params = self._risk_filters(risk_levels, with_mitigation)
+
+        return self._fetch_all(f'''
+        SELECT r.name, COALESCE(p.name, ?), r.category, r.probability, r.impact, r.risk_level, r.mitigation_strategy
+        FROM risks r LEFT JOIN projects p ON p.id = r.project_id
+        {where}
+        ORDER BY r.created_at DESC, r.id DESC
+        LIMIT ?
+        ''', [UNSPECIFIED] + params + [limit])
+
+    def count_risks(self, risk_levels=None, with_mitigation=None):
+        """عدد المخاطر المطابقة لفلاتر risks دون حد أقصى"""
+        where, params = self._risk_filters(risk_levels, with_mitigation)
+        return self._fetch_all(f"SELECT COUNT(*) FROM risks r {where}", params)[0][0]
+
+    def pricing_by_project(self, limit=20):
+        """إجمالي التسعير لكل مشروع"""
+        return self._fetch_all('''
+        SELECT a.project_id, COALESCE(p.name, ?), a.item_count, a.total_price
+        FROM agg_pricing_project a LEFT JOIN projects p ON p.id = a.project_id
+        WHERE a.item_count > 0
+        ORDER BY a.total_price DESC
+        LIMIT ?
+        ''', (UNSPECIFIED, limit))
+
+    def pricing_totals(self):
+        """
+        مؤشرات التسعير لكل المشاريع المسعرة
+
+        العوائد:
+            dict: projects, items, total_price
+        """
+        projects, items, total_price = self._fetch_all('''
+        SELECT COUNT(*), COALESCE(SUM(item_count), 0), COALESCE(SUM(total_price), 0)
+        FROM agg_pricing_project WHERE item_count > 0
+        ''')[0]
+        return {"projects": projects, "items": items, "total_price": total_price}
+
+    def pricing_by_month(self, months=24):
+        """إجمالي التسعير الشهري"""
+        rows = self._fetch_all('''
+        SELECT month, item_count, total_price FROM agg_pricing_month
+        WHERE item_count > 0 ORDER BY month DESC LIMIT ?
+        ''', (months,))
+        return rows[::-1]
+
+    def risk_counts(self, group_by=("category", "risk_level")):
+        """
+        عدد المخاطر مجمعة حسب أعمدة
+
+        المعلمات:
+            group_by (tuple): أعمدة من category, probability, impact, risk_level
+        """
+        columns = [column for column in group_by if column in ("category", "probability", "impact", "risk_level")]
+        if not columns:
+            raise ValueError("لا توجد أعمدة تجميع صالحة")
+        column_list = ", ".join(columns)
+        return self._fetch_all(f'''
+        SELECT {column_list}, SUM(risk_count) FROM agg_risk
+        GROUP BY {column_list} HAVING SUM(risk_count) > 0
+        ORDER BY SUM(risk_count) DESC
+        ''')
+
+    def report_counts(self):
+        """عدد التقارير حسب النوع والحالة"""
+        return self._fetch_all(
+            "SELECT report_type, status, report_count FROM agg_report WHERE report_count > 0 ORDER BY report_count DESC"
+        )
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,361 @@
+"""
+منشئ التقارير المخصصة - تحويل الحقول والفلاتر المختارة إلى استعلام SQL واحد
+
+يصف المستخدم التقرير بخطة (حقول، فلاتر، ترتيب) تترجم إلى استعلام SQL
+بمعاملات، تطبق فيه الفلاتر والترتيب والترقيم داخل قاعدة البيانات. تقرأ
+النتائج على دفعات عند التصدير إلى Excel دون تحميلها كاملة في الذاكرة، وتحفظ
+التقارير مع خطتها المترجمة، وتخزن النتائج مؤقتاً بحسب إصدار البيانات.
+"""
+
+import io
+import json
+import sqlite3
+import hashlib
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+import openpyxl
+
+logger = logging.getLogger('tender_system.reports')
+
+# الحقول المتاحة: الاسم المعروض -> تعبير SQL على جدول المشاريع p وملخص التسعير a
+REPORT_FIELDS = OrderedDict([
+    ("رقم المشروع", "p.id"),
+    ("اسم المشروع", "p.name"),
+    ("نوع المشروع", "p.project_type"),
+    ("حالة المشروع", "p.status"),
+    ("تاريخ البدء", "p.start_date"),
+    ("تاريخ الانتهاء", "p.end_date"),
+    ("الميزانية", "COALESCE(a.total_price, 0)"),
+    ("المخاطر", "(SELECT COUNT(*) FROM risks r WHERE r.project_id = p.id)"),
+    ("الموقع", "p.location"),
+    ("المالك", "p.client"),
+])
+
+# الفلاتر المتاحة: الاسم المعروض -> الحقل الذي تطبق عليه
+REPORT_FILTERS = OrderedDict([
+    ("نوع المشروع", "نوع المشروع"),
+    ("حالة المشروع", "حالة المشروع"),
+    ("الفترة الزمنية", "تاريخ البدء"),
+    ("الميزانية", "الميزانية"),
+    ("الموقع", "الموقع"),
+    ("المالك", "المالك"),
+])
+
+_OPERATORS = {
+    "eq": lambda expression: (f"{expression} = ?", 1),
+    "gte": lambda expression: (f"{expression} >= ?", 1),
+    "lte": lambda expression: (f"{expression} <= ?", 1),
+    "between": lambda expression: (f"{expression} BETWEEN ? AND ?", 2),
+    "contains": lambda expression: (f"{expression} LIKE '%' || ? || '%'", 1),
+}
+
+_FROM = "FROM projects p LEFT JOIN agg_pricing_project a ON a.project_id = p.id"
+
+
+class ReportPlan:
+    """خطة تقرير مخصص: الحقول والفلاتر والترتيب"""
+
+    def __init__(self, fields, filters=None, sort_by=None, descending=False):
+        """
+        تهيئة الخطة
+
+        المعلمات:
+            fields (list): أسماء الحقول من REPORT_FIELDS
+            filters (list): قائمة (الحقل، العملية، القيمة) حيث العملية من
+                eq, in, gte, lte, between, contains
+            sort_by (str): حقل الترتيب
+            descending (bool): ترتيب تنازلي
+        """
+        unknown = [field for field in fields if field not in REPORT_FIELDS]
+        if not fields or unknown:
+            raise ValueError(f"حقول التقرير غير صالحة: {unknown or fields}")
+
+        self.fields = list(fields)
+        self.filters = [(field, operator, _normalize_value(value)) for field, operator, value in (filters or [])]
+        self.sort_by = sort_by
+        self.descending = bool(descending)
+
+        for field, operator, _ in self.filters:
+            if field not in REPORT_FIELDS:
+                raise ValueError(f"حقل الفلتر غير معروف: {field}")
+            if operator != "in" and operator not in _OPERATORS:
+                raise ValueError(f"عملية الفلتر غير معروفة: {operator}")
+
+        if sort_by is not None and sort_by not in REPORT_FIELDS:
+            raise ValueError(f"حقل الترتيب غير معروف: {sort_by}")
+
+    def to_dict(self):
+        """تحويل الخطة إلى قاموس قابل للحفظ"""
+        return {
+            "fields": self.fields,
+            "filters": [list(item) for item in self.filters],
+            "sort_by": self.sort_by,
+            "descending": self.descending
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """إنشاء خطة من قاموس محفوظ"""
+        return cls(data["fields"], data.get("filters"), data.get("sort_by"), data.get("descending", False))
+
+    def key(self):
+        """مفتاح ثابت للخطة يستخدم في التخزين المؤقت"""
+        return hashlib.sha1(json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def compile(self):
+        """
+        ترجمة الخطة إلى استعلامات SQL بمعاملات
+
+        العوائد:
+            dict: {"sql": استعلام البيانات مرتباً، "count_sql": استعلام العدد، "params": المعاملات، "columns": الأعمدة}
+        """
+        select = ", ".join(f'{REPORT_FIELDS[field]} AS "{field}"' for field in self.fields)
+
+        clauses = []
+        params = []
+        for field, operator, value in self.filters:
+            expression = REPORT_FIELDS[field]
+            if operator == "in":
+                values = list(value)
+                if not values:
+                    continue
+                clauses.append(f"{expression} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clause, arity = _OPERATORS[operator](expression)
+                values = list(value) if arity > 1 else [value]
+                if len(values) != arity:
+                    raise ValueError(f"عدد قيم الفلتر {field} غير صحيح")
+                clauses.append(clause)
+                params.extend(values)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        sort_expression = REPORT_FIELDS[self.sort_by] if self.sort_by else "p.id"
+        direction = "DESC" if self.descending else "ASC"
+
+        return {
+            "sql": f"SELECT {select} {_FROM}{where} ORDER BY {sort_expression} {direction}, p.id {direction}",
+            "count_sql": f"SELECT COUNT(*) {_FROM}{where}",
+            "params": params,
+            "columns": list(self.fields)
+        }
+
+
+def _normalize_value(value):
+    """تحويل قيم الفلاتر إلى صيغة قابلة للحفظ (التواريخ إلى نص ISO قابل للمقارنة)"""
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class ReportEngine:
+    """محرك تنفيذ التقارير المخصصة وحفظها"""
+
+    def __init__(self, db_path, cache_size=64):
+        """
+        تهيئة المحرك
+
+        المعلمات:
+            db_path (str): مسار قاعدة بيانات النظام
+            cache_size (int): عدد صفحات النتائج المخزنة مؤقتاً
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جدول التقارير المحفوظة"""
+        with self._lock:
+            self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS saved_reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                plan TEXT NOT NULL,
+                compiled_sql TEXT NOT NULL,
+                count_sql TEXT NOT NULL,
+                params TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_run TIMESTAMP
+            )
+            ''')
+            self.connection.commit()
+
+    def data_version(self):
+        """
+        إصدار البيانات الحالي
+
+        تتغير قيمة PRAGMA data_version كلما ثبتت معاملة من اتصال آخر بقاعدة
+        البيانات، فتصبح النتائج المخزنة مؤقتاً قديمة تلقائياً.
+        """
+        with self._lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def run(self, plan, page=1, page_size=50, compiled=None):
+        """
+        تنفيذ صفحة من التقرير
+
+        المعلمات:
+            plan (ReportPlan): خطة التقرير
+            page (int): رقم الصفحة (يبدأ من 1)
+            page_size (int): عدد الصفوف في الصفحة
+            compiled (dict): خطة مترجمة محفوظة (اختياري)
+
+        العوائد:
+            dict: {"columns": الأعمدة، "rows": الصفوف، "total": إجمالي الصفوف، "cached": من الذاكرة المؤقتة}
+        """
+        compiled = compiled or plan.compile()
+        offset = max(0, page - 1) * page_size
+        cache_key = (plan.key(), offset, page_size, self.data_version())
+
+        with self._lock:
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                return dict(self._cache[cache_key], cached=True)
+
+            rows = self.connection.execute(
+                f"{compiled['sql']} LIMIT ? OFFSET ?", list(compiled["params"]) + [page_size, offset]
+            ).fetchall()
+            total = self.connection.execute(compiled["count_sql"], compiled["params"]).fetchone()[0]
+
+            result = {"columns": compiled["columns"], "rows": rows, "total": total}
+            self._cache[cache_key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return dict(result, cached=False)
+
+    def iter_rows(self, plan, chunk_size=1000, compiled=None):
+        """
+        قراءة جميع صفوف التقرير على دفعات
+
+        يستخدم اتصالاً مستقلاً حتى لا يحجز قفل المحرك أثناء التصدير الطويل.
+        """
+        compiled = compiled or plan.compile()
+        connection = sqlite3.connect(self.db_path)
+        try:
+            cursor = connection.execute(compiled["sql"], compiled["params"])
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            connection.close()
+
+    def export_excel(self, plan, output=None, sheet_name="التقرير", compiled=None):
+        """
+        تصدير التقرير إلى ملف Excel بالكتابة المتدفقة
+
+        المعلمات:
+            plan (ReportPlan): خطة التقرير
+            output (str|file): مسار الملف أو كائن ملف، أو None لإرجاع البايتات
+
+        العوائد:
+            int|bytes: عدد الصفوف المكتوبة، أو محتوى الملف إذا لم يحدد output
+        """
+        compiled = compiled or plan.compile()
+        buffer = io.BytesIO() if output is None else output
+        count = write_excel_rows(compiled["columns"], self.iter_rows(plan, compiled=compiled), buffer, sheet_name)
+        return buffer.getvalue() if output is None else count
+
+    def save(self, name, plan, description=""):
+        """
+        حفظ تقرير مع خطته المترجمة
+
+        العوائد:
+            int: معرف التقرير المحفوظ
+        """
+        compiled = plan.compile()
+        with self._lock:
+            cursor = self.connection.execute('''
+            INSERT INTO saved_reports (name, description, plan, compiled_sql, count_sql, params)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                name,
+                description,
+                json.dumps(plan.to_dict(), ensure_ascii=False),
+                compiled["sql"],
+                compiled["count_sql"],
+                json.dumps(compiled["params"], ensure_ascii=False)
+            ))
+            self.connection.commit()
+            return cursor.lastrowid
+
+    def list_saved(self):
+        """قائمة التقارير المحفوظة"""
+        with self._lock:
+            return self.connection.execute('''
+            SELECT id, name, description, substr(created_at, 1, 10), substr(last_run, 1, 16)
+            FROM saved_reports ORDER BY id DESC
+            ''').fetchall()
+
+    def load_saved(self, report_id):
+        """
+        تحميل تقرير محفوظ
+
+        العوائد:
+            tuple: (الاسم، الخطة، الخطة المترجمة) أو None
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT name, plan, compiled_sql, count_sql, params FROM saved_reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE saved_reports SET last_run = ? WHERE id = ?",
+                (datetime.datetime.now().isoformat(sep=" ", timespec="seconds"), report_id)
+            )
+            self.connection.commit()
+
+        name, plan_json, sql, count_sql, params = row
+        plan = ReportPlan.from_dict(json.loads(plan_json))
+        compiled = {"sql": sql, "count_sql": count_sql, "params": json.loads(params), "columns": plan.fields}
+        return name, plan, compiled
+
+    def delete_saved(self, report_id):
+        """حذف تقرير محفوظ"""
+        with self._lock:
+            self.connection.execute("DELETE FROM saved_reports WHERE id = ?", (report_id,))
+            self.connection.commit()
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            self.connection.close()
+
+
+def write_excel_rows(columns, rows, output, sheet_name="التقرير"):
+    """
+    كتابة صفوف إلى ملف Excel بوضع الكتابة فقط دون الاحتفاظ بها في الذاكرة
+
+    المعلمات:
+        columns (list): عناوين الأعمدة
+        rows (iterable): الصفوف
+        output (str|file): مسار الملف أو كائن ملف
+
+    العوائد:
+        int: عدد الصفوف المكتوبة
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.sheet_view.rightToLeft = True
+    sheet.append(list(columns))
+
+    count = 0
+    for row in rows:
+        sheet.append(list(row))
+        count += 1
+
+    workbook.save(output)
+    return count
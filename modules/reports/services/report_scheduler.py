@@ -0,0 +1,614 @@
+"""
+مجدول التقارير - توليد التقارير الدورية في الخلفية وحفظ ملفاتها
+
+تحفظ مهام التقارير وجداولها (بصيغة cron) في قاعدة البيانات، ويضيف خيط
+الجدولة تشغيلاً جديداً إلى الطابور عند حلول موعد كل مهمة. تنفذ مجموعة من
+العمال التشغيلات المنتظرة وتكتب ملفات PDF أو Excel في مجلد التقارير، ثم
+تحذف الملفات القديمة وفق سياسة الاحتفاظ. لا تحتاج الواجهة إلا إلى عرض
+الملفات الجاهزة وتنزيلها.
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+
+from modules.reports.services.report_builder import write_excel_rows
+
+logger = logging.getLogger('tender_system.reports')
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+    ARABIC_SHAPING_AVAILABLE = True
+except ImportError:
+    ARABIC_SHAPING_AVAILABLE = False
+    logger.warning("لم يتم العثور على مكتبتي arabic_reshaper و python-bidi. ستظهر النصوص العربية في ملفات PDF دون تشكيل.")
+
+REPORT_FORMATS = {"pdf": "pdf", "excel": "xlsx"}
+
+# اختصارات الجداول الشائعة
+SCHEDULE_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 6 * * *",
+    "@weekly": "0 7 * * 0",
+    "@monthly": "0 7 1 * *",
+}
+
+_CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+)
+
+
+class CronSchedule:
+    """جدول زمني بصيغة cron: الدقيقة الساعة اليوم الشهر يوم-الأسبوع"""
+
+    def __init__(self, expression):
+        """
+        تحليل تعبير الجدول
+
+        المعلمات:
+            expression (str): خمسة حقول تدعم * والقوائم والمدى والخطوة مثل
+                "0 7 * * 0" أو "*/15 8-17 * * 1-5"، أو أحد اختصارات SCHEDULE_ALIASES
+        """
+        self.expression = expression.strip()
+        parts = SCHEDULE_ALIASES.get(self.expression, self.expression).split()
+        if len(parts) != len(_CRON_FIELDS):
+            raise ValueError(f"تعبير الجدول غير صالح: {expression}")
+
+        values = {}
+        for part, (name, low, high) in zip(parts, _CRON_FIELDS):
+            values[name] = _parse_cron_field(part, low, high)
+
+        self.minutes = values["minute"]
+        self.hours = values["hour"]
+        self.days = values["day"]
+        self.months = values["month"]
+        # الأحد = 0 أو 7 كما في cron
+        self.weekdays = {day % 7 for day in values["weekday"]}
+        # عند تقييد اليوم ويوم الأسبوع معاً يكفي تطابق أحدهما كما في cron
+        self._day_restricted = parts[2] != "*"
+        self._weekday_restricted = parts[4] != "*"
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """
+        أول موعد بعد لحظة معينة
+
+        المعلمات:
+            moment (datetime): اللحظة المرجعية
+
+        العوائد:
+            datetime: الموعد التالي (بدقة الدقيقة)
+        """
+        candidate = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = candidate + datetime.timedelta(days=366 * 5)
+
+        # القفز إلى الشهر أو اليوم أو الساعة التالية بدلاً من المرور على كل دقيقة
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + datetime.timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"لا يوجد موعد قادم للجدول: {self.expression}")
+
+
+def _parse_cron_field(part, low, high):
+    """تحويل حقل cron إلى مجموعة القيم المسموح بها"""
+    values = set()
+    for item in part.split(","):
+        range_part, _, step = item.partition("/")
+        step = int(step) if step else 1
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start, end = (int(value) for value in range_part.split("-", 1))
+        else:
+            start = int(range_part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"قيمة خارج المدى في حقل الجدول: {item}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class ReportScheduler:
+    """مجدول توليد التقارير في الخلفية"""
+
+    def __init__(self, engine, output_dir, retention_days=30, keep_per_job=10, max_workers=2, clock=None):
+        """
+        تهيئة المجدول
+
+        المعلمات:
+            engine (ReportEngine): محرك التقارير المخصصة (مصدر التقارير المحفوظة)
+            output_dir (str): مجلد ملفات التقارير المولدة
+            retention_days (int): عدد أيام الاحتفاظ بالملفات
+            keep_per_job (int): أقصى عدد من الملفات لكل مهمة
+            max_workers (int): عدد عمال التوليد المتزامنين
+            clock (callable): دالة الوقت الحالي (للاختبار)
+        """
+        self.engine = engine
+        self.output_dir = output_dir
+        self.retention_days = retention_days
+        self.keep_per_job = keep_per_job
+        self.max_workers = max_workers
+        self.clock = clock or datetime.datetime.now
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._stopped = True
+        self._thread = None
+        self._executor = None
+        self._last_purge = None
+
+        self.connection = sqlite3.connect(engine.db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جداول المهام والتشغيلات"""
+        with self._lock:
+            self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS report_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                saved_report_id INTEGER NOT NULL,
+                format TEXT NOT NULL,
+                schedule TEXT NOT NULL,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                next_run_at TIMESTAMP,
+                last_run_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS report_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                requested_at TIMESTAMP NOT NULL,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                artifact_path TEXT,
+                file_size INTEGER,
+                row_count INTEGER,
+                error TEXT
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_report_jobs_due ON report_jobs (enabled, next_run_at);
+            CREATE INDEX IF NOT EXISTS idx_report_runs_status ON report_runs (status, id);
+            CREATE INDEX IF NOT EXISTS idx_report_runs_job ON report_runs (job_id, finished_at);
+            ''')
+            self.connection.commit()
+
+    def add_job(self, name, saved_report_id, schedule, report_format="pdf"):
+        """
+        إضافة مهمة تقرير مجدولة
+
+        المعلمات:
+            name (str): اسم المهمة
+            saved_report_id (int): معرف التقرير المحفوظ في ReportEngine
+            schedule (str): تعبير cron للجدول
+            report_format (str): pdf أو excel
+
+        العوائد:
+            int: معرف المهمة
+        """
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"صيغة التقرير غير مدعومة: {report_format}")
+        next_run_at = CronSchedule(schedule).next_after(self.clock())
+
+        with self._condition:
+            cursor = self.connection.execute('''
+            INSERT INTO report_jobs (name, saved_report_id, format, schedule, next_run_at)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (name, saved_report_id, report_format, schedule.strip(), _to_iso(next_run_at)))
+            self.connection.commit()
+            self._condition.notify_all()
+            return cursor.lastrowid
+
+    def jobs(self):
+        """قائمة المهام المجدولة"""
+        with self._lock:
+            return [dict(row) for row in self.connection.execute("SELECT * FROM report_jobs ORDER BY id")]
+
+    def set_enabled(self, job_id, enabled):
+        """تفعيل مهمة أو إيقافها مع إعادة حساب موعدها التالي"""
+        with self._condition:
+            row = self.connection.execute("SELECT schedule FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            next_run_at = _to_iso(CronSchedule(row["schedule"]).next_after(self.clock())) if enabled else None
+            self.connection.execute(
+                "UPDATE report_jobs SET enabled = ?, next_run_at = ? WHERE id = ?", (int(bool(enabled)), next_run_at, job_id)
+            )
+            self.connection.commit()
+            self._condition.notify_all()
+
+    def remove_job(self, job_id):
+        """حذف مهمة وتشغيلاتها المنتظرة (تبقى الملفات المولدة حتى تنتهي مدة الاحتفاظ)"""
+        with self._lock:
+            self.connection.execute("DELETE FROM report_runs WHERE job_id = ? AND status = 'queued'", (job_id,))
+            self.connection.execute("DELETE FROM report_jobs WHERE id = ?", (job_id,))
+            self.connection.commit()
+
+    def request_run(self, job_id):
+        """
+        طلب تشغيل فوري لمهمة دون انتظار التوليد
+
+        العوائد:
+            int: معرف التشغيل في الطابور
+        """
+        with self._condition:
+            cursor = self.connection.execute(
+                "INSERT INTO report_runs (job_id, requested_at) VALUES (?, ?)", (job_id, _to_iso(self.clock()))
+            )
+            self.connection.commit()
+            self._condition.notify_all()
+            return cursor.lastrowid
+
+    def enqueue_due(self, now=None):
+        """
+        إضافة تشغيلات المهام التي حل موعدها إلى الطابور
+
+        إذا كان للمهمة تشغيل منتظر أو جارٍ يدمج الموعد معه ولا يضاف تشغيل جديد،
+        ويحسب الموعد التالي بعد الوقت الحالي فلا تتراكم التشغيلات الفائتة أثناء
+        توقف النظام.
+
+        العوائد:
+            list: معرفات التشغيلات المضافة
+        """
+        now = now or self.clock()
+        run_ids = []
+        with self._condition:
+            due = self.connection.execute('''
+            SELECT j.id, j.schedule, EXISTS (
+                SELECT 1 FROM report_runs r WHERE r.job_id = j.id AND r.status IN ('queued', 'running')
+            ) AS active
+            FROM report_jobs j
+            WHERE j.enabled = 1 AND j.next_run_at <= ?
+            ''', (_to_iso(now),)).fetchall()
+
+            for job in due:
+                if not job["active"]:
+                    cursor = self.connection.execute(
+                        "INSERT INTO report_runs (job_id, requested_at) VALUES (?, ?)", (job["id"], _to_iso(now))
+                    )
+                    run_ids.append(cursor.lastrowid)
+                self.connection.execute(
+                    "UPDATE report_jobs SET next_run_at = ? WHERE id = ?",
+                    (_to_iso(CronSchedule(job["schedule"]).next_after(now)), job["id"])
+                )
+            self.connection.commit()
+        return run_ids
+
+    def _claim_queued(self):
+        """حجز التشغيلات المنتظرة لتنفيذها"""
+        with self._lock:
+            run_ids = [row[0] for row in self.connection.execute(
+                "SELECT id FROM report_runs WHERE status = 'queued' ORDER BY id"
+            )]
+            claimed = []
+            for run_id in run_ids:
+                cursor = self.connection.execute(
+                    "UPDATE report_runs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                    (_to_iso(self.clock()), run_id)
+                )
+                if cursor.rowcount:
+                    claimed.append(run_id)
+            self.connection.commit()
+            return claimed
+
+    def run_pending(self):
+        """
+        تنفيذ جميع التشغيلات المنتظرة في الخيط الحالي
+
+        العوائد:
+            list: معرفات التشغيلات المنفذة
+        """
+        run_ids = self._claim_queued()
+        for run_id in run_ids:
+            self._execute(run_id)
+        return run_ids
+
+    def _execute(self, run_id):
+        """توليد ملف تشغيل واحد وتسجيل نتيجته"""
+        with self._lock:
+            run = self.connection.execute('''
+            SELECT r.id, j.id AS job_id, j.name, j.saved_report_id, j.format
+            FROM report_runs r JOIN report_jobs j ON j.id = r.job_id WHERE r.id = ?
+            ''', (run_id,)).fetchone()
+
+        if run is None:
+            self._finish(run_id, "failed", error="المهمة محذوفة")
+            return
+
+        temp_path = None
+        try:
+            loaded = self.engine.load_saved(run["saved_report_id"])
+            if loaded is None:
+                raise ValueError("التقرير المحفوظ غير موجود")
+            title, plan, compiled = loaded
+
+            started = self.clock()
+            file_name = f"{run['job_id']}_{_safe_name(run['name'])}_{started:%Y%m%d_%H%M%S}_{run_id}.{REPORT_FORMATS[run['format']]}"
+            path = os.path.join(self.output_dir, file_name)
+            temp_path = path + ".part"
+
+            rows = self.engine.iter_rows(plan, compiled=compiled)
+            subtitle = started.strftime("%Y-%m-%d %H:%M")
+            with open(temp_path, "wb") as output:
+                if run["format"] == "pdf":
+                    row_count = write_pdf_rows(compiled["columns"], rows, output, title=f"{run['name']} - {subtitle}")
+                else:
+                    row_count = write_excel_rows(compiled["columns"], rows, output)
+
+            # لا يظهر الملف في قائمة الملفات الجاهزة إلا بعد اكتمال كتابته
+            os.replace(temp_path, path)
+            self._finish(run_id, "done", path=path, row_count=row_count, job_id=run["job_id"])
+            logger.info(f"تم توليد التقرير المجدول {run['name']}: {path}")
+
+        except Exception as e:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.error(f"خطأ في توليد التقرير المجدول {run['name']}: {str(e)}")
+            self._finish(run_id, "failed", error=str(e), job_id=run["job_id"])
+
+    def _finish(self, run_id, status, path=None, row_count=None, error=None, job_id=None):
+        """تسجيل انتهاء التشغيل"""
+        finished_at = _to_iso(self.clock())
+        with self._lock:
+            self.connection.execute('''
+            UPDATE report_runs SET status = ?, finished_at = ?, artifact_path = ?, file_size = ?, row_count = ?, error = ?
+            WHERE id = ?
+            ''', (status, finished_at, path, os.path.getsize(path) if path else None, row_count, error, run_id))
+            if job_id is not None:
+                self.connection.execute("UPDATE report_jobs SET last_run_at = ? WHERE id = ?", (finished_at, job_id))
+            self.connection.commit()
+
+    def runs(self, job_id=None, statuses=None, limit=100):
+        """
+        قائمة التشغيلات الأحدث أولاً
+
+        المعلمات:
+            job_id (int): تصفية حسب المهمة
+            statuses (list): تصفية حسب الحالة (queued, running, done, failed)
+            limit (int): أقصى عدد
+        """
+        clauses = []
+        params = []
+        if job_id is not None:
+            clauses.append("r.job_id = ?")
+            params.append(job_id)
+        if statuses:
+            clauses.append(f"r.status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(f'''
+            SELECT r.*, j.name AS job_name, j.format FROM report_runs r
+            LEFT JOIN report_jobs j ON j.id = r.job_id
+            {where} ORDER BY r.id DESC LIMIT ?
+            ''', params + [limit])]
+
+    def artifacts(self, job_id=None, limit=100):
+        """الملفات الجاهزة للتنزيل"""
+        return [run for run in self.runs(job_id, ["done"], limit) if os.path.exists(run["artifact_path"])]
+
+    def purge(self, now=None):
+        """
+        حذف الملفات التي تجاوزت مدة الاحتفاظ أو العدد الأقصى لكل مهمة
+
+        العوائد:
+            int: عدد التشغيلات المحذوفة
+        """
+        now = now or self.clock()
+        cutoff = _to_iso(now - datetime.timedelta(days=self.retention_days))
+        with self._lock:
+            expired = self.connection.execute('''
+            SELECT id, artifact_path FROM report_runs
+            WHERE status IN ('done', 'failed') AND (
+                finished_at < ?
+                OR id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY job_id ORDER BY finished_at DESC, id DESC) AS position
+                        FROM report_runs WHERE status = 'done'
+                    ) WHERE position > ?
+                )
+            )
+            ''', (cutoff, self.keep_per_job)).fetchall()
+
+            for run in expired:
+                if run["artifact_path"] and os.path.exists(run["artifact_path"]):
+                    os.remove(run["artifact_path"])
+            self.connection.executemany("DELETE FROM report_runs WHERE id = ?", [(run["id"],) for run in expired])
+            self.connection.commit()
+            self._last_purge = now
+
+        return len(expired)
+
+    def _next_run_at(self):
+        """أقرب موعد لمهمة مفعلة"""
+        row = self.connection.execute(
+            "SELECT MIN(next_run_at) FROM report_jobs WHERE enabled = 1 AND next_run_at IS NOT NULL"
+        ).fetchone()
+        return _from_iso(row[0]) if row[0] else None
+
+    def start(self):
+        """تشغيل خيط الجدولة ومجموعة العمال"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # إعادة التشغيلات التي انقطعت بإغلاق النظام إلى الطابور
+            self.connection.execute("UPDATE report_runs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            self.connection.commit()
+
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="report-worker")
+            self._thread = threading.Thread(target=self._run, name="report-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """إيقاف خيط الجدولة وانتظار انتهاء العمال"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self):
+        """حلقة خيط الجدولة"""
+        while True:
+            try:
+                now = self.clock()
+                self.enqueue_due(now)
+                for run_id in self._claim_queued():
+                    self._executor.submit(self._execute, run_id)
+                if self._last_purge is None or now - self._last_purge >= datetime.timedelta(hours=1):
+                    self.purge(now)
+            except Exception as e:
+                logger.error(f"خطأ في مجدول التقارير: {str(e)}")
+
+            with self._condition:
+                if self._stopped:
+                    return
+                next_run_at = self._next_run_at()
+                # الانتظار حتى الموعد التالي أو طلب تشغيل جديد، مع الاستيقاظ كل ساعة للتنظيف
+                delay = 3600 if next_run_at is None else (next_run_at - self.clock()).total_seconds()
+                if delay > 0:
+                    self._condition.wait(min(delay, 3600))
+                if self._stopped:
+                    return
+
+    def close(self):
+        """إيقاف المجدول وإغلاق الاتصال"""
+        self.stop()
+        with self._lock:
+            self.connection.close()
+
+
+def write_pdf_rows(columns, rows, output, title="", rows_per_page=30):
+    """
+    كتابة صفوف تقرير إلى ملف PDF صفحة بعد صفحة
+
+    المعلمات:
+        columns (list): عناوين الأعمدة
+        rows (iterable): الصفوف
+        output (str|file): مسار الملف أو كائن ملف
+        title (str): عنوان يظهر أعلى كل صفحة
+        rows_per_page (int): عدد الصفوف في الصفحة
+
+    العوائد:
+        int: عدد الصفوف المكتوبة
+    """
+    # ترتيب الأعمدة من اليمين إلى اليسار
+    header = [_shape(column) for column in reversed(columns)]
+    count = 0
+    page = []
+
+    with PdfPages(output) as pdf:
+        def flush(page_number):
+            figure = Figure(figsize=(11.69, 8.27))
+            figure.suptitle(f"{_shape(title)}  ({page_number})", fontsize=12)
+            axes = figure.add_subplot()
+            axes.axis("off")
+            table = axes.table(cellText=page or [[""] * len(header)], colLabels=header, loc="upper center", cellLoc="center")
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            table.scale(1, 1.3)
+            pdf.savefig(figure)
+
+        page_number = 1
+        for row in rows:
+            page.append([_shape(_format_cell(value)) for value in reversed(row)])
+            count += 1
+            if len(page) == rows_per_page:
+                flush(page_number)
+                page = []
+                page_number += 1
+
+        if page or count == 0:
+            flush(page_number)
+
+    return count
+
+
+def _format_cell(value):
+    """تنسيق قيمة خلية للعرض"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _shape(text):
+    """تشكيل النص العربي وترتيبه للعرض في matplotlib إن توفرت المكتبات"""
+    if ARABIC_SHAPING_AVAILABLE and text:
+        return get_display(arabic_reshaper.reshape(text))
+    return text
+
+
+def _safe_name(name):
+    """اسم صالح للاستخدام في اسم ملف"""
+    return re.sub(r"[^\w\-]+", "_", name).strip("_")[:60] or "report"
+
+
+def _to_iso(value):
+    """تحويل التاريخ إلى نص ISO قابل للمقارنة"""
+    return value.isoformat(sep=" ", timespec="seconds") if value else None
+
+
+def _from_iso(value):
+    """تحويل نص ISO إلى تاريخ"""
+    return datetime.datetime.fromisoformat(value)
+
+
+def create_report_scheduler(engine, reports_config):
+    """
+    إنشاء مجدول التقارير من إعدادات التقارير في AppConfig
+
+    المعلمات:
+        engine (ReportEngine): محرك التقارير المخصصة
+        reports_config (dict): ناتج AppConfig.get_reports_config()
+
+    العوائد:
+        ReportScheduler: المجدول (غير مشغل)
+    """
+    return ReportScheduler(
+        engine,
+        reports_config["default_path"],
+        retention_days=reports_config.get("retention_days", 30),
+        keep_per_job=reports_config.get("keep_per_job", 10),
+        max_workers=reports_config.get("scheduler_workers", 2)
+    )
@@ -16,6 +16,11 @@ import json
 import base64
 from pathlib import Path
 
+from modules.resources.services.resource_leveling import ResourceLeveler, allocations_frame, schedule_tasks, schedule_task_links
+
+# السعة اليومية الافتراضية لكل مورد حسب نوعه (عدد الوحدات المتاحة من الفريق أو الأسطول)
+DEFAULT_CAPACITY = {"موظف": 10, "معدة": 10}
+
 class ResourcesApp:
     """وحدة الموارد"""
 
@@ -402,7 +407,115 @@ class ResourcesApp:
         pass
 
     def _render_resource_planning_tab(self):
-        """عرض تبويب تخطيط الموارد"""
+        """عرض تبويب تخطيط الموارد: كشف تجاوز السعة وتسوية الموارد عبر المشاريع"""
         st.markdown("### تخطيط الموارد")
-        # إضافة محتوى تبويب تخطيط الموارد هنا ...
-        pass
\ No newline at end of file
+
+        allocations = st.session_state.resources_data["allocations"]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            employee_capacity = st.number_input("السعة اليومية لكل مورد بشري", min_value=1,
+                                                value=DEFAULT_CAPACITY["موظف"], key="leveling_employee_capacity")
+        with col2:
+            equipment_capacity = st.number_input("السعة اليومية لكل معدة", min_value=1,
+                                                 value=DEFAULT_CAPACITY["معدة"], key="leveling_equipment_capacity")
+        with col3:
+            schedule_capacity = st.number_input("سعة موارد الجداول الزمنية", min_value=1, value=1,
+                                                key="leveling_schedule_capacity",
+                                                help="السعة اليومية لكل مورد مذكور في عمود الموارد بالجداول الزمنية")
+
+        tasks = allocations_frame(allocations)
+        capacity = {resource: employee_capacity if resource_type == "موظف" else equipment_capacity
+                    for resource, resource_type in zip(tasks["resource"], tasks["resource_type"])}
+
+        try:
+            links = []
+            if st.checkbox("تضمين موارد الجداول الزمنية للمشاريع", key="leveling_include_schedules"):
+                projects = [project for project in st.session_state.get("saved_pricing", []) if project.get("schedule_items")]
+                scheduled = [schedule_tasks(project["project_name"], project["schedule_items"]) for project in projects]
+                tasks = pd.concat([tasks] + scheduled, ignore_index=True)
+                # علاقات الاعتمادية تمنع تقديم نشاط لاحق على تأخير سابقه أثناء التسوية
+                links = [link for project in projects
+                         for link in schedule_task_links(project["project_name"], project["schedule_items"])]
+
+            leveler = ResourceLeveler(tasks, capacity, default_capacity=schedule_capacity, links=links)
+        except ValueError as e:
+            st.warning(str(e))
+            return
+
+        conflicts = leveler.conflicts()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("الموارد", len(leveler.resources))
+        with col2:
+            st.metric("التخصيصات", len(tasks))
+        with col3:
+            st.metric("فترات تجاوز السعة", len(conflicts))
+        with col4:
+            st.metric("موارد متجاوزة للسعة", conflicts["resource"].nunique())
+
+        if not conflicts.empty:
+            st.markdown("#### تعارضات الموارد")
+            st.dataframe(
+                conflicts.rename(columns={
+                    "resource": "المورد", "start": "من", "finish": "إلى", "days": "الأيام",
+                    "peak": "أعلى استخدام", "capacity": "السعة", "excess": "التجاوز"
+                }),
+                use_container_width=True, hide_index=True
+            )
+
+        result = st.session_state.get("resource_leveling")
+        if st.button("تسوية الموارد", key="level_resources"):
+            result = leveler.level()
+            st.session_state.resource_leveling = result
+        if result is not None and len(result["schedule"]) != len(tasks):
+            result = None
+
+        resources = list(leveler.resources)
+        default = resources.index(conflicts["resource"].iloc[0]) if not conflicts.empty else 0
+        resource = st.selectbox("عرض استخدام المورد", resources, index=default, key="leveling_resource")
+        row = resources.index(resource)
+        dates = leveler.origin + pd.to_timedelta(np.arange(leveler.horizon), unit="D")
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=dates, y=leveler.usage()[row], name="قبل التسوية", line_shape="hv"))
+        if result is not None:
+            after = leveler.usage(result["shifts"])[row]
+            after_dates = leveler.origin + pd.to_timedelta(np.arange(len(after)), unit="D")
+            fig.add_trace(go.Scatter(x=after_dates, y=after, name="بعد التسوية", line_shape="hv"))
+        fig.add_hline(y=leveler.capacity[row], line_dash="dash", line_color="red", annotation_text="السعة")
+        fig.update_layout(title=f"الاستخدام اليومي: {resource}", xaxis_title="التاريخ", yaxis_title="الكمية")
+        st.plotly_chart(fig, use_container_width=True)
+
+        if result is None:
+            return
+
+        st.markdown("#### نتيجة التسوية")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("الأنشطة المؤخرة", result["delayed"])
+        with col2:
+            st.metric("التعارضات المتبقية", len(result["conflicts_after"]),
+                      delta=len(result["conflicts_after"]) - len(result["conflicts_before"]), delta_color="inverse")
+        with col3:
+            st.metric("أقصى تأخير", f"{int(result['shifts'].max())} يوم")
+
+        if not result["unresolved"].empty:
+            st.warning(f"{len(result['unresolved'])} تخصيص يطلب كمية أكبر من سعة المورد ولا تحله التسوية")
+
+        delayed = result["schedule"][result["schedule"]["delay"] > 0]
+        st.dataframe(
+            delayed[["id", "project", "resource", "start", "leveled_start", "leveled_finish", "delay"]].rename(columns={
+                "id": "التخصيص", "project": "المشروع", "resource": "المورد", "start": "البدء الأصلي",
+                "leveled_start": "البدء بعد التسوية", "leveled_finish": "الانتهاء بعد التسوية", "delay": "التأخير (يوم)"
+            }),
+            use_container_width=True, hide_index=True
+        )
+
+        if st.button("اعتماد المواعيد بعد التسوية", key="apply_leveling"):
+            leveled = result["schedule"].set_index("id")
+            mask = allocations["رقم التخصيص"].isin(leveled.index)
+            ids = allocations.loc[mask, "رقم التخصيص"]
+            allocations.loc[mask, "تاريخ البدء"] = leveled.loc[ids, "leveled_start"].dt.strftime("%Y-%m-%d").values
+            allocations.loc[mask, "تاريخ الانتهاء"] = leveled.loc[ids, "leveled_finish"].dt.strftime("%Y-%m-%d").values
+            st.session_state.resource_leveling = None
+            st.success("تم تحديث مواعيد تخصيص الموارد")
@@ -0,0 +1,354 @@
+"""
+تسوية الموارد عبر المشاريع
+
+تبني مدرجات الاستخدام اليومي لكل مورد بمصفوفات الفروق: تضاف كمية كل تخصيص في
+يوم بدايته وتطرح في اليوم التالي لنهايته، ثم يعطي المجموع التراكمي الاستخدام
+اليومي لكل الموارد دفعة واحدة. تكشف فترات تجاوز السعة، وتسوى الموارد بجدولة
+تسلسلية حسب الأولوية (Serial Schedule Generation): يؤخذ كل نشاط بترتيب أولويته
+ويوضع في أبكر إزاحة تتسع لها السعة المتبقية لجميع موارده، مع جمع طلب مهام النشاط
+الواحد على المورد نفسه قبل اختبار السعة.
+
+الأيام أعداد صحيحة من أول تاريخ بدء، وتاريخ الانتهاء داخل في مدة التخصيص.
+"""
+
+import heapq
+import logging
+
+import numpy as np
+import pandas as pd
+
+from modules.scheduling.services.cpm import schedule_links
+
+logger = logging.getLogger('tender_system.resources')
+
+# أعمدة جدول تخصيص الموارد في وحدة الموارد
+ALLOCATION_COLUMNS = {
+    "رقم التخصيص": "id",
+    "رقم المشروع": "project",
+    "نوع المورد": "resource_type",
+    "رقم المورد": "resource",
+    "تاريخ البدء": "start",
+    "تاريخ الانتهاء": "finish",
+    "الكمية": "quantity",
+}
+
+# الموارد المستهلكة لا تعود بعد استخدامها فلا تدخل في التسوية
+CONSUMABLE_TYPES = ("مادة",)
+
+
+def allocations_frame(allocations):
+    """
+    تحويل جدول تخصيص الموارد إلى جدول المهام الذي يستخدمه محرك التسوية
+
+    المعلمات:
+        allocations (DataFrame): تخصيصات الموارد بأعمدة وحدة الموارد
+
+    العوائد:
+        DataFrame: id, project, resource_type, resource, start, finish, quantity
+    """
+    tasks = allocations.rename(columns=ALLOCATION_COLUMNS)[list(ALLOCATION_COLUMNS.values())]
+    tasks = tasks[~tasks["resource_type"].isin(CONSUMABLE_TYPES)].copy()
+    tasks["start"] = pd.to_datetime(tasks["start"])
+    tasks["finish"] = pd.to_datetime(tasks["finish"])
+    return tasks.reset_index(drop=True)
+
+
+def schedule_tasks(project_name, schedule_items, quantity=1):
+    """
+    تحويل بنود جدول زمني إلى مهام موارد (مورد لكل اسم في عمود Resource)
+
+    المعلمات:
+        project_name (str): اسم المشروع
+        schedule_items (list): بنود الجدول بمفاتيح ID, Start, Finish, Resource
+        quantity (float): الكمية المطلوبة من كل مورد
+
+    العوائد:
+        DataFrame: id, activity, project, resource, start, finish, quantity
+    """
+    items = pd.DataFrame(schedule_items)
+    if items.empty or "Resource" not in items.columns:
+        return pd.DataFrame(columns=["id", "activity", "project", "resource", "start", "finish", "quantity"])
+
+    items = items.assign(Resource=items["Resource"].fillna("").astype(str).str.split(r"\s*[,،]\s*")).explode("Resource")
+    items = items[items["Resource"].str.strip() != ""]
+    activity = project_name + ":" + items["ID"].astype(str)
+    start = pd.to_datetime(items["Start"])
+    # تاريخ النهاية في الجدول الزمني هو أبكر انتهاء (حصري) فيطرح منه يوم، والبند بلا مدة
+    # (معلم أو مدة قصيرة قربت إلى صفر) يشغل مورده يوم بدايته
+    finish = (pd.to_datetime(items["Finish"]) - pd.Timedelta(days=1)).clip(lower=start)
+    return pd.DataFrame({
+        "id": activity + ":" + items["Resource"],
+        "activity": activity,
+        "project": project_name,
+        "resource": items["Resource"].str.strip(),
+        "start": start,
+        "finish": finish,
+        "quantity": float(quantity),
+    }).reset_index(drop=True)
+
+
+def schedule_task_links(project_name, schedule_items):
+    """
+    علاقات الأنشطة بين مهام الموارد من عمود الاعتماديات في الجدول الزمني
+
+    الأنشطة التي لا تحتاج موارد لا تظهر في مهام الموارد، فتوصل سابقاتها بلاحقاتها
+    حتى لا تضيع العلاقة غير المباشرة بين نشاطين يحتاجان موارد.
+
+    المعلمات:
+        project_name (str): اسم المشروع
+        schedule_items (list): بنود الجدول بمفاتيح ID, Resource, Dependencies
+
+    العوائد:
+        list: أزواج (النشاط السابق، النشاط اللاحق) بمعرفات الأنشطة في schedule_tasks
+    """
+    items = pd.DataFrame(schedule_items)
+    if items.empty or "Dependencies" not in items.columns:
+        return []
+
+    successors = {}
+    for predecessor, successor, _, _ in schedule_links(items):
+        successors.setdefault(predecessor, []).append(successor)
+
+    resources = items["Resource"] if "Resource" in items.columns else pd.Series("", index=items.index)
+    staffed = {activity_id for activity_id, text in zip(items["ID"], resources.fillna("").astype(str))
+               if text.strip(" ,،")}
+
+    links = set()
+    for activity_id in staffed:
+        stack, seen = list(successors.get(activity_id, [])), set()
+        while stack:
+            successor = stack.pop()
+            if successor in seen:
+                continue
+            seen.add(successor)
+            if successor in staffed:
+                links.add((f"{project_name}:{activity_id}", f"{project_name}:{successor}"))
+            else:
+                stack.extend(successors.get(successor, []))
+    return sorted(links)
+
+
+class ResourceLeveler:
+    """محرك مدرجات الاستخدام وتسوية الموارد"""
+
+    def __init__(self, tasks, capacity=None, default_capacity=np.inf, links=()):
+        """
+        تهيئة المحرك
+
+        المعلمات:
+            tasks (DataFrame): المهام بأعمدة id, resource, start, finish, quantity واختيارياً
+                activity (المهام المتعددة الموارد لنشاط واحد تزاح معاً) وpriority (الأصغر أولاً)
+            capacity (dict): سعة كل مورد اليومية
+            default_capacity (float): سعة الموارد غير المذكورة
+            links (iterable): أزواج (النشاط السابق، النشاط اللاحق)؛ لا تقل إزاحة اللاحق عن إزاحة سابقه
+        """
+        if tasks.empty:
+            raise ValueError("لا توجد تخصيصات موارد للتسوية")
+        self.tasks = tasks.reset_index(drop=True)
+        start = pd.to_datetime(self.tasks["start"])
+        finish = pd.to_datetime(self.tasks["finish"])
+        if (finish < start).any():
+            raise ValueError("يوجد تخصيص ينتهي قبل تاريخ بدئه")
+
+        self.origin = start.min().normalize()
+        self.start = (start - self.origin).dt.days.to_numpy()
+        self.duration = (finish - start).dt.days.to_numpy() + 1
+        self.quantity = self.tasks["quantity"].astype(float).to_numpy()
+
+        self.resource_codes, self.resources = pd.factorize(self.tasks["resource"])
+        capacity = capacity or {}
+        self.capacity = np.array([capacity.get(resource, default_capacity) for resource in self.resources], dtype=float)
+
+        activities = self.tasks["activity"] if "activity" in self.tasks.columns else self.tasks["id"]
+        self.activity_codes, self.activities = pd.factorize(activities)
+        self.links = [(self.activities.get_loc(predecessor), self.activities.get_loc(successor))
+                      for predecessor, successor in links]
+
+    @property
+    def horizon(self):
+        """عدد أيام المدرج بالمواعيد الأصلية"""
+        return int((self.start + self.duration).max())
+
+    def usage(self, shifts=None, horizon=None):
+        """
+        الاستخدام اليومي لكل مورد بمصفوفات الفروق
+
+        المعلمات:
+            shifts (array): إزاحة كل نشاط بالأيام (None للمواعيد الأصلية)
+            horizon (int): عدد الأيام (الافتراضي حتى آخر انتهاء)
+
+        العوائد:
+            ndarray: مصفوفة (الموارد × الأيام)
+        """
+        start = self.start if shifts is None else self.start + np.asarray(shifts)[self.activity_codes]
+        end = start + self.duration
+        horizon = int(end.max()) if horizon is None else horizon
+        width = horizon + 1
+        rows = self.resource_codes * width
+        size = len(self.resources) * width
+        difference = (np.bincount(rows + np.minimum(start, horizon), weights=self.quantity, minlength=size)
+                      - np.bincount(rows + np.minimum(end, horizon), weights=self.quantity, minlength=size))
+        return np.cumsum(difference.reshape(len(self.resources), width), axis=1)[:, :horizon]
+
+    def conflicts(self, shifts=None):
+        """
+        فترات تجاوز السعة
+
+        المعلمات:
+            shifts (array): إزاحة كل نشاط بالأيام (None للمواعيد الأصلية)
+
+        العوائد:
+            DataFrame: resource, start, finish, days, peak, capacity, excess
+        """
+        usage = self.usage(shifts)
+        over = usage > self.capacity[:, None] + 1e-9
+        edges = np.diff(np.pad(over.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        if not len(rows):
+            return pd.DataFrame(columns=["resource", "start", "finish", "days", "peak", "capacity", "excess"])
+
+        horizon = usage.shape[1]
+        flat = np.append(usage.ravel(), 0.0)
+        bounds = np.column_stack([rows * horizon + starts, rows * horizon + ends]).ravel()
+        peaks = np.maximum.reduceat(flat, bounds)[::2]
+        return pd.DataFrame({
+            "resource": self.resources[rows],
+            "start": self.origin + pd.to_timedelta(starts, unit="D"),
+            "finish": self.origin + pd.to_timedelta(ends - 1, unit="D"),
+            "days": ends - starts,
+            "peak": peaks,
+            "capacity": self.capacity[rows],
+            "excess": peaks - self.capacity[rows],
+        })
+
+    def _priority_order(self):
+        """مفاتيح الأولوية لكل نشاط: الأولوية المحددة ثم أبكر بدء ثم أطول مدة"""
+        frame = pd.DataFrame({
+            "activity": self.activity_codes,
+            "priority": self.tasks["priority"] if "priority" in self.tasks.columns else 0,
+            "start": self.start,
+            "duration": -self.duration,
+        }).groupby("activity").min()
+        return list(frame.itertuples(index=False, name=None))
+
+    def level(self, max_delay=None):
+        """
+        تسوية الموارد بالجدولة التسلسلية حسب الأولوية
+
+        المعلمات:
+            max_delay (int): أقصى تأخير مسموح لأي نشاط بالأيام (None بلا حد)
+
+        العوائد:
+            dict: schedule (المهام بمواعيدها بعد التسوية)، shifts، conflicts_before، conflicts_after،
+                unresolved (مهام تتجاوز كميتها سعة المورد)، delayed (عدد الأنشطة المؤخرة)
+        """
+        activity_count = len(self.activities)
+        rows_by_activity = pd.Series(np.arange(len(self.tasks))).groupby(self.activity_codes).apply(list)
+        unresolved = self.quantity > self.capacity[self.resource_codes] + 1e-9
+
+        successors = [[] for _ in range(activity_count)]
+        pending = np.zeros(activity_count, dtype=int)
+        for predecessor, successor in self.links:
+            successors[predecessor].append(successor)
+            pending[successor] += 1
+
+        keys = self._priority_order()
+        eligible = [(keys[a], a) for a in range(activity_count) if pending[a] == 0]
+        heapq.heapify(eligible)
+
+        horizon = max(2 * self.horizon, 1)
+        remaining = np.repeat(self.capacity[:, None], horizon, axis=1)
+        shifts = np.zeros(activity_count, dtype=np.int64)
+        earliest = np.zeros(activity_count, dtype=np.int64)
+        scheduled = 0
+
+        while eligible:
+            _, activity = heapq.heappop(eligible)
+            rows = rows_by_activity[activity]
+            segments = self._demand_segments(rows)
+            while True:
+                shift = self._earliest_shift(segments, remaining, earliest[activity])
+                if shift is not None:
+                    break
+                # لا يوجد موضع ضمن المدى الحالي: يضاعف المدى بسعة كاملة
+                remaining = np.concatenate([remaining, np.repeat(self.capacity[:, None], horizon, axis=1)], axis=1)
+                horizon *= 2
+            if max_delay is not None and shift > max_delay:
+                shift = earliest[activity]
+            shifts[activity] = shift
+            for row in rows:
+                begin = self.start[row] + shift
+                remaining[self.resource_codes[row], begin:begin + self.duration[row]] -= self.quantity[row]
+            scheduled += 1
+
+            for successor in successors[activity]:
+                earliest[successor] = max(earliest[successor], shift)
+                pending[successor] -= 1
+                if pending[successor] == 0:
+                    heapq.heappush(eligible, (keys[successor], successor))
+
+        if scheduled != activity_count:
+            raise ValueError("توجد حلقة في علاقات الأنشطة")
+
+        schedule = self.tasks.copy()
+        delay = shifts[self.activity_codes]
+        schedule["leveled_start"] = pd.to_datetime(schedule["start"]) + pd.to_timedelta(delay, unit="D")
+        schedule["leveled_finish"] = pd.to_datetime(schedule["finish"]) + pd.to_timedelta(delay, unit="D")
+        schedule["delay"] = delay
+
+        conflicts_after = self.conflicts(shifts)
+        logger.info(f"تسوية {activity_count} نشاط: تأخير {int((shifts > 0).sum())} نشاط، "
+                    f"التعارضات المتبقية {len(conflicts_after)}")
+        return {
+            "schedule": schedule,
+            "shifts": shifts,
+            "conflicts_before": self.conflicts(),
+            "conflicts_after": conflicts_after,
+            "unresolved": schedule[unresolved],
+            "delayed": int((shifts > 0).sum()),
+        }
+
+    def _demand_segments(self, rows):
+        """
+        طلب مهام النشاط مجمعاً لكل مورد في فترات ثابتة الكمية
+
+        المعلمات:
+            rows (list): صفوف مهام النشاط
+
+        العوائد:
+            list: (رمز المورد، البداية، المدة، الكمية) لكل فترة؛ مهام النشاط على المورد نفسه
+                المتداخلة زمنياً تجمع كمياتها
+        """
+        segments = []
+        rows = np.asarray(rows)
+        for resource in np.unique(self.resource_codes[rows]):
+            same = rows[self.resource_codes[rows] == resource]
+            start, end = self.start[same], self.start[same] + self.duration[same]
+            bounds = np.unique(np.concatenate([start, end]))
+            for begin, stop in zip(bounds[:-1], bounds[1:]):
+                quantity = self.quantity[same][(start <= begin) & (end >= stop)].sum()
+                if quantity > 0:
+                    segments.append((resource, int(begin), int(stop - begin), quantity))
+        return segments
+
+    def _earliest_shift(self, segments, remaining, minimum):
+        """أبكر إزاحة لا تقل عن الحد الأدنى تتسع فيها السعة المتبقية لطلب النشاط على كل موارده"""
+        horizon = remaining.shape[1]
+        feasible = None
+        for resource, start, duration, quantity in segments:
+            count = horizon - duration + 1 - start
+            if count <= minimum:
+                return None
+            # الطلب الذي يتجاوز سعة المورد لا يتسع في أي موضع (مهام غير قابلة للحل)
+            if quantity > self.capacity[resource] + 1e-9:
+                continue
+            # عدد الأيام غير الكافية في كل نافذة بطول الفترة بالمجموع التراكمي
+            short = np.concatenate([[0], np.cumsum(remaining[resource] < quantity - 1e-9)])
+            windows = short[start + duration:] - short[start:horizon - duration + 1]
+            fits = windows[:count] == 0
+            feasible = fits if feasible is None else feasible[:count] & fits[:len(feasible)]
+        if feasible is None:
+            return int(minimum)
+        candidates = np.flatnonzero(feasible[minimum:])
+        return int(minimum + candidates[0]) if len(candidates) else None
@@ -1,19 +1,29 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.figure_factory as ff
 from datetime import datetime, timedelta
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
 import io
 import openpyxl
 
+from modules.scheduling.services.cpm import CPMSchedule, schedule_links
+from modules.scheduling.services.earned_value import DEFAULT_PAYMENT_TERMS, EarnedValueModel
+from modules.scheduling.services.gantt import DETAIL_LIMIT, gantt_figure, schedule_groups, summarize_schedule, wbs_depth
+from modules.scheduling.services.schedule_import import read_schedule_file, to_schedule_items
+
+# صيغ الجداول الزمنية التي تستورد مباشرة (Primavera P6 XER وMicrosoft Project XML)
+SCHEDULE_FILE_TYPES = ('.xer', '.xml')
+
 class ScheduleApp:
     def __init__(self):
         if 'saved_pricing' not in st.session_state:
             st.session_state.saved_pricing = []
         if 'uploaded_files' not in st.session_state:
             st.session_state.uploaded_files = {}
+        if 'cpm_schedules' not in st.session_state:
+            st.session_state.cpm_schedules = {}
 
     def run(self):
         st.title("الجدول الزمني للمشروع")
@@ -61,8 +71,15 @@ class ScheduleApp:
                     if 'Start' in df.columns and 'Finish' in df.columns:
                         self._create_interactive_gantt(df)
                     
+                elif uploaded_file.name.lower().endswith(SCHEDULE_FILE_TYPES):
+                    file_info = self._import_schedule_file(uploaded_file)
+                    st.success(f"تم استيراد الملف: {uploaded_file.name}")
+                    self._display_imported_schedule(file_info)
+                    self._generate_and_display_schedule(file_info['project'])
+
                 else:
-                    st.info(f"تم استلام الملف {uploaded_file.name}. سيتم إضافة دعم لهذا النوع من الملفات قريباً.")
+                    st.info(f"تم استلام الملف {uploaded_file.name}. صيغة الملف غير مدعومة بعد، "
+                            "يمكنك تصديره من البرنامج بصيغة XER أو Microsoft Project XML.")
 
             except Exception as e:
                 st.error(f"حدث خطأ أثناء معالجة الملف: {str(e)}")
@@ -76,35 +93,82 @@ class ScheduleApp:
                     st.write(f"تاريخ الرفع: {file_info['upload_time']}")
                     if file_info['type'] == 'excel':
                         st.dataframe(file_info['data'], use_container_width=True)
+                    elif 'schedule' in file_info:
+                        st.write(f"عدد الأنشطة: {len(file_info['data'])}")
+
+    def _import_schedule_file(self, uploaded_file):
+        """
+        استيراد ملف جدول زمني مرة واحدة وتحويله إلى مشروع قابل للتحرير
+
+        يعاد استخدام الاستيراد السابق ما دام الملف نفسه مرفوعاً، فلا يعاد تحليله مع كل تفاعل.
+        """
+        file_info = st.session_state.uploaded_files.get(uploaded_file.name)
+        if file_info and file_info.get('size') == uploaded_file.size:
+            return file_info
+
+        schedule = read_schedule_file(uploaded_file, uploaded_file.name)
+        activities = schedule['activities']
+        start = activities['start'].min()
+        finish = activities['finish'].max()
+        project = {
+            'project_name': uploaded_file.name,
+            'items': [],
+            'total_price': 0,
+            'start_date': start.date() if pd.notna(start) else datetime.now().date(),
+            'project_duration': int((finish - start).days) if pd.notna(start) and pd.notna(finish) else 0,
+            'schedule_items': to_schedule_items(schedule),
+        }
+        file_info = {
+            'data': activities,
+            'type': 'primavera' if uploaded_file.name.lower().endswith('.xer') else 'msproject',
+            'size': uploaded_file.size,
+            'schedule': schedule,
+            'project': project,
+            'upload_time': datetime.now()
+        }
+        st.session_state.uploaded_files[uploaded_file.name] = file_info
+        return file_info
+
+    def _display_imported_schedule(self, file_info):
+        schedule = file_info['schedule']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("الأنشطة", len(schedule['activities']))
+        with col2:
+            st.metric("العلاقات", len(schedule['relationships']))
+        with col3:
+            st.metric("التقويمات", len(schedule['calendars']))
+        with col4:
+            st.metric("تخصيصات الموارد", len(schedule['assignments']))
 
     def _create_interactive_gantt(self, df):
         st.subheader("مخطط جانت التفاعلي")
-        
-        # تحضير البيانات للمخطط
-        df['Start'] = pd.to_datetime(df['Start'])
-        df['Finish'] = pd.to_datetime(df['Finish'])
-        
-        fig = ff.create_gantt(
-            df,
-            colors={
-                'Task': '#2196F3',
-                'Complete': '#4CAF50'
-            },
-            index_col='Resource',
-            show_colorbar=True,
-            group_tasks=True,
-            showgrid_x=True,
-            showgrid_y=True
-        )
-        
-        fig.update_layout(
-            title="مخطط جانت للمشروع",
-            xaxis_title="التاريخ",
-            yaxis_title="الأنشطة",
-            height=600
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        self._render_gantt(df, key="uploaded_gantt")
+
+    def _render_gantt(self, df, key, yaxis_title="الأنشطة"):
+        """
+        رسم مخطط جانت بأثر واحد، مع تلخيص الجداول الكبيرة حسب WBS وتوسيع مجموعة واحدة عند الطلب
+        """
+        df = pd.DataFrame(df)
+        if len(df) <= DETAIL_LIMIT:
+            st.plotly_chart(gantt_figure(df, yaxis_title=yaxis_title), use_container_width=True)
+            return
+
+        depth = wbs_depth(df)
+        level = 1
+        if depth > 1:
+            level = st.slider("مستوى WBS", min_value=1, max_value=depth, value=1, key=f"{key}_level")
+        summary = summarize_schedule(df, level)
+        st.caption(f"عدد الأنشطة {len(df)}، يعرض المخطط ملخص {len(summary)} مجموعة")
+        st.plotly_chart(gantt_figure(summary, title="ملخص الجدول الزمني", yaxis_title="المجموعات"),
+                        use_container_width=True)
+
+        # لا تبنى أشرطة التفاصيل إلا للمجموعة المختارة
+        group = st.selectbox("عرض تفاصيل مجموعة", ["—"] + summary["Group"].tolist(), key=f"{key}_group")
+        if group != "—":
+            details = df[schedule_groups(df, level) == group]
+            st.plotly_chart(gantt_figure(details, title=group, yaxis_title=yaxis_title),
+                            use_container_width=True)
 
     def _handle_boq_tab(self):
         # نفس الكود السابق لمعالجة جدول الكميات
@@ -156,6 +220,10 @@ class ScheduleApp:
         with col1:
             st.write(f"اسم المشروع: {project['project_name']}")
             st.write(f"إجمالي القيمة: {project['total_price']:,.2f} ريال")
+            project['start_date'] = st.date_input(
+                "تاريخ بدء المشروع",
+                value=project.get('start_date', datetime.now().date())
+            )
         with col2:
             project['project_duration'] = st.number_input(
                 "مدة المشروع (بالأيام)", 
@@ -172,66 +240,111 @@ class ScheduleApp:
 
         st.subheader("تحرير الجدول الزمني")
         edited_df = self._edit_schedule(project['schedule_items'])
-        project['schedule_items'] = edited_df.to_dict('records')
+        project['schedule_items'] = self._apply_critical_path(project, edited_df).to_dict('records')
 
-        self._display_gantt_chart(project['schedule_items'])
+        self._display_critical_path(project['schedule_items'])
+        self._display_gantt_chart(project['schedule_items'], key=f"gantt_{project['project_name']}")
         self._display_progress_report(project['schedule_items'])
+        self._display_earned_value(project)
 
     def _initialize_schedule_items(self, project):
         project['schedule_items'] = []
-        for item in project['items']:
+        for i, item in enumerate(project['items']):
             relative_duration = int((item['total_price'] / project['total_price']) * project['project_duration'])
             schedule_item = {
+                'ID': i + 1,
                 'Task': item.get('description', ''),
                 'Start': datetime.now().strftime('%Y-%m-%d'),
                 'Finish': (datetime.now() + timedelta(days=relative_duration)).strftime('%Y-%m-%d'),
                 'Duration': relative_duration,
                 'Dependencies': '',
+                'Total Float': 0,
+                'Critical': False,
                 'Progress': 0,
-                'Resource': ''
+                'Resource': '',
+                'Budget': item['total_price'],
+                'Actual Cost': 0
             }
             project['schedule_items'].append(schedule_item)
 
+    def _apply_critical_path(self, project, df):
+        """
+        حساب مواعيد البنود بطريقة المسار الحرج من المدد والاعتماديات
+
+        يحتفظ بمحرك الجدول لكل مشروع في حالة الجلسة، فإذا لم تتغير الاعتماديات يعاد
+        حساب الأنشطة المتأثرة بتعديل المدد فقط.
+        """
+        df = df.copy()
+        if 'ID' not in df.columns:
+            df.insert(0, 'ID', range(1, len(df) + 1))
+        df['Duration'] = pd.to_numeric(df['Duration'], errors='coerce').fillna(0).clip(lower=0)
+        df['Dependencies'] = df['Dependencies'].fillna('').astype(str)
+
+        ids = df['ID'].tolist()
+        signature = (tuple(ids), tuple(df['Dependencies']))
+        cached = st.session_state.cpm_schedules.get(project['project_name'])
+
+        try:
+            if cached and cached[0] == signature:
+                schedule = cached[1].update_durations(dict(zip(ids, df['Duration'])))
+            else:
+                schedule = CPMSchedule(ids, df['Duration'], schedule_links(df))
+                st.session_state.cpm_schedules[project['project_name']] = (signature, schedule)
+        except ValueError as e:
+            st.error(f"تعذر حساب الجدول الزمني: {str(e)}")
+            return df
+
+        start_date = pd.Timestamp(project.get('start_date', datetime.now().date()))
+        df['Start'] = (start_date + pd.to_timedelta(schedule.early_start, unit='D')).strftime('%Y-%m-%d')
+        df['Finish'] = (start_date + pd.to_timedelta(schedule.early_finish, unit='D')).strftime('%Y-%m-%d')
+        df['Total Float'] = schedule.total_float
+        df['Critical'] = schedule.critical
+        return df
+
+    def _display_critical_path(self, schedule_items):
+        df = pd.DataFrame(schedule_items)
+        if 'Critical' not in df.columns:
+            return
+
+        critical = df[df['Critical']]
+        col1, col2 = st.columns(2)
+        with col1:
+            duration = (pd.to_datetime(df['Finish']).max() - pd.to_datetime(df['Start']).min()).days
+            st.metric("مدة المشروع المحسوبة", f"{duration} يوم")
+        with col2:
+            st.metric("البنود الحرجة", f"{len(critical)} من {len(df)}")
+
+        if not critical.empty:
+            st.caption("المسار الحرج: " + " ← ".join(critical['Task'].astype(str)))
+
     def _edit_schedule(self, schedule_items):
         return st.data_editor(
             pd.DataFrame(schedule_items),
             column_config={
+                "ID": st.column_config.NumberColumn("الرقم", disabled=True),
+                "WBS": "رمز WBS",
                 "Task": "البند",
-                "Start": st.column_config.DateColumn("تاريخ البداية"),
-                "Finish": st.column_config.DateColumn("تاريخ النهاية"),
-                "Duration": "المدة (أيام)",
-                "Dependencies": "الاعتماديات",
+                "Start": st.column_config.DateColumn("تاريخ البداية", disabled=True),
+                "Finish": st.column_config.DateColumn("تاريخ النهاية", disabled=True),
+                "Duration": st.column_config.NumberColumn("المدة (أيام)", min_value=0),
+                "Dependencies": st.column_config.TextColumn(
+                    "الاعتماديات",
+                    help="أرقام البنود السابقة مع نوع العلاقة وفترة التأخير، مثل: 1, 2SS+3, 4FF-1"
+                ),
+                "Total Float": st.column_config.NumberColumn("الفائض الكلي (أيام)", disabled=True),
+                "Critical": st.column_config.CheckboxColumn("حرج", disabled=True),
                 "Progress": st.column_config.NumberColumn("نسبة الإنجاز %", min_value=0, max_value=100),
-                "Resource": "الموارد"
+                "Resource": "الموارد",
+                "Budget": st.column_config.NumberColumn("قيمة البند (ريال)", min_value=0, format="%.2f"),
+                "Actual Cost": st.column_config.NumberColumn("التكلفة الفعلية (ريال)", min_value=0, format="%.2f")
             },
             use_container_width=True,
             hide_index=True
         )
 
-    def _display_gantt_chart(self, schedule_items):
+    def _display_gantt_chart(self, schedule_items, key="schedule_gantt"):
         st.subheader("مخطط جانت")
-        df = pd.DataFrame(schedule_items)
-        fig = ff.create_gantt(
-            df,
-            colors={
-                'Complete': 'rgb(0, 255, 100)',
-                'Incomplete': 'rgb(160, 160, 160)'
-            },
-            index_col='Resource',
-            show_colorbar=True,
-            group_tasks=True,
-            showgrid_x=True,
-            showgrid_y=True
-        )
-        
-        fig.update_layout(
-            title="مخطط جانت للمشروع",
-            xaxis_title="التاريخ",
-            yaxis_title="البنود",
-            height=600
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        self._render_gantt(schedule_items, key=key, yaxis_title="البنود")
 
     def _display_progress_report(self, schedule_items):
         st.subheader("تقرير تقدم المشروع")
@@ -247,3 +360,96 @@ class ScheduleApp:
         with col3:
             not_started = len(df[df['Progress'] == 0])
             st.metric("البنود غير المبدوءة", not_started)
+
+    def _display_earned_value(self, project):
+        st.subheader("القيمة المكتسبة والتدفق النقدي")
+        df = pd.DataFrame(project['schedule_items'])
+        if 'Budget' not in df.columns and len(project.get('items', [])) == len(df):
+            df['Budget'] = [item.get('total_price', 0) for item in project['items']]
+        if 'Budget' not in df.columns or pd.to_numeric(df['Budget'], errors='coerce').fillna(0).sum() <= 0:
+            st.info("أدخل قيمة البنود في الجدول لحساب القيمة المكتسبة والتدفق النقدي.")
+            return
+
+        key = project['project_name']
+        try:
+            model = EarnedValueModel(df, origin=project.get('start_date'))
+        except ValueError as e:
+            st.error(f"تعذر حساب القيمة المكتسبة: {str(e)}")
+            return
+
+        status_date = st.date_input("تاريخ الحالة", value=datetime.now().date(), key=f"evm_status_{key}")
+        evm = model.evm(status_date)
+
+        def ratio(value):
+            return "—" if value is None else f"{value:.2f}"
+
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("القيمة المخططة PV", f"{evm['PV']:,.0f}", help=f"{evm['planned_percent']:.1f}% من الميزانية")
+        with col2:
+            st.metric("القيمة المكتسبة EV", f"{evm['EV']:,.0f}", help=f"{evm['earned_percent']:.1f}% من الميزانية")
+        with col3:
+            st.metric("التكلفة الفعلية AC", "—" if evm['AC'] is None else f"{evm['AC']:,.0f}")
+        with col4:
+            st.metric("مؤشر أداء الجدول SPI", ratio(evm['SPI']))
+        with col5:
+            st.metric("مؤشر أداء التكلفة CPI", ratio(evm['CPI']),
+                      help=None if evm['EAC'] is None else f"التكلفة المتوقعة عند الإنجاز: {evm['EAC']:,.0f}")
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=model.dates, y=model.planned_value(), name="القيمة المخططة التراكمية"))
+        fig.add_trace(go.Scatter(x=[pd.Timestamp(status_date)], y=[evm['EV']], mode="markers",
+                                 marker=dict(size=12), name="القيمة المكتسبة"))
+        if evm['AC'] is not None:
+            fig.add_trace(go.Scatter(x=[pd.Timestamp(status_date)], y=[evm['AC']], mode="markers",
+                                     marker=dict(size=12, symbol="diamond"), name="التكلفة الفعلية"))
+        fig.update_layout(title="منحنى S للقيمة المخططة", xaxis_title="التاريخ", yaxis_title="ريال")
+        st.plotly_chart(fig, use_container_width=True)
+
+        with st.expander("شروط الدفع"):
+            col1, col2, col3, col4 = st.columns(4)
+            terms = {}
+            with col1:
+                terms['advance_payment'] = st.number_input(
+                    "الدفعة المقدمة %", 0.0, 100.0, DEFAULT_PAYMENT_TERMS['advance_payment'] * 100,
+                    key=f"terms_advance_{key}") / 100
+                terms['advance_recovery'] = st.number_input(
+                    "استرداد الدفعة المقدمة من كل مستخلص %", 0.0, 100.0, DEFAULT_PAYMENT_TERMS['advance_recovery'] * 100,
+                    key=f"terms_recovery_{key}") / 100
+            with col2:
+                terms['retention'] = st.number_input(
+                    "المحتجزات %", 0.0, 100.0, DEFAULT_PAYMENT_TERMS['retention'] * 100, key=f"terms_retention_{key}") / 100
+                terms['retention_release_months'] = st.number_input(
+                    "صرف المحتجزات بعد (أشهر)", 0, 36, DEFAULT_PAYMENT_TERMS['retention_release_months'],
+                    key=f"terms_release_{key}")
+            with col3:
+                terms['payment_delay_months'] = st.number_input(
+                    "تأخر صرف المستخلص (أشهر)", 0, 12, DEFAULT_PAYMENT_TERMS['payment_delay_months'],
+                    key=f"terms_delay_{key}")
+                terms['supplier_credit_months'] = st.number_input(
+                    "مهلة سداد الموردين (أشهر)", 0, 12, DEFAULT_PAYMENT_TERMS['supplier_credit_months'],
+                    key=f"terms_credit_{key}")
+            with col4:
+                terms['cost_ratio'] = st.number_input(
+                    "نسبة التكلفة إلى القيمة %", 1.0, 200.0, DEFAULT_PAYMENT_TERMS['cost_ratio'] * 100,
+                    key=f"terms_cost_{key}") / 100
+                terms['financing_rate'] = st.number_input(
+                    "معدل التمويل السنوي %", 0.0, 50.0, DEFAULT_PAYMENT_TERMS['financing_rate'] * 100,
+                    key=f"terms_rate_{key}") / 100
+
+        flow = model.cash_flow(terms)
+        monthly = flow['monthly']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("تكلفة تمويل التدفق النقدي", f"{flow['financing_cost']:,.0f} ريال")
+        with col2:
+            st.metric("أقصى عجز نقدي", f"{flow['peak_deficit']:,.0f} ريال")
+        with col3:
+            st.metric("شهر أقصى عجز", flow['peak_month'])
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=monthly['date'], y=monthly['income'], name="المقبوضات"))
+        fig.add_trace(go.Bar(x=monthly['date'], y=-monthly['expense'], name="المصروفات"))
+        fig.add_trace(go.Scatter(x=monthly['date'], y=monthly['cumulative'], name="صافي التدفق التراكمي"))
+        fig.update_layout(title="التدفق النقدي الشهري", barmode="relative", xaxis_title="الشهر", yaxis_title="ريال")
+        st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,294 @@
+"""
+محرك المسار الحرج (CPM) للجدول الزمني
+
+يحسب المحرك أبكر وأقصى موعد بدء وانتهاء لكل نشاط والفائض الكلي والحر والمسار
+الحرج، مع علاقات الاعتمادية الأربع (FS, SS, FF, SF) وفترات التقديم والتأخير.
+
+تخزن العلاقات بمصفوفات تجاور مضغوطة (CSR) للسابقات واللاحقات، ويرتب النشاط
+ترتيباً طوبولوجياً مرة واحدة عند تغير العلاقات. عند تعديل المدد فقط يعاد الحساب
+الأمامي من أول نشاط معدل في الترتيب والحساب الخلفي حتى آخر نشاط معدل (أو كاملاً
+إذا تغير موعد انتهاء المشروع).
+"""
+
+import re
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+LINK_TYPES = ("FS", "SS", "FF", "SF")
+
+# مرجع سابق في عمود الاعتماديات: رقم النشاط ثم نوع العلاقة وفترة التأخير اختيارياً، مثل 3 أو 3SS+2 أو 5FF-1d
+_DEPENDENCY = re.compile(r"^\s*([^\s+\-]+?)\s*(FS|SS|FF|SF)?\s*(?:([+-])\s*(\d+(?:\.\d+)?)\s*(?:d|days?|يوم|أيام)?)?\s*$", re.I)
+
+_TYPE_CODES = {link_type: code for code, link_type in enumerate(LINK_TYPES)}
+
+
+def parse_dependencies(text):
+    """
+    تحليل نص الاعتماديات بصيغة Microsoft Project
+
+    المعلمات:
+        text (str): مراجع السابقات مفصولة بفواصل، مثل "1, 2SS+3, 4FF-1"
+
+    العوائد:
+        list: ثلاثيات (مرجع السابق، نوع العلاقة، فترة التأخير بالأيام)
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+
+    dependencies = []
+    for part in re.split(r"[,;،؛]", str(text)):
+        if not part.strip():
+            continue
+        match = _DEPENDENCY.match(part)
+        if not match:
+            raise ValueError(f"صيغة اعتمادية غير صحيحة: {part.strip()}")
+        reference, link_type, sign, lag = match.groups()
+        lag = float(lag or 0) * (-1 if sign == "-" else 1)
+        dependencies.append((reference, (link_type or "FS").upper(), lag))
+    return dependencies
+
+
+class CPMSchedule:
+    """جدول زمني بطريقة المسار الحرج"""
+
+    def __init__(self, activity_ids, durations, links=()):
+        """
+        تهيئة الجدول وحسابه
+
+        المعلمات:
+            activity_ids (list): معرفات الأنشطة
+            durations (list): مدد الأنشطة بالأيام
+            links (iterable): علاقات (معرف السابق، معرف اللاحق، نوع العلاقة، فترة التأخير)
+        """
+        self.activity_ids = list(activity_ids)
+        self.index = {activity_id: i for i, activity_id in enumerate(self.activity_ids)}
+        if len(self.index) != len(self.activity_ids):
+            raise ValueError("معرفات الأنشطة مكررة")
+
+        self.durations = np.asarray(durations, dtype=float).copy()
+        self.set_links(links)
+
+    def set_links(self, links):
+        """
+        تعيين علاقات الاعتمادية وإعادة بناء الترتيب الطوبولوجي والحساب كاملاً
+
+        المعلمات:
+            links (iterable): علاقات (معرف السابق، معرف اللاحق، نوع العلاقة، فترة التأخير)
+        """
+        predecessors, successors, types, lags = [], [], [], []
+        for predecessor, successor, link_type, lag in links:
+            for activity_id in (predecessor, successor):
+                if activity_id not in self.index:
+                    raise ValueError(f"نشاط غير معروف في الاعتماديات: {activity_id}")
+            if link_type not in _TYPE_CODES:
+                raise ValueError(f"نوع علاقة غير معروف: {link_type}")
+            predecessors.append(self.index[predecessor])
+            successors.append(self.index[successor])
+            types.append(_TYPE_CODES[link_type])
+            lags.append(float(lag))
+
+        self.link_pred = np.asarray(predecessors, dtype=np.int64)
+        self.link_succ = np.asarray(successors, dtype=np.int64)
+        self.link_type = np.asarray(types, dtype=np.int8)
+        self.link_lag = np.asarray(lags, dtype=float)
+
+        count = len(self.activity_ids)
+        # مصفوفات التجاور: العلاقات مرتبة حسب اللاحق (للسابقات) وحسب السابق (للاحقات)
+        self._in_order = np.argsort(self.link_succ, kind="stable")
+        self._in_ptr = np.r_[0, np.cumsum(np.bincount(self.link_succ, minlength=count))]
+        self._out_order = np.argsort(self.link_pred, kind="stable")
+        self._out_ptr = np.r_[0, np.cumsum(np.bincount(self.link_pred, minlength=count))]
+
+        self.order = self._topological_order()
+        self.position = np.empty(count, dtype=np.int64)
+        self.position[self.order] = np.arange(count)
+        self.compute()
+
+    def _topological_order(self):
+        """ترتيب الأنشطة طوبولوجياً (خوارزمية Kahn) مع كشف الحلقات"""
+        count = len(self.activity_ids)
+        indegree = np.bincount(self.link_succ, minlength=count).tolist()
+        out_ptr = self._out_ptr.tolist()
+        out_succ = self.link_succ[self._out_order].tolist()
+
+        queue = deque(i for i in range(count) if indegree[i] == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor in out_succ[out_ptr[node]:out_ptr[node + 1]]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    queue.append(successor)
+
+        if len(order) != count:
+            cycle = [self.activity_ids[i] for i in range(count) if indegree[i] > 0]
+            raise ValueError(f"توجد حلقة في الاعتماديات بين الأنشطة: {', '.join(map(str, cycle[:10]))}")
+        return np.asarray(order, dtype=np.int64)
+
+    def compute(self, forward_from=0, backward_to=None):
+        """
+        الحساب الأمامي والخلفي
+
+        المعلمات:
+            forward_from (int): موضع أول نشاط في الترتيب الطوبولوجي يعاد حسابه أمامياً
+            backward_to (int): موضع آخر نشاط يعاد حسابه خلفياً (None للكل)
+        """
+        count = len(self.activity_ids)
+        if forward_from == 0 or not hasattr(self, "early_start"):
+            self.early_start = np.zeros(count)
+            self.early_finish = self.durations.copy()
+            forward_from = 0
+        previous_finish = getattr(self, "project_duration", None)
+
+        in_ptr = self._in_ptr.tolist()
+        in_pred = self.link_pred[self._in_order].tolist()
+        in_type = self.link_type[self._in_order].tolist()
+        in_lag = self.link_lag[self._in_order].tolist()
+        durations = self.durations.tolist()
+        early_start = self.early_start.tolist()
+        early_finish = self.early_finish.tolist()
+
+        # الحساب الأمامي: أبكر بدء لكل نشاط من قيود سابقاته
+        for node in self.order[forward_from:].tolist():
+            start = 0.0
+            duration = durations[node]
+            for k in range(in_ptr[node], in_ptr[node + 1]):
+                predecessor = in_pred[k]
+                link_type = in_type[k]
+                if link_type == 0:    # FS
+                    candidate = early_finish[predecessor] + in_lag[k]
+                elif link_type == 1:  # SS
+                    candidate = early_start[predecessor] + in_lag[k]
+                elif link_type == 2:  # FF
+                    candidate = early_finish[predecessor] + in_lag[k] - duration
+                else:                 # SF
+                    candidate = early_start[predecessor] + in_lag[k] - duration
+                if candidate > start:
+                    start = candidate
+            early_start[node] = start
+            early_finish[node] = start + duration
+
+        self.early_start = np.asarray(early_start)
+        self.early_finish = np.asarray(early_finish)
+        self.project_duration = float(self.early_finish.max()) if count else 0.0
+
+        if backward_to is None or previous_finish != self.project_duration or not hasattr(self, "late_finish"):
+            backward_to = count - 1
+            self.late_finish = np.full(count, self.project_duration)
+            self.late_start = self.late_finish - self.durations
+
+        out_ptr = self._out_ptr.tolist()
+        out_succ = self.link_succ[self._out_order].tolist()
+        out_type = self.link_type[self._out_order].tolist()
+        out_lag = self.link_lag[self._out_order].tolist()
+        late_start = self.late_start.tolist()
+        late_finish = self.late_finish.tolist()
+        project_finish = self.project_duration
+
+        # الحساب الخلفي: أقصى انتهاء لكل نشاط من قيود لاحقاته
+        for node in self.order[backward_to::-1].tolist():
+            finish = project_finish
+            duration = durations[node]
+            for k in range(out_ptr[node], out_ptr[node + 1]):
+                successor = out_succ[k]
+                link_type = out_type[k]
+                if link_type == 0:    # FS
+                    candidate = late_start[successor] - out_lag[k]
+                elif link_type == 1:  # SS
+                    candidate = late_start[successor] - out_lag[k] + duration
+                elif link_type == 2:  # FF
+                    candidate = late_finish[successor] - out_lag[k]
+                else:                 # SF
+                    candidate = late_finish[successor] - out_lag[k] + duration
+                if candidate < finish:
+                    finish = candidate
+            late_finish[node] = finish
+            late_start[node] = finish - duration
+
+        self.late_start = np.asarray(late_start)
+        self.late_finish = np.asarray(late_finish)
+        self.total_float = self.late_start - self.early_start
+        self.free_float = self._free_float()
+        return self
+
+    def _free_float(self):
+        """الفائض الحر: أقل فسحة قبل تأخير أبكر بدء أي لاحق (أو انتهاء المشروع)"""
+        free_float = self.project_duration - self.early_finish
+        if len(self.link_pred):
+            pred, succ, lag = self.link_pred, self.link_succ, self.link_lag
+            from_finish = np.isin(self.link_type, (_TYPE_CODES["FS"], _TYPE_CODES["FF"]))
+            to_finish = np.isin(self.link_type, (_TYPE_CODES["FF"], _TYPE_CODES["SF"]))
+            available = np.where(to_finish, self.early_finish[succ], self.early_start[succ]) - lag
+            used = np.where(from_finish, self.early_finish[pred], self.early_start[pred])
+            np.minimum.at(free_float, pred, available - used)
+        return np.maximum(free_float, 0.0)
+
+    def update_durations(self, durations):
+        """
+        تعديل مدد بعض الأنشطة وإعادة الحساب جزئياً
+
+        المعلمات:
+            durations (dict): معرف النشاط -> المدة الجديدة
+        """
+        changed = [self.index[activity_id] for activity_id, duration in durations.items()
+                   if self.durations[self.index[activity_id]] != float(duration)]
+        if not changed:
+            return self
+        for activity_id, duration in durations.items():
+            self.durations[self.index[activity_id]] = float(duration)
+
+        positions = self.position[changed]
+        return self.compute(forward_from=int(positions.min()), backward_to=int(positions.max()))
+
+    @property
+    def critical(self):
+        """الأنشطة الحرجة (فائض كلي صفر أو أقل)"""
+        return self.total_float <= 1e-9
+
+    def critical_path(self):
+        """معرفات الأنشطة الحرجة بالترتيب الطوبولوجي"""
+        critical = self.critical
+        return [self.activity_ids[i] for i in self.order if critical[i]]
+
+    def results(self):
+        """
+        نتائج الجدول
+
+        العوائد:
+            DataFrame: id, duration, early_start, early_finish, late_start, late_finish,
+                total_float, free_float, critical
+        """
+        return pd.DataFrame({
+            "id": self.activity_ids,
+            "duration": self.durations,
+            "early_start": self.early_start,
+            "early_finish": self.early_finish,
+            "late_start": self.late_start,
+            "late_finish": self.late_finish,
+            "total_float": self.total_float,
+            "free_float": self.free_float,
+            "critical": self.critical,
+        })
+
+
+def schedule_links(items, id_column="ID", dependencies_column="Dependencies"):
+    """
+    علاقات الاعتمادية من بنود الجدول الزمني
+
+    المعلمات:
+        items (DataFrame): بنود الجدول مع عمود المعرف وعمود الاعتماديات
+
+    العوائد:
+        list: علاقات (معرف السابق، معرف اللاحق، نوع العلاقة، فترة التأخير)
+    """
+    references = {str(activity_id): activity_id for activity_id in items[id_column]}
+    links = []
+    for activity_id, text in zip(items[id_column], items[dependencies_column]):
+        for reference, link_type, lag in parse_dependencies(text):
+            if reference not in references:
+                raise ValueError(f"النشاط {activity_id} يعتمد على نشاط غير موجود: {reference}")
+            links.append((references[reference], activity_id, link_type, lag))
+    return links
@@ -0,0 +1,231 @@
+"""
+القيمة المكتسبة والتدفقات النقدية للمشروع
+
+توزع قيمة كل بند مسعر بالتساوي على أيام نشاطه في الجدول الزمني، وتبنى مصفوفة
+التحميل اليومي (المجموعات × الأيام) دفعة واحدة بمصفوفات الفروق: يضاف المعدل
+اليومي لكل بند في يوم بدايته ويطرح في يوم انتهائه ثم يؤخذ المجموع التراكمي. من
+منحنى القيمة المخططة تحسب مؤشرات القيمة المكتسبة (PV, EV, AC, SPI, CPI)، ومن
+القيمة الشهرية مع شروط الدفع (الدفعة المقدمة واستردادها والمحتجزات وتأخر صرف
+المستخلصات) يحسب التدفق النقدي الشهري وتكلفة تمويل العجز.
+"""
+
+import numpy as np
+import pandas as pd
+
+# شروط الدفع الافتراضية (النسب كسور عشرية)
+DEFAULT_PAYMENT_TERMS = {
+    "advance_payment": 0.10,          # الدفعة المقدمة من قيمة العقد تصرف عند البدء
+    "advance_recovery": 0.10,         # نسبة استرداد الدفعة المقدمة من كل مستخلص
+    "retention": 0.10,                # نسبة المحتجزات من كل مستخلص
+    "retention_release_months": 12,   # صرف المحتجزات بعد آخر شهر عمل بهذه المدة
+    "payment_delay_months": 1,        # تأخر صرف المستخلص عن شهر تنفيذ الأعمال
+    "supplier_credit_months": 0,      # تأخر سداد المصروفات للموردين ومقاولي الباطن
+    "cost_ratio": 0.85,               # نسبة التكلفة إلى قيمة البنود عند عدم إدخال التكلفة
+    "financing_rate": 0.08,           # معدل تمويل العجز السنوي
+}
+
+
+def loading_matrix(start, finish, amounts, groups=None, group_count=None, horizon=None):
+    """
+    مصفوفة التحميل اليومي بمصفوفات الفروق
+
+    المعلمات:
+        start (array): يوم بداية كل بند (عدد صحيح)
+        finish (array): يوم انتهاء كل بند (حصري، لا يقل عن البداية + 1)
+        amounts (array): قيمة كل بند توزع بالتساوي على أيامه
+        groups (array): رمز مجموعة كل بند (الافتراضي كل بند مجموعة)
+        group_count (int): عدد المجموعات
+        horizon (int): عدد الأيام
+
+    العوائد:
+        ndarray: مصفوفة (المجموعات × الأيام)
+    """
+    start = np.asarray(start, dtype=np.int64)
+    finish = np.asarray(finish, dtype=np.int64)
+    groups = np.arange(len(start)) if groups is None else np.asarray(groups, dtype=np.int64)
+    group_count = int(groups.max()) + 1 if group_count is None else group_count
+    horizon = int(finish.max()) if horizon is None else horizon
+    rate = np.asarray(amounts, dtype=float) / (finish - start)
+
+    width = horizon + 1
+    size = group_count * width
+    difference = (np.bincount(groups * width + np.minimum(start, horizon), weights=rate, minlength=size)
+                  - np.bincount(groups * width + np.minimum(finish, horizon), weights=rate, minlength=size))
+    return np.cumsum(difference.reshape(group_count, width), axis=1)[:, :horizon]
+
+
+class EarnedValueModel:
+    """نموذج القيمة المكتسبة والتدفقات النقدية لبنود مجدولة"""
+
+    def __init__(self, items, value_column="Budget", cost_column=None, actual_column="Actual Cost",
+                 origin=None):
+        """
+        تهيئة النموذج
+
+        المعلمات:
+            items (DataFrame): بنود بأعمدة Start, Finish (حصري) وقيمة البند ونسبة الإنجاز Progress
+            value_column (str): عمود قيمة البند (قيمة الأعمال في المستخلص)
+            cost_column (str): عمود تكلفة البند المخططة (None لتقديرها بنسبة التكلفة)
+            actual_column (str): عمود التكلفة الفعلية حتى تاريخه إن وجد
+            origin (date): تاريخ بدء المشروع (الافتراضي أبكر بداية)
+        """
+        items = pd.DataFrame(items).reset_index(drop=True)
+        if items.empty:
+            raise ValueError("لا توجد بنود لحساب القيمة المكتسبة")
+
+        start = pd.to_datetime(items["Start"])
+        finish = pd.to_datetime(items["Finish"])
+        self.origin = pd.Timestamp(origin).normalize() if origin is not None else start.min().normalize()
+        self.start = (start - self.origin).dt.days.to_numpy()
+        if (self.start < 0).any():
+            raise ValueError("يوجد بند يبدأ قبل تاريخ بدء المشروع")
+        self.finish = np.maximum((finish - self.origin).dt.days.to_numpy(), self.start + 1)
+        self.horizon = int(self.finish.max())
+
+        self.value = pd.to_numeric(items[value_column], errors="coerce").fillna(0).to_numpy(dtype=float)
+        self.cost = (pd.to_numeric(items[cost_column], errors="coerce").fillna(0).to_numpy(dtype=float)
+                     if cost_column else None)
+        progress = items["Progress"] if "Progress" in items.columns else pd.Series(0, index=items.index)
+        self.progress = pd.to_numeric(progress, errors="coerce").fillna(0).clip(0, 100).to_numpy() / 100
+        self.actual = (pd.to_numeric(items[actual_column], errors="coerce").fillna(0).to_numpy(dtype=float)
+                       if actual_column in items.columns else None)
+        self.items = items
+
+    @property
+    def dates(self):
+        """تواريخ أيام المشروع"""
+        return self.origin + pd.to_timedelta(np.arange(self.horizon), unit="D")
+
+    @property
+    def budget(self):
+        """الميزانية عند الإنجاز (BAC)"""
+        return float(self.value.sum())
+
+    def loading(self, by=None, amounts=None):
+        """
+        التحميل اليومي للقيمة حسب المجموعة
+
+        المعلمات:
+            by (str): عمود التجميع (None لمجموع المشروع)
+            amounts (array): القيم الموزعة (الافتراضي قيمة البنود)
+
+        العوائد:
+            DataFrame: الأيام صفوفاً والمجموعات أعمدة
+        """
+        amounts = self.value if amounts is None else amounts
+        if by is None:
+            codes, names = np.zeros(len(self.value), dtype=np.int64), pd.Index(["الإجمالي"])
+        else:
+            codes, names = pd.factorize(self.items[by].fillna(""))
+        matrix = loading_matrix(self.start, self.finish, amounts, codes, len(names), self.horizon)
+        return pd.DataFrame(matrix.T, index=self.dates, columns=names)
+
+    def planned_value(self):
+        """القيمة المخططة التراكمية لكل يوم"""
+        return np.cumsum(loading_matrix(self.start, self.finish, self.value, np.zeros(len(self.value)), 1,
+                                        self.horizon)[0])
+
+    def evm(self, status_date):
+        """
+        مؤشرات القيمة المكتسبة في تاريخ الحالة
+
+        المعلمات:
+            status_date (date): تاريخ الحالة
+
+        العوائد:
+            dict: BAC, PV, EV, AC, SV, CV, SPI, CPI, EAC, ETC, VAC, planned_percent, earned_percent
+                (AC والمؤشرات المعتمدة عليها None إذا لم تدخل التكلفة الفعلية)
+        """
+        day = (pd.Timestamp(status_date).normalize() - self.origin).days
+        planned = self.planned_value()
+        pv = 0.0 if day < 0 else float(planned[min(day, self.horizon - 1)])
+        ev = float((self.value * self.progress).sum())
+        ac = float(self.actual.sum()) if self.actual is not None and self.actual.sum() > 0 else None
+        bac = self.budget
+
+        cpi = ev / ac if ac else None
+        eac = bac / cpi if cpi else None
+        return {
+            "BAC": bac,
+            "PV": pv,
+            "EV": ev,
+            "AC": ac,
+            "SV": ev - pv,
+            "CV": ev - ac if ac is not None else None,
+            "SPI": ev / pv if pv else None,
+            "CPI": cpi,
+            "EAC": eac,
+            "ETC": eac - ac if eac is not None else None,
+            "VAC": bac - eac if eac is not None else None,
+            "planned_percent": pv / bac * 100 if bac else 0.0,
+            "earned_percent": ev / bac * 100 if bac else 0.0,
+        }
+
+    def monthly_value(self, amounts=None):
+        """القيمة الشهرية للأعمال المنفذة حسب الخطة (شهر 0 هو شهر البدء)"""
+        daily = self.loading(amounts=amounts).iloc[:, 0]
+        months = (daily.index.year - self.origin.year) * 12 + (daily.index.month - self.origin.month)
+        return np.bincount(months, weights=daily.to_numpy())
+
+    def cash_flow(self, terms=None):
+        """
+        التدفق النقدي الشهري وفق شروط الدفع
+
+        المعلمات:
+            terms (dict): شروط الدفع (تكمل بالقيم الافتراضية DEFAULT_PAYMENT_TERMS)
+
+        العوائد:
+            dict: monthly (DataFrame بأعمدة month, date, value, certified, retention, advance_recovery,
+                income, expense, net, cumulative, financing_cost)، financing_cost، peak_deficit، peak_month
+        """
+        terms = {**DEFAULT_PAYMENT_TERMS, **(terms or {})}
+        value = self.monthly_value()
+        cost = self.monthly_value(self.cost) if self.cost is not None else value * terms["cost_ratio"]
+        work_months = len(value)
+
+        payment_delay = int(terms["payment_delay_months"])
+        supplier_credit = int(terms["supplier_credit_months"])
+        release_month = work_months - 1 + int(terms["retention_release_months"])
+        months = max(work_months + payment_delay, work_months + supplier_credit, release_month + 1)
+
+        def shifted(values, delay):
+            series = np.zeros(months)
+            series[delay:delay + len(values)] = values
+            return series
+
+        advance = terms["advance_payment"] * self.budget
+        retention = value * terms["retention"]
+        recovered = np.diff(np.minimum(np.cumsum(value * terms["advance_recovery"]), advance), prepend=0.0)
+        payment = value - retention - recovered
+
+        income = shifted(payment, payment_delay)
+        income[0] += advance
+        # ما لم يسترد من الدفعة المقدمة بانتهاء الأعمال يخصم من المستخلص الختامي
+        income[work_months - 1 + payment_delay] -= advance - recovered.sum()
+        income[release_month] += retention.sum()
+        expense = shifted(cost, supplier_credit)
+
+        net = income - expense
+        cumulative = np.cumsum(net)
+        financing = np.maximum(-cumulative, 0) * terms["financing_rate"] / 12
+
+        monthly = pd.DataFrame({
+            "month": np.arange(1, months + 1),
+            "date": pd.period_range(self.origin, periods=months, freq="M").to_timestamp(),
+            "value": shifted(value, 0),
+            "certified": shifted(payment, 0),
+            "retention": shifted(retention, 0),
+            "advance_recovery": shifted(recovered, 0),
+            "income": income,
+            "expense": expense,
+            "net": net,
+            "cumulative": cumulative,
+            "financing_cost": financing,
+        })
+        peak = int(np.argmin(cumulative))
+        return {
+            "monthly": monthly,
+            "financing_cost": float(financing.sum()),
+            "peak_deficit": float(max(-cumulative[peak], 0.0)),
+            "peak_month": peak + 1,
+        }
@@ -0,0 +1,154 @@
+"""
+رسم مخطط جانت للجداول الكبيرة
+
+ترسم جميع الأشرطة في أثر Plotly واحد (go.Bar أفقي بقاعدة تاريخ البدء وطول المدة)
+مع أثر ثان لنسبة الإنجاز، بدلاً من أثر لكل نشاط كما في figure_factory.create_gantt،
+فيبقى حجم المخطط ووقت رسمه متناسبين مع عدد الأنشطة. عند كثرة الأنشطة يلخص الجدول
+حسب مستوى WBS (أو مجموعات متتالية من البنود إن لم يوجد WBS) ولا تبنى أشرطة
+التفاصيل إلا للمجموعة التي يختار المستخدم توسيعها.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# أقصى عدد أشرطة يعرض تفصيلياً قبل التلخيص
+DETAIL_LIMIT = 300
+
+# عدد البنود في كل مجموعة عند عدم وجود WBS
+CHUNK_SIZE = 100
+
+# عدد الأشرطة التي تظهر أسماؤها على المحور الرأسي
+LABEL_LIMIT = 60
+
+COLORS = {
+    "normal": "#2196F3",
+    "critical": "#E53935",
+    "summary": "#607D8B",
+    "progress": "rgba(76, 175, 80, 0.9)",
+}
+
+
+def gantt_figure(items, title="مخطط جانت للمشروع", yaxis_title="البنود"):
+    """
+    مخطط جانت بأثر واحد للأشرطة
+
+    المعلمات:
+        items (DataFrame|list): بنود بأعمدة Task, Start, Finish واختيارياً Progress, Critical, Resource, Count
+
+    العوائد:
+        Figure: مخطط Plotly
+    """
+    df = pd.DataFrame(items).reset_index(drop=True)
+    start = pd.to_datetime(df["Start"])
+    finish = pd.to_datetime(df["Finish"])
+    span = ((finish - start).dt.total_seconds() * 1000).clip(lower=0).fillna(0)
+    progress = pd.to_numeric(df.get("Progress", 0), errors="coerce")
+    progress = (progress if isinstance(progress, pd.Series) else pd.Series(progress, index=df.index)).fillna(0).clip(0, 100)
+    labels = df["Task"].fillna("").astype(str) if "Task" in df.columns else pd.Series(df.index + 1).astype(str)
+    positions = np.arange(len(df))
+
+    colors = np.full(len(df), COLORS["normal"], dtype=object)
+    if "Count" in df.columns:
+        colors[:] = COLORS["summary"]
+    if "Critical" in df.columns:
+        colors[df["Critical"].fillna(False).astype(bool).to_numpy()] = COLORS["critical"]
+
+    details = np.column_stack([
+        labels,
+        start.dt.strftime("%Y-%m-%d"),
+        finish.dt.strftime("%Y-%m-%d"),
+        progress.round(1),
+        df["Resource"].fillna("").astype(str) if "Resource" in df.columns else np.full(len(df), ""),
+    ])
+    hover = ("%{customdata[0]}<br>%{customdata[1]} ← %{customdata[2]}"
+             "<br>الإنجاز: %{customdata[3]}%<br>%{customdata[4]}<extra></extra>")
+
+    fig = go.Figure([
+        go.Bar(base=start, x=span, y=positions, orientation="h", marker_color=colors,
+               customdata=details, hovertemplate=hover, name="المدة"),
+        go.Bar(base=start, x=span * progress / 100, y=positions, orientation="h", width=0.3,
+               marker_color=COLORS["progress"], hoverinfo="skip", name="الإنجاز"),
+    ])
+
+    show_labels = len(df) <= LABEL_LIMIT
+    fig.update_layout(
+        title=title,
+        barmode="overlay",
+        showlegend=False,
+        height=int(min(max(300, 22 * len(df) + 120), 1200)),
+        xaxis=dict(type="date", title="التاريخ"),
+        yaxis=dict(
+            title=yaxis_title,
+            autorange="reversed",
+            tickmode="array" if show_labels else "auto",
+            tickvals=positions if show_labels else None,
+            ticktext=labels if show_labels else None,
+            showticklabels=show_labels,
+        ),
+        bargap=0.2,
+        margin=dict(l=10, r=10, t=50, b=40),
+    )
+    return fig
+
+
+def schedule_groups(items, level=1):
+    """
+    مفتاح مجموعة كل بند: أول مستويات رمز WBS، أو مجموعات متتالية من البنود إن لم يوجد WBS
+
+    المعلمات:
+        items (DataFrame): بنود الجدول
+        level (int): عدد مستويات WBS في المفتاح
+
+    العوائد:
+        Series: اسم مجموعة كل بند
+    """
+    if "WBS" in items.columns and items["WBS"].fillna("").astype(str).str.strip().ne("").any():
+        wbs = items["WBS"].fillna("").astype(str).str.strip()
+        groups = wbs.str.split(".").str[:level].str.join(".")
+        return groups.where(groups != "", "بدون WBS")
+
+    chunk = np.arange(len(items)) // CHUNK_SIZE
+    return pd.Series([f"البنود {c * CHUNK_SIZE + 1} - {min((c + 1) * CHUNK_SIZE, len(items))}" for c in chunk],
+                     index=items.index)
+
+
+def wbs_depth(items):
+    """أعمق مستوى WBS في البنود (صفر إن لم يوجد WBS)"""
+    if "WBS" not in items.columns:
+        return 0
+    wbs = items["WBS"].fillna("").astype(str).str.strip()
+    wbs = wbs[wbs != ""]
+    return int(wbs.str.count(r"\.").max() + 1) if len(wbs) else 0
+
+
+def summarize_schedule(items, level=1):
+    """
+    تلخيص البنود حسب المجموعة: أبكر بدء وآخر انتهاء ونسبة إنجاز مرجحة بالمدة
+
+    المعلمات:
+        items (DataFrame): بنود الجدول بأعمدة Start, Finish واختيارياً Duration, Progress, Critical
+        level (int): مستوى WBS للتجميع
+
+    العوائد:
+        DataFrame: Group, Task (اسم المجموعة وعدد بنودها), Start, Finish, Progress, Critical, Count
+    """
+    df = pd.DataFrame({
+        "group": schedule_groups(items, level),
+        "Start": pd.to_datetime(items["Start"]),
+        "Finish": pd.to_datetime(items["Finish"]),
+        "weight": pd.to_numeric(items.get("Duration", 1), errors="coerce"),
+        "Progress": pd.to_numeric(items.get("Progress", 0), errors="coerce"),
+        "Critical": items["Critical"].fillna(False).astype(bool) if "Critical" in items.columns else False,
+    })
+    df["weight"] = df["weight"].fillna(0).clip(lower=0) + 1e-9
+    df["done"] = df["weight"] * df["Progress"].fillna(0)
+
+    summary = df.groupby("group", sort=False).agg(
+        Start=("Start", "min"), Finish=("Finish", "max"), done=("done", "sum"), weight=("weight", "sum"),
+        Critical=("Critical", "any"), Count=("Start", "size"),
+    )
+    summary["Progress"] = summary["done"] / summary["weight"]
+    summary = summary.reset_index().rename(columns={"group": "Group"})
+    summary["Task"] = summary["Group"] + " (" + summary["Count"].astype(str) + ")"
+    return summary[["Group", "Task", "Start", "Finish", "Progress", "Critical", "Count"]]
@@ -0,0 +1,371 @@
+"""
+استيراد الجداول الزمنية من Primavera P6 (XER) وMicrosoft Project (MSPDI XML)
+
+تقرأ الملفات بالتدفق: ملف XER سطراً بسطر وجدولاً بجدول مع تجاهل الجداول غير
+المطلوبة، وملف MSPDI بـ iterparse مع حذف كل عنصر بعد قراءته، فلا تتجاوز الذاكرة
+حجم البيانات المستخرجة مهما كبر الملف. تجمع البيانات في أعمدة مضغوطة (array
+للأرقام وقوائم للنصوص) ثم تحول إلى جداول pandas:
+
+    activities: id, code, name, wbs, duration_days, start, finish, calendar_id, progress, summary
+    relationships: predecessor_id, successor_id, type (FS|SS|FF|SF), lag_days
+    calendars: id, name, hours_per_day
+    assignments: activity_id, resource_id, resource, units
+"""
+
+import io
+import logging
+import re
+import xml.etree.ElementTree as ET
+from array import array
+
+import pandas as pd
+
+logger = logging.getLogger('tender_system.scheduling')
+
+DEFAULT_HOURS_PER_DAY = 8.0
+
+# الأعمدة المطلوبة من جداول XER (تتجاهل بقية الجداول والأعمدة)
+XER_TABLES = {
+    "TASK": ("task_id", "task_code", "task_name", "target_drtn_hr_cnt", "target_start_date",
+             "target_end_date", "early_start_date", "early_end_date", "clndr_id",
+             "phys_complete_pct", "task_type", "wbs_id"),
+    "PROJWBS": ("wbs_id", "parent_wbs_id", "wbs_short_name", "proj_node_flag"),
+    "TASKPRED": ("task_id", "pred_task_id", "pred_type", "lag_hr_cnt"),
+    "CALENDAR": ("clndr_id", "clndr_name", "day_hr_cnt"),
+    "TASKRSRC": ("task_id", "rsrc_id", "target_qty"),
+    "RSRC": ("rsrc_id", "rsrc_name"),
+}
+
+# أنواع مهام P6 التجميعية (لا تدخل في الجدول)
+_XER_SUMMARY_TYPES = {"TT_WBS", "TT_LOE"}
+
+# أنواع العلاقات في MSPDI
+_MSPDI_LINK_TYPES = {"0": "FF", "1": "FS", "2": "SF", "3": "SS"}
+
+_ISO_DURATION = re.compile(r"^-?PT?(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?$")
+
+
+class _Columns:
+    """أعمدة مضغوطة تبنى سجلاً بسجل"""
+
+    def __init__(self, numeric=(), text=()):
+        self.numeric = {name: array("d") for name in numeric}
+        self.text = {name: [] for name in text}
+
+    def append(self, **values):
+        for name, column in self.numeric.items():
+            column.append(_to_float(values.get(name)))
+        for name, column in self.text.items():
+            value = values.get(name)
+            column.append(None if value in (None, "") else value)
+
+    def frame(self, categorical=()):
+        data = {name: pd.Series(column, dtype=float) for name, column in self.numeric.items()}
+        data.update({name: pd.Series(column, dtype=object) for name, column in self.text.items()})
+        frame = pd.DataFrame(data)
+        for name in categorical:
+            frame[name] = frame[name].astype("category")
+        return frame
+
+
+def _to_float(value):
+    """تحويل قيمة نصية إلى رقم (NaN للقيم الفارغة أو غير الصالحة)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _open_text(source):
+    """
+    فتح ملف XER نصياً بالتدفق مع اكتشاف الترميز من أول جزء
+
+    يحاول UTF-8 ثم ترميز Windows العربي (cp1256) الذي تصدر به P6 على الأنظمة العربية.
+    """
+    stream = open(source, "rb") if isinstance(source, str) else source
+    if stream.seekable():
+        position = stream.tell()
+        sample = stream.read(65536)
+        stream.seek(position)
+    else:
+        stream = io.BufferedReader(stream, 65536)
+        sample = stream.peek(65536)[:65536]
+    try:
+        sample.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as error:
+        # قطع حرف متعدد البايتات في نهاية العينة لا يعني أن الترميز غير UTF-8
+        encoding = "utf-8-sig" if error.start >= len(sample) - 3 else "cp1256"
+    return io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+
+
+def read_xer(source):
+    """
+    قراءة ملف Primavera P6 XER بالتدفق
+
+    المعلمات:
+        source (str|file): مسار الملف أو ملف ثنائي مفتوح
+
+    العوائد:
+        dict: جداول activities, relationships, calendars, assignments
+    """
+    rows = {table: _Columns(text=columns) for table, columns in XER_TABLES.items()}
+    table, positions = None, None
+
+    text = _open_text(source)
+    try:
+        for line in text:
+            line = line.rstrip("\r\n")
+            if line.startswith("%T\t"):
+                table = line[3:].strip()
+                positions = None
+            elif line.startswith("%F\t") and table in XER_TABLES:
+                fields = line[3:].split("\t")
+                positions = [(name, fields.index(name)) for name in XER_TABLES[table] if name in fields]
+            elif line.startswith("%R\t") and positions is not None:
+                values = line[3:].split("\t")
+                rows[table].append(**{name: values[index] if index < len(values) else None
+                                      for name, index in positions})
+    finally:
+        if isinstance(source, str):
+            text.close()
+        else:
+            text.detach()
+
+    calendars = rows["CALENDAR"].frame()
+    calendars = pd.DataFrame({
+        "id": calendars["clndr_id"],
+        "name": calendars["clndr_name"],
+        "hours_per_day": pd.to_numeric(calendars["day_hr_cnt"], errors="coerce").fillna(DEFAULT_HOURS_PER_DAY),
+    })
+    hours_per_day = calendars.set_index("id")["hours_per_day"]
+
+    tasks = rows["TASK"].frame()
+    wbs_paths = _xer_wbs_paths(rows["PROJWBS"].frame())
+    task_hours = tasks["clndr_id"].map(hours_per_day).fillna(DEFAULT_HOURS_PER_DAY)
+    activities = pd.DataFrame({
+        "id": tasks["task_id"],
+        "code": tasks["task_code"],
+        "name": tasks["task_name"],
+        "wbs": tasks["wbs_id"].map(wbs_paths),
+        "duration_days": pd.to_numeric(tasks["target_drtn_hr_cnt"], errors="coerce").fillna(0) / task_hours,
+        "start": pd.to_datetime(tasks["early_start_date"].fillna(tasks["target_start_date"]), errors="coerce"),
+        "finish": pd.to_datetime(tasks["early_end_date"].fillna(tasks["target_end_date"]), errors="coerce"),
+        "calendar_id": tasks["clndr_id"],
+        "progress": pd.to_numeric(tasks["phys_complete_pct"], errors="coerce").fillna(0),
+        "summary": tasks["task_type"].isin(_XER_SUMMARY_TYPES),
+    })
+    activity_hours = pd.Series(task_hours.values, index=tasks["task_id"])
+
+    links = rows["TASKPRED"].frame()
+    relationships = pd.DataFrame({
+        "predecessor_id": links["pred_task_id"],
+        "successor_id": links["task_id"],
+        "type": links["pred_type"].str.replace("PR_", "", regex=False).astype("category"),
+        "lag_days": pd.to_numeric(links["lag_hr_cnt"], errors="coerce").fillna(0)
+                    / links["task_id"].map(activity_hours).fillna(DEFAULT_HOURS_PER_DAY),
+    })
+
+    resources = rows["RSRC"].frame().set_index("rsrc_id")["rsrc_name"]
+    task_resources = rows["TASKRSRC"].frame()
+    assignments = pd.DataFrame({
+        "activity_id": task_resources["task_id"],
+        "resource_id": task_resources["rsrc_id"],
+        "resource": task_resources["rsrc_id"].map(resources).astype("category"),
+        "units": pd.to_numeric(task_resources["target_qty"], errors="coerce"),
+    })
+
+    logger.info(f"تم استيراد {len(activities)} نشاط و{len(relationships)} علاقة من ملف XER")
+    return {"activities": activities, "relationships": relationships,
+            "calendars": calendars, "assignments": assignments}
+
+
+def _xer_wbs_paths(wbs):
+    """مسار كل عنصر WBS برموزه المختصرة من أعلى المستويات (دون عقدة المشروع)، مثل A.B.C"""
+    parents = dict(zip(wbs["wbs_id"], wbs["parent_wbs_id"]))
+    names = {wbs_id: name for wbs_id, name, project_node in
+             zip(wbs["wbs_id"], wbs["wbs_short_name"], wbs["proj_node_flag"]) if project_node != "Y"}
+    paths = {}
+
+    def path(wbs_id):
+        if wbs_id not in paths:
+            parent = parents.get(wbs_id)
+            prefix = path(parent) if parent in parents and parent != wbs_id else None
+            paths[wbs_id] = ".".join(part for part in (prefix, names.get(wbs_id)) if part) or None
+        return paths[wbs_id]
+
+    for wbs_id in parents:
+        path(wbs_id)
+    return paths
+
+
+def _iso_hours(value):
+    """تحويل مدة ISO 8601 بصيغة MSPDI (مثل PT16H0M0S) إلى ساعات"""
+    if not value:
+        return 0.0
+    match = _ISO_DURATION.match(value.strip())
+    if not match:
+        return float("nan")
+    hours, minutes, seconds = (float(part or 0) for part in match.groups())
+    sign = -1 if value.strip().startswith("-") else 1
+    return sign * (hours + minutes / 60 + seconds / 3600)
+
+
+def read_mspdi(source):
+    """
+    قراءة ملف Microsoft Project XML (MSPDI) بالتدفق
+
+    المعلمات:
+        source (str|file): مسار الملف أو ملف ثنائي مفتوح
+
+    العوائد:
+        dict: جداول activities, relationships, calendars, assignments
+    """
+    activities = _Columns(numeric=("duration_hours", "progress"),
+                          text=("id", "code", "name", "wbs", "start", "finish", "calendar_id", "summary"))
+    relationships = _Columns(numeric=("lag_minutes",), text=("predecessor_id", "successor_id", "type"))
+    calendars = _Columns(text=("id", "name"))
+    assignments = _Columns(numeric=("units",), text=("activity_id", "resource_id"))
+    resources = {}
+    minutes_per_day = DEFAULT_HOURS_PER_DAY * 60
+
+    stack = []
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            continue
+        stack.pop()
+        tag = element.tag.rsplit("}", 1)[-1]
+        parent = stack[-1].tag.rsplit("}", 1)[-1] if stack else None
+
+        if tag == "MinutesPerDay" and parent == "Project":
+            minutes_per_day = _to_float(element.text) or minutes_per_day
+        elif tag == "Task" and parent == "Tasks":
+            fields = _children(element)
+            activities.append(
+                id=fields.get("UID"), code=fields.get("ID"), name=fields.get("Name"), wbs=fields.get("WBS"),
+                duration_hours=_iso_hours(fields.get("Duration")), start=fields.get("Start"),
+                finish=fields.get("Finish"), calendar_id=fields.get("CalendarUID"),
+                progress=fields.get("PercentComplete"), summary=fields.get("Summary"),
+            )
+            for link in element:
+                if link.tag.rsplit("}", 1)[-1] == "PredecessorLink":
+                    link_fields = _children(link)
+                    relationships.append(
+                        predecessor_id=link_fields.get("PredecessorUID"), successor_id=fields.get("UID"),
+                        type=_MSPDI_LINK_TYPES.get(link_fields.get("Type", "1"), "FS"),
+                        lag_minutes=_to_float(link_fields.get("LinkLag", 0)) / 10,
+                    )
+        elif tag == "Calendar" and parent == "Calendars":
+            fields = _children(element)
+            calendars.append(id=fields.get("UID"), name=fields.get("Name"))
+        elif tag == "Resource" and parent == "Resources":
+            fields = _children(element)
+            resources[fields.get("UID")] = fields.get("Name")
+        elif tag == "Assignment" and parent == "Assignments":
+            fields = _children(element)
+            if fields.get("ResourceUID") not in (None, "-65535"):
+                assignments.append(activity_id=fields.get("TaskUID"), resource_id=fields.get("ResourceUID"),
+                                   units=fields.get("Units"))
+        else:
+            continue
+
+        # حذف العنصر بعد قراءته ليبقى استهلاك الذاكرة محدوداً
+        element.clear()
+        if stack:
+            stack[-1].remove(element)
+
+    hours_per_day = minutes_per_day / 60
+    tasks = activities.frame()
+    tasks = tasks[tasks["id"] != "0"]  # مهمة ملخص المشروع
+    activities = pd.DataFrame({
+        "id": tasks["id"],
+        "code": tasks["code"],
+        "name": tasks["name"],
+        "wbs": tasks["wbs"],
+        "duration_days": tasks["duration_hours"].fillna(0) / hours_per_day,
+        "start": pd.to_datetime(tasks["start"], errors="coerce"),
+        "finish": pd.to_datetime(tasks["finish"], errors="coerce"),
+        "calendar_id": tasks["calendar_id"],
+        "progress": tasks["progress"].fillna(0),
+        "summary": tasks["summary"] == "1",
+    }).reset_index(drop=True)
+
+    links = relationships.frame(categorical=("type",))
+    relationships = pd.DataFrame({
+        "predecessor_id": links["predecessor_id"],
+        "successor_id": links["successor_id"],
+        "type": links["type"],
+        "lag_days": links["lag_minutes"].fillna(0) / minutes_per_day,
+    })
+
+    calendars = calendars.frame().assign(hours_per_day=hours_per_day)
+    assignments = assignments.frame()
+    assignments.insert(2, "resource", assignments["resource_id"].map(resources).astype("category"))
+
+    logger.info(f"تم استيراد {len(activities)} نشاط و{len(relationships)} علاقة من ملف MSPDI")
+    return {"activities": activities, "relationships": relationships,
+            "calendars": calendars, "assignments": assignments[["activity_id", "resource_id", "resource", "units"]]}
+
+
+def _children(element):
+    """قيم العناصر الفرعية المباشرة حسب اسمها بلا مساحة الأسماء"""
+    return {child.tag.rsplit("}", 1)[-1]: child.text for child in element if len(child) == 0}
+
+
+def read_schedule_file(source, filename):
+    """
+    قراءة ملف جدول زمني حسب امتداده
+
+    العوائد:
+        dict: جداول activities, relationships, calendars, assignments
+    """
+    extension = filename.lower().rsplit(".", 1)[-1]
+    if extension == "xer":
+        return read_xer(source)
+    if extension == "xml":
+        return read_mspdi(source)
+    raise ValueError(f"نوع ملف الجدول الزمني غير مدعوم: {extension}")
+
+
+def to_schedule_items(schedule):
+    """
+    تحويل جداول الاستيراد إلى بنود الجدول الزمني في ScheduleApp
+
+    تستبعد المهام التجميعية والعلاقات المرتبطة بها، وترقم الأنشطة تسلسلياً وتكتب
+    الاعتماديات بصيغة Microsoft Project (مثل 3SS+2) لمحرك المسار الحرج.
+
+    المعلمات:
+        schedule (dict): نتيجة read_xer أو read_mspdi
+
+    العوائد:
+        list: بنود بمفاتيح ID, WBS, Task, Start, Finish, Duration, Dependencies, Progress, Resource
+    """
+    activities = schedule["activities"]
+    activities = activities[~activities["summary"]].reset_index(drop=True)
+    numbers = pd.Series(range(1, len(activities) + 1), index=activities["id"])
+
+    links = schedule["relationships"]
+    links = links[links["predecessor_id"].isin(numbers.index) & links["successor_id"].isin(numbers.index)]
+    lag = links["lag_days"].round(2)
+    lag_text = lag.map(lambda value: "" if value == 0 else f"{value:+g}").astype(str)
+    link_types = links["type"].astype(str)
+    type_text = link_types.where(link_types != "FS", "")
+    references = links["predecessor_id"].map(numbers).astype(str) + type_text + lag_text
+    dependencies = references.groupby(links["successor_id"].values).agg(", ".join)
+
+    assignments = schedule["assignments"]
+    assignments = assignments.dropna(subset=["resource"])
+    resources = assignments["resource"].astype(str).groupby(assignments["activity_id"].values).agg(", ".join)
+
+    return pd.DataFrame({
+        "ID": numbers.values,
+        "WBS": activities["wbs"].fillna(""),
+        "Task": activities["name"].fillna(activities["code"]).fillna(""),
+        "Start": activities["start"].dt.strftime("%Y-%m-%d"),
+        "Finish": activities["finish"].dt.strftime("%Y-%m-%d"),
+        "Duration": activities["duration_days"].round(2),
+        "Dependencies": activities["id"].map(dependencies).fillna(""),
+        "Progress": activities["progress"],
+        "Resource": activities["id"].map(resources).fillna(""),
+    }).to_dict("records")
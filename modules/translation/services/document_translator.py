@@ -0,0 +1,313 @@
+"""
+مترجم المستندات - ترجمة ملفات DOCX وXLSX وTXT مع الحفاظ على التخطيط
+
+تعامل ملفات DOCX وXLSX كحزم ZIP: تنسخ جميع الأجزاء (الصور، الأنماط، أوراق
+العمل الرقمية) إلى الملف الناتج كتدفق دون تحميلها في الذاكرة، ولا يعاد بناء إلا
+الأجزاء النصية:
+- DOCX: الفقرات في المستند والترويسات والتذييلات والحواشي، حيث تترجم الفقرة
+  كاملة وتوضع في أول مقطع نصي (run) مع الإبقاء على تنسيقه.
+- XLSX: جدول النصوص المشتركة (sharedStrings.xml) والنصوص المضمنة في صفوف أوراق
+  العمل، وتقرأ وتكتب تدريجياً على دفعات فتبقى الخلايا والصيغ والتنسيقات كما هي.
+تمرر النصوص إلى مسار الترجمة على دفعات مع إزالة التكرار، فيبقى استهلاك الذاكرة
+محدوداً بحجم الدفعة لا بحجم الملف.
+"""
+
+import os
+import re
+import shutil
+import logging
+import zipfile
+
+from lxml import etree
+
+logger = logging.getLogger('tender_system.document_translator')
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+S_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# الأجزاء النصية في مستندات Word
+_DOCX_TEXT_PARTS = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+_XLSX_SHARED_STRINGS = "xl/sharedStrings.xml"
+_XLSX_WORKSHEETS = re.compile(r"^xl/worksheets/sheet\d+\.xml$")
+
+# اللغات التي تكتب من اليمين إلى اليسار
+RTL_LANGUAGES = {"ar", "fa", "he", "ur"}
+
+# حجم كتلة النسخ للأجزاء غير النصية
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+def _s(tag):
+    return f"{{{S_NS}}}{tag}"
+
+
+class DocumentTranslator:
+    """مترجم المستندات المتدفق"""
+
+    SUPPORTED_EXTENSIONS = ("docx", "xlsx", "txt")
+
+    def __init__(self, pipeline, chunk_size=500, adjust_direction=True):
+        """
+        تهيئة مترجم المستندات
+
+        المعلمات:
+            pipeline (TranslationPipeline): مسار الترجمة
+            chunk_size (int): عدد الفقرات أو النصوص المشتركة في كل دفعة
+            adjust_direction (bool): ضبط اتجاه فقرات Word حسب لغة الهدف
+        """
+        self.pipeline = pipeline
+        self.chunk_size = max(1, chunk_size)
+        self.adjust_direction = adjust_direction
+
+    def translate_file(self, input_path, output_path, source_language, target_language,
+                       use_glossary=True, progress_callback=None):
+        """
+        ترجمة ملف وكتابة الناتج
+
+        المعلمات:
+            input_path (str): مسار الملف الأصلي
+            output_path (str): مسار الملف المترجم
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            use_glossary (bool): تطبيق قاموس المصطلحات الفنية
+            progress_callback (callable): دالة تستقبل (نسبة التقدم بين 0 و 1، رسالة الحالة)
+
+        العوائد:
+            dict: إحصائيات الترجمة المجمعة
+        """
+        extension = os.path.splitext(input_path)[1].lower().lstrip(".")
+        if extension not in self.SUPPORTED_EXTENSIONS:
+            raise ValueError(f"نوع الملف {extension} غير مدعوم للترجمة مع الحفاظ على التخطيط")
+
+        self._context = {
+            "source_language": source_language,
+            "target_language": target_language,
+            "use_glossary": use_glossary,
+            "progress_callback": progress_callback
+        }
+        self._stats = {"texts": 0, "segments": 0, "exact_matches": 0, "fuzzy_matches": 0,
+                       "engine_segments": 0, "engine_batches": 0, "glossary_terms": 0}
+
+        if extension == "txt":
+            self._translate_txt(input_path, output_path)
+        else:
+            self._translate_package(input_path, output_path, extension)
+
+        self._report_progress(1.0, "اكتملت الترجمة")
+        return dict(self._stats)
+
+    def _report_progress(self, fraction, message):
+        """إبلاغ الواجهة بالتقدم إن وجدت دالة متابعة"""
+        callback = self._context.get("progress_callback")
+        if callback:
+            callback(min(max(fraction, 0.0), 1.0), message)
+
+    def _translate_chunk(self, texts):
+        """ترجمة دفعة من النصوص بعد إزالة التكرار وتجميع الإحصائيات"""
+        unique_texts = list(dict.fromkeys(texts))
+        translated, stats = self.pipeline.translate_texts(
+            unique_texts,
+            self._context["source_language"],
+            self._context["target_language"],
+            self._context["use_glossary"]
+        )
+        lookup = dict(zip(unique_texts, translated))
+
+        self._stats["texts"] += len(texts)
+        for key in ("segments", "exact_matches", "fuzzy_matches", "engine_segments", "engine_batches", "glossary_terms"):
+            self._stats[key] += stats[key]
+
+        return [lookup[text] for text in texts]
+
+    def _translate_txt(self, input_path, output_path):
+        """ترجمة ملف نصي على دفعات من الأسطر"""
+        total_size = max(os.path.getsize(input_path), 1)
+
+        with open(input_path, "r", encoding="utf-8") as source, open(output_path, "w", encoding="utf-8") as target:
+            chunk = []
+            processed = 0
+            for line in source:
+                chunk.append(line)
+                processed += len(line.encode("utf-8"))
+                if len(chunk) >= self.chunk_size:
+                    target.writelines(self._translate_chunk(chunk))
+                    chunk = []
+                    self._report_progress(processed / total_size, "جاري ترجمة المحتوى...")
+            if chunk:
+                target.writelines(self._translate_chunk(chunk))
+
+    def _translate_package(self, input_path, output_path, extension):
+        """ترجمة حزمة Office مع نسخ الأجزاء غير النصية كتدفق"""
+        with zipfile.ZipFile(input_path, "r") as zin, zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            items = zin.infolist()
+
+            for index, item in enumerate(items):
+                if extension == "docx" and _DOCX_TEXT_PARTS.match(item.filename):
+                    self._report_progress(index / len(items), f"جاري ترجمة {item.filename}...")
+                    self._translate_docx_part(zin, zout, item)
+                elif extension == "xlsx" and item.filename == _XLSX_SHARED_STRINGS:
+                    self._report_progress(index / len(items), "جاري ترجمة نصوص الخلايا...")
+                    self._stream_part(zin, zout, item, _s("sst"), _s("si"), self._shared_string_texts)
+                elif extension == "xlsx" and _XLSX_WORKSHEETS.match(item.filename):
+                    self._report_progress(index / len(items), f"جاري ترجمة {item.filename}...")
+                    self._stream_part(zin, zout, item, _s("sheetData"), _s("row"), self._inline_string_texts)
+                else:
+                    with zin.open(item) as source, zout.open(item, "w", force_zip64=True) as target:
+                        shutil.copyfileobj(source, target, _COPY_BUFFER_SIZE)
+
+    def _new_part_info(self, item):
+        """إنشاء بيانات جزء جديد بنفس الاسم والتاريخ"""
+        info = zipfile.ZipInfo(item.filename, date_time=item.date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def _translate_docx_part(self, zin, zout, item):
+        """ترجمة فقرات جزء من مستند Word"""
+        with zin.open(item) as source:
+            tree = etree.parse(source)
+
+        paragraphs = []
+        for paragraph in tree.iter(_w("p")):
+            # تجاهل النصوص التابعة لفقرات متداخلة (مثل مربعات النص)
+            text_nodes = [
+                node for node in paragraph.iter(_w("t"))
+                if next(node.iterancestors(_w("p")), None) is paragraph
+            ]
+            if text_nodes and any((node.text or "").strip() for node in text_nodes):
+                paragraphs.append((paragraph, text_nodes))
+
+        for start in range(0, len(paragraphs), self.chunk_size):
+            chunk = paragraphs[start:start + self.chunk_size]
+            translated = self._translate_chunk(["".join(node.text or "" for node in nodes) for _, nodes in chunk])
+
+            for (paragraph, nodes), text in zip(chunk, translated):
+                nodes[0].text = text
+                if text != text.strip():
+                    nodes[0].set(XML_SPACE, "preserve")
+                for node in nodes[1:]:
+                    node.text = ""
+                if self.adjust_direction:
+                    self._set_paragraph_direction(paragraph)
+
+        with zout.open(self._new_part_info(item), "w", force_zip64=True) as target:
+            tree.write(target, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    def _set_paragraph_direction(self, paragraph):
+        """ضبط اتجاه الفقرة حسب لغة الهدف"""
+        rtl = self._context["target_language"] in RTL_LANGUAGES
+        properties = paragraph.find(_w("pPr"))
+
+        if properties is None:
+            if not rtl:
+                return
+            properties = etree.Element(_w("pPr"))
+            paragraph.insert(0, properties)
+
+        bidi = properties.find(_w("bidi"))
+        if rtl and bidi is None:
+            properties.insert(0, etree.Element(_w("bidi")))
+        elif not rtl and bidi is not None:
+            properties.remove(bidi)
+
+    def _stream_part(self, zin, zout, item, container_tag, item_tag, extract_texts):
+        """
+        إعادة كتابة جزء XML كتدفق مع ترجمة عناصره على دفعات
+
+        المعلمات:
+            container_tag (str): وسم العنصر الحاوي للعناصر المترجمة (قد يكون الجذر نفسه)
+            item_tag (str): وسم العناصر المترجمة داخل الحاوي
+            extract_texts (callable): دالة تعيد لكل عنصر قائمة مجموعات العقد النصية
+        """
+        with zin.open(item) as source, zout.open(self._new_part_info(item), "w", force_zip64=True) as target:
+            context = etree.iterparse(source, events=("start", "end"))
+            _, root = next(context)
+
+            with etree.xmlfile(target, encoding="UTF-8") as xf:
+                xf.write_declaration(standalone=True)
+                with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                    container = root if root.tag == container_tag else None
+                    container_writer = None
+                    buffered = []
+
+                    for event, element in context:
+                        parent = element.getparent()
+
+                        if event == "start":
+                            # فتح العنصر الحاوي في الملف الناتج عند بدايته
+                            if container is None and element.tag == container_tag and parent is root:
+                                container = element
+                                container_writer = xf.element(element.tag, dict(element.attrib))
+                                container_writer.__enter__()
+                            continue
+
+                        if container is not None and element.tag == item_tag and parent is container:
+                            buffered.append(element)
+                            if len(buffered) >= self.chunk_size:
+                                self._flush_items(xf, buffered, extract_texts)
+                                buffered = []
+                        elif element is container and container_writer is not None:
+                            self._flush_items(xf, buffered, extract_texts)
+                            buffered = []
+                            container_writer.__exit__(None, None, None)
+                            container_writer = None
+                            root.remove(element)
+                        elif parent is root and element is not container:
+                            # العناصر الأخرى تكتب كما هي عند اكتمالها
+                            xf.write(element)
+                            root.remove(element)
+
+                    if buffered:
+                        self._flush_items(xf, buffered, extract_texts)
+
+    def _flush_items(self, xf, elements, extract_texts):
+        """ترجمة دفعة من العناصر وكتابتها ثم تحرير ذاكرتها"""
+        if not elements:
+            return
+
+        groups = [nodes for element in elements for nodes in extract_texts(element)]
+        translated = self._translate_chunk(["".join(node.text or "" for node in nodes) for nodes in groups]) if groups else []
+
+        for nodes, text in zip(groups, translated):
+            nodes[0].text = text
+            if text != text.strip():
+                nodes[0].set(XML_SPACE, "preserve")
+            for node in nodes[1:]:
+                node.text = ""
+
+        for element in elements:
+            xf.write(element)
+            parent = element.getparent()
+            element.clear()
+            if parent is not None:
+                parent.remove(element)
+
+    @staticmethod
+    def _rich_text_nodes(element):
+        """العقد النصية لنص Excel بسيط أو منسق (t مباشرة أو r/t)"""
+        nodes = [node for node in element if node.tag == _s("t")]
+        nodes += [node for run in element if run.tag == _s("r") for node in run if node.tag == _s("t")]
+        return nodes
+
+    def _shared_string_texts(self, element):
+        """النصوص القابلة للترجمة في عنصر si"""
+        nodes = self._rich_text_nodes(element)
+        return [nodes] if nodes and any((node.text or "").strip() for node in nodes) else []
+
+    def _inline_string_texts(self, row):
+        """النصوص المضمنة في خلايا صف من ورقة العمل"""
+        groups = []
+        for cell in row:
+            if cell.tag != _s("c") or cell.get("t") != "inlineStr":
+                continue
+            inline = cell.find(_s("is"))
+            if inline is None:
+                continue
+            nodes = self._rich_text_nodes(inline)
+            if nodes and any((node.text or "").strip() for node in nodes):
+                groups.append(nodes)
+        return groups
@@ -0,0 +1,107 @@
+"""
+محركات الترجمة - واجهة موحدة لإرسال دفعات من المقاطع إلى محرك الترجمة
+"""
+
+import json
+import logging
+import threading
+
+import requests
+
+logger = logging.getLogger('tender_system.translation_engines')
+
+
+class TranslationEngine:
+    """الفئة الأساسية لمحركات الترجمة"""
+
+    name = "base"
+
+    def translate_batch(self, segments, source_language, target_language):
+        """
+        ترجمة دفعة من المقاطع
+
+        المعلمات:
+            segments (list): المقاطع المراد ترجمتها
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+
+        العوائد:
+            list: الترجمات بنفس ترتيب المقاطع
+        """
+        raise NotImplementedError
+
+
+class LocalTranslationEngine(TranslationEngine):
+    """محرك ترجمة محلي للعرض والاختبار دون اتصال بالإنترنت"""
+
+    name = "local"
+
+    def __init__(self):
+        """تهيئة المحرك المحلي"""
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def translate_batch(self, segments, source_language, target_language):
+        """إرجاع المقاطع موسومة بلغة الهدف مع تسجيل حجم كل دفعة"""
+        with self._lock:
+            self.calls.append(len(segments))
+        return [f"[{target_language}] {segment}" for segment in segments]
+
+
+class OpenAITranslationEngine(TranslationEngine):
+    """محرك ترجمة يعتمد على واجهة OpenAI للمحادثة"""
+
+    name = "openai"
+
+    def __init__(self, api_key, model="gpt-4", timeout=60):
+        """
+        تهيئة محرك OpenAI
+
+        المعلمات:
+            api_key (str): مفتاح واجهة البرمجة
+            model (str): اسم النموذج
+            timeout (int): مهلة الطلب بالثواني
+        """
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+
+    def translate_batch(self, segments, source_language, target_language):
+        """ترجمة دفعة من المقاطع في طلب واحد بصيغة JSON"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        data = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        f"Translate each item of the JSON array from '{source_language}' to '{target_language}'. "
+                        "These are construction tender documents. Keep placeholders such as [[T0]] unchanged. "
+                        "Reply with a JSON array of strings of the same length and nothing else."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": json.dumps(segments, ensure_ascii=False)
+                }
+            ],
+            "temperature": 0
+        }
+
+        response = requests.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers=headers,
+            json=data,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        translations = json.loads(response.json()["choices"][0]["message"]["content"])
+        if not isinstance(translations, list) or len(translations) != len(segments):
+            raise ValueError("عدد الترجمات المستلمة لا يطابق عدد المقاطع المرسلة")
+
+        return [str(translation) for translation in translations]
@@ -0,0 +1,231 @@
+"""
+ذاكرة الترجمة - تخزين المقاطع المترجمة سابقاً في قاعدة بيانات SQLite
+
+تحفظ الذاكرة كل مقطع مصدر مع ترجمته حسب زوج اللغات، وتدعم البحث عن التطابق
+التام (عبر بصمة النص الموحد) والتطابق التقريبي (عبر فهرس الكلمات ثم حساب نسبة
+التشابه) حتى لا يرسل إلى محرك الترجمة إلا المقاطع التي لم تترجم من قبل.
+"""
+
+import os
+import hashlib
+import sqlite3
+import difflib
+import logging
+import threading
+
+from utils.arabic_text import normalize_text, tokenize
+
+logger = logging.getLogger('tender_system.translation_memory')
+
+# الحد الأقصى لعدد المعاملات في استعلام IN واحد
+_SQL_CHUNK_SIZE = 500
+
+
+def segment_hash(segment):
+    """حساب بصمة المقطع بعد توحيده"""
+    return hashlib.sha1(normalize_text(segment).encode('utf-8')).hexdigest()
+
+
+def _chunks(items, size=_SQL_CHUNK_SIZE):
+    """تقسيم قائمة إلى أجزاء بحجم محدد"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class TranslationMemory:
+    """ذاكرة الترجمة على مستوى المقاطع"""
+
+    def __init__(self, db_path=None):
+        """
+        تهيئة ذاكرة الترجمة
+
+        المعلمات:
+            db_path (str): مسار ملف قاعدة البيانات، أو ":memory:" لذاكرة مؤقتة
+        """
+        self.db_path = db_path or os.path.join('data', 'translation_memory.db')
+        self._lock = threading.Lock()
+
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """إنشاء جداول ذاكرة الترجمة"""
+        with self._lock:
+            cursor = self.connection.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS translation_memory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_language TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                target_text TEXT NOT NULL,
+                usage_count INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+
+            cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_translation_memory_lookup
+            ON translation_memory (source_language, target_language, source_hash)
+            ''')
+
+            # فهرس الكلمات المستخدم في البحث التقريبي
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS translation_memory_tokens (
+                token TEXT NOT NULL,
+                segment_id INTEGER NOT NULL,
+                PRIMARY KEY (token, segment_id)
+            ) WITHOUT ROWID
+            ''')
+
+            self.connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+
+    def add(self, source_text, target_text, source_language, target_language):
+        """إضافة مقطع مترجم إلى الذاكرة"""
+        self.add_many([(source_text, target_text)], source_language, target_language)
+
+    def add_many(self, pairs, source_language, target_language, overwrite=True):
+        """
+        إضافة مجموعة من المقاطع المترجمة في معاملة واحدة
+
+        المعلمات:
+            pairs (list): قائمة أزواج (النص المصدر، الترجمة)
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            overwrite (bool): استبدال الترجمة المحفوظة للمقطع، أو الإبقاء عليها (مثل تصحيحات المستخدم)
+        """
+        if not pairs:
+            return
+
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                for source_text, target_text in pairs:
+                    source_hash = segment_hash(source_text)
+                    cursor.execute('''
+                    INSERT INTO translation_memory (source_language, target_language, source_hash, source_text, target_text)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (source_language, target_language, source_hash)
+                    DO UPDATE SET target_text = excluded.target_text, updated_at = CURRENT_TIMESTAMP
+                    WHERE ?
+                    ''', (source_language, target_language, source_hash, source_text, target_text, overwrite))
+
+                    segment_id = cursor.execute('''
+                    SELECT id FROM translation_memory
+                    WHERE source_language = ? AND target_language = ? AND source_hash = ?
+                    ''', (source_language, target_language, source_hash)).fetchone()[0]
+
+                    cursor.executemany(
+                        "INSERT OR IGNORE INTO translation_memory_tokens (token, segment_id) VALUES (?, ?)",
+                        [(token, segment_id) for token in set(tokenize(source_text))]
+                    )
+
+                self.connection.commit()
+            except Exception as e:
+                logger.error(f"خطأ في إضافة المقاطع إلى ذاكرة الترجمة: {str(e)}")
+                self.connection.rollback()
+                raise
+
+    def lookup_many(self, segments, source_language, target_language, fuzzy_threshold=None, max_candidates=20):
+        """
+        البحث عن ترجمات مجموعة من المقاطع
+
+        المعلمات:
+            segments (list): المقاطع المراد البحث عنها
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            fuzzy_threshold (float): الحد الأدنى لنسبة التشابه في التطابق التقريبي، أو None لتعطيله
+            max_candidates (int): عدد المرشحين الذين تحسب لهم نسبة التشابه لكل مقطع
+
+        العوائد:
+            dict: لكل مقطع موجود: {"target": الترجمة، "score": نسبة التشابه، "match_type": "exact" أو "fuzzy"}
+        """
+        hashes = {}
+        for segment in segments:
+            hashes.setdefault(segment_hash(segment), []).append(segment)
+
+        matches = {}
+        hit_ids = []
+
+        with self._lock:
+            # التطابق التام عبر البصمة
+            for chunk in _chunks(list(hashes)):
+                placeholders = ', '.join(['?'] * len(chunk))
+                rows = self.connection.execute(f'''
+                SELECT id, source_hash, target_text FROM translation_memory
+                WHERE source_language = ? AND target_language = ? AND source_hash IN ({placeholders})
+                ''', [source_language, target_language] + chunk).fetchall()
+
+                for segment_id, source_hash, target_text in rows:
+                    hit_ids.append(segment_id)
+                    for segment in hashes[source_hash]:
+                        matches[segment] = {"target": target_text, "score": 1.0, "match_type": "exact"}
+
+            # التطابق التقريبي للمقاطع المتبقية
+            if fuzzy_threshold is not None:
+                for segment in segments:
+                    if segment in matches:
+                        continue
+
+                    fuzzy_match = self._fuzzy_lookup(segment, source_language, target_language, fuzzy_threshold, max_candidates)
+                    if fuzzy_match:
+                        hit_ids.append(fuzzy_match.pop("id"))
+                        matches[segment] = fuzzy_match
+
+            # تحديث عدادات الاستخدام
+            if hit_ids:
+                self.connection.executemany(
+                    "UPDATE translation_memory SET usage_count = usage_count + 1 WHERE id = ?",
+                    [(segment_id,) for segment_id in hit_ids]
+                )
+                self.connection.commit()
+
+        return matches
+
+    def _fuzzy_lookup(self, segment, source_language, target_language, threshold, max_candidates):
+        """البحث عن أقرب مقطع مشابه عبر فهرس الكلمات"""
+        tokens = list(set(tokenize(segment)))
+        if not tokens:
+            return None
+
+        placeholders = ', '.join(['?'] * len(tokens[:_SQL_CHUNK_SIZE]))
+        candidates = self.connection.execute(f'''
+        SELECT tm.id, tm.source_text, tm.target_text, COUNT(*) AS shared_tokens
+        FROM translation_memory_tokens t
+        JOIN translation_memory tm ON tm.id = t.segment_id
+        WHERE t.token IN ({placeholders}) AND tm.source_language = ? AND tm.target_language = ?
+        GROUP BY tm.id
+        ORDER BY shared_tokens DESC
+        LIMIT ?
+        ''', tokens[:_SQL_CHUNK_SIZE] + [source_language, target_language, max_candidates]).fetchall()
+
+        matcher = difflib.SequenceMatcher(None, b=normalize_text(segment))
+        best = None
+
+        for segment_id, source_text, target_text, _ in candidates:
+            matcher.set_seq1(normalize_text(source_text))
+
+            # استبعاد المرشحين سريعاً قبل الحساب الكامل لنسبة التشابه
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+
+            score = matcher.ratio()
+            if score >= threshold and (best is None or score > best["score"]):
+                best = {"id": segment_id, "target": target_text, "score": score, "match_type": "fuzzy"}
+
+        return best
+
+    def close(self):
+        """إغلاق الاتصال بقاعدة البيانات"""
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,279 @@
+"""
+مسار الترجمة - تقسيم النص إلى مقاطع وترجمتها عبر ذاكرة الترجمة ثم المحرك
+
+يمر كل نص بالمراحل التالية:
+1. تقسيمه إلى مقاطع (أسطر ثم جمل) مع الاحتفاظ بالفواصل الأصلية.
+2. البحث عن المقاطع في ذاكرة الترجمة (تطابق تام ثم تقريبي)؛ التطابق التام وحده
+   يغني عن المحرك، أما التقريبي فيعاد كاقتراح للمراجعة لأنه قد يختلف في الأرقام
+   والمدد، ويترجم المقطع بالمحرك.
+3. حماية المصطلحات الفنية بعلامات مؤقتة وفق قاموس المصطلحات.
+4. إرسال المقاطع غير المترجمة فقط إلى المحرك على دفعات مع حد للتوازي.
+5. حفظ الترجمات الجديدة في الذاكرة وإعادة بناء النص.
+"""
+
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('tender_system.translation_pipeline')
+
+# المقطع: جملة تنتهي بعلامة نهاية (غير مسبوقة برقم) أو بقية السطر
+_SEGMENT_RE = re.compile(r"[^\n]+?(?:(?<=[^\d\s])[.!?؟](?=\s|$)|$)", re.MULTILINE)
+
+# المقاطع التي لا تحتوي أحرفاً لا تحتاج إلى ترجمة
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+_PLACEHOLDER_RE = re.compile(r"\[\[T(\d+)\]\]")
+
+# السوابق العربية المسموح بها قبل المصطلح: حروف العطف والجر مع أداة التعريف أو بدونها
+_ARABIC_PREFIX = r"(?:[وف]?[بكل]?ال|[وف]?لل|[وفبل])"
+
+# أداة التعريف في نهاية السابقة (تحذف مع المصطلح لأن ترجمته تغني عنها)
+_ARTICLE_SUFFIX_RE = re.compile(r"ال$|(?<=ل)ل$")
+
+
+def split_segments(text):
+    """
+    تقسيم النص إلى مقاطع قابلة للترجمة
+
+    المعلمات:
+        text (str): النص الكامل
+
+    العوائد:
+        list: قائمة (البداية، النهاية، المقطع) حيث المقطع بدون مسافات طرفية
+    """
+    spans = []
+    for match in _SEGMENT_RE.finditer(text):
+        raw = match.group(0)
+        stripped = raw.strip()
+        if not stripped:
+            continue
+        start = match.start() + (len(raw) - len(raw.lstrip()))
+        spans.append((start, start + len(stripped), stripped))
+    return spans
+
+
+def is_translatable(segment):
+    """التحقق من احتواء المقطع على أحرف تحتاج إلى ترجمة"""
+    return bool(_LETTER_RE.search(segment))
+
+
+class Glossary:
+    """قاموس المصطلحات الفنية المطبق قبل إرسال المقاطع إلى المحرك"""
+
+    def __init__(self, terms, source_language, target_language):
+        """
+        تهيئة القاموس
+
+        المعلمات:
+            terms (list): قائمة قواميس تحتوي رموز اللغات كمفاتيح (مثل {"ar": ..., "en": ...})
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+        """
+        self.mapping = {}
+        for term in terms:
+            source_term = (term.get(source_language) or "").strip()
+            target_term = (term.get(target_language) or "").strip()
+            if source_term and target_term:
+                self.mapping[source_term.lower()] = target_term
+
+        # المصطلحات الأطول أولاً حتى لا تطغى المصطلحات القصيرة عليها، وتطابق كلمات كاملة
+        # فلا يستبدل جزء من كلمة أخرى (bid داخل bidders)، مع السماح بالسوابق العربية (والعطاء)
+        if self.mapping:
+            alternatives = sorted(self.mapping, key=len, reverse=True)
+            self._pattern = re.compile(
+                rf"(?<!\w)(?P<prefix>{_ARABIC_PREFIX})?(?P<term>{'|'.join(re.escape(term) for term in alternatives)})(?!\w)",
+                re.IGNORECASE
+            )
+        else:
+            self._pattern = None
+
+    def mask(self, segment):
+        """
+        استبدال المصطلحات المعروفة بعلامات مؤقتة
+
+        العوائد:
+            tuple: (المقطع بعد الاستبدال، قائمة ترجمات المصطلحات حسب رقم العلامة)
+        """
+        if self._pattern is None:
+            return segment, []
+
+        replacements = []
+
+        def _replace(match):
+            replacements.append(self.mapping[match.group("term").lower()])
+            prefix = _ARTICLE_SUFFIX_RE.sub("", match.group("prefix") or "")
+            return f"{prefix}[[T{len(replacements) - 1}]]"
+
+        return self._pattern.sub(_replace, segment), replacements
+
+    @staticmethod
+    def unmask(text, replacements):
+        """إعادة ترجمات المصطلحات مكان العلامات المؤقتة"""
+        if not replacements:
+            return text
+        return _PLACEHOLDER_RE.sub(
+            lambda match: replacements[int(match.group(1))] if int(match.group(1)) < len(replacements) else match.group(0),
+            text
+        )
+
+
+class TranslationPipeline:
+    """مسار ترجمة يعتمد على ذاكرة الترجمة والدفعات المتوازية"""
+
+    def __init__(self, memory, engine, glossary_terms=None, batch_size=20, max_concurrency=4, fuzzy_threshold=0.9):
+        """
+        تهيئة مسار الترجمة
+
+        المعلمات:
+            memory (TranslationMemory): ذاكرة الترجمة
+            engine (TranslationEngine): محرك الترجمة
+            glossary_terms (list): المصطلحات الفنية
+            batch_size (int): عدد المقاطع في كل طلب إلى المحرك
+            max_concurrency (int): الحد الأقصى للطلبات المتزامنة
+            fuzzy_threshold (float): الحد الأدنى للتطابق التقريبي المقترح للمراجعة، أو None لتعطيله
+        """
+        self.memory = memory
+        self.engine = engine
+        self.glossary_terms = glossary_terms or []
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.fuzzy_threshold = fuzzy_threshold
+        self._glossaries = {}
+
+    def get_glossary(self, source_language, target_language):
+        """الحصول على قاموس زوج اللغات مع تخزينه مؤقتاً"""
+        key = (source_language, target_language)
+        if key not in self._glossaries:
+            self._glossaries[key] = Glossary(self.glossary_terms, source_language, target_language)
+        return self._glossaries[key]
+
+    def translate(self, text, source_language, target_language, use_glossary=True):
+        """
+        ترجمة نص كامل مع الحفاظ على تنسيقه
+
+        المعلمات:
+            text (str): النص المراد ترجمته
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            use_glossary (bool): تطبيق قاموس المصطلحات الفنية
+
+        العوائد:
+            dict: {"text": النص المترجم، "stats": إحصائيات الترجمة}
+        """
+        texts, stats = self.translate_texts([text], source_language, target_language, use_glossary)
+        return {"text": texts[0], "stats": stats}
+
+    def translate_texts(self, texts, source_language, target_language, use_glossary=True):
+        """
+        ترجمة مجموعة من النصوص في تمريرة واحدة على ذاكرة الترجمة والمحرك
+
+        المعلمات:
+            texts (list): النصوص المراد ترجمتها (مثل فقرات مستند أو خلايا جدول)
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            use_glossary (bool): تطبيق قاموس المصطلحات الفنية
+
+        العوائد:
+            tuple: (النصوص المترجمة بنفس الترتيب، إحصائيات الترجمة)
+        """
+        all_spans = [split_segments(text) for text in texts]
+        translations, stats = self.translate_segments(
+            [segment for spans in all_spans for _, _, segment in spans],
+            source_language,
+            target_language,
+            use_glossary
+        )
+
+        translated_texts = []
+        for text, spans in zip(texts, all_spans):
+            parts = []
+            position = 0
+            for start, end, segment in spans:
+                parts.append(text[position:start])
+                parts.append(translations.get(segment, segment))
+                position = end
+            parts.append(text[position:])
+            translated_texts.append("".join(parts))
+
+        return translated_texts, stats
+
+    def translate_segments(self, segments, source_language, target_language, use_glossary=True):
+        """
+        ترجمة مجموعة من المقاطع مع إزالة التكرار
+
+        العوائد:
+            tuple: (قاموس المقطع -> الترجمة، إحصائيات الترجمة)؛ تحتوي الإحصائيات على fuzzy_suggestions:
+                قاموس المقطع -> {"target", "score"} لاقتراحات الذاكرة التقريبية المعروضة للمراجعة
+        """
+        started_at = time.perf_counter()
+
+        unique_segments = list(dict.fromkeys(segment for segment in segments if is_translatable(segment)))
+        translations = {}
+
+        # البحث في ذاكرة الترجمة: لا يطبق إلا التطابق التام، والتقريبي يرسل إلى المحرك
+        matches = self.memory.lookup_many(unique_segments, source_language, target_language, self.fuzzy_threshold)
+        suggestions = {}
+        for segment, match in matches.items():
+            if match["match_type"] == "exact":
+                translations[segment] = match["target"]
+            else:
+                suggestions[segment] = {"target": match["target"], "score": match["score"]}
+
+        pending = [segment for segment in unique_segments if segment not in translations]
+
+        # تطبيق قاموس المصطلحات
+        glossary = self.get_glossary(source_language, target_language) if use_glossary else None
+        masked = []
+        replacements = []
+        for segment in pending:
+            if glossary:
+                masked_segment, segment_replacements = glossary.mask(segment)
+            else:
+                masked_segment, segment_replacements = segment, []
+            masked.append(masked_segment)
+            replacements.append(segment_replacements)
+
+        # إرسال المقاطع الجديدة إلى المحرك على دفعات
+        engine_output = self._run_batches(masked, source_language, target_language)
+
+        new_pairs = []
+        for segment, output, segment_replacements in zip(pending, engine_output, replacements):
+            translated = Glossary.unmask(output, segment_replacements)
+            translations[segment] = translated
+            new_pairs.append((segment, translated))
+
+        self.memory.add_many(new_pairs, source_language, target_language)
+
+        stats = {
+            "segments": len(segments),
+            "unique_segments": len(unique_segments),
+            "exact_matches": sum(1 for match in matches.values() if match["match_type"] == "exact"),
+            "fuzzy_matches": len(suggestions),
+            "fuzzy_suggestions": suggestions,
+            "engine_segments": len(pending),
+            "engine_batches": (len(pending) + self.batch_size - 1) // self.batch_size,
+            "glossary_terms": sum(len(segment_replacements) for segment_replacements in replacements),
+            "elapsed_seconds": time.perf_counter() - started_at
+        }
+
+        return translations, stats
+
+    def _run_batches(self, segments, source_language, target_language):
+        """تنفيذ طلبات المحرك على دفعات مع حد أقصى للطلبات المتزامنة"""
+        if not segments:
+            return []
+
+        batches = [segments[i:i + self.batch_size] for i in range(0, len(segments), self.batch_size)]
+
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [self.engine.translate_batch(batch, source_language, target_language) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                results = list(executor.map(
+                    lambda batch: self.engine.translate_batch(batch, source_language, target_language),
+                    batches
+                ))
+
+        return [translation for batch_result in results for translation in batch_result]
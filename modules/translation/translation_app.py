@@ -9,6 +9,9 @@ import os
 import sys
 from pathlib import Path
 import re
+import time
+import shutil
+import tempfile
 import datetime
 
 # إضافة مسار المشروع للنظام
@@ -17,6 +20,22 @@ sys.path.append(str(Path(__file__).parent.parent))
 # استيراد محسن واجهة المستخدم
 from styling.enhanced_ui import UIEnhancer
 
+# استيراد أدوات توحيد النصوص العربية
+from utils.arabic_text import TextIndex
+
+# استيراد خدمات الترجمة
+from modules.translation.services.translation_memory import TranslationMemory
+from modules.translation.services.translation_engines import LocalTranslationEngine, OpenAITranslationEngine
+from modules.translation.services.translation_pipeline import TranslationPipeline
+from modules.translation.services.document_translator import DocumentTranslator
+
+
+@st.cache_resource
+def get_translation_memory(db_path=None):
+    """الحصول على ذاكرة الترجمة المشتركة بين الجلسات"""
+    return TranslationMemory(db_path)
+
+
 class TranslationApp:
     """تطبيق الترجمة"""
     
@@ -73,6 +92,9 @@ class TranslationApp:
             {"ar": "تسوية النزاعات", "en": "Dispute Resolution", "category": "شروط"}
         ]
         
+        # بناء فهارس البحث في المصطلحات مرة واحدة
+        self._build_terms_index()
+        
         # بيانات نموذجية للمستندات المترجمة
         self.translated_documents = [
             {
@@ -250,6 +272,85 @@ class TranslationApp:
             }
         }
     
+    def _build_terms_index(self):
+        """بناء فهارس موحدة للمصطلحات الفنية حسب اللغة"""
+        self.terms_index = {"ar": TextIndex(), "en": TextIndex()}
+        
+        for i, term in enumerate(self.technical_terms):
+            self.terms_index["ar"].add(i, term["ar"])
+            self.terms_index["en"].add(i, term["en"])
+    
+    def search_terms(self, search_term, search_language="الكل"):
+        """
+        البحث في المصطلحات الفنية بعد توحيد النص
+        
+        المعلمات:
+            search_term (str): نص البحث
+            search_language (str): لغة البحث ("العربية" أو "الإنجليزية" أو "الكل")
+            
+        العوائد:
+            list: المصطلحات المطابقة
+        """
+        if search_language == "العربية":
+            matches = set(self.terms_index["ar"].search(search_term))
+        elif search_language == "الإنجليزية":
+            matches = set(self.terms_index["en"].search(search_term))
+        else:
+            matches = set(self.terms_index["ar"].search(search_term)) | set(self.terms_index["en"].search(search_term))
+        
+        return [term for i, term in enumerate(self.technical_terms) if i in matches]
+    
+    def create_translation_engine(self, translation_engine):
+        """
+        إنشاء محرك الترجمة المختار
+        
+        المعلمات:
+            translation_engine (str): اسم المحرك كما يظهر في الواجهة
+            
+        العوائد:
+            TranslationEngine: محرك الترجمة، أو المحرك المحلي إذا لم يتوفر المحرك المختار
+        """
+        if translation_engine == "OpenAI":
+            api_key = st.session_state.get("ai_api_key") or os.environ.get("AI_API_KEY", "")
+            if api_key:
+                return OpenAITranslationEngine(api_key)
+        
+        return LocalTranslationEngine()
+    
+    def get_translation_pipeline(self, translation_engine="محلي", memory=None):
+        """
+        إنشاء مسار الترجمة مع ذاكرة الترجمة وقاموس المصطلحات
+        
+        المعلمات:
+            translation_engine (str): اسم المحرك كما يظهر في الواجهة
+            memory (TranslationMemory): ذاكرة ترجمة بديلة (للاختبار)
+            
+        العوائد:
+            TranslationPipeline: مسار الترجمة
+        """
+        if memory is None:
+            memory = get_translation_memory()
+        self._seed_translation_memory(memory)
+        
+        return TranslationPipeline(
+            memory,
+            self.create_translation_engine(translation_engine),
+            glossary_terms=self.technical_terms
+        )
+    
+    def _seed_translation_memory(self, memory):
+        """إضافة الترجمات النموذجية إلى ذاكرة الترجمة سطراً بسطر دون استبدال الترجمات المحفوظة"""
+        for sample in self.sample_translations.values():
+            ar_lines = [line.strip() for line in sample["ar"].strip().splitlines()]
+            en_lines = [line.strip() for line in sample["en"].strip().splitlines()]
+            
+            if len(ar_lines) != len(en_lines):
+                continue
+            
+            pairs = [(ar, en) for ar, en in zip(ar_lines, en_lines) if ar and en]
+            memory.add_many(pairs, "ar", "en", overwrite=False)
+            memory.add_many([(en, ar) for ar, en in pairs], "en", "ar", overwrite=False)
+    
     def run(self):
         """تشغيل تطبيق الترجمة"""
         # إنشاء قائمة العناصر
@@ -366,28 +467,20 @@ class TranslationApp:
             if not source_text:
                 st.error("يرجى إدخال النص المراد ترجمته")
             else:
-                # في تطبيق حقيقي، سيتم استدعاء واجهة برمجة التطبيقات للترجمة
-                # هنا نستخدم النصوص النموذجية المحددة مسبقاً للعرض
+                if translation_engine in ["Google Translate", "Microsoft Translator"]:
+                    st.info(f"محرك {translation_engine} غير مهيأ، سيتم استخدام المحرك المحلي")
                 
                 with st.spinner("جاري الترجمة..."):
-                    # محاكاة تأخير الترجمة
-                    import time
-                    time.sleep(1)
-                    
-                    # التحقق من وجود ترجمة نموذجية
-                    if source_language == "ar" and target_language == "en" and source_text.strip() in [self.sample_translations["text1"]["ar"].strip(), self.sample_translations["text2"]["ar"].strip()]:
-                        if source_text.strip() == self.sample_translations["text1"]["ar"].strip():
-                            translated_text = self.sample_translations["text1"]["en"]
-                        else:
-                            translated_text = self.sample_translations["text2"]["en"]
-                    elif source_language == "en" and target_language == "ar" and source_text.strip() in [self.sample_translations["text1"]["en"].strip(), self.sample_translations["text2"]["en"].strip()]:
-                        if source_text.strip() == self.sample_translations["text1"]["en"].strip():
-                            translated_text = self.sample_translations["text1"]["ar"]
-                        else:
-                            translated_text = self.sample_translations["text2"]["ar"]
-                    else:
-                        # ترجمة نموذجية للعرض فقط
-                        translated_text = f"[هذا نص مترجم نموذجي من {self.supported_languages[source_language]} إلى {self.supported_languages[target_language]}]\n\n{source_text}"
+                    # ترجمة المقاطع غير الموجودة في ذاكرة الترجمة فقط
+                    pipeline = self.get_translation_pipeline(translation_engine)
+                    result = pipeline.translate(
+                        source_text,
+                        source_language,
+                        target_language,
+                        use_glossary=use_technical_terms
+                    )
+                    translated_text = result["text"]
+                    translation_stats = result["stats"]
                 
                 # عرض النص المترجم
                 st.markdown("#### النص المترجم")
@@ -436,7 +529,7 @@ class TranslationApp:
                 with col3:
                     self.ui.create_metric_card(
                         "وقت الترجمة",
-                        "1.2 ثانية",
+                        f"{translation_stats['elapsed_seconds']:.2f} ثانية",
                         None,
                         self.ui.COLORS['success']
                     )
@@ -444,10 +537,33 @@ class TranslationApp:
                 with col4:
                     self.ui.create_metric_card(
                         "المصطلحات الفنية",
-                        "5",
+                        str(translation_stats['glossary_terms']),
                         None,
                         self.ui.COLORS['accent']
                     )
+                
+                st.caption(
+                    f"ذاكرة الترجمة: {translation_stats['exact_matches']} تطابق تام، "
+                    f"{translation_stats['fuzzy_matches']} اقتراح تقريبي للمراجعة، "
+                    f"{translation_stats['engine_segments']} مقطع أرسل إلى المحرك "
+                    f"في {translation_stats['engine_batches']} دفعة"
+                )
+                
+                # اقتراحات الذاكرة التقريبية لا تطبق تلقائياً وتعرض للمراجعة مع ترجمة المحرك
+                if translation_stats['fuzzy_suggestions']:
+                    with st.expander("اقتراحات ذاكرة الترجمة للمراجعة"):
+                        st.dataframe(
+                            pd.DataFrame([
+                                {
+                                    "المقطع": segment,
+                                    "اقتراح الذاكرة": suggestion["target"],
+                                    "نسبة التشابه": f"{suggestion['score']:.0%}"
+                                }
+                                for segment, suggestion in translation_stats['fuzzy_suggestions'].items()
+                            ]),
+                            use_container_width=True,
+                            hide_index=True
+                        )
     
     def translate_documents(self):
         """ترجمة المستندات"""
@@ -530,29 +646,29 @@ class TranslationApp:
             if uploaded_file is None:
                 st.error("يرجى تحميل المستند المراد ترجمته")
             else:
-                # في تطبيق حقيقي، سيتم إرسال المستند إلى خدمة الترجمة
-                # هنا نعرض محاكاة لعملية الترجمة
+                file_extension = uploaded_file.name.split('.')[-1].lower()
+                
+                if file_extension not in DocumentTranslator.SUPPORTED_EXTENSIONS:
+                    st.error("ترجمة ملفات PDF مع الحفاظ على التخطيط غير مدعومة حالياً، يرجى تحويل الملف إلى DOCX")
+                    return
                 
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                # محاكاة تقدم الترجمة
-                import time
-                for i in range(101):
-                    progress_bar.progress(i)
-                    
-                    if i < 10:
-                        status_text.text("جاري تحليل المستند...")
-                    elif i < 30:
-                        status_text.text("جاري استخراج النصوص...")
-                    elif i < 70:
-                        status_text.text("جاري ترجمة المحتوى...")
-                    elif i < 90:
-                        status_text.text("جاري إعادة بناء المستند...")
-                    else:
-                        status_text.text("جاري إنهاء الترجمة...")
-                    
-                    time.sleep(0.05)
+                def update_progress(fraction, message):
+                    progress_bar.progress(int(fraction * 100))
+                    status_text.text(message)
+                
+                started_at = time.perf_counter()
+                translated_data, translation_stats = self.translate_uploaded_document(
+                    uploaded_file,
+                    source_language,
+                    target_language,
+                    translation_engine,
+                    use_technical_terms,
+                    update_progress
+                )
+                elapsed_seconds = time.perf_counter() - started_at
                 
                 # عرض نتيجة الترجمة
                 st.success("تمت ترجمة المستند بنجاح!")
@@ -580,8 +696,13 @@ class TranslationApp:
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    if st.button("تنزيل الملف المترجم", use_container_width=True):
-                        st.success("تم بدء تنزيل الملف المترجم")
+                    st.download_button(
+                        "تنزيل الملف المترجم",
+                        data=translated_data,
+                        file_name=translated_file_name,
+                        mime=uploaded_file.type,
+                        use_container_width=True
+                    )
                 
                 with col2:
                     if st.button("حفظ في المستندات المترجمة", use_container_width=True):
@@ -598,16 +719,16 @@ class TranslationApp:
                 
                 with col1:
                     self.ui.create_metric_card(
-                        "عدد الصفحات",
-                        "12",
+                        "عدد النصوص",
+                        f"{translation_stats['texts']:,}",
                         None,
                         self.ui.COLORS['primary']
                     )
                 
                 with col2:
                     self.ui.create_metric_card(
-                        "عدد الكلمات",
-                        "2,450",
+                        "مقاطع من ذاكرة الترجمة",
+                        f"{translation_stats['exact_matches']:,}",
                         None,
                         self.ui.COLORS['secondary']
                     )
@@ -615,7 +736,7 @@ class TranslationApp:
                 with col3:
                     self.ui.create_metric_card(
                         "وقت الترجمة",
-                        "45 ثانية",
+                        f"{elapsed_seconds:.1f} ثانية",
                         None,
                         self.ui.COLORS['success']
                     )
@@ -623,11 +744,51 @@ class TranslationApp:
                 with col4:
                     self.ui.create_metric_card(
                         "المصطلحات الفنية",
-                        "28",
+                        str(translation_stats['glossary_terms']),
                         None,
                         self.ui.COLORS['accent']
                     )
     
+    def translate_uploaded_document(self, uploaded_file, source_language, target_language,
+                                    translation_engine="محلي", use_technical_terms=True, progress_callback=None):
+        """
+        ترجمة ملف مرفوع مع الحفاظ على تخطيطه
+        
+        المعلمات:
+            uploaded_file: الملف المرفوع من واجهة Streamlit
+            source_language (str): رمز لغة المصدر
+            target_language (str): رمز لغة الهدف
+            translation_engine (str): اسم محرك الترجمة
+            use_technical_terms (bool): تطبيق قاموس المصطلحات الفنية
+            progress_callback (callable): دالة متابعة التقدم
+            
+        العوائد:
+            tuple: (محتوى الملف المترجم، إحصائيات الترجمة)
+        """
+        suffix = os.path.splitext(uploaded_file.name)[1].lower()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, f"source{suffix}")
+            output_path = os.path.join(temp_dir, f"translated{suffix}")
+            
+            # نسخ الملف المرفوع إلى القرص على دفعات
+            uploaded_file.seek(0)
+            with open(input_path, "wb") as f:
+                shutil.copyfileobj(uploaded_file, f, 1024 * 1024)
+            
+            translator = DocumentTranslator(self.get_translation_pipeline(translation_engine))
+            stats = translator.translate_file(
+                input_path,
+                output_path,
+                source_language,
+                target_language,
+                use_glossary=use_technical_terms,
+                progress_callback=progress_callback
+            )
+            
+            with open(output_path, "rb") as f:
+                return f.read(), stats
+    
     def technical_terms_dictionary(self):
         """قاموس المصطلحات الفنية"""
         st.markdown("### قاموس المصطلحات الفنية")
@@ -684,12 +845,7 @@ class TranslationApp:
         filtered_terms = self.technical_terms
         
         if search_term:
-            if search_language == "العربية":
-                filtered_terms = [term for term in filtered_terms if search_term.lower() in term["ar"].lower()]
-            elif search_language == "الإنجليزية":
-                filtered_terms = [term for term in filtered_terms if search_term.lower() in term["en"].lower()]
-            else:
-                filtered_terms = [term for term in filtered_terms if search_term.lower() in term["ar"].lower() or search_term.lower() in term["en"].lower()]
+            filtered_terms = self.search_terms(search_term, search_language)
         
         if category_filter != "الكل":
             filtered_terms = [term for term in filtered_terms if term["category"] == category_filter]
@@ -0,0 +1,214 @@
+"""
+سجل صفحات التطبيق - تحميل وحدات الصفحات عند أول اختيار لها
+
+يستورد app.py عند كل تشغيل للسكربت هذا السجل فقط بدلاً من كل وحدات الصفحات، فلا
+تحمل مكتبات مثل matplotlib وseaborn وscipy وfolium وpdfkit إلا عند فتح الصفحة التي
+تحتاجها. تنشأ كائنات الصفحات مرة واحدة لكل جلسة وتحفظ في حالة الجلسة.
+
+يتضمن السجل أدوات لقياس زمن الاستيراد في مفسر جديد لكل صفحة، وحدود زمن الاستيراد
+عند بدء التشغيل ولكل صفحة التي يتحقق منها اختبار الانحدار:
+    python page_registry.py
+يطبع تقرير زمن الاستيراد لبدء التشغيل ولكل صفحة مع أبطأ الوحدات المستوردة.
+"""
+
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('tender_system.pages')
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# اسم الصفحة في القائمة الجانبية -> (مسار الوحدة، اسم فئة التطبيق)
+PAGES = {
+    "تحليل المستندات": ("modules.document_analysis.document_app", "DocumentAnalysisApp"),
+    "نظام التسعير": ("pricing_system.integrated_app", "IntegratedApp"),
+    "الموارد والتكاليف": ("modules.resources.resources_app", "ResourcesApp"),
+    "تحليل المخاطر": ("modules.risk_analysis.risk_analyzer", "RiskAnalysisApp"),
+    "إدارة المشاريع": ("modules.project_management.project_management_app", "ProjectsApp"),
+    "الخرائط والمواقع": ("modules.maps.maps_app", "MapsApp"),
+    "الجدول الزمني": ("modules.scheduling.schedule_app", "ScheduleApp"),
+    "الإشعارات": ("modules.notifications.notifications_app", "NotificationsApp"),
+    "مقارنة المستندات": ("modules.document_comparison.document_comparison_app", "DocumentComparisonApp"),
+    "الترجمة": ("modules.translation.translation_app", "TranslationApp"),
+    "المساعد الذكي": ("modules.ai_assistant.ai_app", "AIAssistantApp"),
+    "تحليل البيانات": ("modules.data_analysis.data_analysis_app", "DataAnalysisApp"),
+}
+
+# الوحدات التي يستوردها app.py عند كل تشغيل قبل اختيار أي صفحة
+COLD_START_MODULES = ("streamlit", "config_manager", "styling.enhanced_ui", "page_registry")
+
+# مكتبات ثقيلة لا يجوز تحميلها عند بدء التشغيل
+HEAVY_MODULES = ("matplotlib", "seaborn", "scipy", "folium", "pdfkit", "requests", "sklearn")
+
+# حدود زمن الاستيراد بالثواني (بدء التشغيل، والزيادة لكل صفحة فوقه)
+COLD_START_BUDGET = 3.0
+PAGE_IMPORT_BUDGET = 4.0
+PAGE_IMPORT_BUDGETS = {
+    "المساعد الذكي": 6.0,
+}
+
+# سكربت القياس في مفسر جديد: زمن وحدات بدء التشغيل ثم زمن وحدة الصفحة
+_PROFILE_SCRIPT = '''
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+result = {{"error": None}}
+start = time.perf_counter()
+for name in {cold!r}:
+    importlib.import_module(name)
+result["cold_start"] = time.perf_counter() - start
+result["cold_modules"] = sorted(sys.modules)
+module = {module!r}
+if module:
+    start = time.perf_counter()
+    try:
+        importlib.import_module(module)
+    except Exception as error:
+        result["error"] = f"{{type(error).__name__}}: {{error}}"
+    result["page"] = time.perf_counter() - start
+result["modules"] = sorted(sys.modules)
+print(json.dumps(result))
+'''
+
+
+def get_page_app(name):
+    """
+    كائن تطبيق الصفحة، يستورد وحدته وينشئه عند أول طلب في الجلسة
+
+    المعلمات:
+        name (str): اسم الصفحة في PAGES
+
+    العوائد:
+        object: كائن تطبيق الصفحة
+    """
+    import streamlit as st
+
+    if "page_apps" not in st.session_state:
+        st.session_state.page_apps = {}
+
+    apps = st.session_state.page_apps
+    if name not in apps:
+        module_name, class_name = PAGES[name]
+        module = importlib.import_module(module_name)
+        apps[name] = getattr(module, class_name)()
+        logger.info(f"تم تحميل صفحة {name} من {module_name}")
+    return apps[name]
+
+
+def run_page(name):
+    """
+    عرض صفحة من السجل، مع رسالة خطأ إذا تعذر تحميل وحدتها
+
+    المعلمات:
+        name (str): اسم الصفحة في PAGES
+    """
+    import streamlit as st
+
+    try:
+        app = get_page_app(name)
+    except ImportError as e:
+        logger.error(f"تعذر تحميل صفحة {name}: {str(e)}")
+        st.error(f"تعذر تحميل صفحة {name}: {str(e)}")
+        return
+    app.run()
+
+
+def profile_imports(page=None):
+    """
+    قياس زمن الاستيراد في مفسر Python جديد
+
+    المعلمات:
+        page (str): اسم الصفحة (None لقياس بدء التشغيل فقط)
+
+    العوائد:
+        dict: cold_start (ثوان)، page (ثوان فوق بدء التشغيل)، heavy (المكتبات الثقيلة
+            المحملة عند بدء التشغيل)، page_heavy (المحملة بسبب الصفحة)، error
+    """
+    module = PAGES[page][0] if page else None
+    script = _PROFILE_SCRIPT.format(root=ROOT_DIR, cold=list(COLD_START_MODULES), module=module)
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT_DIR, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    cold = set(result.pop("cold_modules"))
+    loaded = set(result.pop("modules"))
+    result["heavy"] = sorted(name for name in HEAVY_MODULES if name in cold)
+    result["page_heavy"] = sorted(name for name in HEAVY_MODULES if name in loaded - cold)
+    return result
+
+
+def profile_pages(pages=None, workers=4):
+    """
+    قياس زمن استيراد كل صفحة في مفسر جديد بالتوازي
+
+    العوائد:
+        dict: اسم الصفحة -> نتيجة profile_imports
+    """
+    pages = list(pages or PAGES)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(pages, executor.map(profile_imports, pages)))
+
+
+def slowest_imports(page=None, top=10):
+    """
+    أبطأ الوحدات المستوردة حسب python -X importtime
+
+    المعلمات:
+        page (str): اسم الصفحة (None لوحدات بدء التشغيل)
+        top (int): عدد الوحدات
+
+    العوائد:
+        list: قواميس بمفاتيح module, self, cumulative (ثوان) مرتبة تنازلياً بالزمن التراكمي
+    """
+    modules = list(COLD_START_MODULES) + ([PAGES[page][0]] if page else [])
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=ROOT_DIR
+    ).stderr
+
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append({
+            "module": name.strip(),
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+        })
+    return sorted(records, key=lambda record: record["cumulative"], reverse=True)[:top]
+
+
+def import_report(top=5):
+    """
+    تقرير زمن الاستيراد لبدء التشغيل ولكل صفحة مقارنة بالحدود
+
+    العوائد:
+        str: نص التقرير
+    """
+    cold = profile_imports()
+    lines = [
+        f"بدء التشغيل: {cold['cold_start']:.2f} ث (الحد {COLD_START_BUDGET:.1f} ث)"
+        f"{' - مكتبات ثقيلة: ' + ', '.join(cold['heavy']) if cold['heavy'] else ''}",
+    ]
+    for record in slowest_imports(top=top):
+        lines.append(f"    {record['cumulative']:.3f} ث  {record['module']}")
+
+    for page, result in profile_pages().items():
+        budget = PAGE_IMPORT_BUDGETS.get(page, PAGE_IMPORT_BUDGET)
+        status = "تجاوز الحد" if result["page"] > budget else "ضمن الحد"
+        lines.append(
+            f"{page}: {result['page']:.2f} ث (الحد {budget:.1f} ث، {status})"
+            f"{' - ' + ', '.join(result['page_heavy']) if result['page_heavy'] else ''}"
+            f"{' - ' + result['error'] if result['error'] else ''}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(import_report())
@@ -56,29 +56,7 @@ class IntegratedApp:
         self.reference_guides = ReferenceGuides()
 
     def run(self):
-        st.markdown("""
-            <style>
-                .main-title {
-                    color: #1f77b4;
-                    font-size: 2rem;
-                    text-align: center;
-                    margin-bottom: 2rem;
-                }
-                .sidebar-title {
-                    font-size: 1.2rem;
-                    font-weight: bold;
-                    margin-bottom: 1rem;
-                }
-                .stage-number {
-                    background-color: #1f77b4;
-                    color: white;
-                    padding: 0.2rem 0.5rem;
-                    border-radius: 50%;
-                    margin-right: 0.5rem;
-                }
-            </style>
-        """, unsafe_allow_html=True)
-
+        # أنماط الصفحة ضمن حزمة التنسيق العامة (pricing_system/static/css/pricing_pages.css)
         st.markdown('<h1 class="main-title">نظام التسعير المتكامل</h1>', unsafe_allow_html=True)
         st.sidebar.markdown('<div class="sidebar-title">مراحل التسعير</div>', unsafe_allow_html=True)
 
@@ -971,15 +949,6 @@ class IntegratedApp:
     def _render_navigation(self):
         can_proceed = self._validate_current_stage()
         st.markdown("---")
-        st.markdown("""
-            <style>
-            .nav-button {
-                width: 120px;
-                height: 40px;
-                margin: 10px;
-            }
-            </style>
-        """, unsafe_allow_html=True)
 
         nav_col1, nav_col2, nav_col3 = st.columns([2, 4, 2])
 
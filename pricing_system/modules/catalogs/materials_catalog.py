@@ -1897,6 +1897,11 @@ class MaterialsCatalog:
                     mime="application/json"
                 )
     
+    def get_all_materials(self):
+        """الحصول على جدول جميع المواد في الكتالوج"""
+        
+        return st.session_state.materials_catalog
+    
     def get_material_by_id(self, material_id):
         """الحصول على مادة بواسطة الكود"""
         
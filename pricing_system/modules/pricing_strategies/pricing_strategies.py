@@ -6,6 +6,15 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from modules.maps.services.logistics import LogisticsEngine
+
+
+@st.cache_resource(show_spinner=False)
+def _logistics_engine():
+    """محرك مسافات النقل، تبنى مصفوفة المسافات مرة واحدة وتشارك بين الجلسات"""
+    return LogisticsEngine()
+
+
 class PricingStrategies:
     def __init__(self):
         if 'pricing_strategies' not in st.session_state:
@@ -94,13 +103,39 @@ class PricingStrategies:
         return 0
 
     def _calculate_materials_cost(self, item_data, strategy):
-        """حساب تكلفة المواد مع العوامل المؤثرة"""
+        """حساب تكلفة المواد مع العوامل المؤثرة
+
+        تحسب تكلفة النقل من تكلفة النقل للوحدة (haul_cost) إن وجدت، أو من مسافة المورد
+        إلى موقع المشروع (site) بمحرك النقل، وإلا بنسبة النقل الثابتة في الاستراتيجية.
+        """
         base_cost = item_data.get("unit_price", 0) * item_data.get("quantity", 0)
         storage_cost = base_cost * strategy["storage_cost"]
-        transport_cost = base_cost * strategy["transport_cost"]
+        haul_cost = item_data.get("haul_cost")
+        if haul_cost is None and item_data.get("site") is not None:
+            haul_cost = self._estimate_haul_cost(item_data)
+        if haul_cost is not None and not pd.isna(haul_cost):
+            transport_cost = haul_cost * item_data.get("quantity", 0)
+        else:
+            transport_cost = base_cost * strategy["transport_cost"]
         market_adjustment = base_cost * strategy["market_volatility"]
         return base_cost + storage_cost + transport_cost + market_adjustment
 
+    def _estimate_haul_cost(self, item_data):
+        """تقدير تكلفة نقل وحدة المادة من مورّدها إلى موقع المشروع (None إذا لم يعرف وزن الوحدة أو الموقع)"""
+        material = {
+            "price": item_data.get("unit_price", 0),
+            "unit": item_data.get("unit"),
+            "supplier": item_data.get("supplier"),
+            "origin": item_data.get("origin"),
+            "weight": item_data.get("weight"),
+        }
+        try:
+            haul_cost = _logistics_engine().delivered_costs([material], item_data["site"])["haul_cost"].iloc[0]
+        except ValueError:
+            # موقع باسم غير معروف للمحرك (مثل رقم مشروع): تستخدم نسبة النقل الثابتة
+            return None
+        return None if pd.isna(haul_cost) else float(haul_cost)
+
     def _calculate_labor_cost(self, item_data, strategy):
         """حساب تكلفة العمالة مع عوامل الإنتاجية والمهارة"""
         daily_rate = item_data.get("daily_rate", 0)
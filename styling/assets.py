@@ -0,0 +1,103 @@
+"""
+خط معالجة ملفات التنسيق - حزمة CSS واحدة مصغرة ومبصومة للتطبيق
+
+تجمع ملفات CSS الثابتة وأنماط واجهة المستخدم المولدة في حزمة واحدة تصغر وتحسب
+بصمتها مرة واحدة لكل عملية (وتعاد عند تعديل أحد الملفات)، ثم تحقن في الصفحة بعنصر
+واحد متطابق البايتات في كل تشغيل. يخزن Streamlit الرسائل الكبيرة المتطابقة في
+ذاكرة المتصفح ويرسل بعدها مرجعها فقط، فلا يعاد إرسال ملفات التنسيق مع كل تفاعل.
+"""
+
+import hashlib
+import os
+import re
+
+import streamlit as st
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ملفات التنسيق في الحزمة بترتيب تطبيقها
+STYLESHEETS = (
+    os.path.join("pricing_system", "static", "css", "unified_style.css"),
+    os.path.join("pricing_system", "static", "css", "pricing_pages.css"),
+)
+
+_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_IMPORT = re.compile(r"""@import\s*(?:url\((?:"[^"]*"|'[^']*'|[^)]*)\)|"[^"]*"|'[^']*')[^;]*;""")
+
+
+def minify_css(css):
+    """
+    تصغير CSS بحذف التعليقات والمسافات غير اللازمة دون المساس بالنصوص بين علامات التنصيص
+
+    المعلمات:
+        css (str): نص CSS
+
+    العوائد:
+        str: نص CSS المصغر
+    """
+    parts = _STRING.split(_COMMENT.sub("", css))
+    for index in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[index])
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        parts[index] = re.sub(r":\s+", ":", part)
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def build_css_bundle(sources, inline_css=()):
+    """
+    بناء الحزمة من ملفات التنسيق والأنماط المولدة
+
+    تنقل قواعد @import إلى أول الحزمة لأن المتصفح يتجاهلها بعد أي قاعدة أخرى.
+
+    المعلمات:
+        sources (list): مسارات ملفات CSS (نسبية لمجلد المشروع أو مطلقة)
+        inline_css (tuple): نصوص CSS مولدة تسبق الملفات (تتقدم عليها قواعد الملفات عند التعارض)
+
+    العوائد:
+        dict: css (نص الحزمة)، fingerprint (بصمة المحتوى)، size (بالبايت)
+    """
+    chunks = []
+    for source in sources:
+        with open(os.path.join(ROOT_DIR, source), encoding="utf-8") as f:
+            chunks.append(f.read())
+    css = minify_css("\n".join(list(inline_css) + chunks))
+
+    imports = _IMPORT.findall(css)
+    css = "".join(imports) + _IMPORT.sub("", css)
+    return {
+        "css": css,
+        "fingerprint": hashlib.sha256(css.encode("utf-8")).hexdigest()[:12],
+        "size": len(css.encode("utf-8")),
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_bundle(inline_css, mtimes):
+    """الحزمة المخزنة لكل مجموعة أنماط مولدة وأوقات تعديل الملفات"""
+    return build_css_bundle(STYLESHEETS, inline_css)
+
+
+def css_bundle(*inline_css):
+    """
+    حزمة التنسيق الحالية، تبنى مرة واحدة ما دامت الملفات لم تتغير
+
+    المعلمات:
+        *inline_css: نصوص CSS مولدة تسبق ملفات الحزمة
+
+    العوائد:
+        dict: css, fingerprint, size
+    """
+    mtimes = tuple(os.path.getmtime(os.path.join(ROOT_DIR, source)) for source in STYLESHEETS)
+    return _cached_bundle(inline_css, mtimes)
+
+
+def inject_styles(*inline_css):
+    """
+    حقن حزمة التنسيق في الصفحة
+
+    المعلمات:
+        *inline_css: نصوص CSS مولدة تسبق ملفات الحزمة
+    """
+    bundle = css_bundle(*inline_css)
+    st.markdown(f"<style>/*{bundle['fingerprint']}*/{bundle['css']}</style>", unsafe_allow_html=True)
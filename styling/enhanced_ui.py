@@ -9,6 +9,8 @@ import base64
 from pathlib import Path
 import os
 
+from styling.assets import inject_styles
+
 class UIEnhancer:
     """فئة لتحسين واجهة المستخدم وتوحيد التصميم عبر النظام"""
     
@@ -51,10 +53,9 @@ class UIEnhancer:
         if 'theme' not in st.session_state:
             st.session_state.theme = 'light'
     
-    def apply_global_styles(self):
-        """تطبيق التنسيقات العامة على الصفحة"""
-        # تعريف CSS العام
-        css = f"""
+    def global_css(self):
+        """نص CSS العام المولد من ألوان النظام وأحجام خطوطه"""
+        return f"""
         @import url('https://fonts.googleapis.com/css2?family=Tajawal:wght@300;400;500;700&display=swap');
         
         * {{
@@ -267,9 +268,10 @@ class UIEnhancer:
             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
         }}
         """
-        
-        # تطبيق CSS
-        st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
+    
+    def apply_global_styles(self):
+        """تطبيق التنسيقات العامة وملفات التنسيق الثابتة على الصفحة في حزمة واحدة مخزنة"""
+        inject_styles(self.global_css())
     
     def apply_theme_colors(self):
         """تطبيق ألوان السمة الحالية"""
@@ -0,0 +1,66 @@
+"""
+اختبارات أدوات توحيد النصوص العربية
+"""
+
+import os
+import sys
+import unittest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.arabic_text import normalize_text, tokenize, contains, TextIndex
+
+
+class TestArabicText(unittest.TestCase):
+    """اختبارات التوحيد والتقطيع والفهرسة"""
+
+    def test_normalize_diacritics_and_letters(self):
+        """اختبار إزالة التشكيل وتوحيد الحروف"""
+        self.assertEqual(normalize_text("الإِنْشَاءَاتُ"), "الانشاءات")
+        self.assertEqual(normalize_text("مدرسة"), normalize_text("مدرسه"))
+        self.assertEqual(normalize_text("مستشفى"), normalize_text("مستشفي"))
+
+    def test_normalize_digits(self):
+        """اختبار تحويل الأرقام العربية الهندية"""
+        self.assertEqual(normalize_text("٢٠٢٥"), "2025")
+        self.assertEqual(normalize_text("بند ١٢", remove_digits=True), "بند")
+
+    def test_tokenize_removes_stopwords(self):
+        """اختبار استبعاد كلمات التوقف"""
+        self.assertEqual(tokenize("ضمان في المشروع"), ("ضمان", "المشروع"))
+        self.assertEqual(tokenize("The Bid Bond"), ("bid", "bond"))
+
+    def test_contains(self):
+        """اختبار المطابقة بعد التوحيد"""
+        self.assertTrue(contains("ضماناً نهائياً بنسبة ٥%", "ضمانا نهائيا بنسبة 5%"))
+        self.assertFalse(contains("ضمان ابتدائي", "ضمان نهائي"))
+
+    def test_text_index_prefix_search(self):
+        """اختبار البحث بالبادئات في الفهرس"""
+        index = TextIndex()
+        index.add("a", "ضمان ابتدائي")
+        index.add("b", "ضمان حسن التنفيذ")
+        index.add("c", "Performance Bond")
+
+        self.assertEqual(index.search("ضمأن"), ["a", "b"])
+        self.assertEqual(index.search("ضمان التنف"), ["b"])
+        self.assertEqual(index.search("perf"), ["c"])
+        self.assertEqual(index.search("غير موجود"), [])
+
+    def test_text_index_ignores_article(self):
+        """اختبار مطابقة الكلمات المعرفة بأداة التعريف وحروف العطف والجر المتصلة بها"""
+        index = TextIndex()
+        index.add("a", "تسوية النزاعات")
+        index.add("b", "والنزاعات التعاقدية")
+        index.add("c", "بالتحكيم")
+        index.add("d", "نزع الملكية")
+
+        self.assertEqual(index.search("نزاعات"), ["a", "b"])
+        self.assertEqual(index.search("النزاع"), ["a", "b"])
+        self.assertEqual(index.search("تحكيم"), ["c"])
+        self.assertEqual(index.search("نز"), ["a", "b", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
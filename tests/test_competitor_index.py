@@ -0,0 +1,101 @@
+"""
+اختبارات فهرس أسعار المنافسين
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.pricing.services.competitor_index import CompetitorIndex, OUR_COMPANY
+
+
+class TestCompetitorIndex(unittest.TestCase):
+    """اختبارات فهرس أسعار المنافسين"""
+
+    def setUp(self):
+        """تهيئة فهرس بأسعار عشوائية لعدة أنواع ومناطق"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "competitors.db")
+        self.index = CompetitorIndex(self.db_path)
+
+        rng = np.random.default_rng(11)
+        self.rows = [
+            {
+                "competitor": f"منافس {i}",
+                "project_type": str(rng.choice(["مباني سكنية", "بنية تحتية"])),
+                "region": str(rng.choice(["الرياض", "جدة", "أبها"])),
+                "price_per_sqm": float(rng.integers(1200, 2600))
+            }
+            for i in range(300)
+        ]
+        self.index.add_many(self.rows)
+        self.index.add(OUR_COMPANY, "مباني سكنية", 1, region="الرياض")
+
+    def tearDown(self):
+        """إغلاق الفهرس وحذف الملفات"""
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def _prices(self, project_type=None, region=None):
+        return np.array([
+            row["price_per_sqm"] for row in self.rows
+            if project_type in (None, row["project_type"]) and region in (None, row["region"])
+        ])
+
+    def test_percentiles_match_full_scan(self):
+        """اختبار تطابق الترتيب المئوي مع المقارنة بكل الأسعار واستبعاد شركتنا"""
+        candidates = np.linspace(1000, 2800, 500)
+        for project_type, region in ((None, None), ("مباني سكنية", None), ("بنية تحتية", "جدة")):
+            prices = self._prices(project_type, region)
+            expected = ((prices[None, :] < candidates[:, None]).sum(axis=1)
+                        + (prices[None, :] == candidates[:, None]).sum(axis=1) / 2) / len(prices) * 100
+            np.testing.assert_allclose(self.index.percentile_ranks(candidates, project_type, region), expected)
+
+        position = self.index.position(1900, "مباني سكنية", "الرياض")
+        prices = self._prices("مباني سكنية", "الرياض")
+        self.assertEqual(position["count"], len(prices))
+        self.assertEqual(position["rank"], int((prices < 1900).sum()) + 1)
+        self.assertEqual(position["below"]["price_per_sqm"], prices[prices < 1900].max())
+        self.assertEqual(position["above"]["price_per_sqm"], prices[prices > 1900].min())
+
+    def test_nearest_competitors(self):
+        """اختبار أن أقرب المنافسين هم الأقل فرقاً في السعر"""
+        nearest = self.index.nearest(1850, "بنية تحتية", "أبها", k=5)
+        prices = self._prices("بنية تحتية", "أبها")
+        self.assertEqual(
+            sorted(abs(record["price_gap"]) for record in nearest),
+            sorted(np.abs(prices - 1850))[:5]
+        )
+        self.assertEqual(len(self.index.nearest(1850, "بنية تحتية", "أبها", k=1000)), len(prices))
+        self.assertEqual(self.index.nearest(1850, "مباني تجارية"), [])
+
+    def test_incremental_insert_and_external_changes(self):
+        """اختبار إدراج الإضافات في المصفوفات المحملة وإعادة القراءة عند تعديل اتصال آخر"""
+        before = self.index.position(2000, "مباني سكنية")
+        new_id = self.index.add("منافس جديد", "مباني سكنية", 1500, region="جدة")
+        after = self.index.position(2000, "مباني سكنية")
+        self.assertEqual(after["count"], before["count"] + 1)
+        self.assertEqual(after["rank"], before["rank"] + 1)
+
+        prices, ids = self.index._sorted("مباني سكنية")
+        self.assertTrue(np.all(np.diff(prices) >= 0))
+        self.assertIn(new_id, ids)
+
+        self.index.remove(new_id)
+        self.assertEqual(self.index.position(2000, "مباني سكنية")["count"], before["count"])
+
+        other = CompetitorIndex(self.db_path)
+        other.add("منافس من جلسة أخرى", "مباني سكنية", 900, region="الرياض")
+        other.close()
+        self.assertEqual(self.index.position(2000, "مباني سكنية")["count"], before["count"] + 1)
+        self.assertEqual(self.index.position(2000, "مباني سكنية")["min"], 900)
+
+
+if __name__ == "__main__":
+    unittest.main()
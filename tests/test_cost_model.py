@@ -0,0 +1,88 @@
+"""
+اختبارات نموذج التنبؤ بالتكاليف
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.ai_assistant.services.cost_model import (
+    CostPredictionModel, load_cost_prediction_model, sample_cost_history
+)
+
+
+class TestCostPredictionModel(unittest.TestCase):
+    """اختبارات نموذج التنبؤ بالتكاليف"""
+
+    @classmethod
+    def setUpClass(cls):
+        """تدريب النموذج مرة واحدة على السجل النموذجي"""
+        cls.history = sample_cost_history()
+        cls.model = CostPredictionModel().fit(cls.history)
+        cls.project = {
+            "project_type": "مدارس", "location": "جدة", "client_type": "حكومي", "tender_type": "عامة",
+            "area": 5000, "floors": 3, "duration_months": 12, "has_basement": True,
+            "has_special_finishing": False, "has_landscape": False, "has_parking": False,
+            "has_smart_systems": False, "has_sustainability": False
+        }
+
+    def setUp(self):
+        """مجلد مؤقت لملفات النموذج"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "cost_model")
+
+    def tearDown(self):
+        """حذف الملفات"""
+        self.temp_dir.cleanup()
+
+    def test_learns_reference_factors(self):
+        """اختبار تعلم المعاملات المرجعية من السجل النموذجي"""
+        self.assertGreater(self.model.metadata["r2"], 0.9)
+        self.assertAlmostEqual(self.model.metadata["sigma"], 0.08, delta=0.01)
+
+        expected = 3200 * 1.15 * 1.05 * 1.1 * 1.1
+        prediction = self.model.predict(pd.DataFrame([self.project])).iloc[0]
+        self.assertAlmostEqual(prediction["cost_per_sqm"], expected, delta=expected * 0.03)
+        self.assertLess(prediction["total_cost_low"], prediction["total_cost"])
+        self.assertGreater(prediction["total_cost_high"], prediction["total_cost"])
+
+    def test_batch_prediction_matches_rows_and_intervals_cover(self):
+        """اختبار تطابق التنبؤ الدفعي مع التنبؤ لكل مشروع وتغطية فترات التنبؤ"""
+        pipeline = sample_cost_history(500, seed=7)
+        predictions = self.model.predict(pipeline.drop(columns="total_cost"), confidence=0.9)
+        self.assertEqual(len(predictions), 500)
+
+        single = pd.concat([self.model.predict(pipeline.iloc[[i]]) for i in (0, 250, 499)])
+        pd.testing.assert_frame_equal(single, predictions.iloc[[0, 250, 499]])
+
+        covered = pipeline["total_cost"].between(predictions["total_cost_low"], predictions["total_cost_high"])
+        self.assertGreater(covered.mean(), 0.85)
+        self.assertLess(covered.mean(), 0.95)
+
+        wider = self.model.predict(pipeline.head(20), confidence=0.99)
+        self.assertTrue((wider["total_cost_high"] > predictions["total_cost_high"].head(20)).all())
+
+    def test_saved_model_is_memory_mapped_and_cached(self):
+        """اختبار حفظ النموذج وتحميله بالتعيين في الذاكرة مرة واحدة لكل إصدار"""
+        self.model.save(self.model_path)
+        loaded = load_cost_prediction_model(self.model_path)
+        self.assertIsInstance(loaded.coef_, np.memmap)
+        self.assertIs(load_cost_prediction_model(self.model_path), loaded)
+        np.testing.assert_allclose(
+            loaded.predict(self.history.head(50))["total_cost"],
+            self.model.predict(self.history.head(50))["total_cost"]
+        )
+
+        trained = load_cost_prediction_model(os.path.join(self.temp_dir.name, "new_model"))
+        self.assertEqual(trained.metadata["source"], "sample")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+اختبارات محرك المسار الحرج
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.scheduling.services.cpm import CPMSchedule, parse_dependencies, schedule_links
+
+
+def _random_network(rng, count, max_predecessors=3, window=40):
+    """شبكة أنشطة عشوائية بلا حلقات"""
+    links = []
+    for successor in range(1, count):
+        low = max(0, successor - window)
+        for predecessor in rng.choice(np.arange(low, successor), size=min(successor - low, int(rng.integers(0, max_predecessors + 1))), replace=False):
+            link_type = str(rng.choice(["FS", "SS", "FF", "SF"], p=[0.7, 0.1, 0.1, 0.1]))
+            links.append((int(predecessor), successor, link_type, float(rng.integers(-2, 5))))
+    return rng.integers(1, 30, count).astype(float), links
+
+
+class TestCPMSchedule(unittest.TestCase):
+    """اختبارات محرك المسار الحرج"""
+
+    def test_link_types_and_floats(self):
+        """اختبار الحساب الأمامي والخلفي لعلاقات FS وSS وFF وSF مع فترات التأخير"""
+        items = pd.DataFrame({
+            "ID": [1, 2, 3, 4, 5],
+            "Duration": [10, 5, 8, 4, 6],
+            "Dependencies": ["", "1", "1SS+2", "2, 3FF+1", "3SF+20"],
+        })
+        schedule = CPMSchedule(items["ID"], items["Duration"], schedule_links(items))
+        results = schedule.results().set_index("id")
+
+        self.assertEqual(results["early_start"].tolist(), [0, 10, 2, 15, 16])
+        self.assertEqual(results["early_finish"].tolist(), [10, 15, 10, 19, 22])
+        self.assertEqual(schedule.project_duration, 22)
+        self.assertEqual(results["late_finish"].tolist(), [10, 18, 10, 22, 22])
+        self.assertEqual(results["total_float"].tolist(), [0, 3, 0, 3, 0])
+        self.assertEqual(results["free_float"].tolist(), [0, 0, 0, 3, 0])
+        self.assertEqual(schedule.critical_path(), [1, 3, 5])
+
+    def test_incremental_updates_match_full_recompute(self):
+        """اختبار تطابق إعادة الحساب الجزئي بعد تعديل المدد مع الحساب الكامل"""
+        rng = np.random.default_rng(17)
+        durations, links = _random_network(rng, 2000)
+        schedule = CPMSchedule(range(2000), durations, links)
+
+        for _ in range(20):
+            changes = {int(i): float(rng.integers(1, 60)) for i in rng.choice(2000, 3, replace=False)}
+            schedule.update_durations(changes)
+            reference = CPMSchedule(range(2000), schedule.durations, links)
+            for attribute in ("early_start", "early_finish", "late_start", "late_finish", "total_float", "free_float"):
+                np.testing.assert_allclose(getattr(schedule, attribute), getattr(reference, attribute))
+
+    def test_ten_thousand_activities_under_a_second(self):
+        """اختبار حساب جدول من 10000 نشاط في أقل من ثانية"""
+        rng = np.random.default_rng(23)
+        durations, links = _random_network(rng, 10000)
+
+        start = time.perf_counter()
+        schedule = CPMSchedule(range(10000), durations, links)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertGreater(len(links), 10000)
+        self.assertGreater(schedule.critical.sum(), 0)
+
+        start = time.perf_counter()
+        schedule.update_durations({5000: 100.0})
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_dependency_parsing_and_errors(self):
+        """اختبار تحليل نص الاعتماديات واكتشاف الحلقات والمراجع غير الموجودة"""
+        self.assertEqual(
+            parse_dependencies("1, 2SS+3, 4ff-1d، 5 SF + 2 days"),
+            [("1", "FS", 0), ("2", "SS", 3), ("4", "FF", -1), ("5", "SF", 2)]
+        )
+        self.assertEqual(parse_dependencies(""), [])
+        with self.assertRaises(ValueError):
+            parse_dependencies("2SS+x")
+
+        with self.assertRaises(ValueError):
+            CPMSchedule([1, 2, 3], [1, 1, 1], [(1, 2, "FS", 0), (2, 3, "FS", 0), (3, 1, "FS", 0)])
+
+        items = pd.DataFrame({"ID": [1, 2], "Duration": [1, 1], "Dependencies": ["", "7"]})
+        with self.assertRaises(ValueError):
+            schedule_links(items)
+
+
+if __name__ == "__main__":
+    unittest.main()
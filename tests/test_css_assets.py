@@ -0,0 +1,67 @@
+"""
+اختبارات حزمة ملفات التنسيق
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from styling.assets import STYLESHEETS, build_css_bundle, css_bundle, minify_css
+from styling.enhanced_ui import UIEnhancer
+
+
+class TestCssAssets(unittest.TestCase):
+    """اختبارات حزمة ملفات التنسيق"""
+
+    def test_minify_keeps_selectors_and_strings(self):
+        """اختبار حذف التعليقات والمسافات مع بقاء المحددات والنصوص كما هي"""
+        css = """
+        /* تعليق */
+        .stTabs [data-baseweb="tab"] > div , a:hover {
+            font-family: 'Tajawal', sans-serif;
+            content: "a ,  b ; c";
+            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+        }
+        """
+        self.assertEqual(
+            minify_css(css),
+            '.stTabs [data-baseweb="tab"]>div,a:hover{font-family:\'Tajawal\',sans-serif;'
+            'content:"a ,  b ; c";box-shadow:0 4px 6px rgba(0,0,0,0.1)}'
+        )
+
+    def test_bundle_hoists_imports_and_is_fingerprinted(self):
+        """اختبار نقل @import لأول الحزمة وثبات البصمة وتغيرها بتغير المحتوى"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "page.css")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(".page { color: red; }\n")
+
+            inline = "body { margin: 0; }\n@import url('https://fonts.example.com/css?family=A;B');"
+            bundle = build_css_bundle([path], (inline,))
+            self.assertEqual(
+                bundle["css"],
+                "@import url('https://fonts.example.com/css?family=A;B');body{margin:0}.page{color:red}"
+            )
+            self.assertEqual(bundle, build_css_bundle([path], (inline,)))
+            self.assertNotEqual(bundle["fingerprint"], build_css_bundle([path])["fingerprint"])
+
+    def test_application_bundle_is_built_once(self):
+        """اختبار أن حزمة التطبيق تبنى مرة واحدة وأنها أصغر من الملفات الأصلية"""
+        global_css = UIEnhancer().global_css()
+        bundle = css_bundle(global_css)
+        self.assertIs(css_bundle(global_css), bundle)
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        original = len(global_css.encode("utf-8")) + sum(
+            os.path.getsize(os.path.join(root, source)) for source in STYLESHEETS
+        )
+        self.assertLess(bundle["size"], original * 0.75)
+        self.assertTrue(bundle["css"].startswith("@import url('https://fonts.googleapis.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+اختبارات القيمة المكتسبة والتدفقات النقدية
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.scheduling.services.earned_value import EarnedValueModel, loading_matrix
+
+
+class TestEarnedValue(unittest.TestCase):
+    """اختبارات نموذج القيمة المكتسبة"""
+
+    def setUp(self):
+        self.items = pd.DataFrame({
+            "Start": ["2025-01-01", "2025-01-11", "2025-02-01"],
+            "Finish": ["2025-01-11", "2025-02-10", "2025-03-03"],
+            "Budget": [100000, 300000, 600000],
+            "Progress": [100, 50, 0],
+            "Actual Cost": [90000, 200000, 0],
+        })
+
+    def test_loading_matrix_matches_direct_spread(self):
+        """اختبار مصفوفة التحميل بمصفوفات الفروق مقابل التوزيع المباشر"""
+        rng = np.random.default_rng(2)
+        start = rng.integers(0, 300, 500)
+        finish = start + rng.integers(1, 90, 500)
+        amounts = rng.uniform(1000, 50000, 500)
+        groups = rng.integers(0, 7, 500)
+
+        matrix = loading_matrix(start, finish, amounts, groups, 7)
+        expected = np.zeros((7, finish.max()))
+        for s, f, amount, group in zip(start, finish, amounts, groups):
+            expected[group, s:f] += amount / (f - s)
+        np.testing.assert_allclose(matrix, expected, atol=1e-6)
+        self.assertAlmostEqual(matrix.sum(), amounts.sum(), places=3)
+
+    def test_evm_indices(self):
+        """اختبار PV وEV وAC ومؤشرات الأداء في تاريخ الحالة"""
+        model = EarnedValueModel(self.items)
+        evm = model.evm("2025-01-20")
+
+        self.assertEqual(evm["BAC"], 1000000)
+        self.assertAlmostEqual(evm["PV"], 100000 + 300000 * 10 / 30)
+        self.assertEqual(evm["EV"], 250000)
+        self.assertEqual(evm["AC"], 290000)
+        self.assertAlmostEqual(evm["SPI"], 250000 / 200000)
+        self.assertAlmostEqual(evm["CPI"], 250000 / 290000)
+        self.assertAlmostEqual(evm["EAC"], 1000000 * 290000 / 250000)
+        self.assertEqual(model.evm("2024-12-01")["PV"], 0)
+        self.assertEqual(model.evm("2026-01-01")["PV"], 1000000)
+
+        without_actuals = EarnedValueModel(self.items.drop(columns="Actual Cost")).evm("2025-01-20")
+        self.assertIsNone(without_actuals["AC"])
+        self.assertIsNone(without_actuals["CPI"])
+
+        by_month = EarnedValueModel(self.items.assign(Group=["أ", "أ", "ب"])).loading(by="Group")
+        self.assertEqual(list(by_month.columns), ["أ", "ب"])
+        self.assertAlmostEqual(by_month["أ"].sum(), 400000)
+
+    def test_cash_flow_with_payment_terms(self):
+        """اختبار المقبوضات والمصروفات مع الدفعة المقدمة والمحتجزات وتأخر الصرف"""
+        model = EarnedValueModel(self.items)
+        terms = {"advance_payment": 0.1, "advance_recovery": 0.2, "retention": 0.05,
+                 "retention_release_months": 6, "payment_delay_months": 1, "cost_ratio": 0.8,
+                 "financing_rate": 0.12}
+        flow = model.cash_flow(terms)
+        monthly = flow["monthly"]
+
+        value = model.monthly_value()
+        self.assertAlmostEqual(value.sum(), 1000000)
+        self.assertAlmostEqual(monthly["income"].sum(), 1000000, places=4)
+        self.assertAlmostEqual(monthly["expense"].sum(), 800000, places=4)
+        self.assertAlmostEqual(monthly["advance_recovery"].sum(), 100000, places=4)
+        self.assertAlmostEqual(monthly["income"].iloc[0], 100000)
+        self.assertAlmostEqual(monthly["income"].iloc[1],
+                               value[0] * (1 - 0.05 - 0.2))
+        self.assertAlmostEqual(monthly["income"].iloc[len(value) - 1 + 6], 50000)
+        self.assertEqual(monthly["date"].iloc[0], pd.Timestamp("2025-01-01"))
+
+        deficit = np.maximum(-monthly["cumulative"].to_numpy(), 0)
+        self.assertAlmostEqual(flow["financing_cost"], (deficit * 0.01).sum())
+        self.assertAlmostEqual(flow["peak_deficit"], deficit.max())
+        self.assertGreater(model.cash_flow({**terms, "payment_delay_months": 3})["financing_cost"],
+                           flow["financing_cost"])
+
+    def test_large_programme(self):
+        """اختبار حساب 5000 بند على ثلاث سنوات في أقل من ثانية"""
+        rng = np.random.default_rng(9)
+        start = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 900, 5000), unit="D")
+        items = pd.DataFrame({
+            "Start": start,
+            "Finish": start + pd.to_timedelta(rng.integers(1, 200, 5000), unit="D"),
+            "Budget": rng.uniform(1e4, 1e6, 5000),
+            "Progress": rng.integers(0, 101, 5000),
+        })
+        begin = time.perf_counter()
+        model = EarnedValueModel(items)
+        model.evm("2026-01-01")
+        flow = model.cash_flow()
+        self.assertLess(time.perf_counter() - begin, 1.0)
+        self.assertAlmostEqual(flow["monthly"]["value"].sum(), items["Budget"].sum(), delta=1e-3)
+
+
+class TestContractCashFlow(unittest.TestCase):
+    """اختبارات استخراج شروط الدفع وتدفق محلل العقود"""
+
+    def setUp(self):
+        from modules.ai_assistant.contract_analyzer import ContractAnalyzer
+        self.analyzer = ContractAnalyzer()
+
+    def test_payment_parameters_respect_negation(self):
+        """اختبار أن نفي الدفعة المقدمة أو المحتجزات يجعل نسبتها صفراً"""
+        terms = self.analyzer._extract_payment_parameters("نسبة المحتجزات 10%، لا توجد دفعة مقدمة")
+        self.assertEqual(terms["advance_payment"], 0.0)
+        self.assertAlmostEqual(terms["retention"], 0.1)
+
+        terms = self.analyzer._extract_payment_parameters("الدفعة المقدمة: لا يوجد. بدون احتجاز")
+        self.assertEqual(terms["advance_payment"], 0.0)
+        self.assertEqual(terms["retention"], 0.0)
+
+        terms = self.analyzer._extract_payment_parameters("دفعة مقدمة 15%، احتجاز 5%، الصرف خلال 45 يوما")
+        self.assertAlmostEqual(terms["advance_payment"], 0.15)
+        self.assertAlmostEqual(terms["retention"], 0.05)
+        self.assertEqual(terms["payment_delay_months"], 2)
+
+    def test_cost_breakdown_is_cost_not_value(self):
+        """اختبار معاملة بنود تقدير التكلفة كتكاليف وقيمة الأعمال أعلى منها بنسبة التكلفة"""
+        estimation = {"total_cost": 8500000, "cost_breakdown": [{"category": "أعمال الموقع", "amount": 8500000}]}
+        flow = self.analyzer._analyze_cash_flow("لا توجد دفعة مقدمة", estimation, duration_months=6)
+
+        self.assertAlmostEqual(sum(month["expense"] for month in flow), 8500000, delta=10)
+        self.assertAlmostEqual(sum(month["value"] for month in flow), 10000000, delta=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
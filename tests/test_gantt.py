@@ -0,0 +1,94 @@
+"""
+اختبارات رسم مخطط جانت
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.scheduling.services.gantt import (CHUNK_SIZE, LABEL_LIMIT, gantt_figure, schedule_groups,
+                                               summarize_schedule, wbs_depth)
+
+
+def _programme(count, seed=3):
+    """برنامج زمني عشوائي برموز WBS من ثلاثة مستويات"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 700, count), unit="D")
+    duration = rng.integers(1, 60, count)
+    return pd.DataFrame({
+        "ID": np.arange(1, count + 1),
+        "WBS": [f"{a}.{b}.{c}" for a, b, c in rng.integers(1, 6, (count, 3))],
+        "Task": [f"نشاط {i}" for i in range(count)],
+        "Start": start.strftime("%Y-%m-%d"),
+        "Finish": (start + pd.to_timedelta(duration, unit="D")).strftime("%Y-%m-%d"),
+        "Duration": duration,
+        "Progress": rng.integers(0, 101, count),
+        "Critical": rng.random(count) < 0.1,
+        "Resource": "",
+    })
+
+
+class TestGantt(unittest.TestCase):
+    """اختبارات مخطط جانت"""
+
+    def test_single_trace_for_all_bars(self):
+        """اختبار رسم 5000 نشاط بأثرين فقط في أقل من ثانيتين"""
+        items = _programme(5000)
+        start = time.perf_counter()
+        fig = gantt_figure(items)
+        fig.to_json()
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+        self.assertEqual(len(fig.data), 2)
+        bars, progress = fig.data
+        self.assertEqual(len(bars.x), 5000)
+        self.assertEqual(bars.x[0], items["Duration"].iloc[0] * 86400000)
+        self.assertAlmostEqual(progress.x[0], bars.x[0] * items["Progress"].iloc[0] / 100)
+        self.assertEqual(list(bars.marker.color[:5]),
+                         ["#E53935" if c else "#2196F3" for c in items["Critical"].iloc[:5]])
+        self.assertFalse(fig.layout.yaxis.showticklabels)
+
+        small = gantt_figure(items.head(LABEL_LIMIT))
+        self.assertEqual(list(small.layout.yaxis.ticktext), items["Task"].head(LABEL_LIMIT).tolist())
+
+    def test_summary_by_wbs_level(self):
+        """اختبار تلخيص البنود حسب مستوى WBS مع إنجاز مرجح بالمدة"""
+        items = pd.DataFrame({
+            "WBS": ["1.1", "1.2", "2.1"],
+            "Task": ["أ", "ب", "ج"],
+            "Start": ["2025-01-01", "2025-02-01", "2025-01-10"],
+            "Finish": ["2025-01-11", "2025-02-21", "2025-01-20"],
+            "Duration": [10, 30, 10],
+            "Progress": [100, 0, 50],
+            "Critical": [False, True, False],
+        })
+        self.assertEqual(wbs_depth(items), 2)
+
+        summary = summarize_schedule(items, level=1).set_index("Group")
+        self.assertEqual(summary["Count"].tolist(), [2, 1])
+        self.assertEqual(summary.loc["1", "Start"], pd.Timestamp("2025-01-01"))
+        self.assertEqual(summary.loc["1", "Finish"], pd.Timestamp("2025-02-21"))
+        self.assertAlmostEqual(summary.loc["1", "Progress"], 25.0)
+        self.assertEqual(summary["Critical"].tolist(), [True, False])
+        self.assertEqual(summary.loc["2", "Task"], "2 (1)")
+        self.assertEqual(len(summarize_schedule(items, level=2)), 3)
+
+    def test_chunks_without_wbs(self):
+        """اختبار تجميع البنود في مجموعات متتالية عند عدم وجود WBS"""
+        items = _programme(CHUNK_SIZE * 2 + 5).drop(columns="WBS")
+        groups = schedule_groups(items)
+        self.assertEqual(groups.nunique(), 3)
+        self.assertEqual(groups.iloc[-1], f"البنود {CHUNK_SIZE * 2 + 1} - {CHUNK_SIZE * 2 + 5}")
+        self.assertEqual(wbs_depth(items), 0)
+        self.assertEqual(len(gantt_figure(summarize_schedule(items)).data[0].x), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+اختبارات محسن المحتوى المحلي
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.ai_assistant.services.local_content_optimizer import (
+    LocalContentOptimizer, SCIPY_AVAILABLE, catalog_alternatives
+)
+
+
+def _random_instance(rng, components, max_alternatives):
+    """مكونات وبدائل عشوائية"""
+    comps = [
+        {"id": i, "name": f"مكون {i}", "value": float(rng.integers(100, 1000)),
+         "local_content": float(rng.integers(0, 60)), "supplier": "المورد الحالي"}
+        for i in range(components)
+    ]
+    alternatives = [
+        {"component_id": i, "supplier": f"بديل {i}-{j}", "cost": comp["value"] * float(rng.uniform(0.8, 1.5)),
+         "local_content": float(rng.integers(20, 100))}
+        for i, comp in enumerate(comps) for j in range(int(rng.integers(0, max_alternatives + 1)))
+    ]
+    return comps, alternatives
+
+
+def _brute_force(comps, alternatives, target):
+    """أقل تكلفة محققة للمستهدف بتجربة كل الاختيارات"""
+    options = [
+        [(comp["value"], comp["local_content"])]
+        + [(alt["cost"], alt["local_content"]) for alt in alternatives if alt["component_id"] == comp["id"]]
+        for comp in comps
+    ]
+    best = None
+    for combination in itertools.product(*options):
+        cost = sum(option[0] for option in combination)
+        local_content = sum(option[0] * option[1] for option in combination) / cost
+        if local_content >= target - 1e-9 and (best is None or cost < best):
+            best = cost
+    return best
+
+
+class TestLocalContentOptimizer(unittest.TestCase):
+    """اختبارات محسن المحتوى المحلي"""
+
+    def test_matches_brute_force_on_small_instances(self):
+        """اختبار تحقيق المستهدف وحدود التكلفة مقارنة بالحل الأمثل المحسوب بالتجربة"""
+        rng = np.random.default_rng(3)
+        methods = ["lagrangian", "milp"] if SCIPY_AVAILABLE else ["lagrangian"]
+        for _ in range(60):
+            comps, alternatives = _random_instance(rng, 6, 3)
+            target = float(rng.integers(30, 80))
+            best = _brute_force(comps, alternatives, target)
+            optimizer = LocalContentOptimizer(comps, alternatives)
+
+            for method in methods:
+                result = optimizer.optimize(target, method=method)
+                if best is None:
+                    self.assertEqual(result["status"], "infeasible")
+                    self.assertLess(result["max_local_content"], target)
+                    continue
+
+                self.assertGreaterEqual(result["local_content"], target - 1e-9)
+                self.assertLessEqual(result["lower_bound"], best + 1e-6)
+                self.assertGreaterEqual(result["total_cost"], best - 1e-6)
+                self.assertLessEqual(result["total_cost"], best * 1.02)
+                if result["status"] == "optimal":
+                    self.assertAlmostEqual(result["total_cost"], best, places=6)
+
+    def test_scales_to_thousands_of_components(self):
+        """اختبار حل آلاف المكونات بفجوة صغيرة عن الحد الأدنى"""
+        comps, alternatives = _random_instance(np.random.default_rng(5), 5000, 4)
+        result = LocalContentOptimizer(comps, pd.DataFrame(alternatives)).optimize(60)
+
+        self.assertIn(result["status"], ("optimal", "feasible"))
+        self.assertGreaterEqual(result["local_content"], 60 - 1e-9)
+        self.assertLess(result["gap"] / result["total_cost"], 1e-3)
+        self.assertEqual(len(result["selection"]), 5000)
+
+    def test_keeps_current_suppliers_and_reports_infeasible_targets(self):
+        """اختبار إبقاء الموردين الحاليين عند تحقيق المستهدف وتقرير الأهداف غير الممكنة"""
+        comps = [
+            {"id": 1, "name": "الخرسانة", "value": 1000, "local_content": 90, "supplier": "محلي"},
+            {"id": 2, "name": "التكييف", "value": 1000, "local_content": 20, "supplier": "أجنبي"},
+        ]
+        alternatives = [{"component_id": 2, "supplier": "مصنع محلي", "cost": 1200, "local_content": 80}]
+        optimizer = LocalContentOptimizer(comps, alternatives)
+
+        result = optimizer.optimize(50)
+        self.assertFalse(result["selection"]["changed"].any())
+        self.assertEqual(result["cost_increase"], 0)
+
+        result = optimizer.optimize(80)
+        self.assertEqual(result["selection"]["supplier"].tolist(), ["محلي", "مصنع محلي"])
+        self.assertEqual(result["cost_increase"], 200)
+
+        result = optimizer.optimize(95)
+        self.assertEqual(result["status"], "infeasible")
+        self.assertAlmostEqual(result["max_local_content"], (900 + 960) / 2200 * 100)
+
+    def test_catalog_alternatives(self):
+        """اختبار بناء البدائل من بنود الكتالوج"""
+        materials = pd.DataFrame([
+            {"name": "حديد", "category": "مواد الخرسانة", "subcategory": "حديد", "unit": "طن",
+             "price": 3000, "supplier": "حديد الراجحي", "origin": "محلي"},
+            {"name": "حديد", "category": "مواد الخرسانة", "subcategory": "حديد", "unit": "طن",
+             "price": 3600, "supplier": "مستورد", "origin": "مستورد"},
+            {"name": "أسمنت", "category": "مواد الخرسانة", "subcategory": "أسمنت", "unit": "طن",
+             "price": 600, "supplier": "أسمنت اليمامة", "origin": "محلي"},
+        ])
+        alternatives = catalog_alternatives({"id": 1, "value": 1000}, materials, "مواد الخرسانة")
+        np.testing.assert_allclose([alt["cost"] for alt in alternatives], [1000 * 3000 / 3300, 1000 * 3600 / 3300, 1000])
+        self.assertEqual([alt["local_content"] for alt in alternatives], [90, 10, 90])
+
+        subcontractors = pd.DataFrame([
+            {"name": "مقاول صغير", "category": "أعمال الكهرباء", "min_project_value": 0, "max_project_value": 500},
+            {"name": "مقاول كبير", "category": "أعمال الكهرباء", "min_project_value": 500, "max_project_value": 5000},
+        ])
+        alternatives = catalog_alternatives({"id": 2, "value": 1000}, subcontractors)
+        self.assertEqual([alt["supplier"] for alt in alternatives], ["مقاول كبير"])
+        self.assertEqual(alternatives[0]["cost"], 1000)
+
+
+@unittest.skipUnless(SCIPY_AVAILABLE, "يتطلب مكتبة scipy")
+class TestLocalContentMILP(unittest.TestCase):
+    """اختبارات الحل الصحيح بـ scipy.optimize.milp ومقارنته بطريقة لاغرانج"""
+
+    def test_auto_uses_milp(self):
+        """اختبار اختيار milp تلقائياً عند توفر scipy"""
+        comps, alternatives = _random_instance(np.random.default_rng(7), 20, 3)
+        result = LocalContentOptimizer(comps, alternatives).optimize(50)
+        self.assertEqual(result["solver"], "milp")
+        self.assertEqual(result["status"], "optimal")
+
+    def test_milp_matches_brute_force_and_bounds_lagrangian(self):
+        """اختبار مطابقة milp للحل الأمثل وأنه لا يزيد على حل لاغرانج ولا يقل عن حده الأدنى"""
+        rng = np.random.default_rng(13)
+        for _ in range(40):
+            comps, alternatives = _random_instance(rng, 6, 3)
+            target = float(rng.integers(30, 80))
+            best = _brute_force(comps, alternatives, target)
+            if best is None:
+                continue
+            optimizer = LocalContentOptimizer(comps, alternatives)
+
+            exact = optimizer.optimize(target, method="milp")
+            fallback = optimizer.optimize(target, method="lagrangian")
+            self.assertAlmostEqual(exact["total_cost"], best, places=6)
+            self.assertGreaterEqual(exact["local_content"], target - 1e-9)
+            self.assertLessEqual(exact["total_cost"], fallback["total_cost"] + 1e-6)
+            self.assertGreaterEqual(exact["total_cost"], fallback["lower_bound"] - 1e-6)
+
+    def test_lagrangian_gap_on_large_instance(self):
+        """اختبار قرب حل لاغرانج من الحل الأمثل بـ milp على آلاف المكونات"""
+        comps, alternatives = _random_instance(np.random.default_rng(5), 2000, 4)
+        optimizer = LocalContentOptimizer(comps, pd.DataFrame(alternatives))
+
+        exact = optimizer.optimize(60, method="milp")
+        fallback = optimizer.optimize(60, method="lagrangian")
+        self.assertEqual(len(exact["selection"]), 2000)
+        self.assertGreaterEqual(exact["local_content"], 60 - 1e-9)
+        self.assertLessEqual(exact["total_cost"], fallback["total_cost"] + 1e-6)
+        self.assertLess((fallback["total_cost"] - exact["total_cost"]) / exact["total_cost"], 1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+اختبارات محرك مسافات النقل وتكاليف التوريد
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.maps.services.logistics import (CITY_COORDINATES, HAUL_RATE, LOADING_COST, ROAD_FACTOR,
+                                             LogisticsEngine, haversine_matrix)
+from pricing_system.modules.pricing_strategies.pricing_strategies import PricingStrategies
+
+
+class TestLogisticsEngine(unittest.TestCase):
+    """اختبارات محرك النقل"""
+
+    def test_haversine_matrix(self):
+        """اختبار مصفوفة المسافات مقابل الحساب النقطي ومسافات معروفة"""
+        riyadh, jeddah = CITY_COORDINATES["الرياض"], CITY_COORDINATES["جدة"]
+        self.assertAlmostEqual(haversine_matrix([riyadh[0]], [riyadh[1]], [jeddah[0]], [jeddah[1]])[0, 0], 848, delta=5)
+        self.assertEqual(haversine_matrix([10], [20], [10], [20])[0, 0], 0)
+
+        rng = np.random.default_rng(5)
+        lat1, lon1 = rng.uniform(-60, 60, 300), rng.uniform(-180, 180, 300)
+        lat2, lon2 = rng.uniform(-60, 60, 2000), rng.uniform(-180, 180, 2000)
+        start = time.perf_counter()
+        matrix = haversine_matrix(lat1, lon1, lat2, lon2)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(matrix.shape, (300, 2000))
+        i, j = 17, 1234
+        phi1, phi2 = np.radians(lat1[i]), np.radians(lat2[j])
+        a = (np.sin((phi2 - phi1) / 2) ** 2
+             + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2[j] - lon1[i]) / 2) ** 2)
+        self.assertAlmostEqual(matrix[i, j], 2 * 6371.0 * np.arcsin(np.sqrt(a)), places=6)
+
+    def test_delivered_costs(self):
+        """اختبار تكلفة النقل للوحدة حسب المسافة والوزن ومدينة التوريد"""
+        engine = LogisticsEngine([{"id": "P001", "coordinates": CITY_COORDINATES["أبها"]}])
+        materials = pd.DataFrame({
+            "name": ["بيس كورس", "أسمنت", "مادة عزل", "أنابيب"],
+            "unit": ["م3", "طن", "كجم", "متر طولي"],
+            "price": [70, 600, 20, 50],
+            "supplier": ["كسارات الرياض", "شركة أسمنت ينبع", "سيكا", "الشركة السعودية للأنابيب"],
+            "origin": ["محلي", "محلي", "مستورد", "محلي"],
+        })
+        costs = engine.delivered_costs(materials, "P001")
+
+        self.assertEqual(costs["supply_city"].tolist(), ["الرياض", "ينبع", "الدمام", "الدمام"])
+        distance = engine.distance("كسارات الرياض", "P001")
+        self.assertAlmostEqual(distance, ROAD_FACTOR * haversine_matrix(
+            [CITY_COORDINATES["الرياض"][0]], [CITY_COORDINATES["الرياض"][1]],
+            [CITY_COORDINATES["أبها"][0]], [CITY_COORDINATES["أبها"][1]])[0, 0])
+        self.assertAlmostEqual(costs["haul_cost"].iloc[0], 1.8 * (LOADING_COST + HAUL_RATE * distance))
+        self.assertAlmostEqual(costs["delivered_price"].iloc[0], 70 + costs["haul_cost"].iloc[0])
+        self.assertTrue(np.isnan(costs["haul_cost"].iloc[3]))
+        self.assertEqual(costs["delivered_price"].iloc[3], 50)
+
+        weighted = engine.delivered_costs(materials.assign(weight=[None, None, None, 0.01]), "P001")
+        self.assertAlmostEqual(weighted["haul_cost"].iloc[3],
+                               0.01 * (LOADING_COST + HAUL_RATE * engine.distance("الدمام", "P001")))
+        # الإحداثيات غير المسجلة تحسب مرة واحدة ثم تحفظ
+        column = engine.site_distances([18.2164, 42.5053])
+        self.assertIs(engine.site_distances([18.2164, 42.5053]), column)
+        np.testing.assert_allclose(column, engine.site_distances("P001"))
+        with self.assertRaises(ValueError):
+            engine.site_distances("P999")
+
+    def test_pricing_uses_haul_distance(self):
+        """اختبار استخدام تكلفة النقل حسب المسافة في تسعير المواد بدل النسبة الثابتة"""
+        pricing = PricingStrategies()
+        strategy = pricing.get_strategy_by_id("MTR-001")
+        item = {"unit_price": 70, "quantity": 1000, "unit": "م3", "supplier": "كسارات الرياض"}
+        base_cost = 70000
+        flat = pricing._calculate_materials_cost(item, strategy)
+        self.assertAlmostEqual(flat, base_cost * (1 + strategy["storage_cost"] + strategy["transport_cost"]
+                                                  + strategy["market_volatility"]))
+
+        near = pricing._calculate_materials_cost({**item, "site": [24.80, 46.70]}, strategy)
+        far = pricing._calculate_materials_cost({**item, "site": "أبها"}, strategy)
+        self.assertLess(near, far)
+        haul = LogisticsEngine().delivered_costs(
+            [{"price": 70, "unit": "م3", "supplier": "كسارات الرياض"}], "أبها")["haul_cost"].iloc[0]
+        self.assertAlmostEqual(far - flat, haul * 1000 - base_cost * strategy["transport_cost"])
+
+        self.assertAlmostEqual(pricing._calculate_materials_cost({**item, "haul_cost": 12.0}, strategy) - flat,
+                               12000 - base_cost * strategy["transport_cost"])
+        unknown_weight = {**item, "unit": "قطعة", "site": "أبها"}
+        self.assertAlmostEqual(pricing._calculate_materials_cost(unknown_weight, strategy), flat)
+
+    def test_pricing_unknown_site_falls_back_to_flat_rate(self):
+        """اختبار الرجوع لنسبة النقل الثابتة عند موقع غير معروف لمحرك النقل"""
+        pricing = PricingStrategies()
+        strategy = pricing.get_strategy_by_id("MTR-001")
+        item = {"unit_price": 70, "quantity": 1000, "unit": "م3", "supplier": "كسارات الرياض"}
+
+        flat = pricing._calculate_materials_cost(item, strategy)
+        self.assertAlmostEqual(pricing._calculate_materials_cost({**item, "site": "P001"}, strategy), flat)
+
+
+if __name__ == "__main__":
+    unittest.main()
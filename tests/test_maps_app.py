@@ -0,0 +1,61 @@
+"""
+اختبار تشغيل صفحة خريطة المشاريع
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+from streamlit.testing.v1 import AppTest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HAS_FOLIUM = all(importlib.util.find_spec(name) for name in ("folium", "streamlit_folium"))
+
+
+def _projects_map_script():
+    """سكربت يعرض خريطة المشاريع ومعرف الخريطة الأساسية للجلسة"""
+    import streamlit as st
+    from modules.maps.maps_app import MapsApp, _base_map
+
+    MapsApp().show_projects_map()
+    st.text(str(id(_base_map())))
+
+
+def _delivered_costs_script():
+    """سكربت يعرض تكلفة توريد مواد الكتالوج لأول مشروع"""
+    from modules.maps.maps_app import MapsApp
+
+    app = MapsApp()
+    app.show_delivered_costs(app.projects_data[0])
+
+
+@unittest.skipUnless(HAS_FOLIUM, "folium و streamlit-folium غير مثبتتين")
+class TestProjectsMap(unittest.TestCase):
+    """اختبار مسار عرض خريطة المشاريع"""
+
+    def test_projects_map_renders(self):
+        """اختبار عرض الخريطة دون أخطاء وبناء الخريطة الأساسية مرة واحدة لكل جلسة"""
+        at = AppTest.from_function(_projects_map_script).run(timeout=60)
+        self.assertFalse(at.exception)
+        first_id = at.text[-1].value
+
+        at.run(timeout=60)
+        self.assertFalse(at.exception)
+        self.assertEqual(at.text[-1].value, first_id)
+
+        other = AppTest.from_function(_projects_map_script).run(timeout=60)
+        self.assertFalse(other.exception)
+        self.assertNotEqual(other.text[-1].value, first_id)
+
+    def test_delivered_costs_renders(self):
+        """اختبار عرض تكلفة التوريد من كتالوج المواد دون أخطاء"""
+        at = AppTest.from_function(_delivered_costs_script).run(timeout=60)
+        self.assertFalse(at.exception)
+        self.assertTrue(at.expander)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,315 @@
+"""
+اختبارات مخزن الإشعارات ومجدول المواعيد النهائية وطابور الإرسال
+"""
+
+import os
+import sys
+import time
+import datetime
+import itertools
+import threading
+import unittest
+import socketserver
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.notifications.services.notification_store import NotificationStore
+from modules.notifications.services.deadline_scheduler import DeadlineScheduler
+from modules.notifications.services.delivery_queue import DeliveryQueue, DeliveryChannel, EmailChannel
+
+
+class _SMTPDebugHandler(socketserver.StreamRequestHandler):
+    """خادم SMTP محلي مبسط يسجل الرسائل المستلمة"""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self._reply("220 localhost debug")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == "EHLO":
+                self._reply("250 localhost")
+            elif command == "DATA":
+                self._reply("354 end with .")
+                data = []
+                while True:
+                    data_line = self.rfile.readline().decode()
+                    if data_line.rstrip("\r\n") == ".":
+                        break
+                    data.append(data_line)
+                self.server.messages.append("".join(data))
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class _FailingChannel(DeliveryChannel):
+    """قناة تفشل دائماً"""
+
+    def send(self, recipient, subject, body):
+        raise ConnectionError("unreachable")
+
+
+class _RecordingChannel(DeliveryChannel):
+    """قناة تسجل الرسائل المرسلة"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, recipient, subject, body):
+        self.sent.append((recipient, subject))
+
+
+class TestNotificationStore(unittest.TestCase):
+    """اختبارات مخزن الإشعارات"""
+
+    def setUp(self):
+        """إعداد مخزن مؤقت ببيانات متنوعة"""
+        self.store = NotificationStore(":memory:")
+        base = datetime.datetime(2025, 3, 1)
+        self.store.add_many([
+            {
+                "user_id": 0 if i % 3 == 0 else 1 + i % 2,
+                "title": f"إشعار {i}",
+                "message": "نص",
+                "type": "deadline" if i % 2 else "update",
+                "priority": ("high", "medium", "low")[i % 3],
+                "related_entity": f"T-2025-{i:03d}",
+                "created_at": base + datetime.timedelta(hours=i),
+                "is_read": i % 4 == 0
+            }
+            for i in range(100)
+        ])
+
+    def tearDown(self):
+        """إغلاق المخزن"""
+        self.store.close()
+
+    def test_user_sees_own_and_broadcast(self):
+        """اختبار أن المستخدم يرى إشعاراته والإشعارات العامة فقط"""
+        notifications = self.store.query(user_id=1, limit=None)
+        self.assertTrue(all(n["user_id"] in (0, 1) for n in notifications))
+        self.assertEqual(len(notifications), self.store.count(user_id=1))
+
+    def test_pagination_is_newest_first_and_disjoint(self):
+        """اختبار الترقيم والترتيب الزمني"""
+        first = self.store.query(types=["deadline"], limit=10, offset=0)
+        second = self.store.query(types=["deadline"], limit=10, offset=10)
+        self.assertEqual(len(first), 10)
+        self.assertFalse({n["id"] for n in first} & {n["id"] for n in second})
+        self.assertGreater(first[-1]["created_at"], second[0]["created_at"])
+
+    def test_bulk_mark_read_respects_filters(self):
+        """اختبار تعليم الإشعارات كمقروءة دفعة واحدة حسب الفلاتر"""
+        high_unread = self.store.count(priorities=["high"], is_read=False)
+        updated = self.store.mark_all_read(priorities=["high"])
+        self.assertEqual(updated, high_unread)
+        self.assertEqual(self.store.count(priorities=["high"], is_read=False), 0)
+        self.assertGreater(self.store.count(priorities=["low"], is_read=False), 0)
+
+    def test_broadcast_read_per_user(self):
+        """اختبار أن قراءة مستخدم للإشعارات العامة لا تعلمها مقروءة لغيره"""
+        broadcast_id = self.store.query(user_id=0, is_read=False, limit=1)[0]["id"]
+        user_2_unread = self.store.unread_count(user_id=2)
+
+        self.store.mark_all_read(user_id=1)
+
+        self.assertEqual(self.store.unread_count(user_id=1), 0)
+        self.assertEqual(self.store.unread_count(user_id=2), user_2_unread)
+        self.assertTrue(self.store.get(broadcast_id, user_id=1)["is_read"])
+        self.assertFalse(self.store.get(broadcast_id, user_id=2)["is_read"])
+        self.assertEqual(self.store.count_by("is_read", user_id=1), {1: self.store.count(user_id=1)})
+
+    def test_count_by_and_date_range(self):
+        """اختبار الإحصائيات المجمعة وفلتر الفترة"""
+        counts = self.store.count_by("type", start=datetime.date(2025, 3, 1), end=datetime.datetime(2025, 3, 1, 23, 59))
+        self.assertEqual(counts, {"deadline": 12, "update": 12})
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    """اختبارات مجدول المواعيد النهائية"""
+
+    def setUp(self):
+        """إعداد المجدول"""
+        self.store = NotificationStore(":memory:")
+        self.scheduler = DeadlineScheduler(self.store)
+        self.closing = datetime.datetime(2025, 4, 10, 12, 0)
+
+    def tearDown(self):
+        """إغلاق المخزن"""
+        self.scheduler.stop()
+        self.store.close()
+
+    def test_reminders_fire_in_order(self):
+        """اختبار توليد التذكيرات عند حلول مواعيدها فقط"""
+        self.scheduler.schedule("T-1", "مبنى إداري", self.closing)
+        self.assertEqual(self.scheduler.next_due_time(), self.closing - datetime.timedelta(days=7))
+
+        self.assertEqual(self.scheduler.run_due(self.closing - datetime.timedelta(days=8)), [])
+        self.assertEqual(len(self.scheduler.run_due(self.closing - datetime.timedelta(days=7))), 1)
+        self.assertEqual(self.scheduler.next_due_time(), self.closing - datetime.timedelta(days=3))
+
+    def test_only_nearest_of_overdue_reminders_is_sent(self):
+        """اختبار إرسال أقرب تذكير فقط عند استحقاق عدة تذكيرات معاً"""
+        self.scheduler.schedule("T-1", "مبنى إداري", self.closing)
+        ids = self.scheduler.run_due(self.closing - datetime.timedelta(hours=20))
+        self.assertEqual(len(ids), 1)
+        self.assertIn("1 يوم", self.store.get(ids[0])["message"])
+        self.assertIsNone(self.scheduler.next_due_time())
+
+    def test_reschedule_and_restart_do_not_duplicate(self):
+        """اختبار تجاهل المواعيد القديمة وعدم تكرار التذكيرات بعد إعادة التحميل"""
+        self.scheduler.schedule("T-1", "مبنى إداري", self.closing)
+        self.scheduler.run_due(self.closing - datetime.timedelta(days=7))
+
+        new_closing = self.closing + datetime.timedelta(days=30)
+        self.scheduler.schedule("T-1", "مبنى إداري", new_closing)
+        self.assertEqual(self.scheduler.next_due_time(), new_closing - datetime.timedelta(days=7))
+
+        self.scheduler.run_due(new_closing - datetime.timedelta(days=7))
+        reloaded = DeadlineScheduler(self.store)
+        self.assertEqual(reloaded.next_due_time(), new_closing - datetime.timedelta(days=3))
+
+    def test_same_deadline_rescheduled_is_sent_once(self):
+        """اختبار عدم تكرار التذكير عند جدولة الموعد نفسه مرتين أو إرساله من مجدول آخر"""
+        self.scheduler.schedule("T-1", "مبنى إداري", self.closing)
+        self.scheduler.schedule("T-1", "مبنى إداري - معدل", self.closing)
+        other = DeadlineScheduler(self.store)
+
+        due_at = self.closing - datetime.timedelta(days=7)
+        self.assertEqual(len(self.scheduler.run_due(due_at)), 1)
+        self.assertEqual(self.scheduler.next_due_time(), self.closing - datetime.timedelta(days=3))
+        self.assertEqual(other.run_due(due_at), [])
+
+        self.scheduler.schedule("T-1", "مبنى إداري", self.closing)
+        self.assertEqual(self.scheduler.next_due_time(), self.closing - datetime.timedelta(days=3))
+        self.assertEqual(self.store.count(types=["deadline"]), 1)
+
+
+class TestDeliveryQueue(unittest.TestCase):
+    """اختبارات طابور الإرسال"""
+
+    def setUp(self):
+        """تشغيل خادم SMTP محلي للاختبار"""
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPDebugHandler)
+        self.server.daemon_threads = True
+        self.server.messages = []
+        self.server.connections = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.store = NotificationStore(":memory:")
+        self.email = EmailChannel("127.0.0.1", self.server.server_address[1], sender="tenders@example.com", use_tls=False)
+        self.queue = DeliveryQueue(
+            self.store,
+            {"email": self.email, "failing": _FailingChannel()},
+            rate_per_second=None,
+            max_attempts=3,
+            base_backoff=10
+        )
+
+    def tearDown(self):
+        """إيقاف الطابور والخادم"""
+        self.queue.stop(5)
+        self.server.shutdown()
+        self.server.server_close()
+        self.store.close()
+
+    def test_batch_reuses_smtp_connection(self):
+        """اختبار إرسال الدفعة عبر اتصال SMTP واحد"""
+        for i in range(3):
+            self.queue.enqueue("email", f"user{i}@example.com", "تذكير", "نص الرسالة")
+
+        self.assertEqual(self.queue.process_once()["sent"], 3)
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.queue.stats()["pending"], 0)
+
+    def test_retry_with_backoff_then_fail(self):
+        """اختبار إعادة المحاولة بتأخير متزايد ثم الفشل النهائي"""
+        self.queue.enqueue("failing", "x", "s", "b")
+        now = time.time()
+
+        self.assertEqual(self.queue.process_once(now)["retried"], 1)
+        self.assertEqual(self.queue.process_once(now + 9)["retried"], 0)
+        self.assertEqual(self.queue.process_once(now + 10)["retried"], 1)
+        self.assertEqual(self.queue.process_once(now + 10 + 19)["retried"], 0)
+        self.assertEqual(self.queue.process_once(now + 10 + 20)["failed"], 1)
+        self.assertEqual(self.queue.stats()["failed"], 1)
+
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertEqual(self.queue.stats()["pending"], 1)
+
+    def test_claimed_rows_are_not_sent_twice(self):
+        """اختبار عدم إرسال الرسائل المحجوزة من طابور آخر حتى انتهاء مهلة الحجز"""
+        self.queue.enqueue("email", "user@example.com", "تذكير", "نص الرسالة")
+        now = time.time()
+        other = DeliveryQueue(self.store, {"email": self.email}, rate_per_second=None, claim_timeout=60)
+
+        rows = other._claim(now)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(other.stats()["sending"], 1)
+        self.assertEqual(self.queue.process_once(now)["sent"], 0)
+        self.assertEqual(other._claim(now + 1), [])
+
+        # انتهاء مهلة الحجز (توقف الطابور الآخر قبل الإرسال) يعيد الرسالة إلى الطابور
+        self.assertEqual(other.process_once(now + 60)["sent"], 1)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(other.stats()["sent"], 1)
+
+    def test_worker_delivers_new_notifications(self):
+        """اختبار إرسال الإشعارات الجديدة في الخلفية"""
+        self.queue.subscribe_to({"email": ["manager@example.com"]})
+        self.queue.start()
+        self.store.add("ترسية مناقصة", "تمت ترسية المناقصة T-2025-003")
+
+        deadline = time.time() + 5
+        while self.queue.stats()["sent"] < 1 and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(self.queue.stats()["sent"], 1)
+        self.assertIn("manager@example.com", self.server.messages[0])
+
+
+class TestSchedulerWithDeliveryQueue(unittest.TestCase):
+    """اختبار تشغيل مجدول المواعيد وطابور الإرسال معاً"""
+
+    def test_concurrent_workers_do_not_deadlock(self):
+        """اختبار عدم تعطل الخيطين عند إضافة المجدول للتذكيرات أثناء انتظار خيط الإرسال"""
+        store = NotificationStore(":memory:")
+        channel = _RecordingChannel()
+        queue = DeliveryQueue(store, {"log": channel}, batch_size=1, rate_per_second=None)
+        queue.subscribe_to({"log": ["manager@example.com"]})
+
+        # ساعة تتقدم 10 ثوان مع كل قراءة فيولد المجدول التذكيرات على دفعات متتابعة دون انتظار
+        base = datetime.datetime(2025, 4, 1)
+        ticks = itertools.count()
+        scheduler = DeadlineScheduler(store, reminder_days=(1,),
+                                      clock=lambda: base + datetime.timedelta(seconds=10 * next(ticks)))
+        for i in range(500):
+            scheduler.schedule(f"T-{i}", "مناقصة", base + datetime.timedelta(days=1, seconds=2 * i))
+
+        queue.start()
+        scheduler.start()
+        deadline = time.time() + 15
+        while len(channel.sent) < 500 and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(len(channel.sent), 500)
+        scheduler.stop(5)
+        queue.stop(5)
+        self.assertIsNone(scheduler._thread)
+        self.assertIsNone(queue._thread)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+اختبارات سجل الصفحات وحدود زمن الاستيراد
+"""
+
+import ast
+import os
+import sys
+import unittest
+
+from streamlit.testing.v1 import AppTest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import page_registry
+from page_registry import (
+    COLD_START_BUDGET, PAGE_IMPORT_BUDGET, PAGE_IMPORT_BUDGETS, PAGES,
+    profile_imports, profile_pages
+)
+
+
+def _session_script():
+    """سكربت يطلب تطبيق الصفحة نفسها مرتين ويعرض صفحة لا تتوفر وحدتها"""
+    import streamlit as st
+    from page_registry import get_page_app, run_page
+
+    first = get_page_app("صفحة الاختبار")
+    st.text(str(first is get_page_app("صفحة الاختبار")))
+    st.text(str(id(first)))
+    run_page("صفحة غير متوفرة")
+
+
+class TestPageRegistry(unittest.TestCase):
+    """اختبارات سجل الصفحات"""
+
+    def test_app_imports_pages_lazily(self):
+        """اختبار أن app.py لا يستورد وحدات الصفحات مباشرة"""
+        with open(os.path.join(page_registry.ROOT_DIR, "app.py"), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+
+        imported = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                imported.add(node.module)
+
+        page_modules = {module for module, _ in PAGES.values()}
+        self.assertFalse(imported & page_modules)
+        self.assertFalse([name for name in imported if name.startswith(("modules.", "pricing_system."))])
+
+    def test_cold_start_budget(self):
+        """اختبار زمن بدء التشغيل وعدم تحميل المكتبات الثقيلة قبل اختيار صفحة"""
+        result = profile_imports()
+        self.assertEqual(result["heavy"], [])
+        self.assertLessEqual(result["cold_start"], COLD_START_BUDGET)
+
+    def test_page_import_budgets(self):
+        """اختبار زمن استيراد كل صفحة فوق بدء التشغيل"""
+        for page, result in profile_pages().items():
+            with self.subTest(page=page):
+                if result["error"] and result["error"].startswith("ModuleNotFoundError"):
+                    # مكتبة اختيارية غير مثبتة في بيئة الاختبار
+                    continue
+                self.assertIsNone(result["error"])
+                self.assertLessEqual(result["page"], PAGE_IMPORT_BUDGETS.get(page, PAGE_IMPORT_BUDGET))
+
+    def test_page_apps_cached_per_session(self):
+        """اختبار إنشاء تطبيق الصفحة مرة واحدة لكل جلسة وعرض خطأ للوحدة غير المتوفرة"""
+        pages = dict(PAGES)
+        PAGES["صفحة الاختبار"] = ("collections", "OrderedDict")
+        PAGES["صفحة غير متوفرة"] = ("modules.missing_page_app", "MissingApp")
+        try:
+            at = AppTest.from_function(_session_script).run()
+            self.assertFalse(at.exception)
+            self.assertEqual(at.text[0].value, "True")
+            first_id = at.text[1].value
+            self.assertEqual(len(at.error), 1)
+
+            at.run()
+            self.assertEqual(at.text[1].value, first_id)
+
+            other = AppTest.from_function(_session_script).run()
+            self.assertNotEqual(other.text[1].value, first_id)
+        finally:
+            PAGES.clear()
+            PAGES.update(pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
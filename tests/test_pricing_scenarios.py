@@ -0,0 +1,135 @@
+"""
+اختبارات محرك سيناريوهات التسعير
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.pricing.services.scenario_engine import ScenarioEngine
+
+
+BASE_ITEMS = [
+    {"id": 1, "category": "تكاليف مباشرة", "subcategory": "مواد", "description": "خرسانة", "amount": 120000},
+    {"id": 2, "category": "تكاليف مباشرة", "subcategory": "مواد", "description": "حديد تسليح", "amount": 135000},
+    {"id": 3, "category": "تكاليف مباشرة", "subcategory": "عمالة", "description": "عمالة تنفيذ", "amount": 120000},
+    {"id": 4, "category": "تكاليف غير مباشرة", "subcategory": "إدارة", "description": "إدارة المشروع", "amount": 45000},
+    {"id": 5, "category": "أرباح", "subcategory": "أرباح", "description": "هامش الربح", "amount": 55000},
+]
+
+
+def _line_by_line(items, scenario):
+    """حساب مرجعي لسيناريو واحد بند ببند"""
+    amounts = {item["id"]: float(item["amount"]) for item in items}
+    additions = dict.fromkeys(amounts, 0.0)
+    column = {"item": "id", "category": "category", "subcategory": "subcategory"}
+    for delta in scenario["deltas"]:
+        matched = [item for item in items if str(item[column[delta["scope"]]]) == str(delta["target"])]
+        total = sum(item["amount"] for item in matched)
+        for item in matched:
+            amounts[item["id"]] *= 1 + delta.get("percent", 0) / 100
+            share = item["amount"] / total if total else 1 / len(matched)
+            additions[item["id"]] += delta.get("amount", 0) * share
+    cost = sum(amounts[item["id"]] + additions[item["id"]] for item in items if item["category"] != "أرباح")
+    return cost, cost * (1 + scenario["profit_margin"] / 100)
+
+
+class TestScenarioEngine(unittest.TestCase):
+    """اختبارات محرك سيناريوهات التسعير"""
+
+    def setUp(self):
+        """تهيئة محرك بنموذج أساسي"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "scenarios.db")
+        self.engine = ScenarioEngine(self.db_path)
+        self.engine.replace_base(BASE_ITEMS)
+
+    def tearDown(self):
+        """إغلاق المحرك وحذف الملفات"""
+        self.engine.close()
+        self.temp_dir.cleanup()
+
+    def test_vectorized_evaluation_matches_line_by_line(self):
+        """اختبار تطابق تقييم عشرات السيناريوهات معاً مع الحساب لكل سيناريو على حدة"""
+        rng = np.random.default_rng(5)
+        targets = {"item": ["1", "3", "5"], "category": ["تكاليف مباشرة", "تكاليف غير مباشرة"],
+                   "subcategory": ["مواد", "عمالة", "معدات"]}
+        scenarios = []
+        for _ in range(60):
+            deltas = []
+            for _ in range(rng.integers(0, 4)):
+                scope = str(rng.choice(list(targets)))
+                deltas.append({
+                    "scope": scope,
+                    "target": str(rng.choice(targets[scope])),
+                    "percent": float(rng.uniform(-20, 30)),
+                    "amount": float(rng.choice([0, 10000]))
+                })
+            scenarios.append({"profit_margin": float(rng.uniform(0, 20)), "deltas": deltas})
+
+        result = self.engine.evaluate(scenarios)
+        self.assertEqual(result["lines"].shape, (60, len(BASE_ITEMS)))
+        expected = np.array([_line_by_line(BASE_ITEMS, scenario) for scenario in scenarios])
+        np.testing.assert_allclose(result["total_cost"], expected[:, 0])
+        np.testing.assert_allclose(result["total_price"], expected[:, 1])
+        np.testing.assert_allclose(result["by_category"].sum(axis=1), result["lines"].sum(axis=1))
+
+        with self.assertRaises(ValueError):
+            self.engine.evaluate([{"profit_margin": 5, "deltas": [{"scope": "client", "target": "x"}]}])
+
+    def test_scenarios_are_persisted_with_unique_ids(self):
+        """اختبار حفظ السيناريوهات وتعديلاتها بعد إعادة فتح قاعدة البيانات"""
+        first = self.engine.add_scenario("أساسي", "", 8.0, is_active=True)
+        second = self.engine.add_scenario("مواد مرتفعة", "", 8.0, [{"scope": "subcategory", "target": "مواد", "percent": 10}])
+        self.engine.delete_scenario(first)
+        third = self.engine.add_scenario("تنافسي", "", 4.0)
+        self.assertEqual(len({first, second, third}), 3)
+        self.engine.close()
+
+        self.engine = ScenarioEngine(self.db_path)
+        scenarios = {scenario["id"]: scenario for scenario in self.engine.scenarios()}
+        self.assertEqual(sorted(scenarios), [second, third])
+        self.assertAlmostEqual(scenarios[second]["total_cost"], 420000 + 25500)
+        self.assertAlmostEqual(scenarios[third]["total_price"], 420000 * 1.04)
+
+        self.engine.set_active(second)
+        self.engine.set_active(third)
+        self.assertEqual([s["id"] for s in self.engine.scenarios() if s["is_active"]], [third])
+
+    def test_totals_recomputed_only_when_base_changes(self):
+        """اختبار إعادة استخدام الإجماليات المخزنة حتى يتغير النموذج الأساسي"""
+        for margin in (5.0, 8.0, 12.0):
+            self.engine.add_scenario(f"هامش {margin}", "", margin, [{"scope": "item", "target": 3, "percent": 5}])
+        self.engine.scenarios()
+
+        with mock.patch.object(self.engine, "evaluate", wraps=self.engine.evaluate) as evaluate:
+            self.engine.scenarios()
+            evaluate.assert_not_called()
+
+            new_id = self.engine.add_scenario("جديد", "", 10.0)
+            self.engine.scenarios()
+            self.assertEqual(len(evaluate.call_args.args[0]), 1)
+
+            self.engine.update_scenario(new_id, deltas=[{"scope": "category", "target": "تكاليف غير مباشرة", "amount": 5000}])
+            self.engine.scenarios()
+            self.assertEqual(len(evaluate.call_args.args[0]), 1)
+
+            self.engine.update_base_item(1, amount=150000)
+            scenarios = self.engine.scenarios()
+            self.assertEqual(evaluate.call_count, 3)
+            self.assertEqual(len(evaluate.call_args.args[0]), 4)
+
+        self.assertAlmostEqual(scenarios[-1]["total_cost"], 450000 + 5000)
+        self.assertAlmostEqual(self.engine.base_total(), 450000)
+        self.assertAlmostEqual(self.engine.base_total(include_profit=True), 505000)
+
+
+if __name__ == "__main__":
+    unittest.main()
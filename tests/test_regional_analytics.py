@@ -0,0 +1,154 @@
+"""
+اختبارات تحليل المناطق والخريطة الملونة المحلية
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.db_connector import DatabaseConnector
+from modules.ai_assistant.services.tender_history import TenderHistoryStore
+from modules.maps.services.regional_analytics import (REGIONS, UNSPECIFIED, RegionalAnalytics,
+                                                      load_regions_geojson, regions_figure)
+
+
+class _Config:
+    """إعدادات قاعدة بيانات مؤقتة بدلاً من AppConfig"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_database_config(self):
+        return {"type": "sqlite", "path": self.path}
+
+
+def _tender(number, location, status, budget, bid, area, duration=12):
+    """مناقصة تاريخية بالحقول المستخدمة في التحليل"""
+    return {"tender_number": number, "location": location, "status": status, "estimated_budget": budget,
+            "bid_price": bid, "area": area, "duration_months": duration}
+
+
+class TestRegionalAnalytics(unittest.TestCase):
+    """اختبارات مؤشرات المناطق"""
+
+    def setUp(self):
+        """إنشاء قاعدة النظام (بمشاريعها الافتراضية بلا موقع) ومخزن المناقصات"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseConnector(_Config(os.path.join(self.temp_dir.name, "database.db")))
+        self.history = TenderHistoryStore(os.path.join(self.temp_dir.name, "tender_history.db"))
+        self.analytics = RegionalAnalytics(self.db.db_path, self.history.db_path)
+
+    def tearDown(self):
+        """إغلاق الاتصالات وحذف الملفات"""
+        self.analytics.close()
+        self.history.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def _add_projects(self, rows):
+        self.db.cursor.executemany(
+            "INSERT INTO projects (name, client, start_date, end_date, status, location) VALUES (?, 'عميل', ?, ?, 'نشط', ?)",
+            rows
+        )
+        self.db.connection.commit()
+
+    def test_summary_by_region(self):
+        """اختبار تجميع المشاريع والمناقصات حسب المنطقة مع ربط المدن بمناطقها"""
+        self._add_projects([
+            ("أ", "2025-01-01", "2025-07-02", "الرياض"),
+            ("ب", "2025-01-01", "2026-01-01", " الرياض "),
+            ("ج", "2025-01-01", "2025-04-02", "جدة"),
+        ])
+        self.history.add_many([
+            _tender("T1", "جدة", "فائز", 1_000_000, 900_000, 1000),
+            _tender("T2", "مكة", "خاسر", 2_000_000, 2_100_000, 1000),
+            _tender("T3", "مكة المكرمة", "قيد الدراسة", 500_000, 450_000, None),
+            _tender("T4", "الدمام", "منجز", 3_000_000, 2_500_000, 2500, duration=20),
+        ])
+
+        summary = self.analytics.summary().set_index("region")
+        self.assertEqual(set(REGIONS) | {UNSPECIFIED}, set(summary.index))
+
+        riyadh, makkah, eastern = summary.loc["الرياض"], summary.loc["مكة المكرمة"], summary.loc["المنطقة الشرقية"]
+        self.assertEqual(riyadh["project_count"], 2)
+        self.assertAlmostEqual(riyadh["avg_duration_months"], (182 + 365) / 2 / 30.4375)
+        self.assertEqual(riyadh["tender_count"], 0)
+        self.assertTrue(np.isnan(riyadh["win_rate"]))
+
+        self.assertEqual(makkah["project_count"], 1)
+        self.assertEqual(makkah["tender_count"], 3)
+        self.assertEqual(makkah["total_budget"], 3_500_000)
+        self.assertAlmostEqual(makkah["win_rate"], 0.5)
+        self.assertAlmostEqual(makkah["avg_price_per_sqm"], 3_000_000 / 2000)
+
+        # مدة المشاريع من مدة المناقصات عند عدم وجود مشاريع في المنطقة
+        self.assertEqual(eastern["project_count"], 0)
+        self.assertEqual(eastern["avg_duration_months"], 20)
+        self.assertEqual(eastern["win_rate"], 1.0)
+        # المشاريع الافتراضية بلا موقع
+        self.assertEqual(summary.loc[UNSPECIFIED, "project_count"], 3)
+        self.assertEqual(summary.loc["تبوك", "project_count"], 0)
+
+    def test_sample_tenders_excluded(self):
+        """اختبار عدم دخول المناقصات النموذجية في مؤشرات المناطق"""
+        self.history.add_many([_tender("S1", "جدة", "فائز", 1_000_000, 900_000, 1000)], is_sample=True)
+        self.history.add_many([_tender("T1", "جدة", "خاسر", 2_000_000, 2_100_000, 1000)])
+
+        makkah = self.analytics.summary().set_index("region").loc["مكة المكرمة"]
+        self.assertEqual(makkah["tender_count"], 1)
+        self.assertEqual(makkah["win_rate"], 0.0)
+
+    def test_cached_per_data_version(self):
+        """اختبار إعادة الاستعلام فقط بعد تعديل البيانات من اتصال آخر"""
+        calls = []
+        query = self.analytics._query
+        self.analytics._query = lambda: calls.append(1) or query()
+
+        first = self.analytics.summary()
+        first.loc[0, "project_count"] = -1
+        second = self.analytics.summary()
+        self.assertEqual(len(calls), 1)
+        self.assertGreaterEqual(second["project_count"].min(), 0)
+
+        self.history.add_many([_tender("T9", "تبوك", "فائز", 100, 90, 1)])
+        third = self.analytics.summary().set_index("region")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(third.loc["تبوك", "tender_count"], 1)
+
+        self._add_projects([("د", "2025-01-01", "2025-02-01", "تبوك")])
+        self.assertEqual(self.analytics.summary().set_index("region").loc["تبوك", "project_count"], 1)
+        self.assertEqual(len(calls), 3)
+
+    def test_without_history_and_offline_figure(self):
+        """اختبار التحليل دون قاعدة المناقصات والخريطة المحلية دون خريطة أساس من الإنترنت"""
+        analytics = RegionalAnalytics(self.db.db_path)
+        try:
+            summary = analytics.summary()
+        finally:
+            analytics.close()
+        self.assertEqual(summary["tender_count"].sum(), 0)
+
+        geojson = load_regions_geojson()
+        self.assertEqual(sorted(feature["id"] for feature in geojson["features"]), sorted(REGIONS))
+
+        summary = summary[summary["region"] != UNSPECIFIED].assign(value=np.arange(len(REGIONS), dtype=float))
+        summary.loc[summary["region"] == "جازان", "value"] = np.nan
+        fig = regions_figure(summary, "value", geojson)
+        layout = fig.to_plotly_json()["layout"]
+        self.assertNotIn("geo", layout)
+        self.assertNotIn("mapbox", layout)
+
+        regions = {trace.name: trace for trace in fig.data if trace.fill == "toself"}
+        self.assertEqual(set(regions), set(REGIONS))
+        self.assertEqual(regions["جازان"].fillcolor, "#ECEFF1")
+        self.assertNotEqual(regions["الرياض"].fillcolor, regions["مكة المكرمة"].fillcolor)
+
+
+if __name__ == "__main__":
+    unittest.main()
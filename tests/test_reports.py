@@ -0,0 +1,304 @@
+"""
+اختبارات ملخصات التقارير ومنشئ التقارير المخصصة ومجدول التقارير
+"""
+
+import os
+import sys
+import datetime
+import tempfile
+import threading
+import unittest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.db_connector import DatabaseConnector
+from modules.reports.services.report_aggregates import ReportAggregates
+from modules.reports.services.report_builder import ReportEngine, ReportPlan
+from modules.reports.services.report_scheduler import CronSchedule, ReportScheduler
+
+import openpyxl
+
+
+class _Config:
+    """إعدادات قاعدة بيانات مؤقتة بدلاً من AppConfig"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_database_config(self):
+        return {"type": "sqlite", "path": self.path}
+
+
+def _snapshot(aggregates):
+    """قراءة جميع الملخصات بصيغة قابلة للمقارنة"""
+    return (
+        aggregates.project_totals(),
+        sorted(aggregates.status_counts()),
+        aggregates.monthly_counts(),
+        sorted(aggregates.dimension_counts("type")),
+        sorted(aggregates.pricing_by_project()),
+        sorted(aggregates.risk_counts(("probability", "impact"))),
+        sorted(aggregates.report_counts()),
+    )
+
+
+class TestReportAggregates(unittest.TestCase):
+    """اختبارات الجداول التجميعية"""
+
+    def setUp(self):
+        """إنشاء قاعدة بيانات النظام مع بياناتها الافتراضية"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseConnector(_Config(os.path.join(self.temp_dir.name, "database.db")))
+        self.aggregates = ReportAggregates(self.db.db_path)
+
+    def tearDown(self):
+        """إغلاق الاتصالات وحذف الملفات"""
+        self.aggregates.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_initial_backfill(self):
+        """اختبار بناء الملخصات من البيانات الموجودة عند التثبيت"""
+        totals = self.aggregates.project_totals()
+        self.assertEqual(totals["total"], 3)
+        self.assertEqual(totals["active"], 2)
+
+    def test_triggers_match_full_rebuild(self):
+        """اختبار تطابق التحديث التزايدي مع إعادة البناء الكاملة بعد الإضافة والتعديل والحذف"""
+        for i in range(30):
+            project_id = self.db.insert("projects", {
+                "name": f"مشروع {i}",
+                "client": "وزارة النقل" if i % 2 else "وزارة الصحة",
+                "status": ("فائز", "خاسر", "تم التقديم")[i % 3],
+                "project_type": ("طرق", "مباني", None)[i % 3],
+                "local_content": 60 + i if i % 4 else None,
+                "created_at": f"202{i % 3}-0{1 + i % 9}-15 10:00:00",
+                "created_by": 1
+            })
+            self.db.insert("pricing_items", {
+                "project_id": project_id, "item_number": "1", "description": "بند", "unit": "م3",
+                "quantity": 10, "unit_price": 100 + i, "total_price": 10 * (100 + i)
+            })
+            self.db.insert("risks", {
+                "project_id": project_id, "name": "مخاطرة", "category": "فنية",
+                "probability": ("عالية", "منخفضة")[i % 2], "impact": "متوسط", "risk_level": "متوسط"
+            })
+
+        self.db.execute_query("UPDATE projects SET status = 'فائز', local_content = 90 WHERE id % 5 = 0")
+        self.db.execute_query("UPDATE pricing_items SET total_price = total_price * 2 WHERE id % 3 = 0")
+        self.db.execute_query("DELETE FROM projects WHERE id % 7 = 0")
+        self.db.execute_query("DELETE FROM risks WHERE id % 4 = 0")
+        self.db.insert("reports", {"name": "تقرير", "report_type": "أسبوعي", "status": "مكتمل"})
+
+        incremental = _snapshot(self.aggregates)
+        self.aggregates.refresh()
+        self.assertEqual(incremental, _snapshot(self.aggregates))
+
+        self.assertEqual(
+            self.aggregates.project_totals()["total"],
+            self.db.fetch_one("SELECT COUNT(*) FROM projects")[0]
+        )
+
+    def test_counts_are_not_limited_by_lists(self):
+        """اختبار أن أعداد المؤشرات تشمل كل الصفوف وليس الصفوف المعروضة فقط"""
+        for i in range(250):
+            project_id = self.db.insert("projects", {
+                "name": f"مشروع {i}", "client": "وزارة النقل", "status": "مكتمل", "end_date": "2024-01-01"
+            })
+            self.db.insert("risks", {
+                "project_id": project_id, "name": "مخاطرة", "category": "فنية", "probability": "عالية",
+                "impact": "عالي", "risk_level": "عالي", "mitigation_strategy": "خطة" if i % 2 else ""
+            })
+            self.db.insert("pricing_items", {
+                "project_id": project_id, "item_number": "1", "description": "بند", "unit": "م3",
+                "quantity": 1, "unit_price": 100, "total_price": 100
+            })
+
+        self.assertEqual(len(self.aggregates.projects(statuses=("مكتمل",))), 200)
+        self.assertEqual(self.aggregates.count_projects(statuses=("مكتمل",)),
+                         self.db.fetch_one("SELECT COUNT(*) FROM projects WHERE status = 'مكتمل'")[0])
+        self.assertEqual(self.aggregates.count_risks(risk_levels=("عالي",)),
+                         self.db.fetch_one("SELECT COUNT(*) FROM risks WHERE risk_level = 'عالي'")[0])
+        self.assertEqual(self.aggregates.count_risks(with_mitigation=True) + self.aggregates.count_risks(with_mitigation=False),
+                         self.db.fetch_one("SELECT COUNT(*) FROM risks")[0])
+        self.assertGreaterEqual(self.aggregates.pricing_totals()["projects"], 250)
+
+
+class TestReportEngine(unittest.TestCase):
+    """اختبارات منشئ التقارير المخصصة"""
+
+    def setUp(self):
+        """إنشاء قاعدة بيانات بمشاريع وبنود تسعير"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseConnector(_Config(os.path.join(self.temp_dir.name, "database.db")))
+        self.aggregates = ReportAggregates(self.db.db_path)
+        for i in range(120):
+            project_id = self.db.insert("projects", {
+                "name": f"مشروع {i:03d}",
+                "client": "وزارة النقل",
+                "status": "فائز" if i % 2 else "خاسر",
+                "location": ("الرياض", "جدة", "الدمام")[i % 3],
+                "start_date": f"2025-{1 + i % 12:02d}-01"
+            })
+            self.db.insert("pricing_items", {
+                "project_id": project_id, "item_number": "1", "description": "بند", "unit": "م3",
+                "quantity": 1, "unit_price": i * 1000, "total_price": i * 1000
+            })
+        self.engine = ReportEngine(self.db.db_path)
+        self.plan = ReportPlan(
+            ["اسم المشروع", "الموقع", "الميزانية"],
+            [("الموقع", "in", ["الرياض", "جدة"]), ("الميزانية", "gte", 50000), ("تاريخ البدء", "between", ["2025-01-01", "2025-06-30"])],
+            sort_by="الميزانية",
+            descending=True
+        )
+
+    def tearDown(self):
+        """إغلاق الاتصالات وحذف الملفات"""
+        self.engine.close()
+        self.aggregates.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def _expected(self):
+        return [
+            (f"مشروع {i:03d}", ("الرياض", "جدة", "الدمام")[i % 3], float(i * 1000))
+            for i in range(119, -1, -1)
+            if i % 3 != 2 and i >= 50 and 1 + i % 12 <= 6
+        ]
+
+    def test_compiled_query_is_parameterized(self):
+        """اختبار عدم تضمين القيم في نص الاستعلام"""
+        compiled = self.plan.compile()
+        self.assertNotIn("الرياض", compiled["sql"])
+        self.assertEqual(compiled["params"], ["الرياض", "جدة", 50000, "2025-01-01", "2025-06-30"])
+
+    def test_pagination_and_sorting(self):
+        """اختبار الترقيم والترتيب داخل قاعدة البيانات"""
+        expected = self._expected()
+        first = self.engine.run(self.plan, page=1, page_size=10)
+        second = self.engine.run(self.plan, page=2, page_size=10)
+        self.assertEqual(first["total"], len(expected))
+        self.assertEqual(first["rows"] + second["rows"], expected[:20])
+
+    def test_cache_invalidated_by_writes_from_other_connections(self):
+        """اختبار إبطال النتائج المخزنة عند تغير البيانات"""
+        self.engine.run(self.plan)
+        self.assertTrue(self.engine.run(self.plan)["cached"])
+
+        self.db.execute_query("UPDATE pricing_items SET total_price = 0")
+        result = self.engine.run(self.plan)
+        self.assertFalse(result["cached"])
+        self.assertEqual(result["total"], 0)
+
+    def test_saved_report_and_streaming_export(self):
+        """اختبار حفظ الخطة المترجمة وتصدير النتائج إلى Excel"""
+        report_id = self.engine.save("تقرير الرياض وجدة", self.plan)
+        name, plan, compiled = self.engine.load_saved(report_id)
+        self.assertEqual(compiled["sql"], self.plan.compile()["sql"])
+
+        path = os.path.join(self.temp_dir.name, "report.xlsx")
+        count = self.engine.export_excel(plan, path, compiled=compiled)
+        self.assertEqual(count, len(self._expected()))
+
+        rows = list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ("اسم المشروع", "الموقع", "الميزانية"))
+        self.assertEqual(rows[1:], self._expected())
+
+
+class TestReportScheduler(unittest.TestCase):
+    """اختبارات مجدول التقارير"""
+
+    def setUp(self):
+        """إنشاء محرك تقارير ومجدول بساعة قابلة للتحكم"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseConnector(_Config(os.path.join(self.temp_dir.name, "database.db")))
+        self.aggregates = ReportAggregates(self.db.db_path)
+        self.engine = ReportEngine(self.db.db_path)
+        self.report_id = self.engine.save("ملخص المحفظة", ReportPlan(["اسم المشروع", "حالة المشروع", "الميزانية"]))
+
+        self.now = datetime.datetime(2025, 3, 5, 9, 30)  # الأربعاء
+        self.output_dir = os.path.join(self.temp_dir.name, "reports")
+        self.scheduler = ReportScheduler(self.engine, self.output_dir, retention_days=30, keep_per_job=2, clock=lambda: self.now)
+
+    def tearDown(self):
+        """إغلاق الاتصالات وحذف الملفات"""
+        self.scheduler.close()
+        self.engine.close()
+        self.aggregates.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_cron_next_after(self):
+        """اختبار حساب الموعد التالي لتعبيرات cron"""
+        weekly = CronSchedule("@weekly")
+        self.assertEqual(weekly.next_after(self.now), datetime.datetime(2025, 3, 9, 7, 0))
+        self.assertEqual(weekly.next_after(datetime.datetime(2025, 3, 9, 7, 0)), datetime.datetime(2025, 3, 16, 7, 0))
+
+        working_hours = CronSchedule("*/15 8-17 * * 1-5")
+        self.assertEqual(working_hours.next_after(self.now), datetime.datetime(2025, 3, 5, 9, 45))
+        self.assertEqual(working_hours.next_after(datetime.datetime(2025, 3, 7, 17, 50)), datetime.datetime(2025, 3, 10, 8, 0))
+
+        self.assertEqual(CronSchedule("0 0 1 1 *").next_after(self.now), datetime.datetime(2026, 1, 1, 0, 0))
+        with self.assertRaises(ValueError):
+            CronSchedule("0 25 * * *")
+
+    def test_due_jobs_generate_artifacts(self):
+        """اختبار توليد ملفات PDF و Excel عند حلول موعد المهام"""
+        self.scheduler.add_job("أسبوعي PDF", self.report_id, "@weekly", "pdf")
+        self.scheduler.add_job("أسبوعي Excel", self.report_id, "@weekly", "excel")
+        self.assertEqual(self.scheduler.enqueue_due(), [])
+
+        self.now = datetime.datetime(2025, 3, 9, 7, 0)
+        self.assertEqual(len(self.scheduler.enqueue_due()), 2)
+        self.assertEqual(self.scheduler.enqueue_due(), [])
+        self.scheduler.run_pending()
+
+        artifacts = self.scheduler.artifacts()
+        self.assertEqual(sorted(os.path.splitext(a["artifact_path"])[1] for a in artifacts), [".pdf", ".xlsx"])
+        self.assertTrue(all(a["row_count"] == 3 for a in artifacts))
+        self.assertEqual(sorted(os.listdir(self.output_dir)), sorted(os.path.basename(a["artifact_path"]) for a in artifacts))
+        self.assertTrue(all(job["next_run_at"] == "2025-03-16 07:00:00" for job in self.scheduler.jobs()))
+
+    def test_failed_run_is_recorded(self):
+        """اختبار تسجيل فشل التوليد دون ترك ملفات ناقصة"""
+        job_id = self.scheduler.add_job("تقرير محذوف", self.report_id + 100, "@daily")
+        self.scheduler.request_run(job_id)
+        self.scheduler.run_pending()
+
+        run = self.scheduler.runs(job_id)[0]
+        self.assertEqual(run["status"], "failed")
+        self.assertTrue(run["error"])
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_retention_by_age_and_count(self):
+        """اختبار حذف الملفات القديمة والزائدة عن الحد لكل مهمة"""
+        job_id = self.scheduler.add_job("يومي", self.report_id, "@daily", "excel")
+        for day in range(4):
+            self.now = datetime.datetime(2025, 3, 1 + day, 8, 0)
+            self.scheduler.request_run(job_id)
+            self.scheduler.run_pending()
+
+        self.assertEqual(self.scheduler.purge(), 2)
+        self.assertEqual([a["finished_at"][:10] for a in self.scheduler.artifacts()], ["2025-03-04", "2025-03-03"])
+
+        self.now = datetime.datetime(2025, 4, 2, 12, 0)
+        self.assertEqual(self.scheduler.purge(), 1)
+        self.assertEqual(len(os.listdir(self.output_dir)), 1)
+
+    def test_worker_pool_processes_requests_in_background(self):
+        """اختبار تنفيذ طلبات التشغيل في الخلفية"""
+        self.scheduler.clock = datetime.datetime.now
+        job_id = self.scheduler.add_job("فوري", self.report_id, "@monthly", "excel")
+        self.scheduler.start()
+        self.scheduler.request_run(job_id)
+
+        deadline = datetime.datetime.now() + datetime.timedelta(seconds=10)
+        while not self.scheduler.artifacts() and datetime.datetime.now() < deadline:
+            threading.Event().wait(0.05)
+
+        self.assertEqual(len(self.scheduler.artifacts()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
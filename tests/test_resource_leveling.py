@@ -0,0 +1,180 @@
+"""
+اختبارات تسوية الموارد
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.resources.services.resource_leveling import ResourceLeveler, allocations_frame, schedule_tasks, schedule_task_links
+
+
+def _random_tasks(rng, count, resources=40, sites=20, days=365):
+    """تخصيصات عشوائية لموارد مشتركة بين المواقع"""
+    start = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, days, count), unit="D")
+    return pd.DataFrame({
+        "id": [f"ALLOC-{i}" for i in range(count)],
+        "project": rng.integers(0, sites, count),
+        "resource": [f"R{r}" for r in rng.integers(0, resources, count)],
+        "start": start,
+        "finish": start + pd.to_timedelta(rng.integers(0, 60, count), unit="D"),
+        "quantity": rng.integers(1, 6, count).astype(float),
+    })
+
+
+def _brute_usage(leveler, shifts):
+    """الاستخدام اليومي بحلقة مباشرة للمقارنة"""
+    usage = {}
+    for row in range(len(leveler.tasks)):
+        begin = leveler.start[row] + shifts[leveler.activity_codes[row]]
+        for day in range(begin, begin + leveler.duration[row]):
+            key = (leveler.resource_codes[row], day)
+            usage[key] = usage.get(key, 0) + leveler.quantity[row]
+    return usage
+
+
+class TestResourceLeveler(unittest.TestCase):
+    """اختبارات محرك تسوية الموارد"""
+
+    def test_histogram_and_conflicts(self):
+        """اختبار مدرج الاستخدام بمصفوفات الفروق وكشف فترات التجاوز"""
+        tasks = pd.DataFrame({
+            "id": ["a", "b", "c", "d"],
+            "resource": ["حفار", "حفار", "حفار", "رافعة"],
+            "start": pd.to_datetime(["2025-01-01", "2025-01-03", "2025-01-04", "2025-01-02"]),
+            "finish": pd.to_datetime(["2025-01-05", "2025-01-04", "2025-01-06", "2025-01-02"]),
+            "quantity": [1, 1, 1, 2],
+        })
+        leveler = ResourceLeveler(tasks, {"حفار": 2, "رافعة": 1})
+
+        usage = leveler.usage()
+        self.assertEqual(usage[0].tolist(), [1, 1, 2, 3, 2, 1])
+        self.assertEqual(usage[1].tolist(), [0, 2, 0, 0, 0, 0])
+
+        conflicts = leveler.conflicts()
+        self.assertEqual(conflicts["resource"].tolist(), ["حفار", "رافعة"])
+        self.assertEqual(conflicts["start"].tolist(), [pd.Timestamp("2025-01-04"), pd.Timestamp("2025-01-02")])
+        self.assertEqual(conflicts["days"].tolist(), [1, 1])
+        self.assertEqual(conflicts["excess"].tolist(), [1, 1])
+
+    def test_leveling_removes_conflicts(self):
+        """اختبار أن التسوية تزيل كل التعارضات القابلة للحل وتطابق الاستخدام المحسوب مباشرة"""
+        rng = np.random.default_rng(5)
+        tasks = _random_tasks(rng, 600, resources=15)
+        tasks.loc[0, "quantity"] = 50  # أكبر من سعة المورد
+        leveler = ResourceLeveler(tasks, default_capacity=8)
+        self.assertGreater(len(leveler.conflicts()), 0)
+
+        result = leveler.level()
+        self.assertEqual(result["unresolved"]["id"].tolist(), ["ALLOC-0"])
+        self.assertTrue((result["shifts"] >= 0).all())
+        self.assertGreater(result["delayed"], 0)
+
+        # لا يبقى تجاوز إلا في أيام التخصيص الذي يفوق السعة وحده
+        brute = _brute_usage(leveler, result["shifts"])
+        row = leveler.resource_codes[0]
+        days = set(range(leveler.start[0], leveler.start[0] + leveler.duration[0]))
+        for (resource, day), used in brute.items():
+            if used > 8:
+                self.assertTrue(resource == row and day in days)
+        usage = leveler.usage(result["shifts"])
+        for (resource, day), used in brute.items():
+            self.assertAlmostEqual(usage[resource, day], used)
+
+    def test_activities_move_together_and_respect_links(self):
+        """اختبار إزاحة موارد النشاط الواحد معاً وعدم تقدم اللاحق على تأخير سابقه"""
+        tasks = pd.DataFrame({
+            "id": ["a1", "a2", "b1", "c1"],
+            "activity": ["A", "A", "B", "C"],
+            "resource": ["فريق خرسانة", "رافعة", "رافعة", "فريق خرسانة"],
+            "start": pd.to_datetime(["2025-01-01", "2025-01-01", "2025-01-01", "2025-01-06"]),
+            "finish": pd.to_datetime(["2025-01-03", "2025-01-03", "2025-01-05", "2025-01-06"]),
+            "quantity": [1, 1, 1, 1],
+            "priority": [2, 2, 1, 3],
+        })
+        result = ResourceLeveler(tasks, default_capacity=1, links=[("A", "C")]).level()
+        delays = result["schedule"].set_index("id")["delay"]
+
+        self.assertEqual(delays["b1"], 0)
+        self.assertEqual(delays["a1"], 5)
+        self.assertEqual(delays["a2"], 5)
+        self.assertEqual(delays["c1"], 5)
+        self.assertTrue(result["conflicts_after"].empty)
+
+    def test_sibling_tasks_on_same_resource_are_summed(self):
+        """اختبار جمع طلب مهام النشاط الواحد على المورد نفسه قبل اختبار السعة"""
+        tasks = pd.DataFrame({
+            "id": ["y", "x1", "x2"],
+            "activity": ["Y", "X", "X"],
+            "resource": ["a", "a", "a"],
+            "start": pd.to_datetime(["2025-01-01", "2025-01-01", "2025-01-02"]),
+            "finish": pd.to_datetime(["2025-01-03", "2025-01-02", "2025-01-03"]),
+            "quantity": [1, 1, 1],
+            "priority": [0, 1, 1],
+        })
+        result = ResourceLeveler(tasks, {"a": 2}).level()
+
+        self.assertEqual(result["shifts"].tolist(), [0, 2])
+        self.assertTrue(result["conflicts_after"].empty)
+
+    def test_portfolio_scale_and_inputs(self):
+        """اختبار تسوية محفظة من 20 موقعاً و5000 تخصيص وتحويل مصادر البيانات"""
+        rng = np.random.default_rng(11)
+        tasks = _random_tasks(rng, 5000)
+        start = time.perf_counter()
+        leveler = ResourceLeveler(tasks, default_capacity=20)
+        result = leveler.level()
+        self.assertLess(time.perf_counter() - start, 10.0)
+        self.assertTrue(result["conflicts_after"].empty)
+
+        allocations = pd.DataFrame({
+            "رقم التخصيص": ["ALLOC-001", "ALLOC-002"], "رقم المشروع": ["PRJ-001", "PRJ-002"],
+            "نوع المورد": ["معدة", "مادة"], "رقم المورد": ["EQP-001", "MAT-001"],
+            "تاريخ البدء": ["2025-01-01", "2025-01-01"], "تاريخ الانتهاء": ["2025-01-10", "2025-01-10"],
+            "الكمية": [2, 5], "التكلفة": [1000, 2000],
+        })
+        self.assertEqual(allocations_frame(allocations)["resource"].tolist(), ["EQP-001"])
+
+        items = [{"ID": 1, "Start": "2025-01-01", "Finish": "2025-01-04", "Resource": "نجار، حداد"},
+                 {"ID": 2, "Start": "2025-01-04", "Finish": "2025-01-05", "Resource": ""}]
+        scheduled = schedule_tasks("برج", items)
+        self.assertEqual(scheduled["resource"].tolist(), ["نجار", "حداد"])
+        self.assertEqual(scheduled["activity"].unique().tolist(), ["برج:1"])
+        self.assertEqual(ResourceLeveler(scheduled).duration.tolist(), [3, 3])
+
+    def test_zero_duration_schedule_item(self):
+        """اختبار أن بند الجدول بلا مدة يشغل مورده يوم بدايته ولا يوقف التسوية"""
+        items = [{"ID": 1, "Start": "2025-01-01", "Finish": "2025-01-03", "Resource": "نجار"},
+                 {"ID": 2, "Start": "2025-01-02", "Finish": "2025-01-02", "Resource": "نجار"}]
+        tasks = schedule_tasks("برج", items)
+        self.assertEqual(tasks["finish"].tolist(), [pd.Timestamp("2025-01-02"), pd.Timestamp("2025-01-02")])
+
+        result = ResourceLeveler(tasks, default_capacity=1).level()
+        self.assertTrue(result["conflicts_after"].empty)
+        self.assertEqual(result["delayed"], 1)
+
+    def test_schedule_links_bridge_unstaffed_activities(self):
+        """اختبار بناء علاقات مهام الموارد من الاعتماديات عبر الأنشطة التي لا تحتاج موارد"""
+        items = [{"ID": 1, "Start": "2025-01-01", "Finish": "2025-01-04", "Resource": "نجار", "Dependencies": ""},
+                 {"ID": 2, "Start": "2025-01-04", "Finish": "2025-01-05", "Resource": "", "Dependencies": "1"},
+                 {"ID": 3, "Start": "2025-01-05", "Finish": "2025-01-07", "Resource": "نجار", "Dependencies": "2FS+1"},
+                 {"ID": 4, "Start": "2025-01-01", "Finish": "2025-01-02", "Resource": "نجار", "Dependencies": ""}]
+        links = schedule_task_links("برج", items)
+        self.assertEqual(links, [("برج:1", "برج:3")])
+
+        items[3]["Start"], items[3]["Finish"] = "2025-01-05", "2025-01-06"
+        result = ResourceLeveler(schedule_tasks("برج", items), default_capacity=1, links=links).level()
+        self.assertTrue(result["conflicts_after"].empty)
+        self.assertGreaterEqual(result["schedule"].set_index("id")["delay"]["برج:3:نجار"],
+                                result["schedule"].set_index("id")["delay"]["برج:1:نجار"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+اختبارات استيراد ملفات Primavera P6 وMicrosoft Project
+"""
+
+import io
+import os
+import sys
+import tracemalloc
+import unittest
+
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.scheduling.services.cpm import CPMSchedule, schedule_links
+from modules.scheduling.services.schedule_import import read_mspdi, read_xer, to_schedule_items
+
+
+def _xer(tasks, links, extra_rows=0):
+    """ملف XER مبسط مع جدول إضافي غير مطلوب بعدد الصفوف المحدد"""
+    lines = ["ERMHDR\t19.12\t2024-01-01\tProject\tadmin\tAdmin\tdbxDatabaseNoName\tProject Management\tSAR"]
+    lines += ["%T\tCALENDAR", "%F\tclndr_id\tdefault_flag\tclndr_name\tday_hr_cnt",
+              "%R\t10\tY\tتقويم 8 ساعات\t8", "%R\t11\tN\tتقويم 10 ساعات\t10"]
+    if extra_rows:
+        lines += ["%T\tUDFVALUE", "%F\tudf_type_id\tfk_id\tproj_id\tudf_text"]
+        lines += [f"%R\t1\t{i}\t1\t{'x' * 80}" for i in range(extra_rows)]
+    lines += ["%T\tTASK", "%F\ttask_id\tproj_id\twbs_id\tclndr_id\ttask_type\ttask_code\ttask_name"
+              "\tphys_complete_pct\ttarget_drtn_hr_cnt\ttarget_start_date\ttarget_end_date"]
+    lines += [f"%R\t{task_id}\t1\t1\t{calendar}\t{task_type}\tA{task_id}\t{name}\t{progress}\t{hours}"
+              f"\t2024-01-01 08:00\t2024-01-05 17:00" for task_id, calendar, task_type, name, progress, hours in tasks]
+    lines += ["%T\tTASKPRED", "%F\ttask_pred_id\ttask_id\tpred_task_id\tproj_id\tpred_proj_id\tpred_type\tlag_hr_cnt"]
+    lines += [f"%R\t{i}\t{successor}\t{predecessor}\t1\t1\tPR_{link_type}\t{lag}"
+              for i, (predecessor, successor, link_type, lag) in enumerate(links)]
+    lines += ["%T\tRSRC", "%F\trsrc_id\trsrc_name\trsrc_type", "%R\t7\tعمالة خرسانة\tRT_Labor"]
+    lines += ["%T\tTASKRSRC", "%F\ttaskrsrc_id\ttask_id\tproj_id\trsrc_id\ttarget_qty", "%R\t1\t101\t1\t7\t80"]
+    lines.append("%E")
+    return io.BytesIO("\r\n".join(lines).encode("utf-8"))
+
+
+MSPDI = """<?xml version="1.0" encoding="UTF-8"?>
+<Project xmlns="http://schemas.microsoft.com/project">
+  <Name>مشروع</Name>
+  <MinutesPerDay>480</MinutesPerDay>
+  <Calendars><Calendar><UID>1</UID><Name>Standard</Name></Calendar></Calendars>
+  <Tasks>
+    <Task><UID>0</UID><ID>0</ID><Name>مشروع</Name><Summary>1</Summary><Duration>PT80H0M0S</Duration></Task>
+    <Task><UID>1</UID><ID>1</ID><Name>حفر</Name><WBS>1.1</WBS><Duration>PT40H0M0S</Duration>
+      <Start>2024-01-01T08:00:00</Start><Finish>2024-01-05T17:00:00</Finish><PercentComplete>50</PercentComplete></Task>
+    <Task><UID>2</UID><ID>2</ID><Name>خرسانة</Name><Duration>PT24H0M0S</Duration>
+      <Start>2024-01-08T08:00:00</Start><Finish>2024-01-10T17:00:00</Finish>
+      <PredecessorLink><PredecessorUID>1</PredecessorUID><Type>1</Type><LinkLag>9600</LinkLag></PredecessorLink></Task>
+    <Task><UID>3</UID><ID>3</ID><Name>تشطيب</Name><Duration>PT16H0M0S</Duration>
+      <PredecessorLink><PredecessorUID>2</PredecessorUID><Type>3</Type><LinkLag>0</LinkLag></PredecessorLink>
+      <PredecessorLink><PredecessorUID>1</PredecessorUID><Type>0</Type><LinkLag>-4800</LinkLag></PredecessorLink></Task>
+  </Tasks>
+  <Resources><Resource><UID>5</UID><Name>حفار</Name></Resource></Resources>
+  <Assignments>
+    <Assignment><TaskUID>1</TaskUID><ResourceUID>5</ResourceUID><Units>1</Units></Assignment>
+    <Assignment><TaskUID>3</TaskUID><ResourceUID>-65535</ResourceUID><Units>1</Units></Assignment>
+  </Assignments>
+</Project>
+"""
+
+
+class TestScheduleImport(unittest.TestCase):
+    """اختبارات استيراد ملفات الجداول الزمنية"""
+
+    def test_xer_tables_and_schedule_items(self):
+        """اختبار قراءة جداول XER وتحويل المدد بالتقويم وتشغيل المسار الحرج على النتيجة"""
+        tasks = [(100, 10, "TT_WBS", "ملخص", 0, 0), (101, 10, "TT_Task", "حفر", 50, 40),
+                 (102, 11, "TT_Task", "خرسانة", 0, 30), (103, 10, "TT_Task", "تشطيب", 0, 16)]
+        links = [(101, 102, "FS", 20), (102, 103, "SS", 8), (100, 103, "FS", 0)]
+        schedule = read_xer(_xer(tasks, links))
+
+        activities = schedule["activities"].set_index("id")
+        self.assertEqual(activities.loc["102", "duration_days"], 3.0)
+        self.assertEqual(activities.loc["101", "progress"], 50)
+        self.assertTrue(activities.loc["100", "summary"])
+        self.assertEqual(schedule["relationships"]["type"].tolist(), ["FS", "SS", "FS"])
+        self.assertEqual(schedule["relationships"]["lag_days"].tolist()[:2], [2.0, 1.0])
+        self.assertEqual(schedule["calendars"]["hours_per_day"].tolist(), [8.0, 10.0])
+        self.assertEqual(schedule["assignments"]["resource"].tolist(), ["عمالة خرسانة"])
+
+        items = pd.DataFrame(to_schedule_items(schedule))
+        self.assertEqual(items["Task"].tolist(), ["حفر", "خرسانة", "تشطيب"])
+        self.assertEqual(items["Dependencies"].tolist(), ["", "1+2", "2SS+1"])
+        self.assertEqual(items["Resource"].tolist(), ["عمالة خرسانة", "", ""])
+
+        cpm = CPMSchedule(items["ID"], items["Duration"], schedule_links(items))
+        self.assertEqual(cpm.early_start.tolist(), [0, 7, 8])
+        self.assertEqual(cpm.project_duration, 10)
+
+    def test_schedule_without_relationships(self):
+        """اختبار تحويل جدول بلا علاقات بين الأنشطة"""
+        tasks = [(101, 10, "TT_Task", "حفر", 0, 16), (102, 10, "TT_Task", "خرسانة", 0, 8)]
+        schedule = read_xer(_xer(tasks, []))
+        self.assertTrue(schedule["relationships"].empty)
+
+        items = pd.DataFrame(to_schedule_items(schedule))
+        self.assertEqual(items["Task"].tolist(), ["حفر", "خرسانة"])
+        self.assertEqual(items["Dependencies"].tolist(), ["", ""])
+
+    def test_mspdi_tables_and_schedule_items(self):
+        """اختبار قراءة MSPDI وتحويل أنواع العلاقات وفترات التأخير بأعشار الدقائق"""
+        schedule = read_mspdi(io.BytesIO(MSPDI.encode("utf-8")))
+
+        activities = schedule["activities"]
+        self.assertEqual(activities["name"].tolist(), ["حفر", "خرسانة", "تشطيب"])
+        self.assertEqual(activities["wbs"].tolist(), ["1.1", None, None])
+        self.assertEqual(activities["duration_days"].tolist(), [5.0, 3.0, 2.0])
+        self.assertEqual(activities["start"].iloc[0], pd.Timestamp("2024-01-01 08:00"))
+        self.assertEqual(schedule["relationships"]["type"].astype(str).tolist(), ["FS", "SS", "FF"])
+        self.assertEqual(schedule["relationships"]["lag_days"].tolist(), [2.0, 0.0, -1.0])
+        self.assertEqual(schedule["calendars"]["name"].tolist(), ["Standard"])
+        self.assertEqual(schedule["assignments"]["resource"].tolist(), ["حفار"])
+
+        items = pd.DataFrame(to_schedule_items(schedule))
+        self.assertEqual(items["Dependencies"].tolist(), ["", "1+2", "2SS, 1FF-1"])
+        self.assertEqual(CPMSchedule(items["ID"], items["Duration"], schedule_links(items)).project_duration, 10)
+
+    def test_xer_wbs_paths(self):
+        """اختبار بناء مسار WBS لكل نشاط من جدول PROJWBS دون عقدة المشروع"""
+        lines = ["%T\tPROJWBS", "%F\twbs_id\tproj_node_flag\twbs_short_name\tparent_wbs_id",
+                 "%R\t1\tY\tPRJ\t", "%R\t2\tN\tCIV\t1", "%R\t3\tN\tFND\t2", "%R\t4\tN\tMEP\t1",
+                 "%T\tTASK", "%F\ttask_id\twbs_id\ttask_name\ttarget_drtn_hr_cnt",
+                 "%R\t10\t3\tحفر\t8", "%R\t11\t4\tتمديدات\t8", "%R\t12\t\tبدون\t8", "%E"]
+        schedule = read_xer(io.BytesIO("\n".join(lines).encode("utf-8")))
+        self.assertEqual(schedule["activities"]["wbs"].fillna("").tolist(), ["CIV.FND", "MEP", ""])
+        self.assertEqual([item["WBS"] for item in to_schedule_items(schedule)], ["CIV.FND", "MEP", ""])
+
+    def test_memory_bounded_by_extracted_data(self):
+        """اختبار أن الذاكرة لا تزيد بحجم الجداول غير المطلوبة في الملف"""
+        tasks = [(i, 10, "TT_Task", f"نشاط {i}", 0, 8) for i in range(1, 2001)]
+        links = [(i, i + 1, "FS", 0) for i in range(1, 2000)]
+
+        peaks = []
+        for extra_rows in (0, 250000):
+            source = _xer(tasks, links, extra_rows)
+            tracemalloc.start()
+            schedule = read_xer(source)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(len(schedule["activities"]), 2000)
+            self.assertEqual(len(schedule["relationships"]), 1999)
+
+        self.assertGreater(source.getbuffer().nbytes, 20 * 1024 * 1024)
+        self.assertLess(peaks[1], peaks[0] * 1.5 + 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+اختبارات الفهرس المكاني لمواقع المشاريع
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.maps.services.spatial_index import ProjectSpatialIndex
+
+
+def _sites(count, seed=4):
+    """مواقع مشاريع عشوائية داخل حدود المملكة تقريباً"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": [f"P{i:05d}" for i in range(count)],
+        "lat": rng.uniform(16.5, 32.0, count),
+        "lon": rng.uniform(35.0, 55.5, count),
+        "status": rng.choice(["جاري التنفيذ", "قيد الدراسة", "مكتمل"], count),
+        "location": rng.choice(["الرياض", "جدة", "الدمام", "أبها"], count),
+        "budget": rng.uniform(1e6, 5e7, count),
+    })
+
+
+class TestProjectSpatialIndex(unittest.TestCase):
+    """اختبارات الفهرس المكاني"""
+
+    def test_bbox_query_matches_linear_scan(self):
+        """اختبار تطابق الاستعلام بالمستطيل مع الفحص الخطي ومع الفلاتر"""
+        sites = _sites(20000)
+        index = ProjectSpatialIndex(sites)
+        mask = index.filter(statuses=["مكتمل"], budget_range=(5e6, 3e7))
+        expected_mask = (sites["status"] == "مكتمل") & sites["budget"].between(5e6, 3e7)
+        np.testing.assert_array_equal(mask, expected_mask.to_numpy())
+
+        rng = np.random.default_rng(8)
+        for _ in range(50):
+            south, north = np.sort(rng.uniform(15, 33, 2))
+            west, east = np.sort(rng.uniform(34, 57, 2))
+            inside = (sites["lat"].between(south, north) & sites["lon"].between(west, east)).to_numpy()
+            np.testing.assert_array_equal(index.query_bbox(south, west, north, east), np.flatnonzero(inside))
+            np.testing.assert_array_equal(index.query_bbox(south, west, north, east, mask),
+                                          np.flatnonzero(inside & mask))
+
+        self.assertEqual(len(index.query_bbox(-10, -10, -5, -5)), 0)
+
+    def test_antimeridian_and_coordinates_input(self):
+        """اختبار الاستعلام عبر خط الطول 180 وقبول الإحداثيات بصيغة coordinates"""
+        projects = [
+            {"id": "A", "coordinates": [10.0, 179.5], "status": "مكتمل", "location": "أ", "budget": 1},
+            {"id": "B", "coordinates": [10.0, -179.5], "status": "مكتمل", "location": "ب", "budget": 1},
+            {"id": "C", "coordinates": [10.0, 0.0], "status": "مكتمل", "location": "ج", "budget": 1},
+        ]
+        index = ProjectSpatialIndex(projects)
+        self.assertEqual(index.query_bbox(5, 179, 15, -179).tolist(), [0, 1])
+
+    def test_clusters_depend_on_zoom(self):
+        """اختبار أن التجميع يحفظ العدد والميزانية ويفصل المشاريع عند التكبير"""
+        sites = _sites(5000)
+        index = ProjectSpatialIndex(sites)
+        visible = np.arange(len(sites))
+
+        start = time.perf_counter()
+        clusters = index.clusters(visible, zoom=5)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertLess(len(clusters), 200)
+        self.assertEqual(clusters["count"].sum(), 5000)
+        self.assertAlmostEqual(clusters["budget"].sum(), sites["budget"].sum(), delta=1.0)
+
+        pair = ProjectSpatialIndex(pd.DataFrame({
+            "lat": [24.70, 24.71], "lon": [46.67, 46.68], "status": ["مكتمل", "مكتمل"], "budget": [1, 2]
+        }))
+        merged = pair.clusters([0, 1], zoom=6)
+        self.assertEqual(merged["count"].tolist(), [2])
+        self.assertEqual(merged["project"].tolist(), [-1])
+        separate = pair.clusters([0, 1], zoom=16)
+        self.assertEqual(sorted(separate["project"].tolist()), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+اختبارات أدوات بناء تعابير SQL
+"""
+
+import os
+import sys
+import sqlite3
+import unittest
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.sql import sql_literal, sql_in
+
+
+class TestSQLHelpers(unittest.TestCase):
+    """اختبارات القيم المهربة والمعاملات المسماة"""
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE t (status TEXT)")
+        self.connection.executemany("INSERT INTO t VALUES (?)", [("فائز",), ("it's won",), ("خاسر",)])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_literal_escapes_quotes(self):
+        """اختبار تهريب علامة ' بمضاعفتها وليس بصيغة repr"""
+        self.assertEqual(sql_literal("it's won"), "'it''s won'")
+        self.assertEqual(sql_literal(None), "NULL")
+        self.assertEqual(sql_literal(True), "1")
+        text = 'قال "نعم" و' + "'"
+        value = self.connection.execute(f"SELECT {sql_literal(text)}").fetchone()[0]
+        self.assertEqual(value, text)
+
+    def test_in_with_literals_and_params(self):
+        """اختبار تطابق نتيجة القيم المدرجة والمعاملات المسماة"""
+        values = ("فائز", "it's won")
+        inline = self.connection.execute(f"SELECT SUM({sql_in('status', values)}) FROM t").fetchone()[0]
+
+        params = {}
+        expression = sql_in("status", values, params, "won")
+        self.assertEqual(expression, "(status IN (:won_0, :won_1))")
+        bound = self.connection.execute(f"SELECT SUM({expression}) FROM t", params).fetchone()[0]
+        self.assertEqual(inline, 2)
+        self.assertEqual(bound, 2)
+
+        with self.assertRaises(ValueError):
+            sql_in("status", ("خاسر",), params, "won")
+
+
+if __name__ == "__main__":
+    unittest.main()
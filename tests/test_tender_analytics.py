@@ -0,0 +1,286 @@
+"""
+اختبارات مخزن المناقصات التاريخية ومكعب التحليلات ونموذج احتمال الفوز ومحسن العروض
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.ai_assistant.services.tender_history import TenderHistoryStore, sample_tender_history
+from modules.ai_assistant.services.tender_cube import TenderCube
+from modules.ai_assistant.services.win_model import WinProbabilityModel, ensure_win_model, load_win_model
+from modules.ai_assistant.services.bid_optimizer import BidOptimizer
+from modules.ai_assistant.data_integration import DataAIIntegration
+
+
+class TestWinProbabilityModel(unittest.TestCase):
+    """اختبارات نموذج احتمال الفوز"""
+
+    def setUp(self):
+        """تهيئة مخزن بسجل نموذجي"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = TenderHistoryStore(":memory:")
+        self.store.add_many(sample_tender_history())
+        self.model_path = os.path.join(self.temp_dir.name, "win_model.npz")
+        self.tender = {
+            "estimated_budget": 20_000_000,
+            "project_type": "مدرسة",
+            "location": "جدة",
+            "competitors_count": 5,
+            "duration_months": 18
+        }
+
+    def tearDown(self):
+        """إغلاق المخزن وحذف الملفات"""
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_store_query_filters_and_upserts(self):
+        """اختبار الاستعلام المفلتر وتحديث المناقصة بنفس الرقم"""
+        riyadh = self.store.query(location="الرياض")
+        self.assertTrue((riyadh["الموقع"] == "الرياض").all())
+
+        tender = dict(sample_tender_history()[0], status="خاسر")
+        self.store.add_many([tender])
+        self.assertEqual(self.store.count(), 400)
+        history = self.store.query().set_index("رقم المناقصة")
+        self.assertFalse(history.loc[tender["tender_number"], "فائز"])
+
+    def test_sample_rows_are_excluded_by_default(self):
+        """اختبار استبعاد المناقصات النموذجية من الاستعلام والبصمة إلا عند طلبها"""
+        store = TenderHistoryStore(":memory:")
+        try:
+            store.add_many(sample_tender_history(20), is_sample=True)
+            self.assertFalse(store.has_real_data())
+            self.assertTrue(store.query().empty)
+            self.assertEqual(len(store.query(include_samples=True)), 20)
+
+            cube = TenderCube(store)
+            self.assertEqual(cube.totals()["tenders"], 0)
+            self.assertEqual(cube.totals(include_samples=True)["tenders"], 20)
+
+            store.add_many([dict(sample_tender_history(1, seed=3)[0], tender_number="T-2025-9999")])
+            self.assertTrue(store.has_real_data())
+            self.assertEqual(store.query()["رقم المناقصة"].tolist(), ["T-2025-9999"])
+            self.assertEqual(cube.totals()["tenders"], 1)
+        finally:
+            store.close()
+
+    def test_fitted_model_learns_price_effect(self):
+        """اختبار أن احتمال الفوز يتناقص مع ارتفاع السعر ويعيد نتائج منطقية"""
+        model = WinProbabilityModel().fit(self.store.query(decided_only=True))
+        self.assertGreater(model.metadata["accuracy"], 0.65)
+
+        probabilities = model.score_bids(self.tender, np.linspace(15e6, 25e6, 10_000))
+        self.assertEqual(probabilities.shape, (10_000,))
+        self.assertTrue(np.all(np.diff(probabilities) < 0))
+
+        more_competitors = model.score_bids(dict(self.tender, competitors_count=10), [19e6])[0]
+        self.assertLess(more_competitors, model.score_bids(self.tender, [19e6])[0])
+
+    def test_vectorized_scoring_matches_row_prediction(self):
+        """اختبار تطابق التقييم المصفوفي مع التنبؤ لكل مناقصة على حدة"""
+        model = WinProbabilityModel().fit(self.store.query(decided_only=True))
+        prices = np.array([16e6, 19e6, 23e6])
+        rows = {key: np.repeat(value, 3) for key, value in self.tender.items()}
+        rows["bid_price"] = prices
+        np.testing.assert_allclose(model.score_bids(self.tender, prices), model.predict_proba(rows))
+
+        low, probability, high = model.probability_interval(dict(self.tender, bid_price=19e6))
+        self.assertLess(low, probability)
+        self.assertLess(probability, high)
+
+    def test_saved_model_is_cached_until_history_changes(self):
+        """اختبار تحميل النموذج المحفوظ مرة واحدة وإعادة تدريبه عند تغير البيانات"""
+        model = ensure_win_model(self.store, self.model_path)
+        self.assertIs(ensure_win_model(self.store, self.model_path), model)
+        self.assertIs(load_win_model(self.model_path), model)
+
+        self.store.add_many([dict(sample_tender_history(1, seed=7)[0], tender_number="T-2025-9999")])
+        retrained = ensure_win_model(self.store, self.model_path)
+        self.assertIsNot(retrained, model)
+        self.assertEqual(retrained.metadata["n_samples"], 401)
+
+
+class TestTenderCube(unittest.TestCase):
+    """اختبارات مكعب تحليلات المناقصات"""
+
+    def setUp(self):
+        """تهيئة مخزن ومكعب قبل إضافة البيانات لاختبار التحديث التزايدي"""
+        self.store = TenderHistoryStore(":memory:")
+        self.cube = TenderCube(self.store)
+        self.store.add_many(sample_tender_history())
+
+    def tearDown(self):
+        """إغلاق المخزن"""
+        self.store.close()
+
+    def _snapshot(self):
+        return [
+            self.cube.query(dimensions)
+            for dimensions in ((), ("project_type",), ("location", "year"), ("project_type", "location", "year"))
+        ]
+
+    def test_incremental_matches_refresh_after_changes(self):
+        """اختبار تطابق التحديث التزايدي مع إعادة البناء بعد الإضافة والتعديل والحذف"""
+        tenders = sample_tender_history()
+        self.store.add_many([dict(tender, status="خاسر") for tender in tenders[:40]])
+        self.store.add_many([dict(tenders[0], tender_number="T-2025-9999", area=None, estimated_cost=None)])
+        with self.store._lock:
+            self.store.connection.execute("DELETE FROM tender_history WHERE id % 9 = 0")
+            self.store.connection.commit()
+
+        incremental = self._snapshot()
+        self.cube.refresh()
+        refreshed = self._snapshot()
+        for before, after in zip(incremental, refreshed):
+            self.assertEqual(len(before), len(after))
+            for row_before, row_after in zip(before, after):
+                self.assertEqual(row_before.keys(), row_after.keys())
+                for key, value in row_before.items():
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(value, row_after[key], delta=1e-9 * max(1.0, abs(value)))
+                    else:
+                        self.assertEqual(value, row_after[key])
+
+    def test_filtered_query_matches_full_scan(self):
+        """اختبار تطابق نتائج المكعب المفلترة مع حسابها من جدول المناقصات كاملاً"""
+        history = self.store.query(location="جدة")
+        history = history[history["تاريخ التقديم"].str[:4].between("2022", "2023")]
+
+        by_type = {row["project_type"]: row for row in self.cube.query(("project_type",), location="جدة", start_year=2022, end_year=2023)}
+        for project_type, group in history.groupby("نوع المشروع"):
+            row = by_type[project_type]
+            self.assertEqual(row["tenders"], len(group))
+            self.assertAlmostEqual(row["win_rate"], group["فائز"].mean() * 100)
+            self.assertAlmostEqual(row["avg_margin"], group["هامش الربح (%)"].mean())
+            self.assertAlmostEqual(row["price_per_sqm"], group["قيمة العرض (ريال)"].sum() / group["المساحة (م2)"].sum())
+
+        with self.assertRaises(ValueError):
+            self.cube.query(("client",))
+
+
+class TestDataAIIntegrationPricing(unittest.TestCase):
+    """اختبارات التنبؤ والتسعير في DataAIIntegration"""
+
+    def setUp(self):
+        """تهيئة التكامل بمسارات مؤقتة"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.integration = DataAIIntegration(
+            os.path.join(self.temp_dir.name, "history.db"),
+            os.path.join(self.temp_dir.name, "win_model.npz")
+        )
+        self.tender = {
+            "الميزانية التقديرية": 20_000_000,
+            "قيمة العرض": 18_500_000,
+            "نوع المشروع": "مدرسة",
+            "الموقع": "جدة",
+            "عدد المنافسين": 4
+        }
+
+    def tearDown(self):
+        """إغلاق المخزن وحذف الملفات"""
+        self.integration.history_store.close()
+        self.temp_dir.cleanup()
+
+    def test_prediction_is_deterministic(self):
+        """اختبار أن التنبؤ ناتج عن النموذج وليس عشوائياً"""
+        first = self.integration.predict_tender_success(self.tender)
+        second = self.integration.predict_tender_success(self.tender)
+        self.assertEqual(first["success_probability"], second["success_probability"])
+        low, high = first["probability_range"]
+        self.assertLessEqual(low, first["success_probability"])
+        self.assertGreaterEqual(high, first["success_probability"])
+
+        cheaper = self.integration.predict_tender_success(dict(self.tender, **{"قيمة العرض": 17_000_000}))
+        self.assertGreater(cheaper["success_probability"], first["success_probability"])
+
+    def test_historical_analysis_reflects_new_outcomes(self):
+        """اختبار انعكاس النتائج الجديدة فوراً على التحليلات واستبعاد السجل النموذجي بعد إدخالها"""
+        before = self.integration.analyze_historical_data(project_type="مدرسة")
+        self.assertTrue(before["sample_data"])
+        self.assertTrue(before["data_notice"])
+
+        outcomes = [
+            dict(tender, tender_number=f"T-2025-9{i:03d}", project_type="مدرسة", status="فائز" if i < 45 else "خاسر")
+            for i, tender in enumerate(sample_tender_history(50, seed=7))
+        ]
+        self.integration.record_tender_outcomes(outcomes)
+        after = self.integration.analyze_historical_data(project_type="مدرسة")
+
+        self.assertFalse(after["sample_data"])
+        self.assertGreater(after["win_rate"]["overall_win_rate"], before["win_rate"]["overall_win_rate"])
+        self.assertAlmostEqual(after["win_rate"]["overall_win_rate"], 90)
+        self.assertEqual([row["type"] for row in after["win_rate"]["win_rate_by_type"]], ["مدرسة"])
+        self.assertEqual(self.integration.win_model.metadata["n_samples"], 50)
+        self.assertEqual(self.integration.history_store.count(include_samples=False), 50)
+
+    def test_optimal_price_follows_competitors(self):
+        """اختبار أن السعر الأمثل يقع ضمن النطاق المقترح ويتأثر ببيانات المنافسين"""
+        result = self.integration.optimize_pricing(self.tender)
+        self.assertLessEqual(result["min_price"], result["optimal_price"])
+        self.assertLessEqual(result["optimal_price"], result["max_price"])
+        self.assertEqual(result, self.integration.optimize_pricing(self.tender))
+
+        aggressive = [
+            {"متوسط هامش الربح (%)": 3, "معدل الفوز (%)": 40, "حصة السوق (%)": 10},
+            {"متوسط هامش الربح (%)": 4, "معدل الفوز (%)": 35, "حصة السوق (%)": 8}
+        ]
+        self.assertLess(
+            self.integration.optimize_pricing(self.tender, aggressive)["optimal_price"],
+            result["optimal_price"]
+        )
+
+
+class TestBidOptimizer(unittest.TestCase):
+    """اختبارات محسن العروض"""
+
+    def setUp(self):
+        """بيانات منافسين ثابتة"""
+        self.competitors = pd.DataFrame({
+            "متوسط هامش الربح (%)": np.linspace(6, 18, 8),
+            "معدل الفوز (%)": np.linspace(15, 50, 8),
+            "حصة السوق (%)": np.linspace(2, 14, 8)
+        })
+
+    def test_grid_matches_brute_force(self):
+        """اختبار تطابق احتمال الفوز بالبحث الثنائي مع المقارنة المباشرة"""
+        optimizer = BidOptimizer(self.competitors, n_simulations=2_000, seed=3)
+        result = optimizer.optimize(1_000_000, grid_size=300, n_competitors=4)
+
+        lowest = optimizer.simulate_lowest_bids(1_000_000, 4)
+        brute_force = (lowest[None, :] > result["prices"][:, None]).mean(axis=1)
+        np.testing.assert_allclose(result["win_probability"], brute_force)
+        self.assertTrue(np.all(np.diff(result["win_probability"]) <= 0))
+
+        best = int(np.argmax(result["expected_profit"]))
+        self.assertEqual(result["optimal_markup"], result["markups"][best])
+        low, high = result["markup_band"]
+        self.assertLessEqual(low, result["optimal_markup"])
+        self.assertGreaterEqual(high, result["optimal_markup"])
+
+    def test_dense_grid_and_competition_effect(self):
+        """اختبار الشبكة الكثيفة وانخفاض الإضافة المثلى مع زيادة المنافسين"""
+        optimizer = BidOptimizer(self.competitors, n_simulations=50_000, seed=1)
+        few = optimizer.optimize(1_000_000, grid_size=10_000, n_competitors=2)
+        many = optimizer.optimize(1_000_000, grid_size=10_000, n_competitors=7)
+
+        self.assertEqual(len(few["prices"]), 10_000)
+        self.assertEqual(few["n_simulations"], 50_000)
+        self.assertLess(many["optimal_markup"], few["optimal_markup"])
+        self.assertLess(many["optimal_win_probability"], 1.0)
+
+    def test_requires_competitors(self):
+        """اختبار رفض المحاكاة دون بيانات منافسين"""
+        with self.assertRaises(ValueError):
+            BidOptimizer(pd.DataFrame())
+
+if __name__ == "__main__":
+    unittest.main()
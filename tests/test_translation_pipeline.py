@@ -0,0 +1,191 @@
+"""
+اختبارات ذاكرة الترجمة ومسار الترجمة
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import docx
+import openpyxl
+
+# إضافة مسار المشروع إلى مسار النظام
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.translation.services.translation_memory import TranslationMemory
+from modules.translation.services.translation_engines import LocalTranslationEngine
+from modules.translation.services.translation_pipeline import TranslationPipeline, Glossary, split_segments
+from modules.translation.services.document_translator import DocumentTranslator
+
+
+class TestTranslationMemory(unittest.TestCase):
+    """اختبارات ذاكرة الترجمة"""
+
+    def setUp(self):
+        """إعداد ذاكرة ترجمة مؤقتة"""
+        self.memory = TranslationMemory(":memory:")
+        self.memory.add("يجب تقديم العرض قبل تاريخ الإقفال.", "The offer must be submitted before the closing date.", "ar", "en")
+
+    def tearDown(self):
+        """إغلاق الذاكرة"""
+        self.memory.close()
+
+    def test_exact_match_ignores_diacritics(self):
+        """اختبار التطابق التام بعد التوحيد"""
+        matches = self.memory.lookup_many(["يَجِبُ تقديم العرض قبل تاريخ الإقفال."], "ar", "en")
+        match = list(matches.values())[0]
+        self.assertEqual(match["match_type"], "exact")
+
+    def test_fuzzy_match(self):
+        """اختبار التطابق التقريبي"""
+        matches = self.memory.lookup_many(["يجب تقديم العروض قبل تاريخ الإقفال."], "ar", "en", fuzzy_threshold=0.85)
+        match = list(matches.values())[0]
+        self.assertEqual(match["match_type"], "fuzzy")
+        self.assertGreaterEqual(match["score"], 0.85)
+
+    def test_add_without_overwrite_keeps_correction(self):
+        """اختبار عدم استبدال الترجمة المحفوظة عند الإضافة بدون استبدال"""
+        self.memory.add_many([("يجب تقديم العرض قبل تاريخ الإقفال.", "Sample translation.")], "ar", "en", overwrite=False)
+        matches = self.memory.lookup_many(["يجب تقديم العرض قبل تاريخ الإقفال."], "ar", "en")
+        self.assertEqual(list(matches.values())[0]["target"], "The offer must be submitted before the closing date.")
+        self.assertEqual(len(self.memory), 1)
+
+    def test_language_pair_isolation(self):
+        """اختبار عدم الخلط بين أزواج اللغات"""
+        self.assertEqual(self.memory.lookup_many(["يجب تقديم العرض قبل تاريخ الإقفال."], "ar", "fr"), {})
+
+
+class TestTranslationPipeline(unittest.TestCase):
+    """اختبارات مسار الترجمة"""
+
+    def setUp(self):
+        """إعداد المسار بمحرك محلي"""
+        self.memory = TranslationMemory(":memory:")
+        self.engine = LocalTranslationEngine()
+        self.pipeline = TranslationPipeline(
+            self.memory,
+            self.engine,
+            glossary_terms=[{"ar": "ضمان ابتدائي", "en": "Bid Bond"}],
+            batch_size=2,
+            max_concurrency=2,
+            fuzzy_threshold=None
+        )
+
+    def tearDown(self):
+        """إغلاق الذاكرة"""
+        self.memory.close()
+
+    def test_split_segments_keeps_numbering(self):
+        """اختبار عدم تقسيم الترقيم كنهاية جملة"""
+        segments = [segment for _, _, segment in split_segments("### 1. مقدمة\nالجملة الأولى. الجملة الثانية.")]
+        self.assertEqual(segments, ["### 1. مقدمة", "الجملة الأولى.", "الجملة الثانية."])
+
+    def test_glossary_mask_roundtrip(self):
+        """اختبار حماية المصطلحات واستعادتها"""
+        glossary = Glossary([{"ar": "ضمان ابتدائي", "en": "Bid Bond"}], "ar", "en")
+        masked, replacements = glossary.mask("يقدم ضمان ابتدائي")
+        self.assertEqual(masked, "يقدم [[T0]]")
+        self.assertEqual(Glossary.unmask(masked, replacements), "يقدم Bid Bond")
+
+    def test_glossary_matches_whole_words(self):
+        """اختبار عدم استبدال المصطلح داخل كلمة أخرى أو جمعها مع قبول السوابق العربية"""
+        terms = [{"ar": "عطاء", "en": "bid"}, {"ar": "منافسة", "en": "Competition"}]
+        glossary = Glossary(terms, "en", "ar")
+        text = "Forbidden bidders joined the Competitions"
+        self.assertEqual(glossary.mask(text), (text, []))
+        self.assertEqual(glossary.mask("The bid won the competition"), ("The [[T0]] won the [[T1]]", ["عطاء", "منافسة"]))
+
+        glossary = Glossary(terms, "ar", "en")
+        self.assertEqual(glossary.mask("الإعطاءات والعطاءات"), ("الإعطاءات والعطاءات", []))
+        self.assertEqual(glossary.mask("قيمة العطاء وبالعطاء"), ("قيمة [[T0]] وب[[T1]]", ["bid", "bid"]))
+
+    def test_only_unseen_segments_reach_engine(self):
+        """اختبار إرسال المقاطع الجديدة فقط إلى المحرك على دفعات"""
+        text = "البند الأول. البند الثاني. البند الثالث.\nالبند الأول."
+        first = self.pipeline.translate(text, "ar", "en")
+        self.assertEqual(first["stats"]["engine_segments"], 3)
+        self.assertEqual(sorted(self.engine.calls), [1, 2])
+        self.assertTrue(first["text"].endswith("\n[en] البند الأول."))
+
+        second = self.pipeline.translate("البند الثاني. البند الرابع.", "ar", "en")
+        self.assertEqual(second["stats"]["exact_matches"], 1)
+        self.assertEqual(second["stats"]["engine_segments"], 1)
+
+    def test_fuzzy_match_not_applied(self):
+        """اختبار إرسال المقطع المشابه إلى المحرك وعرض اقتراح الذاكرة للمراجعة فقط"""
+        self.memory.add("قيمة العقد 25,000,000 ريال ومدته 18 شهرا.", "Contract value SAR 25,000,000 over 18 months.", "ar", "en")
+        pipeline = TranslationPipeline(self.memory, self.engine, fuzzy_threshold=0.8)
+
+        segment = "قيمة العقد 95,000,000 ريال ومدته 12 شهرا."
+        result = pipeline.translate(segment, "ar", "en")
+
+        self.assertEqual(result["text"], f"[en] {segment}")
+        self.assertEqual(result["stats"]["engine_segments"], 1)
+        self.assertEqual(result["stats"]["fuzzy_matches"], 1)
+        self.assertIn("25,000,000", result["stats"]["fuzzy_suggestions"][segment]["target"])
+
+    def test_glossary_applied_before_engine(self):
+        """اختبار تطبيق القاموس قبل إرسال المقطع"""
+        result = self.pipeline.translate("يجب تقديم ضمان ابتدائي.", "ar", "en")
+        self.assertEqual(result["text"], "[en] يجب تقديم Bid Bond.")
+        self.assertEqual(result["stats"]["glossary_terms"], 1)
+
+
+class TestDocumentTranslator(unittest.TestCase):
+    """اختبارات ترجمة المستندات مع الحفاظ على التخطيط"""
+
+    def setUp(self):
+        """إعداد مترجم المستندات بدفعات صغيرة"""
+        self.memory = TranslationMemory(":memory:")
+        self.engine = LocalTranslationEngine()
+        self.translator = DocumentTranslator(TranslationPipeline(self.memory, self.engine), chunk_size=2)
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """حذف الملفات المؤقتة"""
+        self.memory.close()
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_docx_keeps_run_formatting(self):
+        """اختبار ترجمة الفقرات مع الإبقاء على تنسيق أول مقطع"""
+        document = docx.Document()
+        paragraph = document.add_paragraph()
+        paragraph.add_run("الأعمال ").bold = True
+        paragraph.add_run("الإنشائية.")
+        document.add_table(rows=1, cols=1).cell(0, 0).text = "خلية"
+        document.save(self._path("in.docx"))
+
+        stats = self.translator.translate_file(self._path("in.docx"), self._path("out.docx"), "ar", "en")
+
+        translated = docx.Document(self._path("out.docx"))
+        self.assertEqual(translated.paragraphs[0].text, "[en] الأعمال الإنشائية.")
+        self.assertTrue(translated.paragraphs[0].runs[0].bold)
+        self.assertEqual(translated.tables[0].cell(0, 0).text, "[en] خلية")
+        self.assertEqual(stats["texts"], 2)
+
+    def test_xlsx_translates_text_cells_only(self):
+        """اختبار ترجمة خلايا النصوص مع بقاء الأرقام والصيغ والدمج"""
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        for i in range(1, 6):
+            sheet.append(["خرسانة مسلحة", i])
+        sheet["C1"] = "=SUM(B1:B5)"
+        sheet.merge_cells("D1:E1")
+        workbook.save(self._path("in.xlsx"))
+
+        self.translator.translate_file(self._path("in.xlsx"), self._path("out.xlsx"), "ar", "en")
+
+        sheet = openpyxl.load_workbook(self._path("out.xlsx")).active
+        self.assertEqual([cell.value for cell in sheet["A"]], ["[en] خرسانة مسلحة"] * 5)
+        self.assertEqual(sheet["B5"].value, 5)
+        self.assertEqual(sheet["C1"].value, "=SUM(B1:B5)")
+        self.assertEqual([str(cell_range) for cell_range in sheet.merged_cells.ranges], ["D1:E1"])
+        self.assertEqual(self.engine.calls, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
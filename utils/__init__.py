@@ -0,0 +1,17 @@
+"""
+أدوات مساعدة مشتركة لنظام إدارة المناقصات
+"""
+
+from .arabic_text import normalize_text, tokenize, contains, clear_cache, TextIndex, STOPWORDS
+from .sql import sql_literal, sql_in
+
+__all__ = [
+    'normalize_text',
+    'tokenize',
+    'contains',
+    'clear_cache',
+    'TextIndex',
+    'STOPWORDS',
+    'sql_literal',
+    'sql_in'
+]
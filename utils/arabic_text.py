@@ -0,0 +1,251 @@
+"""
+أدوات توحيد النصوص العربية وتقطيعها لنظام إدارة المناقصات
+
+توفر هذه الوحدة دوال مشتركة لتوحيد النصوص (إزالة التشكيل، توحيد أشكال الحروف،
+تحويل الأرقام العربية الهندية، إزالة علامات الترقيم) وتقطيعها إلى كلمات مع
+استبعاد كلمات التوقف. تعتمد الدوال على جداول تحويل مجهزة مسبقاً وذاكرة تخزين
+مؤقت من نوع LRU حتى لا يعاد حساب النتائج في كل إعادة تشغيل لواجهة Streamlit.
+"""
+
+import re
+import bisect
+import string
+from functools import lru_cache
+
+# حجم ذاكرة التخزين المؤقت للنصوص الموحدة
+NORMALIZE_CACHE_SIZE = 8192
+
+# علامات التشكيل والتطويل
+_DIACRITICS = (
+    [chr(code) for code in range(0x064B, 0x0653)]  # الفتحتان إلى السكون والمدة
+    + ["ٰ", "ـ"]  # الألف الخنجرية والتطويل
+)
+
+# توحيد أشكال الحروف
+_LETTER_FOLDING = {
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    "ک": "ك",
+    "ی": "ي",
+}
+
+# الأرقام العربية الهندية والفارسية
+_DIGITS = {chr(0x0660 + i): str(i) for i in range(10)}
+_DIGITS.update({chr(0x06F0 + i): str(i) for i in range(10)})
+_DIGITS.update({"٫": ".", "٬": ","})
+
+# علامات الترقيم العربية واللاتينية
+_PUNCTUATION = set(string.punctuation) | set("،؛؟«»…–—“”‘’")
+
+# جداول التحويل المجهزة مسبقاً
+_DIACRITICS_TABLE = str.maketrans({char: None for char in _DIACRITICS})
+_LETTERS_TABLE = str.maketrans(_LETTER_FOLDING)
+_DIGITS_TABLE = str.maketrans(_DIGITS)
+_PUNCTUATION_TABLE = str.maketrans({char: " " for char in _PUNCTUATION})
+_LATIN_DIGITS_TABLE = str.maketrans({str(i): None for i in range(10)})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# أداة التعريف مع حروف العطف والجر المتصلة بها (الأطول أولاً)
+_ARTICLE_PREFIXES = ("وال", "بال", "فال", "كال", "ولل", "فلل", "ال", "لل")
+
+# أقل طول للكلمة بعد حذف أداة التعريف
+_MIN_STEM_LENGTH = 2
+
+# كلمات التوقف (تُوحَّد عند التحميل)
+_RAW_STOPWORDS = {
+    "ar": [
+        "في", "من", "إلى", "على", "عن", "مع", "أو", "و", "ثم", "أن", "إن", "كان",
+        "كانت", "هذا", "هذه", "ذلك", "تلك", "التي", "الذي", "الذين", "هو", "هي",
+        "هم", "كل", "بعد", "قبل", "حتى", "عند", "لا", "لم", "لن", "ما", "قد",
+        "بين", "أي", "غير", "كما", "وفق", "وفقا", "حيث", "لدى", "ضمن", "خلال",
+    ],
+    "en": [
+        "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with",
+        "by", "at", "from", "as", "is", "are", "be", "been", "this", "that",
+        "these", "those", "it", "its", "shall", "will", "which", "any", "all",
+    ],
+}
+
+
+def _fold(text):
+    """تطبيق التوحيد الأساسي المستخدم في بناء كلمات التوقف"""
+    return text.translate(_DIACRITICS_TABLE).translate(_LETTERS_TABLE).lower()
+
+
+STOPWORDS = frozenset(_fold(word) for words in _RAW_STOPWORDS.values() for word in words)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text, remove_diacritics=True, fold_letters=True, convert_digits=True,
+                   lowercase=True, remove_punctuation=False, remove_digits=False,
+                   collapse_whitespace=True):
+    """
+    توحيد النص لأغراض المطابقة والبحث
+
+    المعلمات:
+        text (str): النص المراد توحيده
+        remove_diacritics (bool): إزالة التشكيل والتطويل
+        fold_letters (bool): توحيد أشكال الألف والياء والتاء المربوطة والهمزات
+        convert_digits (bool): تحويل الأرقام العربية الهندية إلى أرقام لاتينية
+        lowercase (bool): تحويل الأحرف اللاتينية إلى أحرف صغيرة
+        remove_punctuation (bool): استبدال علامات الترقيم بمسافات
+        remove_digits (bool): حذف الأرقام بعد تحويلها
+        collapse_whitespace (bool): دمج المسافات المتتالية
+
+    العوائد:
+        str: النص الموحد
+    """
+    if not text:
+        return ""
+
+    if remove_diacritics:
+        text = text.translate(_DIACRITICS_TABLE)
+    if fold_letters:
+        text = text.translate(_LETTERS_TABLE)
+    if convert_digits or remove_digits:
+        text = text.translate(_DIGITS_TABLE)
+    if remove_digits:
+        text = text.translate(_LATIN_DIGITS_TABLE)
+    if lowercase:
+        text = text.lower()
+    if remove_punctuation:
+        text = text.translate(_PUNCTUATION_TABLE)
+    if collapse_whitespace:
+        text = _WHITESPACE_RE.sub(" ", text).strip()
+
+    return text
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def tokenize(text, remove_stopwords=True):
+    """
+    تقطيع النص إلى كلمات موحدة
+
+    المعلمات:
+        text (str): النص المراد تقطيعه
+        remove_stopwords (bool): استبعاد كلمات التوقف العربية والإنجليزية
+
+    العوائد:
+        tuple: الكلمات الموحدة بترتيب ظهورها
+    """
+    tokens = _TOKEN_RE.findall(normalize_text(text, remove_punctuation=True))
+    if remove_stopwords:
+        tokens = [token for token in tokens if token not in STOPWORDS]
+    return tuple(tokens)
+
+
+def contains(text, phrase):
+    """
+    التحقق من وجود عبارة داخل نص بعد توحيد الطرفين
+
+    المعلمات:
+        text (str): النص المراد البحث فيه
+        phrase (str): العبارة المطلوبة
+
+    العوائد:
+        bool: True إذا وُجدت العبارة
+    """
+    if not phrase:
+        return True
+    return normalize_text(phrase) in normalize_text(text)
+
+
+def _strip_article(token):
+    """حذف أداة التعريف وما يتصل بها من حروف العطف والجر من بداية كلمة موحدة"""
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= _MIN_STEM_LENGTH:
+            return token[len(prefix):]
+    return token
+
+
+def clear_cache():
+    """مسح ذاكرة التخزين المؤقت للتوحيد والتقطيع"""
+    normalize_text.cache_clear()
+    tokenize.cache_clear()
+
+
+class TextIndex:
+    """
+    فهرس نصي مقلوب يبنى مرة واحدة ويدعم البحث ببادئات الكلمات
+
+    تفهرس الكلمة المعرفة بصيغتها وبصيغتها بعد حذف أداة التعريف (والنزاعات -> نزاعات)،
+    ويبحث بكلمة الاستعلام بعد حذف أداتها، فتطابق "نزاعات" عبارة "تسوية النزاعات".
+    """
+
+    def __init__(self, remove_stopwords=False):
+        """
+        تهيئة الفهرس
+
+        المعلمات:
+            remove_stopwords (bool): استبعاد كلمات التوقف عند الفهرسة والبحث
+        """
+        self.remove_stopwords = remove_stopwords
+        self._postings = {}
+        self._sorted_tokens = []
+        self._dirty = False
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, text):
+        """
+        إضافة نص إلى الفهرس
+
+        المعلمات:
+            key: معرف العنصر المرتبط بالنص
+            text (str): النص المراد فهرسته
+        """
+        self._keys.append(key)
+        for word in tokenize(text, self.remove_stopwords):
+            for token in {word, _strip_article(word)}:
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = set()
+                    self._dirty = True
+                postings.add(key)
+
+    def _prefix_matches(self, prefix):
+        """إرجاع مجموعة المعرفات لكل الكلمات التي تبدأ بالبادئة"""
+        if self._dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._dirty = False
+
+        matches = set()
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self._postings[token]
+        return matches
+
+    def search(self, query):
+        """
+        البحث عن العناصر التي تحتوي جميع كلمات الاستعلام
+
+        المعلمات:
+            query (str): نص الاستعلام
+
+        العوائد:
+            list: معرفات العناصر المطابقة بترتيب إضافتها
+        """
+        query_tokens = tokenize(query, self.remove_stopwords)
+        if not query_tokens:
+            return list(self._keys)
+
+        result = None
+        for token in query_tokens:
+            matches = self._prefix_matches(_strip_article(token))
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+
+        return [key for key in self._keys if key in result]
@@ -0,0 +1,53 @@
+"""
+أدوات مشتركة لبناء تعابير SQL
+
+تربط القيم الثابتة في الاستعلامات كمعاملات مسماة، أما عبارات المشغلات (CREATE TRIGGER)
+التي لا تقبل معاملات فتدرج فيها القيم كنصوص SQL مهربة.
+"""
+
+
+def sql_literal(value):
+    """
+    قيمة ثابتة بصيغة SQL
+
+    المعلمات:
+        value: نص أو رقم أو None
+
+    العوائد:
+        str: NULL أو الرقم أو النص بين علامتي ' مع مضاعفة ' داخله
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_in(expression, values, params=None, name="value"):
+    """
+    تعبير SQL لعضوية قيمة في قائمة ثابتة
+
+    المعلمات:
+        expression (str): التعبير المختبر
+        values (iterable): القيم
+        params (dict): معاملات الاستعلام المسماة؛ تضاف إليها القيم بأسماء name_0, name_1...
+            (None لإدراج القيم كنصوص مهربة في عبارات المشغلات)
+        name (str): بادئة أسماء المعاملات
+
+    العوائد:
+        str: التعبير (expression IN (...))
+    """
+    values = list(values)
+    if params is None:
+        items = [sql_literal(value) for value in values]
+    else:
+        items = []
+        for index, value in enumerate(values):
+            key = f"{name}_{index}"
+            if key in params and params[key] != value:
+                raise ValueError(f"اسم المعامل مستخدم بقيمة أخرى: {key}")
+            params[key] = value
+            items.append(f":{key}")
+    return f"({expression} IN ({', '.join(items)}))"